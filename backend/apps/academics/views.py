@@ -16,6 +16,7 @@ from .serializers import (
     AttendanceSerializer, DisciplineRecordSerializer, DisciplineRequestSerializer, ReportCardSerializer
 )
 from apps.schools.models import SchoolClass, ClassSubject, StudentClassEnrollment
+from apps.schools.access import teacher_access_exists, titulaire_access_exists, teacher_can_manage
 
 
 class GradePagination(PageNumberPagination):
@@ -250,14 +251,14 @@ class GradeBulletinViewSet(viewsets.ModelViewSet):
             elif self.request.user.is_student:
                 qs = qs.filter(student__user=self.request.user)
             elif self.request.user.is_teacher and not getattr(self.request.user, 'is_admin', False):
-                # Titulaire OU enseignant assigné à cette matière dans cette classe (ClassSubject.teacher)
+                # Titulaire OU enseignant assigné à cette matière dans cette classe (ClassSubject.teacher),
+                # via la carte d'accès TeacherClassAccess (semi-jointure indexée, sans .distinct())
                 try:
                     tp = self.request.user.teacher_profile
                     qs = qs.filter(
-                        Q(school_class__titulaire=tp)
-                        | Q(school_class__isnull=False, school_class__class_subjects__subject=F('subject'), school_class__class_subjects__teacher=tp)
-                        | Q(school_class__isnull=True, student__school_class__titulaire=tp)
-                    ).distinct()
+                        teacher_access_exists(tp, 'school_class', 'subject')
+                        | (Q(school_class__isnull=True) & titulaire_access_exists(tp, 'student__school_class'))
+                    )
                 except Exception:
                     qs = qs.none()
             return qs
@@ -285,7 +286,7 @@ class GradeBulletinViewSet(viewsets.ModelViewSet):
         if getattr(sc, 'titulaire_id', None) is not None and sc.titulaire_id == tp.pk:
             return
         # 2) Enseignant assigné à cette matière dans cette classe (ClassSubject.teacher)
-        if ClassSubject.objects.filter(school_class=sc, subject=subject, teacher=tp).exists():
+        if teacher_can_manage(tp, sc, subject):
             return
         if getattr(sc, 'titulaire_id', None) is None:
             raise PermissionDenied(
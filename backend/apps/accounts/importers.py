@@ -0,0 +1,485 @@
+"""
+Import en masse des élèves et parents depuis une feuille CSV/XLSX.
+
+La feuille est lue en flux (ligne par ligne) et traitée par paquets : chaque paquet
+est validé, les parents sont dédoublonnés par téléphone, les mots de passe par défaut
+sont hachés dans un pool de processus, puis Users / Parents / Students /
+StudentClassEnrollments sont créés avec bulk_create dans une transaction par paquet.
+
+Depuis l'API, seul le dry_run est exécuté dans la requête : l'import réel est enregistré
+(StudentImportJob, fichier conservé dans le stockage) puis exécuté hors requête selon
+STUDENT_IMPORT_MODE ('celery', 'thread' ou 'sync', comme la correction des devoirs) ;
+l'administrateur suit son statut et récupère le rapport par l'API.
+"""
+import csv
+import io
+import logging
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.schools.models import SchoolClass, StudentClassEnrollment
+from .models import User, Parent, Student, StudentImportJob
+from .utils import hash_passwords, password_hash_pool
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+
+# En-têtes acceptés (normalisés : minuscules, sans accents, espaces → _) → champ interne
+COLUMN_ALIASES = {
+    'first_name': 'first_name', 'prenom': 'first_name',
+    'last_name': 'last_name', 'nom': 'last_name',
+    'middle_name': 'middle_name', 'postnom': 'middle_name',
+    'date_of_birth': 'date_of_birth', 'date_de_naissance': 'date_of_birth',
+    'phone': 'phone', 'telephone': 'phone',
+    'email': 'email',
+    'address': 'address', 'adresse': 'address',
+    'student_id': 'student_id', 'matricule': 'student_id',
+    'class_name': 'class_name', 'classe': 'class_name',
+    'academic_year': 'academic_year', 'annee_scolaire': 'academic_year',
+    'parent_name': 'parent_name', 'nom_du_parent': 'parent_name',
+    'parent_phone': 'parent_phone', 'telephone_du_parent': 'parent_phone', 'telephone_parent': 'parent_phone',
+    'parent_email': 'parent_email', 'email_du_parent': 'parent_email', 'email_parent': 'parent_email',
+    'parent_profession': 'parent_profession', 'profession_du_parent': 'parent_profession',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+
+
+class ImportFormatError(Exception):
+    """Fichier illisible ou format non supporté (erreur globale, pas par ligne)."""
+
+
+def _normalize_header(value):
+    text = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', text.strip().lower()).strip('_')
+
+
+def normalize_phone(value):
+    """Clé de dédoublonnage d'un téléphone : chiffres et '+' initial uniquement."""
+    raw = str(value or '').strip()
+    if not raw:
+        return ''
+    digits = re.sub(r'\D', '', raw)
+    return f"+{digits}" if raw.startswith('+') else digits
+
+
+def _parse_name(full_name):
+    """Format attendu « NOM Prénom » (comme les demandes d'inscription). Retourne (first_name, last_name)."""
+    parts = (full_name or '').strip().split()
+    if not parts:
+        return None, None
+    if len(parts) == 1:
+        return parts[0], parts[0]
+    return " ".join(parts[1:]), parts[0]
+
+
+def _parse_date(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Date invalide : {text} (formats acceptés : AAAA-MM-JJ, JJ/MM/AAAA)")
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Les tableurs renvoient souvent les numéros (téléphone, matricule) en float
+        value = int(value)
+    if isinstance(value, (date, datetime)):
+        return value
+    return str(value).strip()
+
+
+def _iter_csv(uploaded_file):
+    stream = io.TextIOWrapper(getattr(uploaded_file, 'file', uploaded_file), encoding='utf-8-sig', newline='')
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+    yield from reader
+    stream.detach()
+
+
+def _iter_xlsx(uploaded_file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("Le support XLSX nécessite le paquet openpyxl. Utilisez un fichier CSV.")
+    try:
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Fichier XLSX illisible : {e}")
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_rows(uploaded_file, filename=''):
+    """
+    Lit la feuille en flux et produit (numéro_de_ligne, dict champ → valeur).
+    La première ligne est l'en-tête ; les colonnes inconnues sont ignorées.
+    """
+    name = (filename or getattr(uploaded_file, 'name', '') or '').lower()
+    if name.endswith('.xlsx'):
+        rows = _iter_xlsx(uploaded_file)
+    elif name.endswith('.csv') or name.endswith('.txt'):
+        rows = _iter_csv(uploaded_file)
+    else:
+        raise ImportFormatError("Format non supporté. Utilisez un fichier .csv ou .xlsx.")
+
+    header = None
+    for line_number, values in enumerate(rows, 1):
+        if header is None:
+            header = [COLUMN_ALIASES.get(_normalize_header(v)) for v in values]
+            if 'first_name' not in header or 'last_name' not in header:
+                raise ImportFormatError("En-tête invalide : les colonnes first_name (prenom) et last_name (nom) sont obligatoires.")
+            continue
+        if not any(v not in (None, '') for v in values):
+            continue
+        row = {}
+        for key, value in zip(header, values):
+            if key:
+                row[key] = _cell(value)
+        yield line_number, row
+    if header is None:
+        raise ImportFormatError("Fichier vide.")
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class StudentImporter:
+    """
+    Importe des élèves (et leurs parents) pour une école.
+    L'état partagé entre paquets (classes, parents déjà vus, usernames et matricules
+    attribués) est chargé une seule fois puis maintenu en mémoire.
+    """
+
+    def __init__(self, school, academic_year=None, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE, workers=None):
+        self.school = school
+        self.academic_year = (academic_year or school.academic_year or '').strip()
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.hash_pool = None
+        self.student_password = getattr(settings, 'DEFAULT_STUDENT_PASSWORD', 'Eleve@@')
+        self.parent_password = getattr(settings, 'DEFAULT_PARENT_PASSWORD', 'Parent@@')
+
+        self.classes = {
+            ((c.name or '').strip().lower(), (c.academic_year or '').strip()): c
+            for c in SchoolClass.objects.filter(school=school)
+        }
+        self.existing_student_ids = set(
+            Student.objects.filter(user__school=school).values_list('student_id', flat=True)
+        )
+        self.parents_by_phone = {}
+        self.taken_usernames = set()
+        self.year = date.today().year
+        self.next_student_number = self._last_student_number() + 1
+        self.report = {
+            'total_rows': 0,
+            'created_students': 0,
+            'created_parents': 0,
+            'reused_parents': 0,
+            'errors': [],
+            'dry_run': dry_run,
+        }
+
+    def _last_student_number(self):
+        prefix = f"{self.school.code}-{self.year}-"
+        last = Student.objects.filter(
+            user__school=self.school, student_id__startswith=prefix
+        ).order_by('-student_id').values_list('student_id', flat=True).first()
+        try:
+            return int(last.split('-')[-1]) if last else 0
+        except ValueError:
+            return 0
+
+    def _generate_student_id(self):
+        while True:
+            student_id = f"{self.school.code}-{self.year}-{str(self.next_student_number).zfill(4)}"
+            self.next_student_number += 1
+            if student_id not in self.existing_student_ids:
+                return student_id
+
+    # -- Validation -------------------------------------------------------------------
+
+    def _validate(self, line_number, row):
+        errors = {}
+        first_name, last_name = row.get('first_name') or '', row.get('last_name') or ''
+        if not first_name:
+            errors['first_name'] = "Prénom obligatoire."
+        if not last_name:
+            errors['last_name'] = "Nom obligatoire."
+
+        try:
+            date_of_birth = _parse_date(row.get('date_of_birth'))
+        except ValueError as e:
+            errors['date_of_birth'] = str(e)
+            date_of_birth = None
+
+        academic_year = str(row.get('academic_year') or self.academic_year).strip()
+        class_name = str(row.get('class_name') or '').strip()
+        school_class = None
+        if class_name:
+            school_class = self.classes.get((class_name.lower(), academic_year))
+            if school_class is None:
+                errors['class_name'] = f"Classe introuvable : {class_name} ({academic_year})."
+
+        student_id = str(row.get('student_id') or '').strip()
+        if student_id and student_id in self.existing_student_ids:
+            errors['student_id'] = f"Matricule déjà utilisé : {student_id}."
+
+        parent_phone = normalize_phone(row.get('parent_phone'))
+        parent_first, parent_last = _parse_name(row.get('parent_name'))
+        if row.get('parent_name') and not parent_phone:
+            errors['parent_phone'] = "Téléphone du parent obligatoire pour créer le parent."
+
+        if errors:
+            self.report['errors'].append({'row': line_number, 'errors': errors})
+            return None
+
+        if student_id:
+            self.existing_student_ids.add(student_id)
+        return {
+            'line': line_number,
+            'first_name': first_name,
+            'last_name': last_name,
+            'middle_name': row.get('middle_name') or None,
+            'date_of_birth': date_of_birth,
+            'phone': row.get('phone') or '',
+            'email': row.get('email') or '',
+            'address': row.get('address') or '',
+            'student_id': student_id,
+            'school_class': school_class,
+            'academic_year': academic_year,
+            'parent_phone': parent_phone,
+            'parent_raw_phone': str(row.get('parent_phone') or '').strip(),
+            'parent_first_name': parent_first,
+            'parent_last_name': parent_last,
+            'parent_email': row.get('parent_email') or '',
+            'parent_profession': row.get('parent_profession') or '',
+        }
+
+    # -- Résolution des parents et usernames -------------------------------------------
+
+    def _load_existing_parents(self, rows):
+        wanted = {}
+        for r in rows:
+            if r['parent_phone'] and r['parent_phone'] not in self.parents_by_phone:
+                wanted.setdefault(r['parent_phone'], set()).update({r['parent_phone'], r['parent_raw_phone']})
+        if not wanted:
+            return
+        lookup = set().union(*wanted.values())
+        for parent in User.objects.filter(school=self.school, role='PARENT', phone__in=lookup):
+            key = normalize_phone(parent.phone)
+            if key in wanted and key not in self.parents_by_phone:
+                self.parents_by_phone[key] = parent
+
+    def _allocate_usernames(self, bases):
+        """Attribue des usernames uniques (prénom.nom, puis prénom.nom.1, ...) pour une liste de bases."""
+        candidates = set(bases) - self.taken_usernames
+        self.taken_usernames.update(
+            User.objects.filter(username__in=candidates).values_list('username', flat=True)
+        )
+        conflicting = {b for b in bases if b in self.taken_usernames}
+        for base in conflicting:
+            self.taken_usernames.update(
+                User.objects.filter(username__startswith=f"{base}.").values_list('username', flat=True)
+            )
+        result = []
+        for base in bases:
+            username, counter = base, 1
+            while username in self.taken_usernames:
+                username = f"{base}.{counter}"
+                counter += 1
+            self.taken_usernames.add(username)
+            result.append(username)
+        return result
+
+    @staticmethod
+    def _username_base(first_name, last_name):
+        return f"{first_name.lower()}.{last_name.lower()}".replace(" ", ".")
+
+    # -- Écriture ------------------------------------------------------------------------
+
+    def _process_chunk(self, rows):
+        self._load_existing_parents(rows)
+
+        new_parent_rows = {}
+        for r in rows:
+            key = r['parent_phone']
+            if not key or not r['parent_first_name']:
+                continue
+            if key in self.parents_by_phone:
+                self.report['reused_parents'] += 1
+            elif key not in new_parent_rows:
+                new_parent_rows[key] = r
+
+        if self.dry_run:
+            self.report['created_parents'] += len(new_parent_rows)
+            self.report['created_students'] += len(rows)
+            for key in new_parent_rows:
+                self.parents_by_phone[key] = None
+            return
+
+        parent_usernames = self._allocate_usernames([
+            self._username_base(r['parent_first_name'], r['parent_last_name']) for r in new_parent_rows.values()
+        ])
+        student_usernames = self._allocate_usernames([
+            self._username_base(r['first_name'], r['last_name']) for r in rows
+        ])
+        hashes = hash_passwords(
+            [self.parent_password] * len(new_parent_rows) + [self.student_password] * len(rows),
+            workers=self.workers, pool=self.hash_pool,
+        )
+        parent_hashes, student_hashes = hashes[:len(new_parent_rows)], hashes[len(new_parent_rows):]
+
+        parent_users = []
+        for r, username, password in zip(new_parent_rows.values(), parent_usernames, parent_hashes):
+            email = r['parent_email'] or f"{r['parent_first_name'].lower()}.{r['parent_last_name'].lower()}@eschool.rdc"
+            parent_users.append(User(
+                username=username, email=email, password=password,
+                first_name=r['parent_first_name'], last_name=r['parent_last_name'],
+                phone=r['parent_raw_phone'], role='PARENT', school=self.school,
+            ))
+
+        student_users = []
+        for r, username, password in zip(rows, student_usernames, student_hashes):
+            student_users.append(User(
+                username=username, email=r['email'] or f"{username}@eschool.rdc", password=password,
+                first_name=r['first_name'], last_name=r['last_name'], middle_name=r['middle_name'],
+                phone=r['phone'], address=r['address'], date_of_birth=r['date_of_birth'],
+                role='STUDENT', school=self.school,
+            ))
+
+        today = date.today()
+        with transaction.atomic():
+            User.objects.bulk_create(parent_users)
+            Parent.objects.bulk_create([
+                Parent(user=u, profession=r['parent_profession'], emergency_contact=r['parent_raw_phone'])
+                for u, r in zip(parent_users, new_parent_rows.values())
+            ])
+            for key, user in zip(new_parent_rows, parent_users):
+                self.parents_by_phone[key] = user
+
+            User.objects.bulk_create(student_users)
+            students = []
+            for user, r in zip(student_users, rows):
+                students.append(Student(
+                    user=user,
+                    student_id=r['student_id'] or self._generate_student_id(),
+                    parent=self.parents_by_phone.get(r['parent_phone']) if r['parent_phone'] else None,
+                    school_class=r['school_class'],
+                    enrollment_date=today,
+                    academic_year=r['academic_year'],
+                ))
+            Student.objects.bulk_create(students)
+            StudentClassEnrollment.objects.bulk_create([
+                StudentClassEnrollment(student=s, school_class=s.school_class, status='active')
+                for s in students if s.school_class_id
+            ])
+
+        self.report['created_parents'] += len(parent_users)
+        self.report['created_students'] += len(students)
+
+    def run(self, uploaded_file, filename=''):
+        """Importe la feuille et retourne le rapport (compteurs + erreurs par ligne)."""
+        # Un seul pool de hachage pour tous les paquets
+        with password_hash_pool(1 if self.dry_run else self.workers) as self.hash_pool:
+            for chunk in _chunks(iter_sheet_rows(uploaded_file, filename), self.chunk_size):
+                self.report['total_rows'] += len(chunk)
+                valid = [v for v in (self._validate(n, row) for n, row in chunk) if v]
+                if valid:
+                    self._process_chunk(valid)
+        self.hash_pool = None
+        return self.report
+
+
+def import_students(school, uploaded_file, filename='', **kwargs):
+    """Raccourci : StudentImporter(school, **kwargs).run(uploaded_file, filename)."""
+    return StudentImporter(school, **kwargs).run(uploaded_file, filename)
+
+
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        # Un import à la fois par processus : le hachage occupe déjà tous les cœurs
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='student-import')
+    return _executor
+
+
+def run_import_job(job_id):
+    """Exécute un StudentImportJob en attente. Retourne le rapport (None si déjà pris)."""
+    if not StudentImportJob.objects.filter(pk=job_id, status='PENDING').update(
+        status='RUNNING', started_at=timezone.now()
+    ):
+        return None
+    job = StudentImportJob.objects.select_related('school').get(pk=job_id)
+    try:
+        with job.file.open('rb') as uploaded_file:
+            report = StudentImporter(job.school, academic_year=job.academic_year or None).run(
+                uploaded_file, job.filename
+            )
+    except Exception as e:
+        StudentImportJob.objects.filter(pk=job_id).update(status='FAILED', error=str(e), finished_at=timezone.now())
+        if not isinstance(e, ImportFormatError):
+            raise
+        return None
+    # Le fichier (données personnelles) n'est plus utile une fois l'import terminé
+    job.file.storage.delete(job.file.name)
+    StudentImportJob.objects.filter(pk=job_id).update(
+        status='DONE', report=report, file='', finished_at=timezone.now()
+    )
+    return report
+
+
+def _import_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    except Exception:
+        logger.exception("Échec de l'import d'élèves %s", job_id)
+    finally:
+        connection.close()
+
+
+def queue_import_job(job_id):
+    """Met en file l'import, après le commit de la requête."""
+    mode = settings.STUDENT_IMPORT_MODE
+    if mode == 'celery':
+        from .tasks import run_student_import
+        transaction.on_commit(lambda: run_student_import.delay(job_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _thread_pool().submit(_import_in_thread, job_id))
+    else:
+        transaction.on_commit(lambda: run_import_job(job_id))
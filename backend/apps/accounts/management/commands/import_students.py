@@ -0,0 +1,58 @@
+"""
+Commande pour importer en masse des élèves et leurs parents depuis un fichier CSV/XLSX.
+Usage: python manage.py import_students eleves.csv --school CVMA
+
+Même pipeline que l'endpoint POST /api/accounts/students/import/ :
+lecture en flux, validation par paquets, parents dédoublonnés par téléphone,
+mots de passe par défaut hachés dans un pool de processus, créations en bulk_create.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.schools.models import School
+from apps.accounts.importers import StudentImporter, ImportFormatError, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Importe des élèves et leurs parents depuis un fichier CSV/XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Chemin du fichier .csv ou .xlsx')
+        parser.add_argument('--school', required=True, help="Code de l'école (ex. CVMA)")
+        parser.add_argument('--academic-year', help="Année scolaire par défaut (défaut : celle de l'école)")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Lignes par paquet')
+        parser.add_argument('--workers', type=int, default=None, help='Processus de hachage (défaut : PASSWORD_HASH_WORKERS)')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valide le fichier sans modifier la base de données',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(code=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f"École introuvable : {options['school']}")
+
+        importer = StudentImporter(
+            school,
+            academic_year=options.get('academic_year'),
+            dry_run=options['dry_run'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+        )
+        try:
+            with open(options['path'], 'rb') as f:
+                report = importer.run(f, options['path'])
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Mode DRY-RUN : aucune modification n'a été effectuée."))
+        for error in report['errors']:
+            details = '; '.join(f"{k}: {v}" for k, v in error['errors'].items())
+            self.stdout.write(self.style.ERROR(f"  Ligne {error['row']} : {details}"))
+        self.stdout.write(f"Lignes lues : {report['total_rows']}")
+        self.stdout.write(f"Erreurs : {len(report['errors'])}")
+        self.stdout.write(f"Parents existants réutilisés : {report['reused_parents']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {report['created_students']} élèves et {report['created_parents']} parents importés"
+        ))
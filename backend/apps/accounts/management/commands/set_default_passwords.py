@@ -1,19 +1,31 @@
 """
 Commande pour définir les mots de passe par défaut pour tous les parents et élèves.
-Usage: python manage.py set_default_passwords
+Usage: python manage.py set_default_passwords [--school CVMA] [--role PARENT]
 
 Cette commande :
 - Définit le mot de passe 'Parent@@' pour tous les parents
 - Définit le mot de passe 'Eleve@@' pour tous les élèves
 - Les utilisateurs pourront ensuite changer leur mot de passe depuis l'application
 
-Note: Cette commande met à jour TOUS les parents et élèves existants.
+Le hachage PBKDF2 (plusieurs centaines de ms par mot de passe) est réparti sur un pool
+de processus créé une seule fois pour toute l'exécution, et les écritures se font par
+paquets avec bulk_update. Après chaque paquet,
+l'id du dernier utilisateur traité est enregistré dans un fichier de reprise : si la
+commande est interrompue, la relancer avec les mêmes filtres reprend là où elle s'est
+arrêtée (--restart pour repartir de zéro).
+
+Note: Sans filtre, cette commande met à jour TOUS les parents et élèves existants.
 Pour définir automatiquement le mot de passe lors de la création d'un nouvel utilisateur,
 voir le signal dans apps/accounts/signals.py
 """
-from django.core.management.base import BaseCommand
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import transaction
+from apps.accounts.utils import hash_passwords, password_hash_pool
+from apps.schools.models import School
 
 User = get_user_model()
 
@@ -21,6 +33,14 @@ User = get_user_model()
 DEFAULT_PARENT_PASSWORD = getattr(settings, 'DEFAULT_PARENT_PASSWORD', 'Parent@@')
 DEFAULT_STUDENT_PASSWORD = getattr(settings, 'DEFAULT_STUDENT_PASSWORD', 'Eleve@@')
 
+DEFAULT_PASSWORDS = {
+    'PARENT': DEFAULT_PARENT_PASSWORD,
+    'STUDENT': DEFAULT_STUDENT_PASSWORD,
+}
+ROLE_LABELS = {'PARENT': 'Parents', 'STUDENT': 'Élèves'}
+
+CHUNK_SIZE = 200
+
 
 class Command(BaseCommand):
     help = "Définit les mots de passe par défaut pour tous les parents et élèves"
@@ -32,85 +52,124 @@ class Command(BaseCommand):
             help='Affiche ce qui serait fait sans modifier la base de données',
         )
         parser.add_argument(
-            '--force',
+            '--school',
+            help="Code de l'école : limite la mise à jour aux utilisateurs de cette école",
+        )
+        parser.add_argument(
+            '--role',
+            choices=sorted(DEFAULT_PASSWORDS),
+            action='append',
+            help='Rôle à traiter (PARENT ou STUDENT, répétable). Défaut : les deux',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Nombre d\'utilisateurs hachés puis écrits par paquet',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Nombre de processus de hachage (défaut : PASSWORD_HASH_WORKERS, 0 = un par cœur)',
+        )
+        parser.add_argument(
+            '--checkpoint-dir',
+            default=str(Path(settings.BASE_DIR) / 'logs'),
+            help='Dossier du fichier de reprise',
+        )
+        parser.add_argument(
+            '--restart',
             action='store_true',
-            help='Force la mise à jour même si le mot de passe a déjà été changé',
+            help='Ignore le fichier de reprise et recommence depuis le début',
         )
 
+    def _checkpoint_path(self, options, roles):
+        key = f"{options.get('school') or 'all'}_{'-'.join(roles)}".lower()
+        return Path(options['checkpoint_dir']) / f"set_default_passwords_{key}.json"
+
+    def _load_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_checkpoint(self, path, state):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        tmp.replace(path)
+
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        force = options['force']
+        roles = sorted(set(options.get('role') or DEFAULT_PASSWORDS))
+        chunk_size = max(1, options['chunk_size'])
 
         if dry_run:
             self.stdout.write(self.style.WARNING("Mode DRY-RUN : aucune modification ne sera effectuée"))
 
-        # Récupérer tous les parents
-        parents = User.objects.filter(role='PARENT')
-        parent_count = parents.count()
+        users = User.objects.filter(role__in=roles)
+        if options.get('school'):
+            if not School.objects.filter(code=options['school']).exists():
+                raise CommandError(f"École introuvable : {options['school']}")
+            users = users.filter(school__code=options['school'])
 
-        # Récupérer tous les élèves
-        students = User.objects.filter(role='STUDENT')
-        student_count = students.count()
+        checkpoint_path = self._checkpoint_path(options, roles)
+        state = {} if (options['restart'] or dry_run) else self._load_checkpoint(checkpoint_path)
+        last_id = state.get('last_id', 0)
+        updated = dict.fromkeys(roles, 0)
+        updated.update(state.get('updated', {}))
 
         self.stdout.write(f"\n{'='*60}")
         self.stdout.write(f"  Définition des mots de passe par défaut")
         self.stdout.write(f"{'='*60}")
-        self.stdout.write(f"\nParents trouvés: {parent_count}")
-        self.stdout.write(f"Élèves trouvés: {student_count}")
-
-        updated_parents = 0
-        updated_students = 0
-
-        # Mettre à jour les parents
-        if parent_count > 0:
-            self.stdout.write(f"\n{'─'*60}")
-            self.stdout.write(f"Mise à jour des parents...")
-            self.stdout.write(f"{'─'*60}")
-            
-            for parent in parents:
-                # Vérifier si le mot de passe a déjà été changé (optionnel)
-                # On peut détecter cela en vérifiant si le hash correspond au mot de passe par défaut
-                # Mais pour simplifier, on met à jour tous les parents
-                
+        for role in roles:
+            self.stdout.write(f"{ROLE_LABELS[role]} trouvés: {users.filter(role=role).count()}")
+        if last_id:
+            self.stdout.write(self.style.WARNING(
+                f"\nReprise après l'utilisateur #{last_id} ({sum(updated.values())} déjà traités). "
+                f"Utilisez --restart pour recommencer."
+            ))
+
+        remaining = users.filter(id__gt=last_id).order_by('id')
+        total_remaining = remaining.count()
+        self.stdout.write(f"\nÀ traiter: {total_remaining}")
+
+        processed = 0
+        with password_hash_pool(1 if dry_run else options['workers']) as pool:
+            while True:
+                batch = list(remaining.filter(id__gt=last_id).only('id', 'username', 'role')[:chunk_size])
+                if not batch:
+                    break
                 if not dry_run:
-                    parent.set_password(DEFAULT_PARENT_PASSWORD)
-                    parent.save()
-                    updated_parents += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f"  ✓ {parent.username} ({parent.get_full_name() or 'N/A'})")
-                    )
-                else:
-                    updated_parents += 1
-                    self.stdout.write(f"  [DRY-RUN] {parent.username} ({parent.get_full_name() or 'N/A'})")
-
-        # Mettre à jour les élèves
-        if student_count > 0:
-            self.stdout.write(f"\n{'─'*60}")
-            self.stdout.write(f"Mise à jour des élèves...")
-            self.stdout.write(f"{'─'*60}")
-            
-            for student in students:
+                    hashes = hash_passwords([DEFAULT_PASSWORDS[u.role] for u in batch], workers=1, pool=pool)
+                    for user, password in zip(batch, hashes):
+                        user.password = password
+                    with transaction.atomic():
+                        User.objects.bulk_update(batch, ['password'])
+                for user in batch:
+                    updated[user.role] += 1
+                    if options['verbosity'] >= 2:
+                        prefix = "  [DRY-RUN]" if dry_run else "  ✓"
+                        self.stdout.write(f"{prefix} {user.username}")
+                last_id = batch[-1].id
+                processed += len(batch)
                 if not dry_run:
-                    student.set_password(DEFAULT_STUDENT_PASSWORD)
-                    student.save()
-                    updated_students += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f"  ✓ {student.username} ({student.get_full_name() or 'N/A'})")
-                    )
-                else:
-                    updated_students += 1
-                    self.stdout.write(f"  [DRY-RUN] {student.username} ({student.get_full_name() or 'N/A'})")
+                    self._save_checkpoint(checkpoint_path, {'last_id': last_id, 'updated': updated})
+                self.stdout.write(f"  {processed}/{total_remaining}")
 
         # Résumé
         self.stdout.write(f"\n{'='*60}")
         self.stdout.write(self.style.SUCCESS("Résumé"))
         self.stdout.write(f"{'='*60}")
-        self.stdout.write(f"Parents mis à jour: {updated_parents}/{parent_count}")
-        self.stdout.write(f"Élèves mis à jour: {updated_students}/{student_count}")
+        for role in roles:
+            self.stdout.write(f"{ROLE_LABELS[role]} mis à jour: {updated[role]}")
         self.stdout.write(f"\nMots de passe par défaut:")
-        self.stdout.write(f"  - Parents: {DEFAULT_PARENT_PASSWORD}")
-        self.stdout.write(f"  - Élèves: {DEFAULT_STUDENT_PASSWORD}")
-        
+        for role in roles:
+            self.stdout.write(f"  - {ROLE_LABELS[role]}: {DEFAULT_PASSWORDS[role]}")
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
@@ -119,9 +178,10 @@ class Command(BaseCommand):
                 )
             )
         else:
+            checkpoint_path.unlink(missing_ok=True)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"\n✓ {updated_parents + updated_students} utilisateurs mis à jour avec succès !"
+                    f"\n✓ {sum(updated.values())} utilisateurs mis à jour avec succès !"
                 )
             )
             self.stdout.write(
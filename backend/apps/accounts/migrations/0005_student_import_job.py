@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0013_teacher_class_access'),
+        ('accounts', '0004_user_middle_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='imports/students/', verbose_name='Fichier')),
+                ('filename', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('academic_year', models.CharField(blank=True, max_length=20, verbose_name='Année scolaire')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échec')], default='PENDING', max_length=20, verbose_name='Statut')),
+                ('report', models.JSONField(blank=True, null=True, verbose_name='Rapport')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='student_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Lancé par')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_import_jobs', to='schools.school', verbose_name='École')),
+            ],
+            options={
+                'verbose_name': "Import d'élèves",
+                'verbose_name_plural': "Imports d'élèves",
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -135,3 +135,34 @@ class Student(models.Model):
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.student_id}"
+
+
+class StudentImportJob(models.Model):
+    """Import en masse lancé depuis l'API, exécuté hors requête (suivi par l'administrateur)"""
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échec'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='student_import_jobs', verbose_name="École")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='student_import_jobs', verbose_name="Lancé par")
+    file = models.FileField(upload_to='imports/students/', verbose_name="Fichier")
+    filename = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    academic_year = models.CharField(max_length=20, blank=True, verbose_name="Année scolaire")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Statut")
+    report = models.JSONField(null=True, blank=True, verbose_name="Rapport")
+    error = models.TextField(blank=True, verbose_name="Erreur")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Import d'élèves"
+        verbose_name_plural = "Imports d'élèves"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
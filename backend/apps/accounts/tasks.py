@@ -0,0 +1,11 @@
+"""
+Celery tasks for accounts (bulk student import)
+"""
+from celery import shared_task
+
+
+@shared_task
+def run_student_import(job_id):
+    """Run a queued bulk student/parent import and store its report"""
+    from .importers import run_import_job
+    return run_import_job(job_id)
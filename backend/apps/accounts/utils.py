@@ -0,0 +1,61 @@
+"""
+Utility functions for accounts (hachage des mots de passe en masse, etc.)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+# En dessous de ce nombre de mots de passe, le coût de démarrage du pool dépasse le gain
+MIN_PASSWORDS_FOR_POOL = 8
+
+
+def _init_hash_worker():
+    """Initialise Django dans les processus du pool (nécessaire hors fork, ex. spawn)."""
+    import django
+    django.setup()
+
+
+def get_password_hash_workers(workers=None):
+    """
+    Nombre de processus pour le hachage. PASSWORD_HASH_WORKERS=0 → un par cœur CPU.
+    """
+    if workers is None:
+        workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 0)
+    if not workers or workers < 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+@contextmanager
+def password_hash_pool(workers=None):
+    """
+    Pool de processus de hachage à partager entre les paquets d'un même traitement
+    (django.setup n'est exécuté qu'une fois par processus). None si un seul processus.
+    """
+    workers = get_password_hash_workers(workers)
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        yield pool
+
+
+def hash_passwords(raw_passwords, workers=None, chunksize=16, pool=None):
+    """
+    Hache une liste de mots de passe (PBKDF2, sel distinct par utilisateur).
+    Le hachage PBKDF2 domine le coût des créations en masse : on le répartit sur
+    un pool de processus (celui de password_hash_pool si fourni, sinon un pool
+    créé pour l'appel). Retourne la liste des hash dans le même ordre.
+    """
+    raw_passwords = list(raw_passwords)
+    if len(raw_passwords) < MIN_PASSWORDS_FOR_POOL:
+        return [make_password(p) for p in raw_passwords]
+    if pool is not None:
+        return list(pool.map(make_password, raw_passwords, chunksize=chunksize))
+    workers = get_password_hash_workers(workers)
+    if workers <= 1:
+        return [make_password(p) for p in raw_passwords]
+    with password_hash_pool(min(workers, len(raw_passwords))) as pool:
+        return list(pool.map(make_password, raw_passwords, chunksize=chunksize))
@@ -5,10 +5,12 @@ from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.exceptions import PermissionDenied, NotFound
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from .models import User, Teacher, Parent, Student
+from .models import User, Teacher, Parent, Student, StudentImportJob
+from .importers import StudentImporter, ImportFormatError, queue_import_job
 from .serializers import (
     UserSerializer, CustomTokenObtainPairSerializer, RegisterSerializer,
     ChangePasswordSerializer,
@@ -195,6 +197,64 @@ class StudentViewSet(viewsets.ModelViewSet):
                 defaults={'status': 'active'},
             )
     
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """
+        Import en masse d'élèves et de leurs parents depuis un fichier CSV/XLSX (champ « file »).
+        Champs optionnels : academic_year (défaut : année de l'école), dry_run (validation seule).
+        Colonnes : first_name, last_name, middle_name, date_of_birth, student_id, class_name,
+        parent_name, parent_phone, parent_email (en-têtes français acceptés : prenom, nom, classe, ...).
+        Les parents sont dédoublonnés par téléphone.
+        dry_run : validation dans la requête, retourne les compteurs et les erreurs par ligne.
+        Sinon : l'import est mis en file (202) ; suivre GET import/<job_id>/ jusqu'à DONE ou FAILED.
+        """
+        if not getattr(request.user, 'is_admin', False):
+            return Response({'detail': 'Réservé aux administrateurs.'}, status=status.HTTP_403_FORBIDDEN)
+        if not request.user.school:
+            return Response({'detail': 'École non associée.'}, status=status.HTTP_400_BAD_REQUEST)
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Le fichier (champ « file ») est obligatoire.'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes', 'on')
+        academic_year = request.data.get('academic_year') or None
+        if dry_run:
+            importer = StudentImporter(request.user.school, academic_year=academic_year, dry_run=True)
+            try:
+                report = importer.run(upload, upload.name)
+            except ImportFormatError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(report, status=status.HTTP_200_OK)
+
+        if not upload.name.lower().endswith(('.csv', '.txt', '.xlsx')):
+            return Response({'error': 'Format non supporté. Utilisez un fichier .csv ou .xlsx.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        job = StudentImportJob.objects.create(
+            school=request.user.school, created_by=request.user, file=upload,
+            filename=upload.name, academic_year=academic_year or '',
+        )
+        queue_import_job(job.pk)
+        return Response(self._import_job_data(job), status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'import/(?P<job_id>\d+)')
+    def import_status(self, request, job_id=None):
+        """Statut d'un import mis en file (PENDING, RUNNING, DONE, FAILED) et son rapport une fois terminé."""
+        if not getattr(request.user, 'is_admin', False):
+            return Response({'detail': 'Réservé aux administrateurs.'}, status=status.HTTP_403_FORBIDDEN)
+        job = get_object_or_404(StudentImportJob, pk=job_id, school=request.user.school)
+        return Response(self._import_job_data(job))
+
+    @staticmethod
+    def _import_job_data(job):
+        return {
+            'job_id': job.pk,
+            'status': job.status,
+            'filename': job.filename,
+            'report': job.report,
+            'error': job.error or None,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+        }
+
     @action(detail=False, methods=['get'], url_path='parent_dashboard')
     def parent_dashboard(self, request):
         """
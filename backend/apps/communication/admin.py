@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting
+from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting, ArchivedRecord
 from apps.schools.admin_base import SchoolScopedAdminMixin
 
 
@@ -55,3 +55,11 @@ class ParentMeetingAdmin(SchoolScopedAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'teacher', 'parent', 'student', 'meeting_date', 'status']
     list_filter = ['status', 'school', 'meeting_date']
     search_fields = ['title', 'description']
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(SchoolScopedAdminMixin, admin.ModelAdmin):
+    list_display = ['kind', 'summary', 'user', 'recipient_phone', 'status', 'created_at', 'archived_at']
+    list_filter = ['kind', 'status', 'school', 'created_at']
+    search_fields = ['summary', 'recipient_phone', 'user__username']
+    readonly_fields = ['archived_at']
@@ -0,0 +1,13 @@
+"""
+Configuration de l'application communication
+"""
+from django.apps import AppConfig
+
+
+class CommunicationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.communication'
+
+    def ready(self):
+        """Import des signaux (compteurs de non-lus) lors du chargement de l'application"""
+        import apps.communication.signals  # noqa
@@ -0,0 +1,89 @@
+"""
+Archivage (partition chaude / froide) des notifications et logs SMS/WhatsApp.
+
+Les lignes plus anciennes que ARCHIVE_AFTER_DAYS sont copiées par tranches dans
+ArchivedRecord (bulk_create, données d'origine en JSON) puis supprimées des tables
+chaudes, dans la même transaction. La suppression se fait en une requête par tranche, sans
+signaux : les compteurs de non-lus des notifications archivées sont décrémentés en bloc
+(une requête par décrément identique). Les tables chaudes restent petites ; l'historique
+reste consultable par les administrateurs via /api/communication/archives/.
+
+Les logs encore PENDING (file du worker de livraison) ne sont jamais archivés.
+"""
+import json
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from .counters import decrement_unread_many
+from .models import Notification, SMSLog, WhatsAppLog, ArchivedRecord
+
+ARCHIVE_SOURCES = {
+    'NOTIFICATION': Notification,
+    'SMS': SMSLog,
+    'WHATSAPP': WhatsAppLog,
+}
+
+
+def _archivable(kind, cutoff):
+    queryset = ARCHIVE_SOURCES[kind].objects.filter(created_at__lt=cutoff)
+    if kind != 'NOTIFICATION':
+        queryset = queryset.exclude(status='PENDING')
+    return queryset
+
+
+def _to_archive(kind, row):
+    data = json.loads(json.dumps(row, cls=DjangoJSONEncoder))
+    if kind == 'NOTIFICATION':
+        return ArchivedRecord(
+            kind=kind, original_id=row['id'], school_id=row['school_id'], user_id=row['user_id'],
+            status='READ' if row['is_read'] else 'UNREAD', summary=row['title'][:255],
+            data=data, created_at=row['created_at'],
+        )
+    return ArchivedRecord(
+        kind=kind, original_id=row['id'], school_id=row['school_id'], recipient_phone=row['recipient_phone'],
+        status=row['status'], summary=row['message'][:255], data=data, created_at=row['created_at'],
+    )
+
+
+def archive_kind(kind, older_than_days=None, chunk_size=None, dry_run=False):
+    """
+    Archive les lignes d'un type (NOTIFICATION, SMS, WHATSAPP) plus anciennes que older_than_days.
+    Parcours par id croissant (les lignes anciennes sont en tête de la clé primaire).
+    Retourne le nombre de lignes archivées (ou archivables si dry_run).
+    """
+    older_than_days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    queryset = _archivable(kind, cutoff)
+    if dry_run:
+        return queryset.count()
+
+    model = ARCHIVE_SOURCES[kind]
+    archived = 0
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values()[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            ArchivedRecord.objects.bulk_create([_to_archive(kind, row) for row in rows])
+            if kind == 'NOTIFICATION':
+                decrement_unread_many(Counter(row['user_id'] for row in rows if not row['is_read']), 'notifications')
+            # Aucune relation ne pointe vers ces tables : DELETE direct, sans signaux par ligne
+            deleted = model.objects.filter(id__in=ids)
+            deleted._raw_delete(deleted.db)
+        archived += len(rows)
+    return archived
+
+
+def archive_communication(older_than_days=None, chunk_size=None, kinds=None, dry_run=False):
+    """Archive tous les types demandés ; retourne {type: nombre}."""
+    return {
+        kind: archive_kind(kind, older_than_days, chunk_size, dry_run)
+        for kind in (kinds or ARCHIVE_SOURCES)
+    }
@@ -0,0 +1,79 @@
+"""
+Compteurs de non-lus par utilisateur (UnreadCounter) : notifications, messages et
+messages d'encadrement (tutoring).
+
+Les compteurs sont incrémentés / décrémentés dans la même transaction que l'écriture
+des lignes (signaux pour les save() unitaires, appels explicites pour bulk_create et
+update()), de sorte que /api/communication/counters/ se lit en une requête sur la clé primaire.
+rebuild_counters() recalcule tout à partir des tables sources (commande rebuild_unread_counters).
+"""
+from collections import defaultdict
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from .models import Notification, Message, UnreadCounter
+
+COUNTER_FIELDS = ('notifications', 'messages', 'tutoring_messages')
+
+
+def _ensure_counters(user_ids):
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+    )
+
+
+def increment_unread(user_ids, field, by=1):
+    """Ajoute `by` au compteur `field` des utilisateurs donnés (ids)."""
+    user_ids = list(user_ids)
+    if not user_ids or not by:
+        return
+    _ensure_counters(user_ids)
+    UnreadCounter.objects.filter(user_id__in=user_ids).update(**{field: F(field) + by})
+
+
+def decrement_unread(user_id, field, by=1):
+    """Retire `by` au compteur `field` (jamais en dessous de zéro)."""
+    if not by:
+        return
+    UnreadCounter.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) - by, 0)})
+
+
+def decrement_unread_many(per_user, field):
+    """{user_id: n} retirés du compteur `field` : une requête par décrément identique."""
+    groups = defaultdict(list)
+    for user_id, by in per_user.items():
+        if by:
+            groups[by].append(user_id)
+    for by, user_ids in groups.items():
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(**{field: Greatest(F(field) - by, 0)})
+
+
+def get_counters(user):
+    """Tous les badges de l'utilisateur en une lecture indexée."""
+    row = UnreadCounter.objects.filter(user=user).values(*COUNTER_FIELDS).first()
+    return row or dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def rebuild_counters(user_ids=None):
+    """Recalcule les compteurs à partir des lignes non lues (requêtes groupées). Retourne le nombre de compteurs écrits."""
+    from apps.tutoring.models import TutoringMessage
+    sources = (
+        ('notifications', Notification.objects.filter(is_read=False), 'user_id'),
+        ('messages', Message.objects.filter(is_read=False), 'recipient_id'),
+        ('tutoring_messages', TutoringMessage.objects.filter(is_read=False), 'recipient_id'),
+    )
+    totals = {}
+    for field, queryset, user_field in sources:
+        if user_ids is not None:
+            queryset = queryset.filter(**{f'{user_field}__in': user_ids})
+        for user_id, count in queryset.values_list(user_field).annotate(n=Count('pk')).order_by():
+            totals.setdefault(user_id, dict.fromkeys(COUNTER_FIELDS, 0))[field] = count
+    stale = UnreadCounter.objects.exclude(user_id__in=list(totals))
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+    stale.update(**dict.fromkeys(COUNTER_FIELDS, 0))
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id, **values) for user_id, values in totals.items()],
+        update_conflicts=True, unique_fields=['user'], update_fields=list(COUNTER_FIELDS),
+        batch_size=1000,
+    )
+    return len(totals)
@@ -0,0 +1,169 @@
+"""
+Worker de livraison SMS / WhatsApp.
+
+Le worker réserve par lots les SMSLog / WhatsAppLog PENDING dont l'échéance est
+atteinte (SELECT ... FOR UPDATE SKIP LOCKED quand la base le permet, puis bail via
+next_attempt_at), les envoie en parallèle via un fournisseur partagé (session HTTP
+poolée) en respectant le débit du fournisseur (seau à jetons), puis écrit les statuts
+avec bulk_update. Les échecs temporaires sont replanifiés avec un backoff exponentiel
+jusqu'à DELIVERY_MAX_ATTEMPTS, les échecs définitifs passent FAILED.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import SMSLog, WhatsAppLog
+from .providers import ProviderError, get_provider
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_MODELS = {
+    'sms': SMSLog,
+    'whatsapp': WhatsAppLog,
+}
+UPDATE_FIELDS = ['status', 'provider', 'provider_message_id', 'sent_at', 'error_message', 'attempts', 'next_attempt_at']
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe : `rate` jetons par seconde, rafale de `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider, rate=None):
+    """Seau partagé par fournisseur (dans le processus) : le débit est celui du fournisseur, pas du canal."""
+    rate = rate or settings.DELIVERY_RATE_LIMIT or provider.rate_limit
+    with _buckets_lock:
+        bucket = _buckets.get(provider.name)
+        if bucket is None or bucket.rate != rate:
+            bucket = _buckets[provider.name] = TokenBucket(rate)
+        return bucket
+
+
+def retry_delay(attempts):
+    """Backoff exponentiel : base, 2×base, 4×base... plafonné."""
+    delay = settings.DELIVERY_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=min(delay, settings.DELIVERY_RETRY_MAX_SECONDS))
+
+
+class DeliveryWorker:
+    def __init__(self, channel, provider=None, batch_size=None, threads=None, rate_limit=None, max_attempts=None):
+        if channel not in CHANNEL_MODELS:
+            raise ValueError(f"Canal inconnu : {channel}")
+        self.channel = channel
+        self.model = CHANNEL_MODELS[channel]
+        self.provider = provider or get_provider()
+        self.batch_size = batch_size or settings.DELIVERY_BATCH_SIZE
+        self.threads = threads or settings.DELIVERY_WORKER_THREADS
+        self.max_attempts = max_attempts or settings.DELIVERY_MAX_ATTEMPTS
+        self.bucket = get_bucket(self.provider, rate_limit)
+
+    def claim_batch(self, ids=None):
+        """Réserve le prochain lot de logs à envoyer (bail de DELIVERY_LEASE_SECONDS)."""
+        now = timezone.now()
+        with transaction.atomic():
+            queryset = self.model.objects.filter(status='PENDING').filter(
+                Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+            )
+            if ids is not None:
+                queryset = queryset.filter(id__in=ids)
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            logs = list(queryset.order_by('id')[:self.batch_size])
+            if logs:
+                self.model.objects.filter(id__in=[log.id for log in logs]).update(
+                    next_attempt_at=now + timedelta(seconds=settings.DELIVERY_LEASE_SECONDS)
+                )
+        return logs
+
+    def _send(self, log):
+        self.bucket.acquire()
+        try:
+            return log, self.provider.send(self.channel, log.recipient_phone, log.message), None
+        except ProviderError as e:
+            return log, None, e
+        except Exception as e:  # erreur réseau, timeout...
+            return log, None, ProviderError(str(e))
+
+    def deliver(self, logs):
+        """Envoie un lot réservé et enregistre les statuts. Retourne (envoyés, échoués, replanifiés)."""
+        sent = failed = retried = 0
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            results = list(pool.map(self._send, logs))
+        now = timezone.now()
+        for log, message_id, error in results:
+            log.attempts += 1
+            log.provider = self.provider.name
+            if error is None:
+                log.status = 'SENT'
+                log.provider_message_id = message_id
+                log.sent_at = now
+                log.error_message = None
+                log.next_attempt_at = None
+                sent += 1
+            elif error.retryable and log.attempts < self.max_attempts:
+                log.error_message = str(error)
+                log.next_attempt_at = now + retry_delay(log.attempts)
+                retried += 1
+            else:
+                log.status = 'FAILED'
+                log.error_message = str(error)
+                log.next_attempt_at = None
+                failed += 1
+        self.model.objects.bulk_update(logs, UPDATE_FIELDS)
+        return sent, failed, retried
+
+    def run(self, ids=None, max_batches=None):
+        """Traite les lots jusqu'à épuisement de la file (ou max_batches). Retourne les statistiques."""
+        stats = {'channel': self.channel, 'sent': 0, 'failed': 0, 'retried': 0, 'batches': 0}
+        start = time.perf_counter()
+        while max_batches is None or stats['batches'] < max_batches:
+            logs = self.claim_batch(ids)
+            if not logs:
+                break
+            sent, failed, retried = self.deliver(logs)
+            stats['sent'] += sent
+            stats['failed'] += failed
+            stats['retried'] += retried
+            stats['batches'] += 1
+        stats['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        if stats['batches']:
+            logger.info(
+                "Livraison %s : %s envoyés, %s échoués, %s replanifiés en %ss",
+                self.channel, stats['sent'], stats['failed'], stats['retried'], stats['elapsed_seconds'],
+            )
+        return stats
+
+
+def deliver_logs(channel, ids=None, **kwargs):
+    """Raccourci : livre les logs PENDING du canal (tous, ou les ids donnés)."""
+    return DeliveryWorker(channel, **kwargs).run(ids=ids)
@@ -0,0 +1,142 @@
+"""
+Résumé périodique (quotidien par défaut) des événements d'un parent : notes, présences,
+paiements confirmés.
+
+Au lieu d'une notification / d'un SMS par événement, chaque événement est enregistré
+dans DigestEvent (signaux) ; le job send_parent_digests agrège les événements de la
+fenêtre écoulée par parent et par élève (une requête GROUP BY) et envoie une seule
+notification et un seul SMS par parent, insérés en masse.
+
+Les fenêtres sont alignées sur minuit (DIGEST_WINDOW_HOURS) : seuls les événements des
+fenêtres terminées sont envoyés, relancer le job dans la même fenêtre n'envoie rien de plus.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.accounts.models import User, Student
+from .fanout import bulk_notify, enqueue_deliveries
+from .models import DigestEvent, Notification, SMSLog
+
+DIGEST_OBJECT_TYPE = 'digest'
+
+
+def record_event(student_id, event_type, related_object_id, detail=''):
+    """
+    Enregistre (ou met à jour) l'événement en attente d'un objet : une note modifiée
+    plusieurs fois dans la fenêtre ne compte qu'une fois, avec son dernier détail.
+    """
+    if not settings.DIGEST_ENABLED or not student_id:
+        return
+    pending = DigestEvent.objects.filter(
+        event_type=event_type, related_object_id=related_object_id, digest_sent_at__isnull=True
+    )
+    if pending.update(detail=detail):
+        return
+    parent = Student.objects.filter(pk=student_id, parent__isnull=False).values_list(
+        'parent_id', 'parent__school_id'
+    ).first()
+    if parent is None or parent[1] is None:
+        return
+    DigestEvent.objects.create(
+        parent_id=parent[0], school_id=parent[1], student_id=student_id,
+        event_type=event_type, related_object_id=related_object_id, detail=detail,
+    )
+
+
+def digest_window_end(now=None):
+    """Début de la fenêtre en cours (fenêtres de DIGEST_WINDOW_HOURS alignées sur minuit)."""
+    now = timezone.localtime(now)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    window = timedelta(hours=settings.DIGEST_WINDOW_HOURS)
+    return midnight + ((now - midnight) // window) * window
+
+
+def _plural(count, singular, plural=None):
+    return f"{count} {singular if count == 1 else (plural or singular + 's')}"
+
+
+def _student_line(name, counts):
+    parts = []
+    if counts.get('GRADE'):
+        parts.append(_plural(counts['GRADE'], 'note mise à jour', 'notes mises à jour'))
+    if counts.get('ATTENDANCE'):
+        line = _plural(counts['ATTENDANCE'], 'présence relevée', 'présences relevées')
+        alerts = []
+        if counts.get('ABSENT'):
+            alerts.append(_plural(counts['ABSENT'], 'absence'))
+        if counts.get('LATE'):
+            alerts.append(_plural(counts['LATE'], 'retard'))
+        if alerts:
+            line += f" (dont {', '.join(alerts)})"
+        parts.append(line)
+    if counts.get('PAYMENT'):
+        parts.append(_plural(counts['PAYMENT'], 'paiement confirmé', 'paiements confirmés'))
+    return f"{name} : {', '.join(parts)}"
+
+
+def send_parent_digests(window_end=None, dry_run=False):
+    """
+    Envoie un résumé par parent pour les événements antérieurs à window_end.
+    Retourne {'parents', 'events', 'notifications', 'sms_queued'}.
+    """
+    window_end = window_end or digest_window_end()
+    pending = DigestEvent.objects.filter(digest_sent_at__isnull=True, created_at__lt=window_end)
+    rows = (
+        pending.values('parent_id', 'school_id', 'student_id', 'event_type')
+        .annotate(
+            total=Count('id'),
+            absent=Count('id', filter=Q(detail='ABSENT')),
+            late=Count('id', filter=Q(detail='LATE')),
+        )
+        .order_by('parent_id', 'student_id')
+    )
+    per_parent = defaultdict(lambda: {'school_id': None, 'students': defaultdict(dict)})
+    events = 0
+    for row in rows:
+        digest = per_parent[row['parent_id']]
+        digest['school_id'] = row['school_id']
+        counts = digest['students'][row['student_id']]
+        counts[row['event_type']] = row['total']
+        if row['event_type'] == 'ATTENDANCE':
+            counts['ABSENT'] = row['absent']
+            counts['LATE'] = row['late']
+        events += row['total']
+    report = {'parents': len(per_parent), 'events': events, 'notifications': 0, 'sms_queued': 0}
+    if dry_run or not per_parent:
+        return report
+
+    student_ids = {sid for digest in per_parent.values() for sid in digest['students']}
+    names = {
+        sid: first_name or last_name
+        for sid, first_name, last_name in Student.objects.filter(id__in=student_ids).values_list(
+            'id', 'user__first_name', 'user__last_name'
+        )
+    }
+    phones = dict(User.objects.filter(id__in=list(per_parent), phone__isnull=False).values_list('id', 'phone'))
+    title = f"Résumé du {timezone.localtime(window_end - timedelta(seconds=1)):%d/%m/%Y}"
+
+    notifications, sms_logs = [], []
+    for parent_id, digest in per_parent.items():
+        text = " ; ".join(
+            _student_line(names.get(sid, 'Élève'), counts) for sid, counts in digest['students'].items()
+        )
+        notifications.append(Notification(
+            user_id=parent_id, school_id=digest['school_id'], notification_type='GENERAL',
+            title=title, message=text, related_object_type=DIGEST_OBJECT_TYPE,
+        ))
+        if settings.DIGEST_SEND_SMS and phones.get(parent_id):
+            sms_logs.append(SMSLog(
+                school_id=digest['school_id'], recipient_phone=phones[parent_id], message=f"{title} - {text}"
+            ))
+
+    with transaction.atomic():
+        bulk_notify(notifications)
+        logs = SMSLog.objects.bulk_create(sms_logs)
+        enqueue_deliveries('sms', [log.id for log in logs])
+        pending.update(digest_sent_at=timezone.now())
+    report['notifications'] = len(notifications)
+    report['sms_queued'] = len(logs)
+    return report
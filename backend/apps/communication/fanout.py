@@ -0,0 +1,219 @@
+"""
+Diffusion (fan-out) des annonces publiées : notifications in-app, SMS et WhatsApp.
+
+Le public cible est résolu par une seule requête ensembliste sur User, parcourue par
+tranches (keyset sur l'id). Chaque tranche est écrite avec bulk_create et les envois
+SMS/WhatsApp sont mis en file par lots. Publier une annonce reste un appel HTTP en
+temps constant : la diffusion est mise en file après le commit selon
+ANNOUNCEMENT_FANOUT_MODE ('celery', 'thread' ou 'sync', comme la correction des devoirs).
+
+Reprise : chaque tranche enregistre, dans sa transaction, le dernier destinataire traité
+(fanout_cursor), les compteurs et l'heure (updated_at) ; une diffusion interrompue reprend
+après ce curseur, qu'elle crée des notifications ou seulement des SMS / WhatsApp. Un numéro
+déjà présent dans les logs SMS / WhatsApp de l'annonce (même texte depuis la publication)
+n'est pas relancé. resume_announcement_fanouts (commande et tâche périodique) relance les
+diffusions publiées, inachevées et sans progrès depuis ANNOUNCEMENT_FANOUT_STALLED_SECONDS.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.accounts.models import User
+from .models import Announcement, Notification, SMSLog, WhatsAppLog
+from .counters import increment_unread
+from .pubsub import publish_events, push_event
+
+# Rôles visés par Announcement.target_audience (None = tous les rôles)
+AUDIENCE_ROLES = {
+    'ALL': None,
+    'STUDENTS': ['STUDENT'],
+    'PARENTS': ['PARENT'],
+    'TEACHERS': ['TEACHER'],
+    'ADMINS': ['ADMIN'],
+}
+ANNOUNCEMENT_OBJECT_TYPE = 'announcement'
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='announcement-fanout')
+    return _executor
+
+
+def audience_queryset(announcement):
+    """Utilisateurs actifs de l'école visés par l'annonce."""
+    users = User.objects.filter(school_id=announcement.school_id, is_active=True)
+    roles = AUDIENCE_ROLES.get(announcement.target_audience)
+    if roles is not None:
+        users = users.filter(role__in=roles)
+    return users
+
+
+def announcement_text(announcement):
+    return f"{announcement.title} : {announcement.message}"
+
+
+def bulk_notify(notifications):
+    """
+    Insère des notifications en masse (bulk_create ne déclenche pas les signaux) :
+    compteurs de non-lus et événements du flux temps réel mis à jour explicitement.
+    """
+    notifications = Notification.objects.bulk_create(notifications)
+    increment_unread([n.user_id for n in notifications], 'notifications')
+    events = [(n.user_id, push_event(n)) for n in notifications]
+    transaction.on_commit(lambda: publish_events(events))
+    return notifications
+
+
+def enqueue_deliveries(channel, log_ids):
+    """Met en file l'envoi d'un lot de SMSLog / WhatsAppLog (tâche Celery par lot)."""
+    if not log_ids or not getattr(settings, 'COMMUNICATION_TASKS_ASYNC', False):
+        # Sans Celery les logs restent PENDING jusqu'au passage du worker (run_delivery_worker)
+        return
+    from .tasks import send_sms_batch, send_whatsapp_batch
+    task = send_sms_batch if channel == 'sms' else send_whatsapp_batch
+    transaction.on_commit(lambda: task.delay(log_ids))
+
+
+def _new_phones(model, announcement, text, phones):
+    """Numéros de la tranche (sans doublon) sans log de l'annonce déjà créé."""
+    phones = list(dict.fromkeys(phones))
+    sent = set(
+        model.objects.filter(
+            school_id=announcement.school_id, recipient_phone__in=phones, message=text,
+            created_at__gte=announcement.published_at or announcement.created_at,
+        ).values_list('recipient_phone', flat=True)
+    )
+    return [phone for phone in phones if phone not in sent]
+
+
+def fan_out_announcement(announcement_id, chunk_size=None):
+    """
+    Crée les notifications et les envois SMS/WhatsApp d'une annonce publiée.
+    Reprise possible : les destinataires jusqu'à fanout_cursor sont ignorés, et une annonce
+    déjà diffusée (fanout_completed_at) n'est pas rediffusée.
+    Retourne le rapport de diffusion (de cet appel).
+    """
+    chunk_size = chunk_size or settings.ANNOUNCEMENT_FANOUT_CHUNK_SIZE
+    announcement = Announcement.objects.get(pk=announcement_id)
+    report = {
+        'recipients': 0,
+        'notifications': 0,
+        'sms_queued': 0,
+        'whatsapp_queued': 0,
+    }
+    if not announcement.is_published or announcement.fanout_completed_at:
+        return report
+
+    recipients = audience_queryset(announcement).order_by('id')
+    text = announcement_text(announcement)
+    last_id = announcement.fanout_cursor
+    while True:
+        batch = list(recipients.filter(id__gt=last_id).values_list('id', 'phone')[:chunk_size])
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        phones = [phone for _, phone in batch if phone]
+
+        chunk = dict.fromkeys(report, 0)
+        chunk['recipients'] = len(batch)
+        with transaction.atomic():
+            if announcement.send_notification:
+                bulk_notify([
+                    Notification(
+                        user_id=user_id,
+                        school_id=announcement.school_id,
+                        notification_type='ANNOUNCEMENT',
+                        title=announcement.title,
+                        message=announcement.message,
+                        related_object_type=ANNOUNCEMENT_OBJECT_TYPE,
+                        related_object_id=announcement.id,
+                    )
+                    for user_id, _ in batch
+                ])
+                chunk['notifications'] = len(batch)
+            sms_phones = _new_phones(SMSLog, announcement, text, phones) if announcement.send_sms else []
+            if sms_phones:
+                logs = SMSLog.objects.bulk_create([
+                    SMSLog(school_id=announcement.school_id, recipient_phone=phone, message=text)
+                    for phone in sms_phones
+                ])
+                enqueue_deliveries('sms', [log.id for log in logs])
+                chunk['sms_queued'] = len(logs)
+            whatsapp_phones = _new_phones(WhatsAppLog, announcement, text, phones) if announcement.send_whatsapp else []
+            if whatsapp_phones:
+                logs = WhatsAppLog.objects.bulk_create([
+                    WhatsAppLog(school_id=announcement.school_id, recipient_phone=phone, message=text)
+                    for phone in whatsapp_phones
+                ])
+                enqueue_deliveries('whatsapp', [log.id for log in logs])
+                chunk['whatsapp_queued'] = len(logs)
+            # Curseur, compteurs et heure de progrès dans la même transaction que la tranche
+            Announcement.objects.filter(pk=announcement.pk).update(
+                fanout_cursor=last_id,
+                updated_at=timezone.now(),
+                recipients_count=F('recipients_count') + chunk['recipients'],
+                notifications_sent=F('notifications_sent') + chunk['notifications'],
+                sms_queued=F('sms_queued') + chunk['sms_queued'],
+                whatsapp_queued=F('whatsapp_queued') + chunk['whatsapp_queued'],
+            )
+        for key, value in chunk.items():
+            report[key] += value
+
+    Announcement.objects.filter(pk=announcement.pk).update(fanout_completed_at=timezone.now())
+    return report
+
+
+def _fan_out_in_thread(announcement_id):
+    try:
+        fan_out_announcement(announcement_id)
+    except Exception:
+        logger.exception("Échec de la diffusion de l'annonce %s", announcement_id)
+    finally:
+        connection.close()
+
+
+def queue_announcement_fanout(announcement_id):
+    """Met en file la diffusion d'une annonce, après le commit de la requête."""
+    mode = settings.ANNOUNCEMENT_FANOUT_MODE
+    if mode == 'celery':
+        from .tasks import fan_out_announcement as task
+        transaction.on_commit(lambda: task.delay(announcement_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _thread_pool().submit(_fan_out_in_thread, announcement_id))
+    else:
+        transaction.on_commit(lambda: fan_out_announcement(announcement_id))
+
+
+def resume_announcement_fanouts(stalled_seconds=None):
+    """
+    Relance les diffusions publiées mais inachevées, sans progrès depuis stalled_seconds
+    (ANNOUNCEMENT_FANOUT_STALLED_SECONDS par défaut) : processus redémarré, tâche perdue.
+    Tâche Celery en mode 'celery', sinon diffusion dans ce processus. Retourne les ids relancés.
+    """
+    if stalled_seconds is None:
+        stalled_seconds = settings.ANNOUNCEMENT_FANOUT_STALLED_SECONDS
+    stalled = list(
+        Announcement.objects.filter(
+            is_published=True, fanout_completed_at__isnull=True,
+            updated_at__lt=timezone.now() - timedelta(seconds=stalled_seconds),
+        ).order_by('id').values_list('id', flat=True)
+    )
+    for announcement_id in stalled:
+        if settings.ANNOUNCEMENT_FANOUT_MODE == 'celery':
+            from .tasks import fan_out_announcement as task
+            task.delay(announcement_id)
+        else:
+            try:
+                fan_out_announcement(announcement_id)
+            except Exception:
+                logger.exception("Échec de la reprise de la diffusion de l'annonce %s", announcement_id)
+    return stalled
@@ -0,0 +1,121 @@
+"""
+Boîte de réception par conversation (Message) avec pagination par curseur (keyset).
+
+Chaque utilisateur a une ligne Conversation par interlocuteur (dernier message, non-lus),
+recalculée par les signaux de Message à chaque envoi, lecture ou suppression. Une page de la
+boîte de réception lit ces lignes sur l'index (utilisateur, dernier message décroissant) :
+la page suivante reprend après le dernier message de la page, sans OFFSET ni GROUP BY sur
+l'ensemble des messages. rebuild_conversations() recalcule tout (rebuild_unread_counters).
+"""
+import base64
+import binascii
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, Q
+from .models import Conversation, Message
+
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(str(value).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Curseur opaque -> id ; None si absent, ValueError si invalide."""
+    if not cursor:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Curseur invalide.")
+
+
+def user_messages(user):
+    queryset = Message.objects.filter(Q(sender=user) | Q(recipient=user))
+    if user.school_id:
+        queryset = queryset.filter(school_id=user.school_id)
+    return queryset
+
+
+def _pair_messages(user_id, partner_id, school_id):
+    queryset = Message.objects.filter(
+        Q(sender_id=user_id, recipient_id=partner_id) | Q(sender_id=partner_id, recipient_id=user_id)
+    )
+    if school_id:
+        queryset = queryset.filter(school_id=school_id)
+    return queryset
+
+
+def refresh_conversation(user_id, partner_id):
+    """Recalcule la ligne Conversation de `user_id` avec `partner_id` (supprimée s'il n'y a plus de message)."""
+    school_id = get_user_model().objects.filter(pk=user_id).values_list('school_id', flat=True).first()
+    summary = _pair_messages(user_id, partner_id, school_id).aggregate(
+        last_message_id=Max('id'),
+        unread_count=Count('id', filter=Q(recipient_id=user_id, is_read=False)),
+    )
+    if summary['last_message_id'] is None:
+        Conversation.objects.filter(user_id=user_id, partner_id=partner_id).delete()
+        return
+    Conversation.objects.update_or_create(user_id=user_id, partner_id=partner_id, defaults=summary)
+
+
+def rebuild_conversations():
+    """Recalcule toutes les lignes Conversation (requête groupée). Retourne le nombre de conversations."""
+    schools = dict(get_user_model().objects.values_list('pk', 'school_id'))
+    rows = Message.objects.values('sender_id', 'recipient_id', 'school_id').annotate(
+        last_message_id=Max('id'), unread=Count('id', filter=Q(is_read=False)),
+    ).order_by()
+    summaries = {}
+    for row in rows:
+        sides = ((row['recipient_id'], row['sender_id'], row['unread']), (row['sender_id'], row['recipient_id'], 0))
+        for user_id, partner_id, unread in sides:
+            if schools.get(user_id) and schools[user_id] != row['school_id']:
+                continue
+            summary = summaries.setdefault((user_id, partner_id), {'last_message_id': 0, 'unread_count': 0})
+            summary['last_message_id'] = max(summary['last_message_id'], row['last_message_id'])
+            summary['unread_count'] += unread
+            if user_id == partner_id:
+                break
+    Conversation.objects.all().delete()
+    Conversation.objects.bulk_create(
+        [Conversation(user_id=user_id, partner_id=partner_id, **summary)
+         for (user_id, partner_id), summary in summaries.items()],
+        batch_size=1000,
+    )
+    return len(summaries)
+
+
+def conversation_threads(user, after=None, limit=INBOX_PAGE_SIZE):
+    """
+    Conversations de l'utilisateur, la plus récente d'abord.
+    `after` : id du dernier message de la page précédente (curseur décodé).
+    Retourne (conversations, id_curseur_suivant ou None).
+    """
+    threads = Conversation.objects.filter(user=user).select_related(
+        'partner', 'last_message__sender', 'last_message__recipient', 'last_message__school',
+    ).order_by('-last_message_id')
+    if after is not None:
+        threads = threads.filter(last_message_id__lt=after)
+    rows = list(threads[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    conversations = [
+        {'partner': row.partner, 'last_message': row.last_message, 'unread_count': row.unread_count}
+        for row in rows
+    ]
+    next_cursor = rows[-1].last_message_id if has_next else None
+    return conversations, next_cursor
+
+
+def conversation_messages(user, partner_id, before=None, limit=INBOX_PAGE_SIZE):
+    """Messages échangés avec un interlocuteur, du plus récent au plus ancien (keyset sur id)."""
+    queryset = user_messages(user).filter(
+        Q(sender=user, recipient_id=partner_id) | Q(sender_id=partner_id, recipient=user)
+    ).select_related('sender', 'recipient', 'school').order_by('-id')
+    if before is not None:
+        queryset = queryset.filter(id__lt=before)
+    rows = list(queryset[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1].id if has_next else None)
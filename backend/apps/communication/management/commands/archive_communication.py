@@ -0,0 +1,30 @@
+"""
+Archive les notifications et logs SMS/WhatsApp anciens (tables chaudes -> ArchivedRecord).
+
+Usage:
+  python manage.py archive_communication                  # plus vieux que ARCHIVE_AFTER_DAYS
+  python manage.py archive_communication --days 90 --kind SMS --kind WHATSAPP
+  python manage.py archive_communication --dry-run        # compte seulement
+"""
+from django.core.management.base import BaseCommand
+from apps.communication.archive import ARCHIVE_SOURCES, archive_communication
+
+
+class Command(BaseCommand):
+    help = "Déplace les notifications et logs SMS/WhatsApp anciens vers l'archive, par tranches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Âge minimal en jours (défaut : ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--kind', action='append', choices=list(ARCHIVE_SOURCES), default=None)
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans archiver")
+
+    def handle(self, *args, **options):
+        result = archive_communication(
+            older_than_days=options['days'], chunk_size=options['chunk_size'],
+            kinds=options['kind'], dry_run=options['dry_run'],
+        )
+        verb = "archivables" if options['dry_run'] else "archivées"
+        for kind, count in result.items():
+            self.stdout.write(f"{kind}: {count} ligne(s) {verb}")
+        self.stdout.write(self.style.SUCCESS(f"Total : {sum(result.values())}"))
@@ -0,0 +1,53 @@
+"""
+Mesure hors ligne du débit du worker de livraison avec le fournisseur local (FakeProvider).
+
+Les SMSLog de test sont créés puis annulés (transaction rollback) : la base reste intacte.
+
+Usage:
+  python manage.py benchmark_delivery --messages 2000 --latency-ms 50 --threads 8
+  python manage.py benchmark_delivery --messages 500 --rate 100 --failure-rate 0.05
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from apps.communication.delivery import DeliveryWorker
+from apps.communication.models import SMSLog
+from apps.communication.providers import FakeProvider
+from apps.schools.models import School
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit du worker de livraison SMS avec un fournisseur simulé."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--latency-ms', type=int, default=50, help="Latence simulée par envoi")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Taux d'échec simulé (0-1)")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--threads', type=int, default=None)
+        parser.add_argument('--rate', type=float, default=None, help="Messages / seconde (défaut : illimité en pratique)")
+
+    def handle(self, *args, **options):
+        school = School.objects.first()
+        if school is None:
+            raise CommandError("Aucune école en base : créez-en une avant le benchmark.")
+        provider = FakeProvider(latency=options['latency_ms'] / 1000, failure_rate=options['failure_rate'], seed=42)
+        with transaction.atomic():
+            logs = SMSLog.objects.bulk_create(
+                [
+                    SMSLog(school=school, recipient_phone=f"+24399{i:07d}", message="Benchmark")
+                    for i in range(options['messages'])
+                ],
+                batch_size=1000,
+            )
+            worker = DeliveryWorker(
+                'sms', provider=provider, batch_size=options['batch_size'], threads=options['threads'],
+                rate_limit=options['rate'], max_attempts=1,
+            )
+            stats = worker.run(ids=[log.id for log in logs])
+            transaction.set_rollback(True)
+        elapsed = stats['elapsed_seconds'] or 1e-9
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['sent']} envoyés, {stats['failed']} échoués en {elapsed}s "
+            f"({stats['sent'] / elapsed:.0f} msg/s, {stats['batches']} lots, "
+            f"{worker.threads} threads, débit max {worker.bucket.rate:g}/s)"
+        ))
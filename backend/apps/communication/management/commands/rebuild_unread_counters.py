@@ -0,0 +1,24 @@
+"""
+Recalcule les compteurs de non-lus (UnreadCounter) à partir des notifications, messages
+et messages d'encadrement non lus, ainsi que les résumés de conversation (Conversation)
+de la boîte de réception.
+
+Les compteurs sont maintenus à chaque création / lecture ; cette commande sert après
+des modifications en masse (QuerySet.update, import SQL) qui ne passent pas par les signaux.
+
+Usage:
+  python manage.py rebuild_unread_counters
+"""
+from django.core.management.base import BaseCommand
+from apps.communication.counters import rebuild_counters
+from apps.communication.inbox import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de non-lus (notifications, messages, encadrement) et les conversations."
+
+    def handle(self, *args, **options):
+        count = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés : {count} utilisateur(s) avec des non-lus"))
+        count = rebuild_conversations()
+        self.stdout.write(self.style.SUCCESS(f"Conversations recalculées : {count}"))
@@ -0,0 +1,25 @@
+"""
+Relance les diffusions d'annonces publiées restées inachevées (processus redémarré, tâche perdue).
+
+Usage:
+  python manage.py resume_announcement_fanouts                 # sans progrès depuis ANNOUNCEMENT_FANOUT_STALLED_SECONDS
+  python manage.py resume_announcement_fanouts --stalled 0     # toutes les diffusions inachevées
+"""
+from django.core.management.base import BaseCommand
+from apps.communication.fanout import resume_announcement_fanouts
+
+
+class Command(BaseCommand):
+    help = "Reprend, après leur curseur, les diffusions d'annonces publiées et inachevées."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stalled', type=int, default=None,
+            help="Secondes sans progrès avant reprise (défaut : ANNOUNCEMENT_FANOUT_STALLED_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        resumed = resume_announcement_fanouts(stalled_seconds=options['stalled'])
+        for announcement_id in resumed:
+            self.stdout.write(f"Annonce {announcement_id} : diffusion relancée")
+        self.stdout.write(self.style.SUCCESS(f"Total : {len(resumed)}"))
@@ -0,0 +1,57 @@
+"""
+Worker de livraison SMS / WhatsApp : envoie par lots les logs PENDING dont l'échéance
+est atteinte (retries compris), avec limitation de débit par fournisseur.
+
+Usage:
+  python manage.py run_delivery_worker               # boucle continue
+  python manage.py run_delivery_worker --once        # vide la file puis s'arrête
+  python manage.py run_delivery_worker --channel sms --provider fake --threads 8
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.communication.delivery import DeliveryWorker
+from apps.communication.providers import PROVIDERS, get_provider
+
+
+class Command(BaseCommand):
+    help = "Envoie les SMS / WhatsApp en attente par lots (limitation de débit, retries avec backoff)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--channel', choices=['sms', 'whatsapp', 'all'], default='all')
+        parser.add_argument('--provider', choices=list(PROVIDERS), default=None,
+                            help="Fournisseur (défaut : réglage SMS_PROVIDER)")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--threads', type=int, default=None)
+        parser.add_argument('--rate', type=float, default=None, help="Messages / seconde (défaut : débit du fournisseur)")
+        parser.add_argument('--once', action='store_true', help="Vider la file une fois puis s'arrêter")
+        parser.add_argument('--idle-sleep', type=float, default=5.0,
+                            help="Pause (secondes) quand la file est vide")
+
+    def handle(self, *args, **options):
+        channels = ['sms', 'whatsapp'] if options['channel'] == 'all' else [options['channel']]
+        provider = get_provider(options['provider'])
+        workers = [
+            DeliveryWorker(
+                channel, provider=provider, batch_size=options['batch_size'],
+                threads=options['threads'], rate_limit=options['rate'],
+            )
+            for channel in channels
+        ]
+        self.stdout.write(f"Worker de livraison ({provider.name}) : {', '.join(channels)}")
+        try:
+            while True:
+                processed = 0
+                for worker in workers:
+                    stats = worker.run()
+                    processed += stats['sent'] + stats['failed'] + stats['retried']
+                    if stats['batches']:
+                        self.stdout.write(
+                            f"{stats['channel']}: {stats['sent']} envoyés, {stats['failed']} échoués, "
+                            f"{stats['retried']} replanifiés ({stats['elapsed_seconds']}s)"
+                        )
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['idle_sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du worker.")
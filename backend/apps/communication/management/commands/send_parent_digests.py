@@ -0,0 +1,25 @@
+"""
+Envoie le résumé des parents (notes, présences, paiements) pour la dernière fenêtre terminée.
+
+À planifier une fois par fenêtre (DIGEST_WINDOW_HOURS, 24 h par défaut, ex. cron à 00:05).
+
+Usage:
+  python manage.py send_parent_digests
+  python manage.py send_parent_digests --dry-run
+"""
+from django.core.management.base import BaseCommand
+from apps.communication.digest import send_parent_digests
+
+
+class Command(BaseCommand):
+    help = "Envoie un résumé unique (notification + SMS) par parent pour les événements de la fenêtre écoulée."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans envoyer")
+
+    def handle(self, *args, **options):
+        report = send_parent_digests(dry_run=options['dry_run'])
+        self.stdout.write(
+            f"{report['events']} événement(s) pour {report['parents']} parent(s) : "
+            f"{report['notifications']} notification(s), {report['sms_queued']} SMS en file"
+        )
@@ -0,0 +1,42 @@
+# Rapport de diffusion des annonces (fan-out) et index des notifications par objet lié.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='recipients_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Destinataires'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='notifications_sent',
+            field=models.PositiveIntegerField(default=0, verbose_name='Notifications créées'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='sms_queued',
+            field=models.PositiveIntegerField(default=0, verbose_name='SMS en file'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='whatsapp_queued',
+            field=models.PositiveIntegerField(default=0, verbose_name='WhatsApp en file'),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='fanout_completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Diffusion terminée le'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['related_object_type', 'related_object_id'], name='comm_notif_related_idx'),
+        ),
+    ]
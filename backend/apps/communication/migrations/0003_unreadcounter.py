@@ -0,0 +1,50 @@
+# Compteurs de non-lus par utilisateur, initialisés à partir des lignes non lues existantes.
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_unread_counters(apps, schema_editor):
+    UnreadCounter = apps.get_model('communication', 'UnreadCounter')
+    sources = (
+        ('notifications', apps.get_model('communication', 'Notification'), 'user_id'),
+        ('messages', apps.get_model('communication', 'Message'), 'recipient_id'),
+        ('tutoring_messages', apps.get_model('tutoring', 'TutoringMessage'), 'recipient_id'),
+    )
+    totals = {}
+    for field, model, user_field in sources:
+        rows = model.objects.filter(is_read=False).values_list(user_field).annotate(n=Count('pk')).order_by()
+        for user_id, count in rows:
+            totals.setdefault(user_id, {})[field] = count
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id, **values) for user_id, values in totals.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tutoring', '0001_initial'),
+        ('communication', '0002_announcement_fanout_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('notifications', models.IntegerField(default=0, verbose_name='Notifications non lues')),
+                ('messages', models.IntegerField(default=0, verbose_name='Messages non lus')),
+                ('tutoring_messages', models.IntegerField(default=0, verbose_name="Messages d'encadrement non lus")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Compteur de non-lus',
+                'verbose_name_plural': 'Compteurs de non-lus',
+            },
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
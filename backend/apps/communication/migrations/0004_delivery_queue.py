@@ -0,0 +1,41 @@
+# File de livraison SMS / WhatsApp : tentatives, prochaine échéance et index de la file.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0003_unreadcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smslog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives'),
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Prochaine tentative'),
+        ),
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives'),
+        ),
+        migrations.AddField(
+            model_name='whatsapplog',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Prochaine tentative'),
+        ),
+        migrations.AddIndex(
+            model_name='smslog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='comm_sms_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsapplog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='comm_whatsapp_queue_idx'),
+        ),
+    ]
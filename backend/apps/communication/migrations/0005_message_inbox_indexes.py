@@ -0,0 +1,25 @@
+# Index composites de Message pour la boîte de réception par conversation.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0004_delivery_queue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='comm_msg_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', '-created_at'], name='comm_msg_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', '-id'], name='comm_msg_thread_idx'),
+        ),
+    ]
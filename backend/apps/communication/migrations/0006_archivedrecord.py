@@ -0,0 +1,43 @@
+# Archive froide des notifications et logs SMS/WhatsApp anciens.
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schools', '0001_initial'),
+        ('communication', '0005_message_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('NOTIFICATION', 'Notification'), ('SMS', 'SMS'), ('WHATSAPP', 'WhatsApp')], max_length=20, verbose_name='Type')),
+                ('original_id', models.BigIntegerField(verbose_name="ID d'origine")),
+                ('recipient_phone', models.CharField(blank=True, max_length=20, null=True, verbose_name='Téléphone du destinataire')),
+                ('status', models.CharField(blank=True, max_length=20, verbose_name='Statut')),
+                ('summary', models.CharField(blank=True, max_length=255, verbose_name='Résumé')),
+                ('data', models.JSONField(verbose_name="Données d'origine")),
+                ('created_at', models.DateTimeField(verbose_name='Créé le (origine)')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivé le')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_records', to='schools.school', verbose_name='École')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_records', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Archive de communication',
+                'verbose_name_plural': 'Archives de communication',
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['school', 'kind', '-created_at'], name='comm_archive_school_idx'),
+                    models.Index(fields=['user', '-created_at'], name='comm_archive_user_idx'),
+                    models.Index(fields=['recipient_phone'], name='comm_archive_phone_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Événements en attente du résumé quotidien des parents.
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0001_initial'),
+        ('schools', '0001_initial'),
+        ('communication', '0006_archivedrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('GRADE', 'Note'), ('ATTENDANCE', 'Présence'), ('PAYMENT', 'Paiement')], max_length=20, verbose_name='Type')),
+                ('detail', models.CharField(blank=True, max_length=50, verbose_name='Détail')),
+                ('related_object_id', models.IntegerField(verbose_name="ID de l'objet lié")),
+                ('digest_sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Résumé envoyé le')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to=settings.AUTH_USER_MODEL, verbose_name='Parent')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to='schools.school', verbose_name='École')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_events', to='accounts.student', verbose_name='Élève')),
+            ],
+            options={
+                'verbose_name': 'Événement du résumé parent',
+                'verbose_name_plural': 'Événements du résumé parent',
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['digest_sent_at', 'created_at'], name='comm_digest_pending_idx'),
+                    models.Index(fields=['event_type', 'related_object_id'], name='comm_digest_object_idx'),
+                ],
+            },
+        ),
+    ]
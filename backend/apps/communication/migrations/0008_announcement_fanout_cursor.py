@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0007_digestevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='fanout_cursor',
+            field=models.BigIntegerField(default=0, verbose_name='Dernier destinataire traité'),
+        ),
+    ]
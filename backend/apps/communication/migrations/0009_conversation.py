@@ -0,0 +1,63 @@
+# Résumés de conversation de la boîte de réception, initialisés à partir des messages existants.
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+import django.db.models.deletion
+
+
+def backfill_conversations(apps, schema_editor):
+    Conversation = apps.get_model('communication', 'Conversation')
+    Message = apps.get_model('communication', 'Message')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    schools = dict(User.objects.values_list('pk', 'school_id'))
+    rows = Message.objects.values('sender_id', 'recipient_id', 'school_id').annotate(
+        last_message_id=Max('id'), unread=Count('id', filter=Q(is_read=False)),
+    ).order_by()
+    summaries = {}
+    for row in rows:
+        sides = ((row['recipient_id'], row['sender_id'], row['unread']), (row['sender_id'], row['recipient_id'], 0))
+        for user_id, partner_id, unread in sides:
+            if schools.get(user_id) and schools[user_id] != row['school_id']:
+                continue
+            summary = summaries.setdefault((user_id, partner_id), {'last_message_id': 0, 'unread_count': 0})
+            summary['last_message_id'] = max(summary['last_message_id'], row['last_message_id'])
+            summary['unread_count'] += unread
+            if user_id == partner_id:
+                break
+    Conversation.objects.bulk_create(
+        [Conversation(user_id=user_id, partner_id=partner_id, **summary)
+         for (user_id, partner_id), summary in summaries.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('communication', '0008_announcement_fanout_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.IntegerField(default=0, verbose_name='Messages non lus')),
+                ('last_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='communication.message', verbose_name='Dernier message')),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Interlocuteur')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Conversation',
+                'verbose_name_plural': 'Conversations',
+                'indexes': [models.Index(fields=['user', '-last_message'], name='comm_conv_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user', 'partner'), name='comm_conv_unique_partner'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
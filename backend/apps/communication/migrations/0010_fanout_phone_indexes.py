@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communication', '0009_conversation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='smslog',
+            index=models.Index(fields=['recipient_phone', 'created_at'], name='comm_sms_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='whatsapplog',
+            index=models.Index(fields=['recipient_phone', 'created_at'], name='comm_whatsapp_phone_idx'),
+        ),
+    ]
@@ -38,6 +38,9 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['related_object_type', 'related_object_id'], name='comm_notif_related_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -62,11 +65,39 @@ class Message(models.Model):
         verbose_name = "Message"
         verbose_name_plural = "Messages"
         ordering = ['-created_at']
+        indexes = [
+            # Boîte de réception / non-lus, messages envoyés, fil d'une conversation (inbox.py)
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='comm_msg_inbox_idx'),
+            models.Index(fields=['sender', '-created_at'], name='comm_msg_sent_idx'),
+            models.Index(fields=['sender', 'recipient', '-id'], name='comm_msg_thread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.subject} - {self.sender.username} -> {self.recipient.username}"
 
 
+class Conversation(models.Model):
+    """Résumé d'une conversation du point de vue d'un utilisateur (boîte de réception, voir inbox.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations', verbose_name="Utilisateur")
+    partner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="Interlocuteur")
+    last_message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='+', verbose_name="Dernier message")
+    unread_count = models.IntegerField(default=0, verbose_name="Messages non lus")
+    
+    class Meta:
+        verbose_name = "Conversation"
+        verbose_name_plural = "Conversations"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'partner'], name='comm_conv_unique_partner'),
+        ]
+        indexes = [
+            # Pagination de la boîte de réception : dernier message décroissant
+            models.Index(fields=['user', '-last_message'], name='comm_conv_inbox_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} <-> {self.partner_id} ({self.unread_count} non lus)"
+
+
 class SMSLog(models.Model):
     """Model for SMS sending logs"""
     STATUS_CHOICES = [
@@ -88,6 +119,10 @@ class SMSLog(models.Model):
     # Error handling
     error_message = models.TextField(null=True, blank=True, verbose_name="Message d'erreur")
     
+    # Livraison (worker delivery.py) : tentatives et prochaine échéance (retry / bail)
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="Prochaine tentative")
+    
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Envoyé le")
     delivered_at = models.DateTimeField(null=True, blank=True, verbose_name="Livré le")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -96,6 +131,11 @@ class SMSLog(models.Model):
         verbose_name = "Log SMS"
         verbose_name_plural = "Logs SMS"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='comm_sms_queue_idx'),
+            # Numéros déjà servis lors de la reprise d'une diffusion (fanout.py)
+            models.Index(fields=['recipient_phone', 'created_at'], name='comm_sms_phone_idx'),
+        ]
     
     def __str__(self):
         return f"SMS to {self.recipient_phone} - {self.status}"
@@ -123,6 +163,10 @@ class WhatsAppLog(models.Model):
     # Error handling
     error_message = models.TextField(null=True, blank=True, verbose_name="Message d'erreur")
     
+    # Livraison (worker delivery.py) : tentatives et prochaine échéance (retry / bail)
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="Prochaine tentative")
+    
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Envoyé le")
     delivered_at = models.DateTimeField(null=True, blank=True, verbose_name="Livré le")
     read_at = models.DateTimeField(null=True, blank=True, verbose_name="Lu le")
@@ -132,6 +176,10 @@ class WhatsAppLog(models.Model):
         verbose_name = "Log WhatsApp"
         verbose_name_plural = "Logs WhatsApp"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='comm_whatsapp_queue_idx'),
+            models.Index(fields=['recipient_phone', 'created_at'], name='comm_whatsapp_phone_idx'),
+        ]
     
     def __str__(self):
         return f"WhatsApp to {self.recipient_phone} - {self.status}"
@@ -161,6 +209,14 @@ class Announcement(models.Model):
     is_published = models.BooleanField(default=False, verbose_name="Publié")
     published_at = models.DateTimeField(null=True, blank=True, verbose_name="Publié le")
     
+    # Rapport de diffusion (voir communication/fanout.py)
+    recipients_count = models.PositiveIntegerField(default=0, verbose_name="Destinataires")
+    notifications_sent = models.PositiveIntegerField(default=0, verbose_name="Notifications créées")
+    sms_queued = models.PositiveIntegerField(default=0, verbose_name="SMS en file")
+    whatsapp_queued = models.PositiveIntegerField(default=0, verbose_name="WhatsApp en file")
+    fanout_cursor = models.BigIntegerField(default=0, verbose_name="Dernier destinataire traité")
+    fanout_completed_at = models.DateTimeField(null=True, blank=True, verbose_name="Diffusion terminée le")
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, 
                                    related_name='created_announcements', verbose_name="Créé par")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -218,3 +274,85 @@ class ParentMeeting(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.student.user.get_full_name()}"
+
+
+class UnreadCounter(models.Model):
+    """Compteurs de non-lus par utilisateur (badges web/mobile), maintenus à chaque création / lecture"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='unread_counter', verbose_name="Utilisateur")
+    notifications = models.IntegerField(default=0, verbose_name="Notifications non lues")
+    messages = models.IntegerField(default=0, verbose_name="Messages non lus")
+    tutoring_messages = models.IntegerField(default=0, verbose_name="Messages d'encadrement non lus")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Compteur de non-lus"
+        verbose_name_plural = "Compteurs de non-lus"
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.notifications}/{self.messages}/{self.tutoring_messages}"
+
+
+class ArchivedRecord(models.Model):
+    """Archive froide des notifications et logs SMS/WhatsApp anciens (voir communication/archive.py)"""
+    KIND_CHOICES = [
+        ('NOTIFICATION', 'Notification'),
+        ('SMS', 'SMS'),
+        ('WHATSAPP', 'WhatsApp'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Type")
+    original_id = models.BigIntegerField(verbose_name="ID d'origine")
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='archived_records', verbose_name="École")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='archived_records', verbose_name="Utilisateur")
+    recipient_phone = models.CharField(max_length=20, null=True, blank=True, verbose_name="Téléphone du destinataire")
+    status = models.CharField(max_length=20, blank=True, verbose_name="Statut")
+    summary = models.CharField(max_length=255, blank=True, verbose_name="Résumé")
+    data = models.JSONField(verbose_name="Données d'origine")
+    created_at = models.DateTimeField(verbose_name="Créé le (origine)")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archivé le")
+    
+    class Meta:
+        verbose_name = "Archive de communication"
+        verbose_name_plural = "Archives de communication"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['school', 'kind', '-created_at'], name='comm_archive_school_idx'),
+            models.Index(fields=['user', '-created_at'], name='comm_archive_user_idx'),
+            models.Index(fields=['recipient_phone'], name='comm_archive_phone_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.original_id} - {self.summary}"
+
+
+class DigestEvent(models.Model):
+    """Événement en attente du résumé parent (notes, présences, paiements), voir communication/digest.py"""
+    EVENT_TYPES = [
+        ('GRADE', 'Note'),
+        ('ATTENDANCE', 'Présence'),
+        ('PAYMENT', 'Paiement'),
+    ]
+    
+    parent = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_events', verbose_name="Parent")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='digest_events', verbose_name="Élève")
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='digest_events', verbose_name="École")
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES, verbose_name="Type")
+    # Détail court (statut de présence, matière...) utilisé par l'agrégation
+    detail = models.CharField(max_length=50, blank=True, verbose_name="Détail")
+    related_object_id = models.IntegerField(verbose_name="ID de l'objet lié")
+    digest_sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Résumé envoyé le")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Événement du résumé parent"
+        verbose_name_plural = "Événements du résumé parent"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['digest_sent_at', 'created_at'], name='comm_digest_pending_idx'),
+            models.Index(fields=['event_type', 'related_object_id'], name='comm_digest_object_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.student} -> {self.parent.username}"
@@ -0,0 +1,111 @@
+"""
+Fournisseurs d'envoi SMS / WhatsApp utilisés par le worker de livraison (delivery.py).
+
+- TwilioProvider : un seul Client Twilio par processus, avec session HTTP poolée
+  (keep-alive) au lieu d'un Client construit à chaque message.
+- FakeProvider : fournisseur local (latence et taux d'échec simulés) pour tester et
+  mesurer le débit du worker hors ligne ; seuls les FAKE_PROVIDER_SENT_MAX derniers
+  messages sont gardés (sent), le total est dans sent_count.
+
+Le fournisseur est choisi par le réglage SMS_PROVIDER ('twilio' ou 'fake').
+"""
+import random
+import threading
+from collections import deque
+import time
+import uuid
+from django.conf import settings
+
+
+class ProviderError(Exception):
+    """Échec d'envoi ; retryable=False pour les erreurs définitives (numéro invalide...)."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BaseProvider:
+    name = 'base'
+    # Débit maximal par défaut (messages / seconde), surchargeable par DELIVERY_RATE_LIMIT
+    rate_limit = 10.0
+
+    def send(self, channel, recipient_phone, body):
+        """Envoie un message et retourne l'identifiant du fournisseur."""
+        raise NotImplementedError
+
+
+class TwilioProvider(BaseProvider):
+    name = 'Twilio'
+    rate_limit = 10.0
+
+    def __init__(self):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+        self.client = Client(
+            settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=settings.DELIVERY_HTTP_TIMEOUT),
+        )
+
+    def send(self, channel, recipient_phone, body):
+        from twilio.base.exceptions import TwilioRestException
+        prefix = 'whatsapp:' if channel == 'whatsapp' else ''
+        try:
+            message = self.client.messages.create(
+                body=body,
+                from_=f'{prefix}{settings.TWILIO_PHONE_NUMBER}',
+                to=f'{prefix}{recipient_phone}',
+            )
+        except TwilioRestException as e:
+            # 4xx (hors 429) : requête refusée, inutile de réessayer
+            raise ProviderError(str(e), retryable=e.status == 429 or e.status >= 500)
+        return message.sid
+
+
+class FakeProvider(BaseProvider):
+    name = 'Fake'
+    rate_limit = 1000.0
+
+    def __init__(self, latency=None, failure_rate=None, seed=None):
+        self.latency = settings.FAKE_PROVIDER_LATENCY_MS / 1000 if latency is None else latency
+        self.failure_rate = settings.FAKE_PROVIDER_FAILURE_RATE if failure_rate is None else failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.sent = deque(maxlen=settings.FAKE_PROVIDER_SENT_MAX)
+        self.sent_count = 0
+
+    def send(self, channel, recipient_phone, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._rng.random() < self.failure_rate
+            if not failed:
+                self.sent.append((channel, recipient_phone, body))
+                self.sent_count += 1
+        if failed:
+            raise ProviderError("Échec simulé du fournisseur")
+        return f"fake-{uuid.uuid4().hex[:16]}"
+
+    def reset(self):
+        with self._lock:
+            self.sent.clear()
+            self.sent_count = 0
+
+
+PROVIDERS = {
+    'twilio': TwilioProvider,
+    'fake': FakeProvider,
+}
+_provider_instances = {}
+_provider_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """Instance partagée (par processus) du fournisseur configuré."""
+    name = (name or settings.SMS_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Fournisseur inconnu : {name} (choix : {', '.join(PROVIDERS)})")
+    with _provider_lock:
+        if name not in _provider_instances:
+            _provider_instances[name] = PROVIDERS[name]()
+        return _provider_instances[name]
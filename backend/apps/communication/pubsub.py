@@ -0,0 +1,309 @@
+"""
+Pub/sub des événements temps réel (nouvelles notifications, messages, messages
+d'encadrement) vers le flux SSE / long-poll (push.py).
+
+Chaque événement publié reçoit un identifiant croissant par utilisateur et reste dans un
+tampon court (PUSH_BUFFER_SIZE événements, PUSH_BUFFER_SECONDS) : un client reprend après
+le dernier identifiant reçu (?since= ou en-tête Last-Event-ID) sans perdre les événements
+émis entre deux long-polls ou pendant une reconnexion. Si le tampon ne couvre plus ce point,
+l'abonnement est marqué `missed` et le client doit recharger ses listes par l'API.
+
+Backends (réglage PUSH_BACKEND) :
+- 'redis'  (défaut) : un stream Redis par utilisateur (XADD borné, XREAD bloquant) ; les
+  identifiants sont ceux du stream, connexions bornées par PUSH_REDIS_TIMEOUT. Nécessaire dès que les écritures passent par les
+  workers gunicorn WSGI (process `web`) et les flux par le processus ASGI (process `push`).
+- 'memory' : en processus (séquence, tampon et files asyncio par utilisateur). Uniquement
+  quand un seul processus ASGI reçoit les écritures et sert les flux : exige
+  PUSH_SINGLE_PROCESS=True, sinon ImproperlyConfigured (rien n'atteindrait les flux).
+
+publish_events() est synchrone (appelé depuis les signaux, après commit) ; subscribe() est
+asynchrone (appelé depuis la vue de flux).
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+from collections import deque
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = 'eschool:push:user:'
+# Type d'événement par modèle (nom du modèle en minuscules -> type SSE)
+EVENT_TYPES = {
+    'notification': 'notification',
+    'message': 'message',
+    'tutoringmessage': 'tutoring_message',
+}
+_REDIS_ID_RE = re.compile(r'^(\d+)(?:-(\d+))?$')
+
+
+class BasePushBackend:
+    def publish_many(self, events):
+        """Publie des paires (user_id, événement)."""
+        raise NotImplementedError
+
+    def parse_cursor(self, value):
+        """Identifiant d'événement envoyé par le client (ValueError si invalide)."""
+        raise NotImplementedError
+
+    async def subscribe(self, user_id, since=None):
+        """
+        Abonnement (get(timeout) -> (event_id, événement) ou None, close(), cursor, missed)
+        à partir de l'événement qui suit `since` (None : seulement les nouveaux).
+        """
+        raise NotImplementedError
+
+
+class MemorySubscription:
+    def __init__(self, backend, user_id, cursor, replay, missed):
+        self.backend = backend
+        self.user_id = user_id
+        self.cursor = cursor
+        self.missed = missed
+        self.loop = asyncio.get_running_loop()
+        self.replay = deque(replay)
+        self.queue = asyncio.Queue(maxsize=settings.PUSH_QUEUE_SIZE)
+
+    def deliver(self, event_id, event):
+        """Appelé depuis n'importe quel thread : dépose l'événement dans la boucle de l'abonné."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event_id, event)
+        except RuntimeError:
+            # Boucle fermée (client déconnecté entre-temps)
+            pass
+
+    def _put(self, event_id, event):
+        if self.queue.full():
+            # Client trop lent : on abandonne le plus ancien plutôt que de bloquer l'éditeur
+            self.queue.get_nowait()
+            self.missed = True
+        self.queue.put_nowait((event_id, event))
+
+    async def get(self, timeout):
+        if self.replay:
+            item = self.replay.popleft()
+        else:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self.cursor = item[0]
+        return item
+
+    async def close(self):
+        self.backend.unregister(self)
+
+
+class MemoryPushBackend(BasePushBackend):
+    def __init__(self):
+        if not settings.PUSH_SINGLE_PROCESS:
+            raise ImproperlyConfigured(
+                "PUSH_BACKEND='memory' ne fonctionne qu'avec un seul processus qui reçoit les écritures "
+                "et sert les flux (PUSH_SINGLE_PROCESS=True). Avec les process web (WSGI) et push (ASGI) "
+                "séparés, utiliser PUSH_BACKEND='redis'."
+            )
+        self._subscribers = {}
+        self._sequences = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def publish_many(self, events):
+        targets = []
+        with self._lock:
+            for user_id, event in events:
+                sequence = self._sequences[user_id] = self._sequences.get(user_id, 0) + 1
+                buffer = self._buffers.get(user_id)
+                if buffer is None:
+                    buffer = self._buffers[user_id] = deque(maxlen=settings.PUSH_BUFFER_SIZE)
+                buffer.append((str(sequence), event))
+                targets.append((list(self._subscribers.get(user_id, ())), str(sequence), event))
+        for subscriptions, event_id, event in targets:
+            for subscription in subscriptions:
+                subscription.deliver(event_id, event)
+
+    def parse_cursor(self, value):
+        sequence = int(value)
+        if sequence < 0:
+            raise ValueError(value)
+        return sequence
+
+    async def subscribe(self, user_id, since=None):
+        with self._lock:
+            # Inscription et lecture du tampon sous le même verrou : ni trou ni doublon
+            last = self._sequences.get(user_id, 0)
+            buffered = list(self._buffers.get(user_id, ()))
+            if since is None:
+                cursor, replay, missed = last, [], False
+            else:
+                since = self.parse_cursor(since)
+                if since > last:
+                    # Séquence repartie de zéro (redémarrage) : tout le tampon est nouveau
+                    cursor, replay, missed = 0, buffered, True
+                else:
+                    replay = [(event_id, event) for event_id, event in buffered if int(event_id) > since]
+                    first = int(buffered[0][0]) if buffered else last + 1
+                    cursor, missed = since, first > since + 1
+            subscription = MemorySubscription(self, user_id, str(cursor), replay, missed)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unregister(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+def _redis_id(value):
+    """'1700000000000-3' -> (1700000000000, 3) pour comparer deux identifiants de stream."""
+    match = _REDIS_ID_RE.match(value)
+    if not match:
+        raise ValueError(value)
+    return int(match.group(1)), int(match.group(2) or 0)
+
+
+class RedisSubscription:
+    READ_COUNT = 100
+
+    def __init__(self, client, key, cursor, missed):
+        self.client = client
+        self.key = key
+        self.cursor = cursor
+        self.missed = missed
+        self.pending = deque()
+
+    async def get(self, timeout):
+        if not self.pending:
+            # XREAD BLOCK 0 attendrait indéfiniment : au moins 1 ms
+            block = max(1, int(timeout * 1000))
+            response = await self.client.xread({self.key: self.cursor}, count=self.READ_COUNT, block=block)
+            for _, entries in response or ():
+                for entry_id, fields in entries:
+                    self.pending.append((entry_id.decode(), json.loads(fields[b'data'])))
+        if not self.pending:
+            return None
+        item = self.pending.popleft()
+        self.cursor = item[0]
+        return item
+
+    async def close(self):
+        # Connexions rendues au pool du client partagé
+        self.pending.clear()
+
+
+class RedisPushBackend(BasePushBackend):
+    def __init__(self, url=None):
+        import redis
+        import redis.asyncio
+        self.url = url or settings.PUSH_REDIS_URL
+        timeout = settings.PUSH_REDIS_TIMEOUT
+        self._client = redis.Redis.from_url(self.url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._async_module = redis.asyncio
+        self._async_clients = {}
+
+    def publish_many(self, events):
+        pipe = self._client.pipeline(transaction=False)
+        for user_id, event in events:
+            key = f'{STREAM_PREFIX}{user_id}'
+            pipe.xadd(key, {'data': json.dumps(event, default=str)},
+                      maxlen=settings.PUSH_BUFFER_SIZE, approximate=True)
+            pipe.expire(key, settings.PUSH_BUFFER_SECONDS)
+        pipe.execute()
+
+    def parse_cursor(self, value):
+        milliseconds, sequence = _redis_id(value)
+        return f'{milliseconds}-{sequence}'
+
+    def _async_client(self):
+        # Un client (pool de connexions) par boucle d'événements
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            # Lecture : au-delà du plus long XREAD BLOCK (battement SSE ou long-poll)
+            timeout = settings.PUSH_REDIS_TIMEOUT
+            read_timeout = max(settings.PUSH_HEARTBEAT_SECONDS, settings.PUSH_LONG_POLL_TIMEOUT) + timeout
+            client = self._async_clients[loop] = self._async_module.Redis.from_url(
+                self.url, socket_timeout=read_timeout, socket_connect_timeout=timeout,
+            )
+        return client
+
+    async def subscribe(self, user_id, since=None):
+        client = self._async_client()
+        key = f'{STREAM_PREFIX}{user_id}'
+        if since is None:
+            latest = await client.xrevrange(key, count=1)
+            return RedisSubscription(client, key, latest[0][0].decode() if latest else '0-0', False)
+        since = self.parse_cursor(since)
+        oldest = await client.xrange(key, count=1)
+        if oldest:
+            # Le tampon commence après `since` : des événements ont pu être tronqués
+            missed = _redis_id(oldest[0][0].decode()) > _redis_id(since) and since != '0-0'
+        else:
+            # Tampon expiré (aucune écriture depuis PUSH_BUFFER_SECONDS)
+            missed = since != '0-0'
+        return RedisSubscription(client, key, since, missed)
+
+
+BACKENDS = {
+    'memory': MemoryPushBackend,
+    'redis': RedisPushBackend,
+}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = settings.PUSH_BACKEND
+            if name not in BACKENDS:
+                raise ValueError(f"Backend de push inconnu : {name} (choix : {', '.join(BACKENDS)})")
+            _backend = BACKENDS[name]()
+        return _backend
+
+
+@register()
+def check_push_backend(app_configs, **kwargs):
+    """Erreur au démarrage (migrate, check, runserver) si le backend en mémoire est mal utilisé."""
+    if settings.PUSH_ENABLED and settings.PUSH_BACKEND == 'memory' and not settings.PUSH_SINGLE_PROCESS:
+        return [Error(
+            "PUSH_BACKEND='memory' avec des process web et push séparés : aucun événement n'atteindrait les flux.",
+            hint="Utiliser PUSH_BACKEND='redis' (défaut), ou PUSH_SINGLE_PROCESS=True pour un seul processus ASGI.",
+            id='communication.E001',
+        )]
+    return []
+
+
+def publish_events(events):
+    """Publie des paires (user_id, événement) ; une panne du backend ne bloque jamais l'écriture."""
+    events = list(events)
+    if not events or not settings.PUSH_ENABLED:
+        return
+    try:
+        get_backend().publish_many(events)
+    except ImproperlyConfigured:
+        # Voir check_push_backend : signalé aussi au démarrage
+        logger.error("Publication push impossible : backend mal configuré", exc_info=True)
+    except Exception:
+        logger.warning("Publication push impossible (%s événements)", len(events), exc_info=True)
+
+
+def publish_event(user_id, event):
+    publish_events([(user_id, event)])
+
+
+def push_event(instance):
+    """Événement compact pour une Notification / un Message / un TutoringMessage ; le détail se lit via l'API."""
+    return {
+        'type': EVENT_TYPES[instance._meta.model_name],
+        'id': instance.pk,
+        'title': getattr(instance, 'title', None) or getattr(instance, 'subject', ''),
+        'created_at': instance.created_at.isoformat() if instance.created_at else None,
+    }
@@ -0,0 +1,111 @@
+"""
+Flux temps réel par utilisateur (Server-Sent Events ou long-poll) servi par ASGI.
+
+GET /api/communication/stream/            -> text/event-stream (EventSource)
+GET /api/communication/stream/?mode=poll  -> JSON {'events': [...], 'cursor', 'resync'} dès le
+                                             premier événement ou après PUSH_LONG_POLL_TIMEOUT secondes
+
+Reprise : chaque événement porte un identifiant (`id:` SSE, `event_id` en JSON). Le client
+le renvoie dans ?since=<id> (long-poll : le `cursor` de la réponse précédente) ou
+l'en-tête Last-Event-ID (renvoyé automatiquement par EventSource à la reconnexion) ; les
+événements émis entre-temps sont rejoués depuis le tampon du backend (pubsub.py). Le flux
+SSE commence par un événement `ready` qui porte l'identifiant courant. `resync` (ou un
+événement SSE `resync`) signale que le tampon ne couvre plus la reprise : recharger les listes.
+
+Authentification JWT par l'en-tête Authorization: Bearer <token> ou ?token=<token>
+(EventSource ne permet pas d'en-têtes). Les événements viennent du pub/sub (pubsub.py) :
+un client inactif ne génère plus aucune requête SQL, contrairement au polling des listes.
+
+Le flux exige le serveur ASGI (voir config/asgi.py et le process `push` du Procfile) ;
+servi par gunicorn WSGI il répond 503 pour ne pas bloquer un worker synchrone.
+"""
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .pubsub import get_backend
+
+
+def _authenticate(request):
+    token = request.GET.get('token')
+    if not token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        parts = header.split()
+        if len(parts) == 2 and parts[0] in settings.SIMPLE_JWT['AUTH_HEADER_TYPES']:
+            token = parts[1]
+    if not token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, TokenError):
+        return None
+    return user if user.is_active else None
+
+
+def _sse(event_id, event):
+    return f"id: {event_id}\nevent: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def _stream(subscription):
+    deadline = time.monotonic() + settings.PUSH_STREAM_MAX_SECONDS
+    try:
+        # Délai de reconnexion conseillé au client EventSource, puis point de reprise courant
+        yield f"retry: {settings.PUSH_RETRY_MS}\n\n"
+        yield _sse(subscription.cursor, {'type': 'ready'})
+        if subscription.missed:
+            yield _sse(subscription.cursor, {'type': 'resync'})
+        while time.monotonic() < deadline:
+            item = await subscription.get(timeout=settings.PUSH_HEARTBEAT_SECONDS)
+            # Commentaire SSE : garde la connexion ouverte à travers les proxys
+            yield _sse(*item) if item is not None else ": ping\n\n"
+    finally:
+        await subscription.close()
+
+
+async def _long_poll(subscription, timeout):
+    try:
+        events = []
+        item = await subscription.get(timeout=timeout)
+        while item is not None:
+            event_id, event = item
+            events.append({**event, 'event_id': event_id})
+            item = await subscription.get(timeout=0.05)
+        return {'events': events, 'cursor': subscription.cursor, 'resync': subscription.missed}
+    finally:
+        await subscription.close()
+
+
+async def event_stream(request):
+    """Flux SSE / long-poll des nouveaux éléments de l'utilisateur connecté."""
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Méthode non autorisée.'}, status=405)
+    if 'wsgi.version' in request.META:
+        return JsonResponse(
+            {'detail': 'Le flux temps réel est servi par le serveur ASGI (process push).'}, status=503
+        )
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': "Informations d'authentification non fournies ou invalides."}, status=401)
+
+    since = request.GET.get('since') or request.META.get('HTTP_LAST_EVENT_ID') or None
+    try:
+        subscription = await get_backend().subscribe(user.id, since=since)
+    except ValueError:
+        return JsonResponse({'detail': "Identifiant d'événement (since / Last-Event-ID) invalide."}, status=400)
+    if request.GET.get('mode') == 'poll':
+        try:
+            timeout = min(float(request.GET.get('timeout', settings.PUSH_LONG_POLL_TIMEOUT)),
+                          settings.PUSH_LONG_POLL_TIMEOUT)
+        except ValueError:
+            timeout = settings.PUSH_LONG_POLL_TIMEOUT
+        return JsonResponse(await _long_poll(subscription, max(0.0, timeout)))
+
+    response = StreamingHttpResponse(_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Désactive la mise en tampon de nginx pour ce flux
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting
+from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting, ArchivedRecord
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -53,7 +53,10 @@ class AnnouncementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Announcement
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at', 'published_at', 'school']  # school est assigné automatiquement dans perform_create
+        read_only_fields = [
+            'created_at', 'updated_at', 'published_at', 'school', 'recipients_count', 'notifications_sent',
+            'sms_queued', 'whatsapp_queued', 'fanout_cursor', 'fanout_completed_at',
+        ]  # school est assigné automatiquement dans perform_create
         extra_kwargs = {
             'school': {'required': False, 'allow_null': True, 'read_only': True}  # Le champ school est assigné automatiquement dans perform_create
         }
@@ -69,3 +72,11 @@ class ParentMeetingSerializer(serializers.ModelSerializer):
         model = ParentMeeting
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
+
+
+class ArchivedRecordSerializer(serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.get_full_name', read_only=True, default=None)
+    
+    class Meta:
+        model = ArchivedRecord
+        fields = '__all__'
@@ -0,0 +1,128 @@
+"""
+Signals pour maintenir les compteurs de non-lus (UnreadCounter) et les résumés de
+conversation (Conversation), alimenter le flux temps réel (pubsub) à chaque nouvel élément
+et enregistrer les événements du résumé parent
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from apps.academics.models import Attendance, GradeBulletin
+from apps.payments.models import Payment
+from apps.tutoring.models import TutoringMessage
+from .models import Notification, Message
+from .counters import increment_unread, decrement_unread
+from .digest import record_event
+from .inbox import refresh_conversation
+from .pubsub import publish_event, push_event
+
+# Modèle -> (compteur, champ destinataire)
+COUNTED_MODELS = {
+    Notification: ('notifications', 'user_id'),
+    Message: ('messages', 'recipient_id'),
+    TutoringMessage: ('tutoring_messages', 'recipient_id'),
+}
+
+
+@receiver(pre_save, sender=Notification)
+@receiver(pre_save, sender=Message)
+@receiver(pre_save, sender=TutoringMessage)
+def remember_previous_read_state(sender, instance, raw=False, **kwargs):
+    """Mémorise l'état lu / destinataire avant modification."""
+    if raw:
+        return
+    _, recipient_field = COUNTED_MODELS[sender]
+    instance._previous_unread = None
+    if instance.pk:
+        instance._previous_unread = sender.objects.filter(pk=instance.pk).values_list(
+            recipient_field, 'is_read'
+        ).first()
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=TutoringMessage)
+def update_unread_on_save(sender, instance, created, raw=False, **kwargs):
+    """Création non lue : +1 ; passage à lu : -1 ; retour à non lu : +1."""
+    if raw:
+        return
+    field, recipient_field = COUNTED_MODELS[sender]
+    recipient_id = getattr(instance, recipient_field)
+    previous = None if created else getattr(instance, '_previous_unread', None)
+    if previous is not None:
+        previous_recipient_id, previous_is_read = previous
+        if previous_recipient_id == recipient_id and previous_is_read == instance.is_read:
+            return
+        if not previous_is_read:
+            decrement_unread(previous_recipient_id, field)
+    if not instance.is_read:
+        increment_unread([recipient_id], field)
+
+
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=TutoringMessage)
+def update_unread_on_delete(sender, instance, **kwargs):
+    if instance.is_read:
+        return
+    field, recipient_field = COUNTED_MODELS[sender]
+    decrement_unread(getattr(instance, recipient_field), field)
+
+
+@receiver(post_save, sender=Message)
+def update_conversations_on_save(sender, instance, created, raw=False, **kwargs):
+    """Nouveau message ou changement d'état lu : résumés des deux interlocuteurs recalculés."""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous_unread', None)
+    if previous is not None and previous == (instance.recipient_id, instance.is_read):
+        return
+    refresh_conversation(instance.sender_id, instance.recipient_id)
+    if instance.recipient_id != instance.sender_id:
+        refresh_conversation(instance.recipient_id, instance.sender_id)
+
+
+@receiver(post_delete, sender=Message)
+def update_conversations_on_delete(sender, instance, **kwargs):
+    refresh_conversation(instance.sender_id, instance.recipient_id)
+    if instance.recipient_id != instance.sender_id:
+        refresh_conversation(instance.recipient_id, instance.sender_id)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=TutoringMessage)
+def publish_new_item(sender, instance, created, raw=False, **kwargs):
+    """Nouvel élément : événement poussé au destinataire une fois la transaction validée."""
+    if raw or not created:
+        return
+    _, recipient_field = COUNTED_MODELS[sender]
+    recipient_id = getattr(instance, recipient_field)
+    event = push_event(instance)
+    transaction.on_commit(lambda: publish_event(recipient_id, event))
+
+
+@receiver(post_save, sender=GradeBulletin)
+def record_grade_event(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_event(instance.student_id, 'GRADE', instance.id, detail=str(instance.subject_id or ''))
+
+
+@receiver(post_save, sender=Attendance)
+def record_attendance_event(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_event(instance.student_id, 'ATTENDANCE', instance.id, detail=instance.status)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment_status(sender, instance, raw=False, **kwargs):
+    instance._previous_status = None
+    if not raw and instance.pk:
+        instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Payment)
+def record_payment_event(sender, instance, raw=False, **kwargs):
+    """Paiement passé à COMPLETED."""
+    if raw or instance.status != 'COMPLETED' or getattr(instance, '_previous_status', None) == 'COMPLETED':
+        return
+    record_event(instance.student_id, 'PAYMENT', instance.id, detail=instance.currency)
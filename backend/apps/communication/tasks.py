@@ -1,70 +1,66 @@
 """
-Celery tasks for communication (SMS, WhatsApp)
+Celery tasks for communication (SMS, WhatsApp, announcement fan-out)
+
+Les envois passent par le worker de livraison (delivery.py) : lots, fournisseur partagé
+(session HTTP poolée), limitation de débit, retries avec backoff.
 """
 from celery import shared_task
-from django.conf import settings
-from django.utils import timezone
-from twilio.rest import Client
-from .models import SMSLog, WhatsAppLog
+from .delivery import deliver_logs
 
 
 @shared_task
 def send_sms(sms_log_id):
-    """Send SMS using Twilio"""
-    try:
-        sms_log = SMSLog.objects.get(id=sms_log_id)
-        
-        # Initialize Twilio client
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        
-        # Send SMS
-        message = client.messages.create(
-            body=sms_log.message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=sms_log.recipient_phone
-        )
-        
-        # Update log
-        sms_log.status = 'SENT'
-        sms_log.provider_message_id = message.sid
-        sms_log.sent_at = timezone.now()
-        sms_log.save()
-        
-        return f"SMS sent: {message.sid}"
-    except Exception as e:
-        sms_log = SMSLog.objects.get(id=sms_log_id)
-        sms_log.status = 'FAILED'
-        sms_log.error_message = str(e)
-        sms_log.save()
-        raise
+    """Send one SMS"""
+    return deliver_logs('sms', ids=[sms_log_id])
 
 
 @shared_task
 def send_whatsapp(whatsapp_log_id):
-    """Send WhatsApp message using Twilio"""
-    try:
-        whatsapp_log = WhatsAppLog.objects.get(id=whatsapp_log_id)
-        
-        # Initialize Twilio client
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        
-        # Send WhatsApp (using Twilio WhatsApp API)
-        message = client.messages.create(
-            body=whatsapp_log.message,
-            from_=f'whatsapp:{settings.TWILIO_PHONE_NUMBER}',
-            to=f'whatsapp:{whatsapp_log.recipient_phone}'
-        )
-        
-        # Update log
-        whatsapp_log.status = 'SENT'
-        whatsapp_log.provider_message_id = message.sid
-        whatsapp_log.sent_at = timezone.now()
-        whatsapp_log.save()
-        
-        return f"WhatsApp sent: {message.sid}"
-    except Exception as e:
-        whatsapp_log = WhatsAppLog.objects.get(id=whatsapp_log_id)
-        whatsapp_log.status = 'FAILED'
-        whatsapp_log.error_message = str(e)
-        whatsapp_log.save()
-        raise
+    """Send one WhatsApp message"""
+    return deliver_logs('whatsapp', ids=[whatsapp_log_id])
+
+
+@shared_task
+def send_sms_batch(sms_log_ids):
+    """Send a batch of SMS (announcement fan-out)"""
+    return deliver_logs('sms', ids=sms_log_ids)
+
+
+@shared_task
+def send_whatsapp_batch(whatsapp_log_ids):
+    """Send a batch of WhatsApp messages (announcement fan-out)"""
+    return deliver_logs('whatsapp', ids=whatsapp_log_ids)
+
+
+@shared_task
+def process_delivery_queue():
+    """Drain every PENDING SMS / WhatsApp log that is due (periodic task, retries included)"""
+    return [deliver_logs('sms'), deliver_logs('whatsapp')]
+
+
+@shared_task
+def fan_out_announcement(announcement_id):
+    """Create notifications and queue SMS/WhatsApp for a published announcement"""
+    from .fanout import fan_out_announcement as run_fan_out
+    return run_fan_out(announcement_id)
+
+
+@shared_task
+def resume_announcement_fanouts():
+    """Resume published announcements whose fan-out stalled (periodic task)"""
+    from .fanout import resume_announcement_fanouts as run_resume
+    return run_resume()
+
+
+@shared_task
+def archive_communication_logs():
+    """Move old notifications and SMS/WhatsApp logs to the archive (periodic task)"""
+    from .archive import archive_communication
+    return archive_communication()
+
+
+@shared_task
+def send_parent_digests():
+    """Send one digest (notification + SMS) per parent for the last closed window (periodic task)"""
+    from .digest import send_parent_digests as run_digests
+    return run_digests()
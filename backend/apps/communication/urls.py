@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .push import event_stream
 from .views import (
     NotificationViewSet, MessageViewSet, SMSLogViewSet,
-    WhatsAppLogViewSet, AnnouncementViewSet, ParentMeetingViewSet
+    WhatsAppLogViewSet, AnnouncementViewSet, ParentMeetingViewSet, ArchivedRecordViewSet, unread_counters
 )
 
 router = DefaultRouter()
@@ -12,7 +13,10 @@ router.register(r'sms', SMSLogViewSet, basename='sms')
 router.register(r'whatsapp', WhatsAppLogViewSet, basename='whatsapp')
 router.register(r'announcements', AnnouncementViewSet, basename='announcement')
 router.register(r'parent-meetings', ParentMeetingViewSet, basename='parent-meeting')
+router.register(r'archives', ArchivedRecordViewSet, basename='archive')
 
 urlpatterns = [
+    path('counters/', unread_counters, name='unread-counters'),
+    path('stream/', event_stream, name='event-stream'),
     path('', include(router.urls)),
 ]
@@ -1,14 +1,23 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.utils import timezone
-from django.db import models
-from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting
+from django.utils.dateparse import parse_date
+from django.db import models, transaction
+import logging
+from .models import Notification, Message, SMSLog, WhatsAppLog, Announcement, ParentMeeting, ArchivedRecord
 from .serializers import (
     NotificationSerializer, MessageSerializer, SMSLogSerializer,
-    WhatsAppLogSerializer, AnnouncementSerializer, ParentMeetingSerializer
+    WhatsAppLogSerializer, AnnouncementSerializer, ParentMeetingSerializer, ArchivedRecordSerializer
 )
-# from .tasks import send_sms, send_whatsapp  # Uncomment when Celery is configured
+from .counters import decrement_unread, get_counters
+from .fanout import enqueue_deliveries, queue_announcement_fanout
+from .inbox import (
+    INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE, encode_cursor, decode_cursor, conversation_threads, conversation_messages,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -35,10 +44,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).update(is_read=True, read_at=timezone.now())
+        with transaction.atomic():
+            count = Notification.objects.filter(
+                user=request.user,
+                is_read=False
+            ).update(is_read=True, read_at=timezone.now())
+            decrement_unread(request.user.id, 'notifications', count)
         return Response({'marked_read': count})
 
 
@@ -57,14 +68,11 @@ class MessageViewSet(viewsets.ModelViewSet):
         return queryset
     
     def create(self, request, *args, **kwargs):
-        """Override create to add debug logging and validation"""
+        """Override create to add validation"""
         user = request.user
-        print(f"DEBUG MESSAGE CREATE: User: {user.username}, Role: {user.role}, School: {user.school}")
-        print(f"DEBUG MESSAGE CREATE: Request data: {request.data}")
         
         # Vérifier si l'utilisateur a une école
         if not user.school:
-            print(f"DEBUG MESSAGE CREATE: ERREUR - L'utilisateur {user.username} n'a pas d'école associée")
             return Response({
                 'non_field_errors': ['Vous devez être associé à une école pour envoyer un message. Veuillez contacter l\'administrateur système.']
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -74,15 +82,12 @@ class MessageViewSet(viewsets.ModelViewSet):
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
-            print(f"DEBUG MESSAGE CREATE: Succès - Message créé")
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except Exception as e:
-            print(f"DEBUG MESSAGE CREATE: ERREUR lors de la création: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
             # Retourner une erreur formatée au lieu de laisser l'exception se propager
             if hasattr(e, 'detail'):
                 return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+            logger.exception("Erreur lors de la création d'un message par %s", user.username)
             return Response({
                 'non_field_errors': [f'Erreur lors de l\'envoi du message: {str(e)}']
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -102,6 +107,57 @@ class MessageViewSet(viewsets.ModelViewSet):
             message.read_at = timezone.now()
             message.save()
         return Response(MessageSerializer(message).data)
+    
+    def _page_size(self, request):
+        try:
+            size = int(request.query_params.get('page_size', INBOX_PAGE_SIZE))
+        except ValueError:
+            size = INBOX_PAGE_SIZE
+        return max(1, min(size, INBOX_MAX_PAGE_SIZE))
+    
+    def _next_url(self, request, cursor):
+        if cursor is None:
+            return None
+        params = request.query_params.copy()
+        params['cursor'] = encode_cursor(cursor)
+        return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """Conversations (interlocuteur, dernier message, non-lus), pagination par curseur"""
+        try:
+            after = decode_cursor(request.query_params.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        conversations, next_cursor = conversation_threads(request.user, after, self._page_size(request))
+        results = [
+            {
+                'partner': {
+                    'id': c['partner'].id,
+                    'name': c['partner'].get_full_name() or c['partner'].username,
+                    'role': c['partner'].role,
+                },
+                'last_message': MessageSerializer(c['last_message']).data,
+                'unread_count': c['unread_count'],
+            }
+            for c in conversations
+        ]
+        return Response({'next': self._next_url(request, next_cursor), 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def conversation(self, request):
+        """Messages échangés avec un interlocuteur (?with=<user_id>), du plus récent au plus ancien"""
+        try:
+            partner_id = int(request.query_params.get('with', ''))
+            before = decode_cursor(request.query_params.get('cursor'))
+        except ValueError:
+            return Response({'error': 'Paramètres with (id utilisateur) ou cursor invalides.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        messages, next_cursor = conversation_messages(request.user, partner_id, before, self._page_size(request))
+        return Response({
+            'next': self._next_url(request, next_cursor),
+            'results': MessageSerializer(messages, many=True).data,
+        })
 
 
 class SMSLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -133,11 +189,8 @@ class SMSLogViewSet(viewsets.ReadOnlyModelViewSet):
             status='PENDING'
         )
         
-        # Send SMS asynchronously
-        # send_sms.delay(sms_log.id)  # Uncomment when Celery is configured
-        sms_log.status = 'SENT'
-        sms_log.sent_at = timezone.now()
-        sms_log.save()
+        # Envoi par le worker de livraison (tâche Celery, ou worker run_delivery_worker sans broker)
+        enqueue_deliveries('sms', [sms_log.id])
         
         return Response(SMSLogSerializer(sms_log).data, status=status.HTTP_201_CREATED)
 
@@ -170,11 +223,8 @@ class WhatsAppLogViewSet(viewsets.ReadOnlyModelViewSet):
             status='PENDING'
         )
         
-        # Send WhatsApp asynchronously
-        # send_whatsapp.delay(whatsapp_log.id)  # Uncomment when Celery is configured
-        whatsapp_log.status = 'SENT'
-        whatsapp_log.sent_at = timezone.now()
-        whatsapp_log.save()
+        # Envoi par le worker de livraison (tâche Celery, ou worker run_delivery_worker sans broker)
+        enqueue_deliveries('whatsapp', [whatsapp_log.id])
         
         return Response(WhatsAppLogSerializer(whatsapp_log).data, status=status.HTTP_201_CREATED)
 
@@ -209,9 +259,8 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         announcement.published_at = timezone.now()
         announcement.save()
         
-        # Create notifications for target audience
-        # This would be handled by a Celery task in production
-        # For now, we'll just return success
+        # Notifications / SMS / WhatsApp du public cible : diffusion par lots hors requête
+        queue_announcement_fanout(announcement.id)
         
         return Response(AnnouncementSerializer(announcement).data)
 
@@ -233,3 +282,38 @@ class ParentMeetingViewSet(viewsets.ModelViewSet):
         elif self.request.user.is_teacher:
             queryset = queryset.filter(teacher__user=self.request.user)
         return queryset
+
+
+class ArchivedRecordViewSet(viewsets.ReadOnlyModelViewSet):
+    """Historique archivé (notifications, SMS, WhatsApp) : recherche réservée aux administrateurs"""
+    serializer_class = ArchivedRecordSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['kind', 'status', 'user', 'recipient_phone']
+    search_fields = ['summary', 'recipient_phone', 'user__username']
+    
+    def get_queryset(self):
+        user = self.request.user
+        if not (user.is_admin or user.is_superuser):
+            raise PermissionDenied("Seuls les administrateurs peuvent consulter les archives.")
+        queryset = ArchivedRecord.objects.select_related('user')
+        if user.school:
+            queryset = queryset.filter(school=user.school)
+        for param, lookup in (('created_after', 'created_at__date__gte'), ('created_before', 'created_at__date__lte')):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({param: "Date invalide (format AAAA-MM-JJ)."})
+            queryset = queryset.filter(**{lookup: day})
+        return queryset
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def unread_counters(request):
+    """Badges non lus (notifications, messages, encadrement) de l'utilisateur en une seule lecture"""
+    return Response(get_counters(request.user))
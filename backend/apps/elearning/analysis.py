@@ -0,0 +1,232 @@
+"""
+Analyse d'items d'un quiz ou d'un devoir : difficulté, discrimination (point-bisériale),
+fréquence des distracteurs et distribution des notes.
+
+Les réponses sont chargées en une requête (values_list, sans instancier de modèles) dans
+une matrice répondants x questions, puis toutes les statistiques sont calculées en une
+passe par sommes cumulées. Le résultat est mis en cache jusqu'à la prochaine soumission
+ou correction (invalidate_item_analysis), au plus ITEM_ANALYSIS_CACHE_SECONDS, seulement avec
+un cache partagé par tous les workers (ITEM_ANALYSIS_CACHE_ENABLED) : en mémoire locale,
+l'invalidation n'atteindrait que le processus qui a reçu la soumission.
+"""
+import json
+import math
+from collections import Counter
+from statistics import median
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Warning, register
+from django.utils import timezone
+from .grading import evaluate_answers
+from .models import AssignmentQuestion, AssignmentSubmission, QuizAnswer, QuizQuestion
+
+CACHE_KEY = 'elearning:item-analysis:{kind}:{pk}'
+CHOICE_TYPES = ('SINGLE_CHOICE', 'MULTIPLE_CHOICE')
+HISTOGRAM_BINS = 10
+
+
+def invalidate_item_analysis(kind, pk):
+    """À appeler après une soumission ou une correction (kind : 'quiz' ou 'assignment')."""
+    cache.delete(CACHE_KEY.format(kind=kind, pk=pk))
+
+
+def _questions(model, **filters):
+    return list(
+        model.objects.filter(**filters).order_by('order', 'id').values(
+            'id', 'order', 'question_text', 'question_type', 'points', 'correct_answer'
+        )
+    )
+
+
+def _quiz_responses(quiz_id):
+    """{attempt_id: {question_id: (réponse, points)}} des tentatives soumises."""
+    responses = {}
+    rows = QuizAnswer.objects.filter(
+        attempt__quiz_id=quiz_id, attempt__submitted_at__isnull=False
+    ).values_list('attempt_id', 'question_id', 'answer_text', 'points_earned')
+    for attempt_id, question_id, answer_text, points_earned in rows:
+        responses.setdefault(attempt_id, {})[question_id] = (answer_text or '', float(points_earned or 0))
+    return responses
+
+
+def _assignment_responses(assignment_id, questions):
+    """
+    {submission_id: {question_id: (réponse, points)}} ; les soumissions pas encore notées
+    par question sont corrigées à la volée, question par question (evaluate_answers).
+    """
+    responses, ungraded = {}, {}
+    rows = AssignmentSubmission.objects.filter(assignment_id=assignment_id).values_list(
+        'id', 'submission_text', 'answer_grades'
+    )
+    for submission_id, text, grades in rows:
+        try:
+            answers = json.loads(text) if text else {}
+        except (json.JSONDecodeError, TypeError):
+            answers = {}
+        if not isinstance(answers, dict):
+            answers = {}
+        if not grades and not answers:
+            continue
+        row = responses[submission_id] = {}
+        for q in questions:
+            answer = str(answers.get(str(q['id'])) or '')
+            grade = (grades or {}).get(str(q['id']))
+            if grade is not None:
+                row[q['id']] = (answer, float(grade.get('points_earned') or 0))
+            else:
+                ungraded.setdefault(q['id'], []).append((submission_id, answer))
+    by_id = {q['id']: q for q in questions}
+    for question_id, pending in ungraded.items():
+        q = by_id[question_id]
+        results = evaluate_answers(q['question_type'], [a for _, a in pending], q['correct_answer'], q['points'])
+        for (submission_id, answer), (_, points) in zip(pending, results):
+            responses[submission_id][question_id] = (answer, float(points))
+    return responses
+
+
+def _correlation(n, sx, sy, sxx, syy, sxy):
+    denominator = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if n < 2 or denominator <= 0:
+        return None
+    return round((n * sxy - sx * sy) / math.sqrt(denominator), 3)
+
+
+def _distractor_key(question_type, answer):
+    answer = answer.strip()
+    if question_type in CHOICE_TYPES:
+        return answer.upper()
+    if question_type == 'TRUE_FALSE':
+        return answer.lower()
+    return None
+
+
+def _distribution(totals, max_score):
+    if not totals:
+        return {'mean': None, 'median': None, 'stdev': None, 'min': None, 'max': None, 'histogram': []}
+    n = len(totals)
+    mean = sum(totals) / n
+    variance = sum((t - mean) ** 2 for t in totals) / n
+    histogram = [0] * HISTOGRAM_BINS
+    for total in totals:
+        ratio = total / max_score if max_score else 0
+        histogram[min(max(int(ratio * HISTOGRAM_BINS), 0), HISTOGRAM_BINS - 1)] += 1
+    step = 100 // HISTOGRAM_BINS
+    return {
+        'mean': round(mean, 2),
+        'median': round(median(totals), 2),
+        'stdev': round(math.sqrt(variance), 2),
+        'min': round(min(totals), 2),
+        'max': round(max(totals), 2),
+        'histogram': [
+            {'range': f"{i * step}-{(i + 1) * step}%", 'count': count} for i, count in enumerate(histogram)
+        ],
+    }
+
+
+def analyse_items(questions, responses):
+    """
+    Statistiques par question à partir de la matrice des réponses.
+    difficulty : part moyenne des points obtenus (1 = tout le monde réussit) ;
+    discrimination : corrélation point-bisériale entre la question et le reste de la copie.
+    """
+    respondents = list(responses.values())
+    n = len(respondents)
+    totals = [sum(points for _, points in row.values()) for row in respondents]
+    max_score = sum(float(q['points'] or 0) for q in questions)
+
+    items = []
+    for q in questions:
+        qid, max_points = q['id'], float(q['points'] or 0)
+        sx = sy = sxx = syy = sxy = 0.0
+        answered = full = partial = 0
+        distractors = Counter()
+        for row, total in zip(respondents, totals):
+            answer, points = row.get(qid, ('', 0.0))
+            x = points / max_points if max_points else 0.0
+            rest = total - points
+            sx += x
+            sy += rest
+            sxx += x * x
+            syy += rest * rest
+            sxy += x * rest
+            if answer:
+                answered += 1
+                key = _distractor_key(q['question_type'], answer)
+                if key is not None:
+                    distractors[key] += 1
+            if max_points and points >= max_points:
+                full += 1
+            elif points > 0:
+                partial += 1
+
+        item = {
+            'question_id': qid,
+            'order': q['order'],
+            'question_text': q['question_text'],
+            'question_type': q['question_type'],
+            'points': max_points,
+            'answered': answered,
+            'difficulty': round(sx / n, 3) if n else None,
+            'mean_points': round(sx / n * max_points, 2) if n else None,
+            'discrimination': _correlation(n, sx, sy, sxx, syy, sxy),
+            'credit': {'full': full, 'partial': partial, 'none': n - full - partial},
+            'distractors': None,
+        }
+        if q['question_type'] in CHOICE_TYPES or q['question_type'] == 'TRUE_FALSE':
+            correct = _distractor_key(q['question_type'], q['correct_answer'] or '')
+            options = ['A', 'B', 'C', 'D'] if q['question_type'] in CHOICE_TYPES else ['true', 'false']
+            options += sorted(set(distractors) - set(options))
+            item['distractors'] = [
+                {
+                    'answer': option,
+                    'count': distractors[option],
+                    'share': round(distractors[option] / n, 3) if n else 0,
+                    'is_correct': option == correct,
+                }
+                for option in options
+            ]
+        items.append(item)
+
+    return {
+        'respondents': n,
+        'max_score': max_score,
+        'score_distribution': _distribution(totals, max_score),
+        'questions': items,
+    }
+
+
+def _cached(kind, pk, compute):
+    if not settings.ITEM_ANALYSIS_CACHE_ENABLED:
+        return {'kind': kind, 'id': pk, **compute(), 'computed_at': timezone.now().isoformat()}
+    key = CACHE_KEY.format(kind=kind, pk=pk)
+    result = cache.get(key)
+    if result is None:
+        result = {'kind': kind, 'id': pk, **compute(), 'computed_at': timezone.now().isoformat()}
+        cache.set(key, result, settings.ITEM_ANALYSIS_CACHE_SECONDS)
+    return result
+
+
+@register()
+def check_item_analysis_cache(app_configs, **kwargs):
+    """Avertissement si l'analyse d'items est mise en cache dans la mémoire locale de chaque processus."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.ITEM_ANALYSIS_CACHE_ENABLED and backend.endswith('LocMemCache'):
+        return [Warning(
+            "ITEM_ANALYSIS_CACHE_ENABLED avec LocMemCache : invalidate_item_analysis n'invalide que le processus courant.",
+            hint="Définir REDIS_CACHE_URL (cache partagé) ou ITEM_ANALYSIS_CACHE_ENABLED=False avec plusieurs workers.",
+            id='elearning.W001',
+        )]
+    return []
+
+
+def quiz_item_analysis(quiz):
+    def compute():
+        return analyse_items(_questions(QuizQuestion, quiz_id=quiz.pk), _quiz_responses(quiz.pk))
+    return _cached('quiz', quiz.pk, compute)
+
+
+def assignment_item_analysis(assignment):
+    def compute():
+        questions = _questions(AssignmentQuestion, assignment_id=assignment.pk)
+        return analyse_items(questions, _assignment_responses(assignment.pk, questions))
+    return _cached('assignment', assignment.pk, compute)
@@ -0,0 +1,211 @@
+"""
+Correction automatique des devoirs hors de la requête HTTP.
+
+La soumission enregistre les réponses brutes puis met la correction en file après le
+commit (queue_submission_grading) ; selon ASSIGNMENT_GRADING_MODE la correction est :
+  - 'celery' : tâche Celery (grade_assignment_submission) ;
+  - 'thread' : pool de threads du processus web (sans broker) ;
+  - 'sync'   : exécutée dans le callback de commit (tests, scripts).
+
+La correction écrit answer_grades et score en une seule mise à jour (sauf si l'enseignant
+a noté la copie entre-temps), puis notifie l'élève.
+La mise en file date la soumission (grading_queued_at), remise à None une fois corrigée : une
+correction perdue (redémarrage du processus en mode 'thread', message Celery perdu) est
+reprise par grade_pending_submissions (tâche périodique du processus clock, et commande).
+regrade_assignment recorrige toutes les soumissions d'un devoir (après modification d'une
+bonne réponse) par lots : chaque question est évaluée pour tout le lot en un appel, les lots
+sont répartis sur les workers Celery ou sur le pool de threads du processus.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .analysis import invalidate_item_analysis
+from .grading import evaluate_answers
+from .models import AssignmentQuestion, AssignmentSubmission
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_OBJECT_TYPE = 'assignment_submission'
+
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASSIGNMENT_GRADING_THREADS, thread_name_prefix='assignment-grading'
+        )
+    return _executor
+
+
+def _parse_answers(submission_text):
+    try:
+        answers = json.loads(submission_text) if submission_text else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return answers if isinstance(answers, dict) else {}
+
+
+def grade_answers(questions, submission_texts):
+    """
+    Corrige un lot de soumissions d'un même devoir : {id: submission_text} ->
+    {id: (answer_grades, score)}. Chaque question est évaluée pour tout le lot en un appel.
+    """
+    parsed = {pk: _parse_answers(text) for pk, text in submission_texts.items()}
+    results = {pk: ({}, 0.0) for pk in parsed}
+    for q in questions:
+        ids = list(parsed)
+        answers = [parsed[pk].get(str(q.id)) or parsed[pk].get(q.id) or '' for pk in ids]
+        graded = evaluate_answers(q.question_type, [str(a) for a in answers], q.correct_answer, q.points)
+        for pk, (_, pts) in zip(ids, graded):
+            answer_grades, score = results[pk]
+            answer_grades[str(q.id)] = {'points_earned': float(pts), 'teacher_feedback': ''}
+            results[pk] = (answer_grades, score + pts)
+    return {pk: (grades, round(score, 2)) for pk, (grades, score) in results.items()}
+
+
+def _notify(submissions):
+    """Une notification par élève dont la note a été (re)calculée."""
+    from apps.communication.fanout import bulk_notify
+    from apps.communication.models import Notification
+    notifications = [
+        Notification(
+            user_id=s.student.user_id, school_id=s.assignment.school_class.school_id,
+            notification_type='ASSIGNMENT', title='Devoir corrigé',
+            message=f"{s.assignment.title} : {float(s.score):g}/{float(s.assignment.total_points):g}",
+            related_object_type=SUBMISSION_OBJECT_TYPE, related_object_id=s.id,
+        )
+        for s in submissions
+    ]
+    bulk_notify(notifications)
+
+
+def grade_submissions(submission_ids, notify=True):
+    """
+    Corrige des soumissions (d'un ou plusieurs devoirs) et enregistre answer_grades / score.
+    Les soumissions notées par l'enseignant entre-temps ne sont pas écrasées.
+    Retourne le nombre de soumissions corrigées.
+    """
+    started_at = timezone.now()
+    submissions = list(
+        AssignmentSubmission.objects.filter(id__in=submission_ids)
+        .exclude(status='GRADED')
+        .select_related('assignment__school_class', 'student')
+    )
+    by_assignment = {}
+    for submission in submissions:
+        by_assignment.setdefault(submission.assignment_id, []).append(submission)
+
+    graded = 0
+    for assignment_id, batch in by_assignment.items():
+        questions = list(AssignmentQuestion.objects.filter(assignment_id=assignment_id).order_by('order'))
+        if not questions:
+            continue
+        results = grade_answers(questions, {s.id: s.submission_text for s in batch if s.submission_text})
+        updated = []
+        with transaction.atomic():
+            for submission in batch:
+                if submission.id not in results:
+                    continue
+                answer_grades, score = results[submission.id]
+                # Mise à jour conditionnelle : une note saisie par l'enseignant entre-temps est conservée
+                if AssignmentSubmission.objects.filter(pk=submission.id).exclude(status='GRADED').update(
+                    answer_grades=answer_grades, score=score, grading_queued_at=None
+                ):
+                    submission.answer_grades, submission.score = answer_grades, score
+                    updated.append(submission)
+            if notify and updated:
+                _notify(updated)
+        invalidate_item_analysis('assignment', assignment_id)
+        graded += len(updated)
+    # Rien à corriger (notée, sans réponses, sans questions) : plus en attente, sauf nouvelle mise en file
+    AssignmentSubmission.objects.filter(
+        id__in=submission_ids, grading_queued_at__lte=started_at
+    ).update(grading_queued_at=None)
+    return graded
+
+
+def _grade_in_thread(submission_id):
+    try:
+        grade_submissions([submission_id])
+    except Exception:
+        logger.exception("Échec de la correction automatique de la soumission %s", submission_id)
+    finally:
+        connection.close()
+
+
+def _grade_chunk_in_thread(submission_ids, notify):
+    try:
+        return grade_submissions(submission_ids, notify=notify)
+    finally:
+        connection.close()
+
+
+def queue_submission_grading(submission_id):
+    """Met en file la correction d'une soumission, après le commit de la requête."""
+    AssignmentSubmission.objects.filter(pk=submission_id).update(grading_queued_at=timezone.now())
+    mode = settings.ASSIGNMENT_GRADING_MODE
+    if mode == 'celery':
+        from .tasks import grade_assignment_submission
+        transaction.on_commit(lambda: grade_assignment_submission.delay(submission_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _thread_pool().submit(_grade_in_thread, submission_id))
+    else:
+        transaction.on_commit(lambda: grade_submissions([submission_id]))
+
+
+def regrade_assignment(assignment_id, include_graded=False, chunk_size=None, notify=True, use_celery=None):
+    """
+    Recorrige toutes les soumissions d'un devoir par lots de chunk_size.
+    include_graded : réinitialise aussi les soumissions déjà notées par l'enseignant.
+    use_celery (ASSIGNMENT_GRADING_MODE == 'celery' par défaut) : un lot par tâche, en parallèle.
+    Retourne {'submissions', 'chunks', 'graded' (None si mis en file)}.
+    """
+    chunk_size = chunk_size or settings.ASSIGNMENT_REGRADE_CHUNK_SIZE
+    if use_celery is None:
+        use_celery = settings.ASSIGNMENT_GRADING_MODE == 'celery'
+    submissions = AssignmentSubmission.objects.filter(assignment_id=assignment_id)
+    if include_graded:
+        submissions.filter(status='GRADED').update(status='SUBMITTED', graded_by=None, graded_at=None)
+    ids = list(submissions.exclude(status='GRADED').order_by('id').values_list('id', flat=True))
+    return _grade_in_chunks(ids, chunk_size, notify, use_celery)
+
+
+def _grade_in_chunks(ids, chunk_size, notify, use_celery):
+    """Lots répartis sur les workers Celery, ou sur le pool de threads du processus (plusieurs lots)."""
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    report = {'submissions': len(ids), 'chunks': len(chunks), 'graded': None}
+    if use_celery:
+        from celery import group
+        from .tasks import grade_assignment_submissions
+        group(grade_assignment_submissions.s(chunk, notify) for chunk in chunks).apply_async()
+        return report
+    if len(chunks) > 1:
+        futures = [_thread_pool().submit(_grade_chunk_in_thread, chunk, notify) for chunk in chunks]
+        report['graded'] = sum(future.result() for future in futures)
+    else:
+        report['graded'] = sum(grade_submissions(chunk, notify=notify) for chunk in chunks)
+    return report
+
+
+def grade_pending_submissions(older_than_seconds=None, chunk_size=None, use_celery=None):
+    """
+    Reprend les corrections en file depuis plus de older_than_seconds
+    (ASSIGNMENT_GRADING_SWEEP_SECONDS par défaut) et jamais terminées.
+    Retourne {'submissions', 'chunks', 'graded' (None si mis en file)}.
+    """
+    if older_than_seconds is None:
+        older_than_seconds = settings.ASSIGNMENT_GRADING_SWEEP_SECONDS
+    if use_celery is None:
+        use_celery = settings.ASSIGNMENT_GRADING_MODE == 'celery'
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    ids = list(
+        AssignmentSubmission.objects.filter(grading_queued_at__lte=cutoff)
+        .order_by('id').values_list('id', flat=True)
+    )
+    return _grade_in_chunks(ids, chunk_size or settings.ASSIGNMENT_REGRADE_CHUNK_SIZE, True, use_celery)
@@ -0,0 +1,191 @@
+"""
+Autosauvegarde des réponses d'une tentative de quiz en cours.
+
+Les PATCH fréquents du client n'écrivent que dans le cache (Redis en production, mémoire
+locale en tests) : {'user_id', 'answers': {question_id: réponse}, 'updated_at'}. La copie
+durable (QuizAttemptDraft, table séparée) est écrite en différé : au plus une écriture par
+tentative toutes les QUIZ_DRAFT_WRITE_BEHIND_SECONDS, le reste étant rattrapé par
+flush_quiz_drafts (tâche périodique). Si le cache est perdu, le brouillon est relu depuis
+la base. submit fusionne le brouillon avec les réponses envoyées puis le supprime.
+
+Les autosauvegardes concurrentes d'une même tentative (plusieurs onglets, requêtes qui se
+chevauchent) fusionnent leurs réponses sous un verrou court pris dans le cache (cache.add) :
+chaque PATCH relit le brouillon courant avant d'y ajouter ses réponses, aucune n'est écrasée.
+Le cache doit être partagé par tous les workers (REDIS_CACHE_URL) : avec la mémoire locale,
+chaque processus aurait son propre brouillon et son propre verrou. Sans cache partagé
+(QUIZ_DRAFT_CACHE_ENABLED=False, défaut sans REDIS_CACHE_URL), chaque autosauvegarde écrit
+directement en base, fusionnée sous le verrou de la ligne QuizAttemptDraft.
+"""
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Warning, register
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import QuizAttemptDraft
+
+DRAFT_KEY = 'elearning:quiz-draft:{pk}'
+WRITE_BEHIND_KEY = 'elearning:quiz-draft-saved:{pk}'
+LOCK_KEY = 'elearning:quiz-draft-lock:{pk}'
+# Durée de vie du verrou (détenteur arrêté) et attente maximale pour l'obtenir, en secondes
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 2
+MAX_DRAFT_ANSWERS = 500
+MAX_ANSWER_LENGTH = 10000
+
+
+class DraftBusy(RuntimeError):
+    """Verrou du brouillon non obtenu à temps (autre autosauvegarde en cours)."""
+
+
+def _key(attempt_id):
+    return DRAFT_KEY.format(pk=attempt_id)
+
+
+@contextmanager
+def _draft_lock(attempt_id):
+    key = LOCK_KEY.format(pk=attempt_id)
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(key, True, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise DraftBusy("Brouillon en cours d'enregistrement, réessayez.")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def clean_answers(data):
+    """
+    Réponses envoyées ({question_id: réponse} ou [{'question_id', 'answer_text'}])
+    -> {str(question_id): str} ; ValueError si le format est invalide.
+    """
+    if isinstance(data, list):
+        data = {item.get('question_id'): item.get('answer_text') for item in data if isinstance(item, dict)}
+    if not isinstance(data, dict) or len(data) > MAX_DRAFT_ANSWERS:
+        raise ValueError("Réponses invalides.")
+    cleaned = {}
+    for question_id, answer in data.items():
+        answer = '' if answer is None else str(answer)
+        if len(answer) > MAX_ANSWER_LENGTH:
+            raise ValueError("Réponse trop longue.")
+        cleaned[str(int(question_id))] = answer
+    return cleaned
+
+
+def get_cached_draft(attempt_id):
+    if not settings.QUIZ_DRAFT_CACHE_ENABLED:
+        return None
+    return cache.get(_key(attempt_id))
+
+
+def load_draft(attempt_id, user_id):
+    """Brouillon du cache, sinon relu depuis la base (et remis en cache) pour l'élève user_id."""
+    draft = get_cached_draft(attempt_id)
+    if draft is not None:
+        return draft
+    stored = QuizAttemptDraft.objects.filter(attempt_id=attempt_id).first()
+    draft = {
+        'user_id': user_id,
+        'answers': dict(stored.answers) if stored else {},
+        'updated_at': stored.updated_at.isoformat() if stored else None,
+    }
+    if not settings.QUIZ_DRAFT_CACHE_ENABLED:
+        return draft
+    # add : un brouillon mis en cache entre-temps par une autre requête n'est pas écrasé
+    if not cache.add(_key(attempt_id), draft, settings.QUIZ_DRAFT_TTL_SECONDS):
+        draft = get_cached_draft(attempt_id) or draft
+    return draft
+
+
+def _persist(attempt_id, draft):
+    QuizAttemptDraft.objects.update_or_create(
+        attempt_id=attempt_id,
+        defaults={'answers': draft['answers'], 'updated_at': parse_datetime(draft['updated_at'])},
+    )
+
+
+def _save_to_database(attempt_id, draft, answers):
+    """Sans cache partagé : fusion dans QuizAttemptDraft sous le verrou de la ligne."""
+    now = timezone.now()
+    with transaction.atomic():
+        stored, _ = QuizAttemptDraft.objects.select_for_update().get_or_create(
+            attempt_id=attempt_id, defaults={'answers': {}, 'updated_at': now},
+        )
+        stored.answers = {**stored.answers, **answers}
+        stored.updated_at = now
+        stored.save(update_fields=['answers', 'updated_at'])
+    return {'user_id': draft['user_id'], 'answers': stored.answers, 'updated_at': now.isoformat()}
+
+
+def save_draft(attempt_id, draft, answers):
+    """
+    Fusionne des réponses dans le brouillon en cache (relu sous verrou : `draft` ne sert
+    que si le cache l'a perdu) ; écriture différée en base au plus une fois par
+    QUIZ_DRAFT_WRITE_BEHIND_SECONDS et par tentative. DraftBusy si le verrou reste pris.
+    Sans cache partagé, écrit directement en base.
+    """
+    if not settings.QUIZ_DRAFT_CACHE_ENABLED:
+        return _save_to_database(attempt_id, draft, answers)
+    with _draft_lock(attempt_id):
+        draft = get_cached_draft(attempt_id) or draft
+        draft['answers'].update(answers)
+        draft['updated_at'] = timezone.now().isoformat()
+        cache.set(_key(attempt_id), draft, settings.QUIZ_DRAFT_TTL_SECONDS)
+        if cache.add(WRITE_BEHIND_KEY.format(pk=attempt_id), True, settings.QUIZ_DRAFT_WRITE_BEHIND_SECONDS):
+            _persist(attempt_id, draft)
+    return draft
+
+
+def draft_answers(attempt_id):
+    """Réponses du brouillon (cache, sinon base), sans le modifier."""
+    draft = get_cached_draft(attempt_id)
+    if draft is not None:
+        return dict(draft['answers'])
+    return dict(
+        QuizAttemptDraft.objects.filter(attempt_id=attempt_id).values_list('answers', flat=True).first() or {}
+    )
+
+
+def discard_draft(attempt_id):
+    """Supprime le brouillon (après la soumission)."""
+    QuizAttemptDraft.objects.filter(attempt_id=attempt_id).delete()
+    cache.delete_many([_key(attempt_id), WRITE_BEHIND_KEY.format(pk=attempt_id)])
+
+
+def flush_quiz_drafts():
+    """
+    Écrit en base les brouillons du cache plus récents que leur copie durable
+    (tentatives non soumises). Retourne le nombre de brouillons écrits.
+    """
+    if not settings.QUIZ_DRAFT_CACHE_ENABLED:
+        return 0
+    stored = dict(
+        QuizAttemptDraft.objects.filter(attempt__submitted_at__isnull=True).values_list('attempt_id', 'updated_at')
+    )
+    if not stored:
+        return 0
+    cached = cache.get_many([_key(pk) for pk in stored])
+    flushed = 0
+    for pk, updated_at in stored.items():
+        draft = cached.get(_key(pk))
+        if draft and draft.get('updated_at') and parse_datetime(draft['updated_at']) > updated_at:
+            _persist(pk, draft)
+            flushed += 1
+    return flushed
+
+
+@register()
+def check_draft_cache(app_configs, **kwargs):
+    """Avertissement si les brouillons et leur verrou sont tenus dans la mémoire locale de chaque processus."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.QUIZ_DRAFT_CACHE_ENABLED and backend.endswith('LocMemCache'):
+        return [Warning(
+            "QUIZ_DRAFT_CACHE_ENABLED avec LocMemCache : chaque worker aurait son brouillon, des réponses seraient perdues.",
+            hint="Définir REDIS_CACHE_URL (cache partagé) ou QUIZ_DRAFT_CACHE_ENABLED=False avec plusieurs workers.",
+            id='elearning.W002',
+        )]
+    return []
@@ -0,0 +1,94 @@
+"""
+Correction automatique partagée des quiz et des devoirs.
+
+evaluate_answer est l'unique évaluateur (quiz, devoirs, affichage des notes), les réponses
+texte sont comparées par similarity.py ; evaluate_answers note toutes les réponses à une
+question en un appel. score_quiz_answers corrige toutes les réponses d'une tentative à partir des questions
+du quiz chargées en une seule requête, sans écrire en base.
+"""
+from .models import QuizAnswer
+from .similarity import compare_many
+
+
+TEXT_QUESTION_TYPES = ('TEXT', 'SHORT_ANSWER', 'ESSAY')
+# Seuil 0.65 = correct, entre 0.4 et 0.65 = points partiels
+TEXT_CORRECT_THRESHOLD = 0.65
+TEXT_PARTIAL_THRESHOLD = 0.4
+
+
+def _grade_text(ans, correct, pts, ratio):
+    if not (correct and ans):
+        is_correct = not ans and not correct
+        return is_correct, pts if is_correct else 0
+    if ratio >= TEXT_CORRECT_THRESHOLD:
+        return True, pts
+    if ratio >= TEXT_PARTIAL_THRESHOLD:
+        return False, round(pts * ratio, 2)
+    return False, 0
+
+
+def evaluate_answer(question_type, student_answer, correct_answer, points):
+    """Évalue une réponse (quiz ou devoir). Utilise la similarité pour TEXT/SHORT_ANSWER/ESSAY."""
+    return evaluate_answers(question_type, [student_answer], correct_answer, points)[0]
+
+
+def evaluate_answers(question_type, student_answers, correct_answer, points):
+    """
+    Évalue toutes les réponses à une même question en un appel ;
+    la réponse attendue n'est normalisée qu'une fois. Retourne [(is_correct, points), ...].
+    """
+    answers = [(a or '').strip() for a in student_answers]
+    correct = (correct_answer or '').strip()
+    pts = float(points or 0)
+
+    if question_type in TEXT_QUESTION_TYPES:
+        ratios = compare_many(answers, correct) if correct else [0.0] * len(answers)
+        return [_grade_text(ans, correct, pts, ratio) for ans, ratio in zip(answers, ratios)]
+    return [_evaluate_exact(question_type, ans, correct, pts) for ans in answers]
+
+
+def _evaluate_exact(question_type, ans, correct, pts):
+    if question_type in ('SINGLE_CHOICE', 'MULTIPLE_CHOICE'):
+        is_correct = ans.upper() == correct.upper()
+        return is_correct, pts if is_correct else 0
+    if question_type == 'TRUE_FALSE':
+        is_correct = ans.lower() == correct.lower()
+        return is_correct, pts if is_correct else 0
+    if question_type == 'NUMBER':
+        try:
+            is_correct = float(ans) == float(correct)
+            return is_correct, pts if is_correct else 0
+        except (ValueError, TypeError):
+            return False, 0
+    is_correct = ans == correct
+    return is_correct, pts if is_correct else 0
+
+
+def score_quiz_answers(attempt, questions, answers_data):
+    """
+    Corrige les réponses soumises d'une tentative.
+    `questions` : {id: QuizQuestion} du quiz (une requête, ex. in_bulk).
+    Une question répétée ne compte qu'une fois (dernière réponse retenue).
+    Retourne (réponses QuizAnswer non enregistrées, score total, points possibles) ;
+    lève KeyError pour une question absente du quiz.
+    """
+    submitted = {}
+    for answer_data in answers_data:
+        question = questions[int(answer_data['question_id'])]
+        submitted[question.id] = answer_data.get('answer_text') or ''
+
+    answers = []
+    total_score = 0
+    total_points = 0
+    for question_id, answer_text in submitted.items():
+        question = questions[question_id]
+        is_correct, points_earned = evaluate_answer(
+            question.question_type, answer_text, question.correct_answer, question.points
+        )
+        answers.append(QuizAnswer(
+            attempt=attempt, question=question, answer_text=answer_text,
+            is_correct=is_correct, points_earned=points_earned,
+        ))
+        total_score += points_earned
+        total_points += float(question.points)
+    return answers, total_score, total_points
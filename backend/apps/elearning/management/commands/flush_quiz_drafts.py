@@ -0,0 +1,17 @@
+"""
+Écrit en base les brouillons de quiz autosauvegardés encore seulement en cache.
+
+À planifier toutes les minutes environ (ou tâche Celery flush_quiz_drafts).
+
+Usage:
+  python manage.py flush_quiz_drafts
+"""
+from django.core.management.base import BaseCommand
+from apps.elearning.drafts import flush_quiz_drafts
+
+
+class Command(BaseCommand):
+    help = "Copie en base les brouillons de tentatives de quiz modifiés depuis la dernière écriture."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"{flush_quiz_drafts()} brouillon(s) enregistré(s)"))
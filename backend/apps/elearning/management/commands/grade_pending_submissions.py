@@ -0,0 +1,36 @@
+"""
+Reprend les corrections automatiques mises en file mais jamais terminées (processus web
+redémarré en mode 'thread', tâche Celery perdue).
+
+Planifiée toutes les ASSIGNMENT_GRADING_SWEEP_SECONDS par la tâche Celery
+grade_pending_submissions (CELERY_BEAT_SCHEDULE, processus clock du Procfile) ; la commande
+sert aux reprises manuelles ou à un planificateur externe (cron) sans Celery.
+
+Usage:
+  python manage.py grade_pending_submissions
+  python manage.py grade_pending_submissions --older-than 0 --local
+"""
+from django.core.management.base import BaseCommand
+from apps.elearning.autograde import grade_pending_submissions
+
+
+class Command(BaseCommand):
+    help = "Corrige les soumissions dont la correction automatique est en file depuis trop longtemps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None,
+                            help="Secondes d'attente minimales (défaut : ASSIGNMENT_GRADING_SWEEP_SECONDS)")
+        parser.add_argument('--local', action='store_true', help="Corriger dans ce processus, sans Celery")
+
+    def handle(self, *args, **options):
+        report = grade_pending_submissions(
+            older_than_seconds=options['older_than'], use_celery=False if options['local'] else None,
+        )
+        if report['graded'] is None:
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['submissions']} soumission(s) en file en {report['chunks']} lot(s)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['graded']} soumission(s) corrigée(s) sur {report['submissions']} en attente"
+            ))
@@ -0,0 +1,41 @@
+"""
+Recorrige toutes les soumissions d'un devoir (après modification d'une bonne réponse).
+
+Usage:
+  python manage.py regrade_assignment 42
+  python manage.py regrade_assignment 42 --include-graded   # écrase aussi les notes de l'enseignant
+  python manage.py regrade_assignment 42 --local --no-notify
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.elearning.autograde import regrade_assignment
+from apps.elearning.models import Assignment
+
+
+class Command(BaseCommand):
+    help = "Recorrige automatiquement toutes les soumissions d'un devoir, par lots en parallèle (Celery)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('assignment_id', type=int)
+        parser.add_argument('--include-graded', action='store_true',
+                            help="Recorriger aussi les copies déjà notées par l'enseignant")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Soumissions par lot (défaut : ASSIGNMENT_REGRADE_CHUNK_SIZE)")
+        parser.add_argument('--local', action='store_true', help="Corriger dans ce processus, sans Celery")
+        parser.add_argument('--no-notify', action='store_true', help="Ne pas notifier les élèves")
+
+    def handle(self, *args, **options):
+        if not Assignment.objects.filter(pk=options['assignment_id']).exists():
+            raise CommandError(f"Devoir {options['assignment_id']} introuvable.")
+        report = regrade_assignment(
+            options['assignment_id'], include_graded=options['include_graded'],
+            chunk_size=options['chunk_size'], notify=not options['no_notify'],
+            use_celery=False if options['local'] else None,
+        )
+        if report['graded'] is None:
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['submissions']} soumission(s) en file en {report['chunks']} lot(s)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['graded']} soumission(s) recorrigée(s) sur {report['submissions']}"
+            ))
@@ -0,0 +1,25 @@
+# Brouillons des tentatives de quiz (autosauvegarde, write-behind depuis le cache)
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning', '0006_assignment_submission_answer_grades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttemptDraft',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='draft', serialize=False, to='elearning.quizattempt', verbose_name='Tentative')),
+                ('answers', models.JSONField(blank=True, default=dict, verbose_name='Réponses')),
+                ('updated_at', models.DateTimeField(verbose_name='Modifié le')),
+            ],
+            options={
+                'verbose_name': 'Brouillon de tentative',
+                'verbose_name_plural': 'Brouillons de tentatives',
+            },
+        ),
+    ]
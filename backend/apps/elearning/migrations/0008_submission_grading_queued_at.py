@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elearning', '0007_quizattemptdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmission',
+            name='grading_queued_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Correction en file depuis'),
+        ),
+    ]
@@ -132,6 +132,9 @@ class AssignmentSubmission(models.Model):
     graded_by = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, 
                                  related_name='graded_submissions', verbose_name="Noté par")
     graded_at = models.DateTimeField(null=True, blank=True, verbose_name="Noté le")
+    # Correction automatique en file depuis cette date (None : rien en attente), voir autograde.py
+    grading_queued_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                             verbose_name="Correction en file depuis")
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SUBMITTED', verbose_name="Statut")
     
@@ -249,3 +252,19 @@ class QuizAnswer(models.Model):
     
     def __str__(self):
         return f"{self.attempt.student.user.get_full_name()} - {self.question.question_text[:50]}"
+
+
+class QuizAttemptDraft(models.Model):
+    """Brouillon des réponses d'une tentative en cours (copie durable du cache d'autosauvegarde)"""
+    attempt = models.OneToOneField(
+        QuizAttempt, on_delete=models.CASCADE, primary_key=True, related_name='draft', verbose_name="Tentative"
+    )
+    answers = models.JSONField(default=dict, blank=True, verbose_name="Réponses")
+    updated_at = models.DateTimeField(verbose_name="Modifié le")
+
+    class Meta:
+        verbose_name = "Brouillon de tentative"
+        verbose_name_plural = "Brouillons de tentatives"
+
+    def __str__(self):
+        return f"Brouillon - tentative {self.attempt_id}"
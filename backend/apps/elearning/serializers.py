@@ -61,14 +61,14 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         ag = data.get('answer_grades') or {}
         if not ag and instance.submission_text:
-            from .views import _evaluate_answer
+            from .grading import evaluate_answer
             try:
                 answers_dict = json.loads(instance.submission_text)
             except (json.JSONDecodeError, TypeError):
                 answers_dict = {}
             for q in instance.assignment.questions.all().order_by('order'):
                 ans = answers_dict.get(str(q.id)) or answers_dict.get(q.id) or ''
-                _, pts = _evaluate_answer(q.question_type, ans, q.correct_answer, q.points)
+                _, pts = evaluate_answer(q.question_type, ans, q.correct_answer, q.points)
                 ag[str(q.id)] = {'points_earned': float(pts), 'teacher_feedback': ''}
             data['answer_grades'] = ag
         return data
@@ -0,0 +1,85 @@
+"""
+Similarité des réponses texte (TEXT / SHORT_ANSWER / ESSAY) pour la correction automatique.
+
+Le texte est normalisé (minuscules, accents repliés, ponctuation supprimée), découpé
+en mots, débarrassé des mots vides français, puis comparé par coefficient de Dice sur
+les trigrammes de caractères de chaque mot : l'ordre des mots n'importe pas, une faute
+de frappe ne coûte que quelques trigrammes, et le calcul est linéaire en longueur.
+
+Coût borné : seuls les SIMILARITY_MAX_TOKENS premiers mots sont comparés. Le profil de
+la réponse attendue est mis en cache (une question corrigée pour toute une classe n'est
+normalisée qu'une fois) ; compare_many note toutes les réponses à une question en un appel.
+"""
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from django.conf import settings
+
+FRENCH_STOP_WORDS = frozenset("""
+    a au aux avec ce ces cet cette d dans de des du elle elles en est et eux il ils
+    j je l la le les leur leurs lui m ma mais me meme mes moi mon n ne nos notre nous
+    on ou par pas pour qu que qui s sa se ses son sont sur t ta te tes toi ton tu un
+    une vos votre vous y c ca ci
+""".split())
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Minuscules sans accents (é -> e, ç -> c, œ -> oe)."""
+    text = unicodedata.normalize('NFKD', (text or '').lower().replace('œ', 'oe').replace('æ', 'ae'))
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text, max_tokens=None):
+    """Mots normalisés sans mots vides (ceux-ci sont gardés si la réponse n'a rien d'autre)."""
+    max_tokens = max_tokens or settings.SIMILARITY_MAX_TOKENS
+    words = []
+    for match in _TOKEN_RE.finditer(fold(text)):
+        words.append(match.group())
+        if len(words) >= max_tokens:
+            break
+    return [w for w in words if w not in FRENCH_STOP_WORDS] or words
+
+
+def _trigrams(tokens):
+    grams = Counter()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _profile(text, max_tokens=None):
+    grams = _trigrams(tokenize(text, max_tokens))
+    return grams, sum(grams.values())
+
+
+@lru_cache(maxsize=2048)
+def reference_profile(text, max_tokens):
+    """Profil (trigrammes, taille) d'une réponse attendue, en cache."""
+    return _profile(text, max_tokens)
+
+
+def _dice(profile, reference):
+    grams, size = profile
+    ref_grams, ref_size = reference
+    if not size or not ref_size:
+        return 1.0 if size == ref_size else 0.0
+    if len(grams) > len(ref_grams):
+        grams, ref_grams = ref_grams, grams
+    common = sum(min(count, ref_grams[gram]) for gram, count in grams.items() if gram in ref_grams)
+    return 2.0 * common / (size + ref_size)
+
+
+def similarity(answer, reference):
+    """Similarité entre 0 et 1 d'une réponse à la réponse attendue."""
+    return compare_many([answer], reference)[0]
+
+
+def compare_many(answers, reference):
+    """Similarités de plusieurs réponses à la même réponse attendue (profil calculé une fois)."""
+    max_tokens = settings.SIMILARITY_MAX_TOKENS
+    ref = reference_profile(reference or '', max_tokens)
+    return [_dice(_profile(answer, max_tokens), ref) for answer in answers]
@@ -0,0 +1,31 @@
+"""
+Celery tasks for e-learning (automatic assignment grading)
+"""
+from celery import shared_task
+from .autograde import grade_submissions
+
+
+@shared_task
+def grade_assignment_submission(submission_id):
+    """Grade one assignment submission and notify the student"""
+    return grade_submissions([submission_id])
+
+
+@shared_task
+def grade_assignment_submissions(submission_ids, notify=True):
+    """Grade a batch of submissions (regrade of a whole assignment)"""
+    return grade_submissions(submission_ids, notify=notify)
+
+
+@shared_task
+def grade_pending_submissions():
+    """Grade submissions whose queued grading never completed (periodic task)"""
+    from .autograde import grade_pending_submissions as run_sweep
+    return run_sweep()
+
+
+@shared_task
+def flush_quiz_drafts():
+    """Write autosaved quiz drafts from the cache to the database (periodic task)"""
+    from .drafts import flush_quiz_drafts as run_flush
+    return run_flush()
@@ -1,50 +1,28 @@
-import json
-from difflib import SequenceMatcher
-
+from django.db import transaction
 from django.db.models import Q
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
+from apps.uploads.chunked import chunked_upload_fields, uploaded_file
 from .models import Course, Assignment, AssignmentQuestion, AssignmentSubmission, Quiz, QuizQuestion, QuizAttempt, QuizAnswer
 from .serializers import (
     CourseSerializer, AssignmentSerializer, AssignmentQuestionSerializer, AssignmentSubmissionSerializer,
     QuizSerializer, QuizQuestionSerializer, QuizAttemptSerializer, QuizAnswerSerializer
 )
+from .analysis import assignment_item_analysis, quiz_item_analysis, invalidate_item_analysis
+from .autograde import queue_submission_grading
+from .drafts import (
+    DraftBusy, clean_answers, discard_draft, draft_answers, get_cached_draft, load_draft, save_draft,
+)
+from .grading import score_quiz_answers
 
 
-def _evaluate_answer(question_type, student_answer, correct_answer, points):
-    """Évalue une réponse (quiz ou devoir). Utilise la similarité pour TEXT/SHORT_ANSWER/ESSAY."""
-    ans = (student_answer or '').strip()
-    correct = (correct_answer or '').strip()
-    pts = float(points or 0)
-
-    if question_type in ('SINGLE_CHOICE', 'MULTIPLE_CHOICE'):
-        is_correct = ans.upper() == correct.upper()
-        return is_correct, pts if is_correct else 0
-    if question_type == 'TRUE_FALSE':
-        is_correct = ans.lower() == correct.lower()
-        return is_correct, pts if is_correct else 0
-    if question_type in ('TEXT', 'SHORT_ANSWER', 'ESSAY'):
-        if correct and ans:
-            ratio = SequenceMatcher(None, ans.lower(), correct.lower()).ratio()
-            if ratio >= 0.65:
-                return True, pts
-            if ratio >= 0.4:
-                return False, round(pts * ratio, 2)
-        else:
-            is_correct = not ans and not correct
-            return is_correct, pts if is_correct else 0
-        return False, 0
-    if question_type == 'NUMBER':
-        try:
-            is_correct = float(ans) == float(correct)
-            return is_correct, pts if is_correct else 0
-        except (ValueError, TypeError):
-            return False, 0
-    is_correct = ans == correct
-    return is_correct, pts if is_correct else 0
+def _require_teacher_or_admin(user):
+    if not (user.is_teacher or getattr(user, 'is_admin', False)):
+        from rest_framework.exceptions import PermissionDenied
+        raise PermissionDenied('Réservé aux enseignants et administrateurs.')
 
 
 class CourseViewSet(viewsets.ModelViewSet):
@@ -80,16 +58,21 @@ class CourseViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Assigner automatiquement l'enseignant connecté"""
         if self.request.user.is_teacher:
+            # Pièce jointe envoyée en morceaux (attachments_upload)
+            files = chunked_upload_fields(self.request, 'attachments')
             try:
                 teacher_profile = self.request.user.teacher_profile
-                serializer.save(teacher=teacher_profile)
             except:
                 from rest_framework.exceptions import ValidationError
                 raise ValidationError({'teacher': 'Vous devez avoir un profil enseignant pour créer un cours.'})
+            serializer.save(teacher=teacher_profile, **files)
         else:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Seuls les enseignants peuvent créer des cours.')
 
+    def perform_update(self, serializer):
+        serializer.save(**chunked_upload_fields(self.request, 'attachments'))
+
 
 class AssignmentViewSet(viewsets.ModelViewSet):
     serializer_class = AssignmentSerializer
@@ -135,16 +118,21 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Assigner automatiquement l'enseignant connecté"""
         if self.request.user.is_teacher:
+            # Fichier du devoir envoyé en morceaux (assignment_file_upload)
+            files = chunked_upload_fields(self.request, 'assignment_file')
             try:
                 teacher_profile = self.request.user.teacher_profile
-                serializer.save(teacher=teacher_profile)
             except:
                 from rest_framework.exceptions import ValidationError
                 raise ValidationError({'teacher': 'Vous devez avoir un profil enseignant pour créer un devoir.'})
+            serializer.save(teacher=teacher_profile, **files)
         else:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Seuls les enseignants peuvent créer des devoirs.')
 
+    def perform_update(self, serializer):
+        serializer.save(**chunked_upload_fields(self.request, 'assignment_file'))
+
     @action(detail=True, methods=['get', 'post'], url_path='questions')
     def questions(self, request, pk=None):
         """Liste (GET) ou création (POST) des questions du devoir."""
@@ -158,50 +146,46 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         ser.save()
         return Response(ser.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['get'], url_path='item-analysis')
+    def item_analysis(self, request, pk=None):
+        """Analyse d'items : difficulté, discrimination, distracteurs, distribution des notes."""
+        _require_teacher_or_admin(request.user)
+        return Response(assignment_item_analysis(self.get_object()))
+
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
-        """Submit an assignment. Évaluation automatique avec similarité pour les questions texte."""
+        """
+        Submit an assignment. Les réponses brutes sont enregistrées en une écriture ;
+        la correction automatique (similarité pour les questions texte) est faite hors
+        requête (autograde.py) puis l'élève est notifié.
+        """
         assignment = self.get_object()
         student = request.user.student_profile
+        is_late = timezone.now() > assignment.due_date
+        # Fichier multipart classique ou envoi fractionné terminé (submission_file_upload)
+        submission_file = uploaded_file(request, 'submission_file')
 
         submission, created = AssignmentSubmission.objects.get_or_create(
             assignment=assignment,
             student=student,
             defaults={
                 'submission_text': request.data.get('submission_text', ''),
-                'submission_file': request.FILES.get('submission_file'),
+                'submission_file': submission_file,
+                'status': 'LATE' if is_late else 'SUBMITTED',
             }
         )
 
         if not created:
             submission.submission_text = request.data.get('submission_text', submission.submission_text)
-            if 'submission_file' in request.FILES:
-                submission.submission_file = request.FILES['submission_file']
+            if submission_file:
+                submission.submission_file = submission_file
+            if is_late:
+                submission.status = 'LATE'
             submission.save()
 
-        # Check if late
-        if timezone.now() > assignment.due_date:
-            submission.status = 'LATE'
-            submission.save()
-
-        # Évaluation automatique (même logique que quiz, similarité pour TEXT) + answer_grades par question
         if submission.submission_text:
-            try:
-                answers_dict = json.loads(submission.submission_text)
-            except (json.JSONDecodeError, TypeError):
-                answers_dict = {}
-            questions = AssignmentQuestion.objects.filter(assignment=assignment).order_by('order')
-            auto_score = 0
-            answer_grades = {}
-            for q in questions:
-                ans = answers_dict.get(str(q.id)) or answers_dict.get(q.id) or ''
-                is_correct, pts = _evaluate_answer(q.question_type, ans, q.correct_answer, q.points)
-                auto_score += pts
-                answer_grades[str(q.id)] = {'points_earned': float(pts), 'teacher_feedback': ''}
-            submission.answer_grades = answer_grades
-            submission.score = round(auto_score, 2)
-            submission.save()
-
+            queue_submission_grading(submission.id)
+        invalidate_item_analysis('assignment', assignment.id)
         return Response(AssignmentSubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
 
 
@@ -304,6 +288,7 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
         submission.graded_at = timezone.now()
         submission.status = 'GRADED'
         submission.save()
+        invalidate_item_analysis('assignment', submission.assignment_id)
         return Response(AssignmentSubmissionSerializer(submission).data)
 
 
@@ -362,6 +347,12 @@ class QuizViewSet(viewsets.ModelViewSet):
         ser.save()
         return Response(ser.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['get'], url_path='item-analysis')
+    def item_analysis(self, request, pk=None):
+        """Analyse d'items : difficulté, discrimination, distracteurs, distribution des notes."""
+        _require_teacher_or_admin(request.user)
+        return Response(quiz_item_analysis(self.get_object()))
+
 
 class QuizQuestionViewSet(viewsets.ModelViewSet):
     """CRUD sur une question de quiz (retrieve, update, delete). List/create via quiz action."""
@@ -435,84 +426,84 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
 
         return Response(QuizAttemptSerializer(attempt).data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['get', 'patch'])
+    def draft(self, request, pk=None):
+        """
+        Brouillon de la tentative en cours (autosauvegarde) : GET pour le relire, PATCH
+        {'answers': {question_id: réponse}} pour fusionner des réponses. Servi par le cache
+        partagé, la base n'est lue qu'au premier accès ; sans lui, lu et écrit en base (voir drafts.py).
+        """
+        try:
+            attempt_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'error': 'Tentative introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        draft = get_cached_draft(attempt_id)
+        if draft is None or draft.get('user_id') != request.user.id:
+            attempt = self.get_object()
+            if attempt.student.user_id != request.user.id:
+                from rest_framework.exceptions import PermissionDenied
+                raise PermissionDenied("Réservé à l'élève de la tentative.")
+            if attempt.submitted_at:
+                return Response({'error': 'Tentative déjà soumise'}, status=status.HTTP_400_BAD_REQUEST)
+            draft = load_draft(attempt_id, request.user.id)
+
+        if request.method == 'PATCH':
+            try:
+                answers = clean_answers(request.data.get('answers', {}))
+            except (TypeError, ValueError) as e:
+                return Response({'error': str(e) or 'Réponses invalides.'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                draft = save_draft(attempt_id, draft, answers)
+            except DraftBusy as e:
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response({'attempt': attempt_id, 'answers': draft['answers'], 'updated_at': draft['updated_at']})
+
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
-        """Submit quiz answers and calculate score"""
+        """
+        Submit quiz answers and calculate score.
+        Questions chargées en une requête, réponses insérées en masse ; la tentative est
+        marquée soumise par une mise à jour conditionnelle (double soumission refusée).
+        Les réponses du brouillon autosauvegardé sont reprises si absentes de la requête.
+        """
         attempt = self.get_object()
-        
-        if getattr(attempt, 'is_completed', False) or attempt.submitted_at:
+
+        if attempt.submitted_at:
             return Response({'error': 'Tentative déjà soumise'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        answers_data = request.data.get('answers', [])
-        time_taken = request.data.get('time_taken_minutes', None)
-        
-        total_score = 0
-        total_points = 0
-        
-        for answer_data in answers_data:
-            question = QuizQuestion.objects.get(id=answer_data['question_id'])
-            answer_text = answer_data.get('answer_text', '')
-            if answer_text is None:
-                answer_text = ''
-
-            # Check if answer is correct (similarité pour TEXT/SHORT_ANSWER/ESSAY)
-            is_correct = False
-            points_earned = 0
-            correct = (question.correct_answer or '').strip()
-            ans = answer_text.strip()
-
-            if question.question_type in ('SINGLE_CHOICE', 'MULTIPLE_CHOICE'):
-                is_correct = ans.upper() == correct.upper()
-                points_earned = float(question.points) if is_correct else 0
-            elif question.question_type == 'TRUE_FALSE':
-                is_correct = ans.lower() == correct.lower()
-                points_earned = float(question.points) if is_correct else 0
-            elif question.question_type in ('TEXT', 'SHORT_ANSWER', 'ESSAY'):
-                # Similarité des mots/phrases au lieu de correspondance exacte
-                if correct and ans:
-                    ratio = SequenceMatcher(None, ans.lower(), correct.lower()).ratio()
-                    # Seuil 0.65 = correct, entre 0.4 et 0.65 = points partiels
-                    if ratio >= 0.65:
-                        is_correct = True
-                        points_earned = float(question.points)
-                    elif ratio >= 0.4:
-                        points_earned = round(float(question.points) * ratio, 2)
-                else:
-                    is_correct = not ans and not correct
-                    points_earned = float(question.points) if is_correct else 0
-            elif question.question_type == 'NUMBER':
-                try:
-                    is_correct = float(ans) == float(correct)
-                    points_earned = float(question.points) if is_correct else 0
-                except (ValueError, TypeError):
-                    points_earned = 0
-            else:
-                is_correct = ans == correct
-                points_earned = float(question.points) if is_correct else 0
-            
-            QuizAnswer.objects.create(
-                attempt=attempt,
-                question=question,
-                answer_text=answer_text,
-                is_correct=is_correct,
-                points_earned=points_earned
-            )
-            
-            total_score += points_earned
-            total_points += question.points
-        
+
+        questions = QuizQuestion.objects.filter(quiz_id=attempt.quiz_id).in_bulk()
+        # Brouillon autosauvegardé d'abord : les réponses envoyées avec submit priment
+        answers_data = [
+            {'question_id': int(question_id), 'answer_text': answer_text}
+            for question_id, answer_text in draft_answers(attempt.id).items()
+            if int(question_id) in questions
+        ]
+        try:
+            answers_data += list(request.data.get('answers', []))
+            answers, total_score, total_points = score_quiz_answers(attempt, questions, answers_data)
+        except (KeyError, ValueError, TypeError):
+            return Response({'error': 'Question invalide pour ce quiz'}, status=status.HTTP_400_BAD_REQUEST)
+
         # Calculate percentage score
         percentage_score = (total_score / total_points * 100) if total_points > 0 else 0
-        
-        attempt.score = total_score
-        attempt.submitted_at = timezone.now()
-        if time_taken is not None and hasattr(attempt, 'time_taken_minutes'):
-            attempt.time_taken_minutes = time_taken
-        attempt.is_passed = attempt.quiz.passing_score is None or float(percentage_score) >= float(attempt.quiz.passing_score or 0)
-        if hasattr(attempt, 'is_completed'):
-            attempt.is_completed = True
-        attempt.save()
-
+        passing_score = attempt.quiz.passing_score
+
+        with transaction.atomic():
+            submitted_at = timezone.now()
+            claimed = QuizAttempt.objects.filter(pk=attempt.pk, submitted_at__isnull=True).update(
+                submitted_at=submitted_at,
+                score=round(total_score, 2),
+                is_passed=passing_score is None or float(percentage_score) >= float(passing_score or 0),
+            )
+            if not claimed:
+                return Response({'error': 'Tentative déjà soumise'}, status=status.HTTP_400_BAD_REQUEST)
+            QuizAnswer.objects.bulk_create(answers)
+            discard_draft(attempt.id)
+
+        invalidate_item_analysis('quiz', attempt.quiz_id)
+        attempt = QuizAttempt.objects.select_related('quiz__subject', 'student__user').prefetch_related(
+            'answers__question'
+        ).get(pk=attempt.pk)
         return Response(QuizAttemptSerializer(attempt).data)
 
     @action(detail=True, methods=['post'])
@@ -557,5 +548,6 @@ class QuizAttemptViewSet(viewsets.ModelViewSet):
         percentage = (total_score / total_points * 100) if total_points > 0 else 0
         attempt.is_passed = attempt.quiz.passing_score is None or float(percentage) >= float(attempt.quiz.passing_score or 0)
         attempt.save()
+        invalidate_item_analysis('quiz', attempt.quiz_id)
 
         return Response(QuizAttemptSerializer(attempt).data)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import BookCategory, Book, BookPurchase, ReadingProgress
+from .models import BookCategory, Book, BookPurchase, ReadingProgress, BookDailyStat
 from apps.schools.admin_base import SchoolScopedAdminMixin
 
 
@@ -42,3 +42,11 @@ class ReadingProgressAdmin(SchoolScopedAdminMixin, admin.ModelAdmin):
         if request.user.is_authenticated and request.user.is_admin and request.user.school and not request.user.is_superuser:
             return qs.filter(user__school=request.user.school)
         return qs
+
+
+@admin.register(BookDailyStat)
+class BookDailyStatAdmin(SchoolScopedAdminMixin, admin.ModelAdmin):
+    list_display = ['book', 'date', 'views', 'downloads']
+    list_filter = ['date']
+    search_fields = ['book__title']
+    date_hierarchy = 'date'
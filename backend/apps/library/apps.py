@@ -0,0 +1,13 @@
+"""
+Configuration de l'application library
+"""
+from django.apps import AppConfig
+
+
+class LibraryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.library'
+
+    def ready(self):
+        """Import des signaux (visibilité précalculée du catalogue élève) lors du chargement de l'application"""
+        import apps.library.signals  # noqa
@@ -0,0 +1,168 @@
+"""
+Compteurs de vues et de téléchargements des livres, écrits en différé.
+
+Chaque vue / téléchargement ne fait qu'incrémenter un tampon en mémoire du processus
+({(livre, jour): [vues, téléchargements]}). Le tampon est vidé en base hors requête par un
+thread du processus (BOOK_COUNTER_FLUSH_MODE='thread', démarré à la première entrée) toutes
+les BOOK_COUNTER_FLUSH_SECONDS, réveillé plus tôt dès BOOK_COUNTER_MAX_PENDING entrées, et à
+l'arrêt du processus ; en mode 'sync' (tests, scripts) la requête qui remplit le tampon le vide :
+  - Book.view_count / download_count par update(F() + n), groupés par incrément identique
+    (ni save() complet, ni updated_at touché, aucune perte sous concurrence) ;
+  - BookDailyStat (livre, jour) créé si besoin puis incrémenté de la même façon.
+Si l'écriture échoue (base indisponible), les incréments sont remis dans le tampon pour le
+passage suivant. Un arrêt brutal perd au plus la fenêtre en cours, ce qui est acceptable pour
+des compteurs.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import Book, BookDailyStat
+
+VIEWS, DOWNLOADS = 0, 1
+BOOK_FIELDS = ('view_count', 'download_count')
+STAT_FIELDS = ('views', 'downloads')
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = defaultdict(lambda: [0, 0])
+_wake = threading.Event()
+# (pid, thread) : le thread d'écriture ne survit pas à un fork (workers gunicorn)
+_flusher = None
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(settings.BOOK_COUNTER_FLUSH_SECONDS)
+        _wake.clear()
+        try:
+            flush_counters()
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    """Démarre le thread d'écriture du processus courant (appelé sous _lock)."""
+    global _flusher
+    if _flusher is None or _flusher[0] != os.getpid() or not _flusher[1].is_alive():
+        thread = threading.Thread(target=_flush_loop, name='book-counters-flush', daemon=True)
+        _flusher = (os.getpid(), thread)
+        thread.start()
+
+
+def _record(book_id, kind):
+    threaded = settings.BOOK_COUNTER_FLUSH_MODE == 'thread'
+    with _lock:
+        _pending[(book_id, timezone.localdate())][kind] += 1
+        full = len(_pending) >= settings.BOOK_COUNTER_MAX_PENDING
+        if threaded:
+            _ensure_flusher()
+    if full and threaded:
+        _wake.set()
+    elif full:
+        flush_counters()
+
+
+def record_view(book_id):
+    _record(book_id, VIEWS)
+
+
+def record_download(book_id):
+    _record(book_id, DOWNLOADS)
+
+
+def pending_count(book_id, kind):
+    """Incréments du livre encore dans le tampon (pour renvoyer un total à jour)."""
+    with _lock:
+        return sum(counts[kind] for (pk, _), counts in _pending.items() if pk == book_id)
+
+
+def _grouped(increments):
+    """{(incrément vues, incrément téléchargements): [clés]} : une requête par groupe."""
+    groups = defaultdict(list)
+    for key, counts in increments.items():
+        groups[tuple(counts)].append(key)
+    return groups
+
+
+def _restore(increments):
+    """Remet dans le tampon des incréments non écrits."""
+    with _lock:
+        for key, counts in increments.items():
+            _pending[key][VIEWS] += counts[VIEWS]
+            _pending[key][DOWNLOADS] += counts[DOWNLOADS]
+
+
+def flush_counters():
+    """
+    Écrit le tampon en base. Retourne le nombre de couples (livre, jour) écrits ; en cas
+    d'échec, journalise et remet les incréments dans le tampon (0 écrit).
+    """
+    global _pending
+    with _lock:
+        increments, _pending = _pending, defaultdict(lambda: [0, 0])
+    if not increments:
+        return 0
+    try:
+        return _write(increments)
+    except Exception:
+        logger.exception("Compteurs de livres non écrits (%s entrées remises dans le tampon)", len(increments))
+        _restore(increments)
+        return 0
+
+
+def _write(increments):
+    """Écrit des incréments {(livre, jour): [vues, téléchargements]} en une transaction."""
+    per_book = defaultdict(lambda: [0, 0])
+    for (book_id, _), counts in increments.items():
+        per_book[book_id][VIEWS] += counts[VIEWS]
+        per_book[book_id][DOWNLOADS] += counts[DOWNLOADS]
+
+    with transaction.atomic():
+        for counts, book_ids in _grouped(per_book).items():
+            Book.objects.filter(pk__in=book_ids).update(
+                **{field: F(field) + n for field, n in zip(BOOK_FIELDS, counts) if n}
+            )
+        existing_books = set(Book.objects.filter(pk__in=list(per_book)).values_list('pk', flat=True))
+        increments = {key: counts for key, counts in increments.items() if key[0] in existing_books}
+        BookDailyStat.objects.bulk_create(
+            [BookDailyStat(book_id=book_id, date=day) for book_id, day in increments],
+            ignore_conflicts=True,
+        )
+        by_day = defaultdict(dict)
+        for (book_id, day), counts in increments.items():
+            by_day[day][book_id] = counts
+        for day, day_increments in by_day.items():
+            for counts, book_ids in _grouped(day_increments).items():
+                BookDailyStat.objects.filter(date=day, book_id__in=book_ids).update(
+                    **{field: F(field) + n for field, n in zip(STAT_FIELDS, counts) if n}
+                )
+    return len(increments)
+
+
+def discard_pending():
+    """Vide le tampon sans l'écrire (tests)."""
+    with _lock:
+        _pending.clear()
+
+
+def popular_book_ids(books, days=30, metric='views', limit=20):
+    """[(id, total)] des livres de `books` les plus vus / téléchargés sur les `days` derniers jours."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        BookDailyStat.objects.filter(date__gte=since, book_id__in=books.values('pk'))
+        .values_list('book_id')
+        .annotate(total=Sum(metric))
+        .filter(total__gt=0)
+        .order_by('-total', 'book_id')[:limit]
+    )
+
+
+atexit.register(flush_counters)
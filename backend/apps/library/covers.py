@@ -0,0 +1,187 @@
+"""
+Couvertures et vignettes des livres, générées hors requête.
+
+À la création (ou au remplacement du fichier / de la couverture), generate_book_covers est
+mis en file selon BOOK_COVER_MODE ('celery', 'thread' ou 'sync', comme la correction des
+devoirs). Le travail :
+  - ouvre le PDF depuis le stockage sans le charger en mémoire (chemin local, sinon copie
+    par blocs dans un fichier temporaire) et rastérise la page 1 directement à la largeur
+    de la plus grande vignette (plus de rendu 2x suivi d'un rééchantillonnage) ;
+  - enregistre cover_image (JPEG) et le nombre de pages si absents ;
+  - produit chaque taille de COVER_SIZES en WebP et JPEG, chacune réduite depuis la
+    précédente, et les référence dans Book.cover_thumbnails.
+
+Le catalogue choisit la taille (grid en liste, detail en fiche, ?cover_size=mobile).
+"""
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+from .models import Book
+from .visibility import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Largeur maximale en pixels par usage, de la plus grande à la plus petite
+COVER_SIZES = {
+    'detail': 800,
+    'grid': 320,
+    'mobile': 160,
+}
+COVER_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+THUMBNAIL_DIR = 'books/covers/thumbs'
+COPY_BLOCK_SIZE = 1024 * 1024
+
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BOOK_COVER_THREADS, thread_name_prefix='book-covers')
+    return _executor
+
+
+class _LocalCopy:
+    """Chemin local d'un fichier du stockage (copie temporaire par blocs si stockage distant)."""
+
+    def __init__(self, field_file):
+        self.field_file = field_file
+        self.tmp = None
+
+    def __enter__(self):
+        try:
+            return self.field_file.path
+        except NotImplementedError:
+            pass
+        self.tmp = tempfile.NamedTemporaryFile(suffix=os.path.splitext(self.field_file.name)[1], delete=False)
+        with self.field_file.open('rb') as source:
+            for block in source.chunks(COPY_BLOCK_SIZE):
+                self.tmp.write(block)
+        self.tmp.close()
+        return self.tmp.name
+
+    def __exit__(self, *exc):
+        if self.tmp is not None:
+            os.remove(self.tmp.name)
+
+
+def render_pdf_cover(book_file, width=None):
+    """Page 1 du PDF rendue à `width` pixels de large. Retourne (Image RGB ou None, nombre de pages)."""
+    import fitz  # PyMuPDF
+    width = width or max(COVER_SIZES.values())
+    with _LocalCopy(book_file) as path:
+        with fitz.open(path) as document:
+            num_pages = len(document)
+            if num_pages == 0:
+                return None, 0
+            page = document[0]
+            zoom = width / page.rect.width if page.rect.width else 1.0
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes('RGB', (pix.width, pix.height), pix.samples), num_pages
+
+
+def build_thumbnails(image):
+    """{taille: {format: octets, 'width', 'height'}} de la plus grande à la plus petite."""
+    thumbnails = {}
+    current = image.convert('RGB')
+    for size, max_width in COVER_SIZES.items():
+        if current.width > max_width:
+            current = current.resize(
+                (max_width, max(1, round(current.height * max_width / current.width))),
+                Image.Resampling.LANCZOS, reducing_gap=2.0,
+            )
+        entry = {'width': current.width, 'height': current.height}
+        for fmt, pil_format in COVER_FORMATS.items():
+            buffer = io.BytesIO()
+            current.save(buffer, format=pil_format, quality=80)
+            entry[fmt] = buffer.getvalue()
+        thumbnails[size] = entry
+    return thumbnails
+
+
+def _store_thumbnails(book, thumbnails):
+    storage = book.cover_image.storage if book.cover_image else Book._meta.get_field('cover_image').storage
+    for old in (book.cover_thumbnails or {}).values():
+        for fmt in COVER_FORMATS:
+            if old.get(fmt):
+                storage.delete(old[fmt])
+    stored = {}
+    for size, entry in thumbnails.items():
+        stored[size] = {'width': entry['width'], 'height': entry['height']}
+        for fmt in COVER_FORMATS:
+            name = f"{THUMBNAIL_DIR}/{book.pk}_{size}.{'jpg' if fmt == 'jpeg' else fmt}"
+            stored[size][fmt] = storage.save(name, ContentFile(entry[fmt]))
+    return stored
+
+
+def generate_book_covers(book_id):
+    """Génère couverture, nombre de pages et vignettes d'un livre. Retourne True si des vignettes ont été produites."""
+    book = Book.objects.filter(pk=book_id).first()
+    if book is None:
+        return False
+    updates = {}
+    if book.cover_image:
+        with book.cover_image.open('rb') as source:
+            image = Image.open(source)
+            image.load()
+    elif book.book_file and book.book_file.name.lower().endswith('.pdf'):
+        image, num_pages = render_pdf_cover(book.book_file)
+        if image is None:
+            return False
+        if not book.pages:
+            updates['pages'] = num_pages
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        cover_name = f"{os.path.splitext(os.path.basename(book.book_file.name))[0]}_cover.jpg"
+        book.cover_image.save(cover_name, ContentFile(buffer.getvalue()), save=False)
+        updates['cover_image'] = book.cover_image.name
+    else:
+        return False
+
+    updates['cover_thumbnails'] = _store_thumbnails(book, build_thumbnails(image))
+    updates['covers_generated_at'] = timezone.now()
+    # update() : ne touche pas updated_at ni les autres champs modifiés entre-temps
+    Book.objects.filter(pk=book.pk).update(**updates)
+    bump_catalog_version()
+    return True
+
+
+def _generate_in_thread(book_id):
+    try:
+        generate_book_covers(book_id)
+    except Exception:
+        logger.exception("Échec de la génération des couvertures du livre %s", book_id)
+    finally:
+        connection.close()
+
+
+def queue_cover_generation(book_id):
+    """Met en file la génération des couvertures, après le commit de la requête."""
+    mode = settings.BOOK_COVER_MODE
+    if mode == 'celery':
+        from .tasks import generate_book_covers as task
+        transaction.on_commit(lambda: task.delay(book_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _thread_pool().submit(_generate_in_thread, book_id))
+    else:
+        transaction.on_commit(lambda: generate_book_covers(book_id))
+
+
+def cover_url(book, size, fmt='webp', request=None):
+    """URL de la vignette demandée ; couverture d'origine tant que les vignettes ne sont pas prêtes."""
+    entry = (book.cover_thumbnails or {}).get(size) or {}
+    name = entry.get(fmt if fmt in COVER_FORMATS else 'webp')
+    if name:
+        url = book.cover_image.storage.url(name)
+    elif book.cover_image:
+        url = book.cover_image.url
+    else:
+        return None
+    return request.build_absolute_uri(url) if request is not None else url
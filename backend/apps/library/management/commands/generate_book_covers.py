@@ -0,0 +1,24 @@
+"""
+Génère les vignettes de couverture des livres existants (reprise après déploiement).
+
+Usage:
+  python manage.py generate_book_covers            # livres sans vignettes
+  python manage.py generate_book_covers --all      # régénère tout
+"""
+from django.core.management.base import BaseCommand
+from apps.library.covers import generate_book_covers
+from apps.library.models import Book
+
+
+class Command(BaseCommand):
+    help = "Génère la couverture et les vignettes (WebP/JPEG) des livres."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Régénérer aussi les livres déjà traités")
+
+    def handle(self, *args, **options):
+        books = Book.objects.all()
+        if not options['all']:
+            books = books.filter(covers_generated_at__isnull=True)
+        generated = sum(1 for pk in books.values_list('pk', flat=True).iterator() if generate_book_covers(pk))
+        self.stdout.write(self.style.SUCCESS(f"{generated} livre(s) traité(s)"))
@@ -0,0 +1,29 @@
+"""
+Indexe le texte des livres PDF pour la recherche plein texte (reprise après déploiement).
+
+Usage:
+  python manage.py index_book_contents            # livres PDF non indexés
+  python manage.py index_book_contents --all      # réindexe tout
+"""
+from django.core.management.base import BaseCommand
+from apps.library.models import Book
+from apps.library.search import index_book_content
+
+
+class Command(BaseCommand):
+    help = "Extrait le texte des pages des livres PDF et reconstruit l'index de recherche."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Réindexer aussi les livres déjà indexés")
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(book_file='').exclude(book_file__isnull=True)
+        if not options['all']:
+            books = books.filter(content_indexed_at__isnull=True)
+        pages = indexed = 0
+        for pk in books.values_list('pk', flat=True).iterator():
+            count = index_book_content(pk)
+            if count is not None:
+                indexed += 1
+                pages += count
+        self.stdout.write(self.style.SUCCESS(f"{indexed} livre(s) indexé(s), {pages} page(s)"))
@@ -0,0 +1,22 @@
+"""
+Supprime les suppressions synchronisées (SyncTombstone) plus anciennes que la durée de conservation.
+
+Les appareils dont la dernière synchronisation est antérieure reçoivent l'état complet.
+
+Usage:
+  python manage.py purge_sync_tombstones               # plus vieilles que BOOK_SYNC_TOMBSTONE_RETENTION_DAYS
+  python manage.py purge_sync_tombstones --days 30
+"""
+from django.core.management.base import BaseCommand
+from apps.library.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Supprime les suppressions synchronisées au-delà de la durée de conservation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Ancienneté minimale en jours (défaut : BOOK_SYNC_TOMBSTONE_RETENTION_DAYS)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"{purge_tombstones(options['days'])} suppression(s) purgée(s)"))
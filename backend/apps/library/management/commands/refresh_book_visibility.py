@@ -0,0 +1,21 @@
+"""
+Reconstruit la visibilité précalculée des livres (BookVisibility) à partir des livres
+publiés et de leurs classes.
+
+Les signaux maintiennent la table à chaque save / changement de classes ; cette commande
+sert après des modifications en masse (QuerySet.update, import SQL) qui ne déclenchent pas
+les signaux.
+
+Usage:
+  python manage.py refresh_book_visibility
+"""
+from django.core.management.base import BaseCommand
+from apps.library.visibility import refresh_book_visibility
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la visibilité des livres par classe (catalogue élève)."
+
+    def handle(self, *args, **options):
+        count = refresh_book_visibility()
+        self.stdout.write(self.style.SUCCESS(f"Visibilités de livres reconstruites : {count}"))
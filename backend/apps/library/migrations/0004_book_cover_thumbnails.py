@@ -0,0 +1,22 @@
+# Vignettes de couverture multi-tailles générées hors requête
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_book_classes_alter_book_book_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_thumbnails',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Vignettes de couverture'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='covers_generated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Vignettes générées le'),
+        ),
+    ]
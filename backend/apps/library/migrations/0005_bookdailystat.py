@@ -0,0 +1,29 @@
+# Statistiques journalières (vues / téléchargements) alimentées par les compteurs différés
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_book_cover_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Vues')),
+                ('downloads', models.PositiveIntegerField(default=0, verbose_name='Téléchargements')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='library.book', verbose_name='Livre')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière de livre',
+                'verbose_name_plural': 'Statistiques journalières de livres',
+                'indexes': [models.Index(fields=['date', 'book'], name='library_stat_date_book_idx')],
+                'unique_together': {('book', 'date')},
+            },
+        ),
+    ]
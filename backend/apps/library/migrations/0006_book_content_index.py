@@ -0,0 +1,49 @@
+# Recherche plein texte dans le contenu des livres : texte par page et index inversé
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_bookdailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='content_indexed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Contenu indexé le'),
+        ),
+        migrations.CreateModel(
+            name='BookPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(verbose_name='Numéro de page')),
+                ('content', models.TextField(blank=True, verbose_name='Texte')),
+                ('term_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de termes')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_pages', to='library.book', verbose_name='Livre')),
+            ],
+            options={
+                'verbose_name': 'Page indexée',
+                'verbose_name_plural': 'Pages indexées',
+                'ordering': ['book', 'page_number'],
+                'unique_together': {('book', 'page_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BookIndexTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Terme')),
+                ('frequency', models.PositiveIntegerField(default=1, verbose_name='Occurrences')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_terms', to='library.book', verbose_name='Livre')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='library.bookpage', verbose_name='Page')),
+            ],
+            options={
+                'verbose_name': 'Terme indexé',
+                'verbose_name_plural': 'Termes indexés',
+                'indexes': [models.Index(fields=['term', 'book'], name='library_term_book_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Synchronisation hors ligne : horodatage par champ, identifiants client et suppressions
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('library', '0006_book_content_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ANNOTATION', 'Annotation'), ('NOTE', 'Note')], max_length=20, verbose_name='Type')),
+                ('object_id', models.BigIntegerField(verbose_name='Identifiant supprimé')),
+                ('client_id', models.UUIDField(blank=True, null=True, verbose_name='Identifiant client')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Supprimé le')),
+            ],
+            options={
+                'verbose_name': 'Suppression synchronisée',
+                'verbose_name_plural': 'Suppressions synchronisées',
+            },
+        ),
+        migrations.AddField(
+            model_name='bookannotation',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Identifiant client'),
+        ),
+        migrations.AddField(
+            model_name='bookannotation',
+            name='field_timestamps',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Horodatage des champs'),
+        ),
+        migrations.AddField(
+            model_name='booknote',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Identifiant client'),
+        ),
+        migrations.AddField(
+            model_name='booknote',
+            name='field_timestamps',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Horodatage des champs'),
+        ),
+        migrations.AddField(
+            model_name='readingprogress',
+            name='field_timestamps',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Horodatage des champs'),
+        ),
+        migrations.AddIndex(
+            model_name='bookannotation',
+            index=models.Index(fields=['user', 'updated_at'], name='library_annot_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booknote',
+            index=models.Index(fields=['user', 'updated_at'], name='library_note_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readingprogress',
+            index=models.Index(fields=['user', 'last_read_at'], name='library_progress_sync_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookannotation',
+            constraint=models.UniqueConstraint(fields=('user', 'client_id'), name='library_annot_client_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='booknote',
+            constraint=models.UniqueConstraint(fields=('user', 'client_id'), name='library_note_client_uniq'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_tombstones', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='library_tombstone_sync_idx'),
+        ),
+    ]
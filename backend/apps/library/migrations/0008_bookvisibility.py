@@ -0,0 +1,44 @@
+# Visibilité précalculée des livres publiés par classe (catalogue élève), initialisée à partir des livres existants.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_book_visibility(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    BookVisibility = apps.get_model('library', 'BookVisibility')
+    classes = {}
+    for book_id, school_class_id in Book.classes.through.objects.values_list('book_id', 'schoolclass_id'):
+        classes.setdefault(book_id, []).append(school_class_id)
+    rows = []
+    for book_id in Book.objects.filter(is_published=True).values_list('pk', flat=True):
+        rows.extend(
+            BookVisibility(book_id=book_id, school_class_id=school_class_id)
+            for school_class_id in classes.get(book_id) or [None]
+        )
+    BookVisibility.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0013_teacher_class_access'),
+        ('library', '0007_offline_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='library.book', verbose_name='Livre')),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schools.schoolclass', verbose_name='Classe')),
+            ],
+            options={
+                'verbose_name': 'Visibilité de livre',
+                'verbose_name_plural': 'Visibilités de livres',
+                'indexes': [models.Index(fields=['book', 'school_class'], name='library_visibility_book_idx'), models.Index(fields=['school_class', 'book'], name='library_visibility_class_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_book_visibility, migrations.RunPython.noop),
+    ]
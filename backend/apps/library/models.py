@@ -35,6 +35,11 @@ class Book(models.Model):
     cover_image = models.ImageField(upload_to='books/covers/', null=True, blank=True, verbose_name="Image de couverture")
     book_file = models.FileField(upload_to='books/files/', null=True, blank=True, verbose_name="Fichier du livre")
     book_url = models.URLField(null=True, blank=True, verbose_name="Lien du livre")
+    # Vignettes générées hors requête (covers.py) : {taille: {'webp', 'jpeg', 'width', 'height'}}
+    cover_thumbnails = models.JSONField(default=dict, blank=True, verbose_name="Vignettes de couverture")
+    covers_generated_at = models.DateTimeField(null=True, blank=True, verbose_name="Vignettes générées le")
+    # Texte des pages indexé hors requête pour la recherche plein texte (search.py)
+    content_indexed_at = models.DateTimeField(null=True, blank=True, verbose_name="Contenu indexé le")
     
     # Pricing
     is_free = models.BooleanField(default=True, verbose_name="Gratuit")
@@ -93,11 +98,16 @@ class ReadingProgress(models.Model):
     total_pages = models.IntegerField(null=True, blank=True, verbose_name="Total pages")
     progress_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="Pourcentage de progression")
     last_read_at = models.DateTimeField(auto_now=True, verbose_name="Dernière lecture")
+    # Synchronisation hors ligne (sync.py) : {champ: horodatage de la dernière écriture}
+    field_timestamps = models.JSONField(default=dict, blank=True, verbose_name="Horodatage des champs")
     
     class Meta:
         verbose_name = "Progression de lecture"
         verbose_name_plural = "Progressions de lecture"
         unique_together = ['book', 'user']
+        indexes = [
+            models.Index(fields=['user', 'last_read_at'], name='library_progress_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.book.title} - {self.progress_percentage}%"
@@ -114,6 +124,9 @@ class BookAnnotation(models.Model):
     color = models.CharField(max_length=7, default='#FFEB3B', verbose_name="Couleur")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    # Synchronisation hors ligne : identifiant généré par l'appareil et horodatage par champ
+    client_id = models.UUIDField(null=True, blank=True, verbose_name="Identifiant client")
+    field_timestamps = models.JSONField(default=dict, blank=True, verbose_name="Horodatage des champs")
     
     class Meta:
         verbose_name = "Annotation"
@@ -121,6 +134,10 @@ class BookAnnotation(models.Model):
         ordering = ['page_number', 'created_at']
         indexes = [
             models.Index(fields=['book', 'user', 'page_number']),
+            models.Index(fields=['user', 'updated_at'], name='library_annot_sync_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='library_annot_client_uniq'),
         ]
     
     def __str__(self):
@@ -136,6 +153,9 @@ class BookNote(models.Model):
     page_reference = models.IntegerField(null=True, blank=True, verbose_name="Référence page")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    # Synchronisation hors ligne : identifiant généré par l'appareil et horodatage par champ
+    client_id = models.UUIDField(null=True, blank=True, verbose_name="Identifiant client")
+    field_timestamps = models.JSONField(default=dict, blank=True, verbose_name="Horodatage des champs")
     
     class Meta:
         verbose_name = "Note"
@@ -143,8 +163,114 @@ class BookNote(models.Model):
         ordering = ['-updated_at']
         indexes = [
             models.Index(fields=['book', 'user']),
+            models.Index(fields=['user', 'updated_at'], name='library_note_sync_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='library_note_client_uniq'),
         ]
     
     def __str__(self):
         title = self.title or f"Note du {self.created_at.strftime('%d/%m/%Y')}"
         return f"{self.user.get_full_name()} - {self.book.title} - {title}"
+
+
+class BookDailyStat(models.Model):
+    """Vues et téléchargements d'un livre par jour (classements de popularité)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='daily_stats', verbose_name="Livre")
+    date = models.DateField(verbose_name="Date")
+    views = models.PositiveIntegerField(default=0, verbose_name="Vues")
+    downloads = models.PositiveIntegerField(default=0, verbose_name="Téléchargements")
+    
+    class Meta:
+        verbose_name = "Statistique journalière de livre"
+        verbose_name_plural = "Statistiques journalières de livres"
+        unique_together = ['book', 'date']
+        indexes = [
+            models.Index(fields=['date', 'book'], name='library_stat_date_book_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book.title} - {self.date} : {self.views} vues, {self.downloads} téléchargements"
+
+
+class BookPage(models.Model):
+    """Texte extrait d'une page de livre (recherche plein texte)"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='text_pages', verbose_name="Livre")
+    page_number = models.PositiveIntegerField(verbose_name="Numéro de page")
+    content = models.TextField(blank=True, verbose_name="Texte")
+    term_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de termes")
+    
+    class Meta:
+        verbose_name = "Page indexée"
+        verbose_name_plural = "Pages indexées"
+        unique_together = ['book', 'page_number']
+        ordering = ['book', 'page_number']
+    
+    def __str__(self):
+        return f"{self.book.title} - Page {self.page_number}"
+
+
+class BookIndexTerm(models.Model):
+    """Index inversé : occurrences d'un terme normalisé dans une page"""
+    term = models.CharField(max_length=64, verbose_name="Terme")
+    page = models.ForeignKey(BookPage, on_delete=models.CASCADE, related_name='terms', verbose_name="Page")
+    # Dénormalisé pour filtrer par livres visibles sans jointure
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='index_terms', verbose_name="Livre")
+    frequency = models.PositiveIntegerField(default=1, verbose_name="Occurrences")
+    
+    class Meta:
+        verbose_name = "Terme indexé"
+        verbose_name_plural = "Termes indexés"
+        indexes = [
+            models.Index(fields=['term', 'book'], name='library_term_book_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} ({self.page})"
+
+
+class SyncTombstone(models.Model):
+    """Suppression d'une annotation / note, transmise aux autres appareils par la synchronisation"""
+    KIND_CHOICES = [
+        ('ANNOTATION', 'Annotation'),
+        ('NOTE', 'Note'),
+    ]
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='library_tombstones', verbose_name="Utilisateur")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Type")
+    object_id = models.BigIntegerField(verbose_name="Identifiant supprimé")
+    client_id = models.UUIDField(null=True, blank=True, verbose_name="Identifiant client")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Supprimé le")
+    
+    class Meta:
+        verbose_name = "Suppression synchronisée"
+        verbose_name_plural = "Suppressions synchronisées"
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='library_tombstone_sync_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id} ({self.user_id})"
+
+
+class BookVisibility(models.Model):
+    """
+    Catalogue élève précalculé : livre publié → classe qui le voit, maintenu par signaux
+    (voir apps/library/visibility.py). school_class=NULL : toutes les classes (livre sans
+    classe assignée). Remplace le Count('classes') + distinct par une semi-jointure indexée.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='visibility', verbose_name="Livre")
+    school_class = models.ForeignKey(
+        SchoolClass, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Classe"
+    )
+    
+    class Meta:
+        verbose_name = "Visibilité de livre"
+        verbose_name_plural = "Visibilités de livres"
+        indexes = [
+            models.Index(fields=['book', 'school_class'], name='library_visibility_book_idx'),
+            models.Index(fields=['school_class', 'book'], name='library_visibility_class_idx'),
+        ]
+    
+    def __str__(self):
+        school_class = self.school_class.name if self.school_class_id else "toutes les classes"
+        return f"{self.book.title} — {school_class}"
@@ -0,0 +1,220 @@
+"""
+Rendu à la demande des pages d'un livre PDF pour la liseuse.
+
+GET /api/library/books/<id>/pages/<n>/?zoom=1.5 renvoie la page n (à partir de 1) en
+image (WebP, ou ?image_format=jpeg) ou, avec ?layer=text, sa couche texte (mots et
+rectangles, à l'échelle du zoom) : la première page s'affiche sans télécharger le livre.
+
+Les rendus sont gardés dans un cache disque LRU (BOOK_PAGE_CACHE_DIR) borné à
+BOOK_PAGE_CACHE_MAX_BYTES, clé (livre, version du fichier, page, zoom, couche) ; un accès
+rafraîchit la date du fichier, l'éviction supprime les plus anciens. La taille du cache est
+suivie en mémoire ; le parcours du disque (éviction, et recalcul au plus tard toutes les
+BOOK_PAGE_CACHE_RESCAN_SECONDS, le répertoire pouvant être partagé par plusieurs processus)
+est confié à un unique thread de maintenance, hors du verrou et de la requête. Le zoom est arrondi
+au ZOOM_STEP le plus proche pour limiter le nombre de variantes. Après chaque page servie,
+les BOOK_PAGE_PREFETCH suivantes sont rendues par un pool de threads du processus (le
+cache étant local au serveur, un worker Celery distant ne servirait à rien).
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from PIL import Image
+from .covers import COVER_FORMATS, _LocalCopy
+from .serving import file_etag
+
+logger = logging.getLogger(__name__)
+
+ZOOM_STEP = 0.25
+MIN_ZOOM = 0.5
+LAYERS = ('image', 'text')
+# Fraction de BOOK_PAGE_CACHE_MAX_BYTES conservée après une éviction
+EVICTION_TARGET = 0.8
+
+_executor = None
+_maintenance_executor = None
+_lock = threading.Lock()
+_in_flight = set()
+_cache_bytes = None
+_scanned_at = None
+_maintaining = False
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BOOK_PAGE_RENDER_THREADS, thread_name_prefix='book-pages')
+    return _executor
+
+
+def _maintenance_pool():
+    global _maintenance_executor
+    if _maintenance_executor is None:
+        _maintenance_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='book-page-cache')
+    return _maintenance_executor
+
+
+def normalize_zoom(value):
+    """Zoom demandé -> multiple de ZOOM_STEP entre MIN_ZOOM et BOOK_PAGE_MAX_ZOOM (ValueError si invalide)."""
+    zoom = float(value)
+    if zoom != zoom:  # NaN
+        raise ValueError
+    zoom = min(max(zoom, MIN_ZOOM), settings.BOOK_PAGE_MAX_ZOOM)
+    return round(zoom / ZOOM_STEP) * ZOOM_STEP
+
+
+def file_version(book):
+    """Version du fichier (taille + date) : un fichier remplacé ne réutilise pas l'ancien cache."""
+    try:
+        return file_etag(os.stat(book.book_file.path)).strip('"')
+    except (NotImplementedError, ValueError, FileNotFoundError):
+        return book.book_file.name.replace('/', '_')
+
+
+def cache_path(book_id, version, page_number, zoom, layer, image_format='webp'):
+    extension = 'json' if layer == 'text' else ('jpg' if image_format == 'jpeg' else image_format)
+    name = f"p{page_number}_z{zoom:g}.{extension}"
+    return os.path.join(settings.BOOK_PAGE_CACHE_DIR, str(book_id), version, name)
+
+
+def _render(book, page_number, zoom, layer, image_format):
+    """Rendu d'une page -> octets (image, ou JSON de la couche texte)."""
+    import fitz  # PyMuPDF
+    with _LocalCopy(book.book_file) as path:
+        with fitz.open(path) as document:
+            page = document[page_number - 1]
+            if layer == 'text':
+                words = [
+                    [round(x0 * zoom, 1), round(y0 * zoom, 1), round(x1 * zoom, 1), round(y1 * zoom, 1), word]
+                    for x0, y0, x1, y1, word, *_ in page.get_text('words')
+                ]
+                return json.dumps({
+                    'page': page_number, 'page_count': len(document), 'zoom': zoom,
+                    'width': round(page.rect.width * zoom), 'height': round(page.rect.height * zoom),
+                    'words': words,
+                }, ensure_ascii=False).encode('utf-8')
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    buffer = io.BytesIO()
+    image.save(buffer, format=COVER_FORMATS[image_format], quality=80)
+    return buffer.getvalue()
+
+
+def _store(path, data):
+    """Écriture atomique dans le cache ; recalcul / éviction mis en file si nécessaire."""
+    global _cache_bytes, _maintaining
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+    with _lock:
+        if _cache_bytes is not None:
+            _cache_bytes += len(data)
+        due = not _maintaining and (
+            _cache_bytes is None
+            or _cache_bytes > settings.BOOK_PAGE_CACHE_MAX_BYTES
+            or time.monotonic() - _scanned_at >= settings.BOOK_PAGE_CACHE_RESCAN_SECONDS
+        )
+        if due:
+            _maintaining = True
+    if due:
+        _maintenance_pool().submit(maintain_cache)
+
+
+def maintain_cache():
+    """Recalcule la taille du cache sur disque et évince au-delà du maximum (thread de maintenance)."""
+    global _cache_bytes, _scanned_at, _maintaining
+    try:
+        total = _scan()[1]
+        if total > settings.BOOK_PAGE_CACHE_MAX_BYTES:
+            total = evict(int(settings.BOOK_PAGE_CACHE_MAX_BYTES * EVICTION_TARGET))
+        with _lock:
+            _cache_bytes, _scanned_at = total, time.monotonic()
+    except Exception:
+        logger.exception("Échec de la maintenance du cache des pages")
+    finally:
+        with _lock:
+            _maintaining = False
+
+
+def _scan():
+    """([(date d'accès, taille, chemin)], taille totale) des fichiers du cache."""
+    entries = []
+    for root, _dirs, files in os.walk(settings.BOOK_PAGE_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries, sum(size for _, size, _ in entries)
+
+
+def evict(target_bytes):
+    """Supprime les rendus les moins récemment utilisés jusqu'à target_bytes. Retourne la taille restante."""
+    entries, total = _scan()
+    for _, size, path in sorted(entries):
+        if total <= target_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def render_page(book, page_number, zoom=1.0, layer='image', image_format='webp'):
+    """Octets de la page (depuis le cache si possible). Le zoom doit être normalisé."""
+    path = cache_path(book.pk, file_version(book), page_number, zoom, layer, image_format)
+    try:
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        os.utime(path)  # accès récent : repoussé en fin de file LRU
+        return data
+    except FileNotFoundError:
+        pass
+    data = _render(book, page_number, zoom, layer, image_format)
+    _store(path, data)
+    return data
+
+
+def _prefetch_one(book, page_number, zoom, layer, image_format, key):
+    try:
+        render_page(book, page_number, zoom, layer, image_format)
+    except Exception:
+        logger.exception("Échec du pré-rendu de la page %s du livre %s", page_number, book.pk)
+    finally:
+        with _lock:
+            _in_flight.discard(key)
+
+
+def prefetch_pages(book, page_number, page_count, zoom, layer, image_format):
+    """Met en file le rendu des BOOK_PAGE_PREFETCH pages suivantes (déjà en cache ou en cours : ignorées)."""
+    version = file_version(book)
+    last = min(page_count, page_number + settings.BOOK_PAGE_PREFETCH)
+    for next_page in range(page_number + 1, last + 1):
+        key = cache_path(book.pk, version, next_page, zoom, layer, image_format)
+        if os.path.exists(key):
+            continue
+        with _lock:
+            if key in _in_flight:
+                continue
+            _in_flight.add(key)
+        _thread_pool().submit(_prefetch_one, book, next_page, zoom, layer, image_format, key)
+
+
+def page_count(book):
+    """Nombre de pages (champ pages, sinon lu dans le PDF)."""
+    if book.pages:
+        return book.pages
+    import fitz  # PyMuPDF
+    with _LocalCopy(book.book_file) as path:
+        with fitz.open(path) as document:
+            return len(document)
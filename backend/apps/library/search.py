@@ -0,0 +1,201 @@
+"""
+Recherche plein texte dans le contenu des livres PDF.
+
+Ingestion (hors requête, après l'envoi du fichier, selon BOOK_INDEX_MODE comme les
+couvertures) : le texte de chaque page est extrait avec PyMuPDF et stocké (BookPage), puis
+ses termes normalisés (minuscules, accents repliés, sans mots vides) alimentent un index
+inversé en base (BookIndexTerm : terme, page, occurrences). L'index est portable (PostgreSQL
+en production, SQLite en développement) et partagé par tous les serveurs.
+
+Recherche : les pages contenant les termes sont classées par BM25 ; les termes les plus
+rares sont traités d'abord et, au-delà de BOOK_SEARCH_MAX_POSTINGS occurrences, un terme
+courant n'est cherché que dans les pages déjà retenues. Un livre prend le score de sa
+meilleure page ; chaque page retenue est renvoyée avec un extrait et les positions à surligner.
+La visibilité (école, classe) est celle du queryset passé par la vue.
+"""
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+from apps.elearning.similarity import FRENCH_STOP_WORDS, fold
+from .covers import _LocalCopy
+from .models import Book, BookIndexTerm, BookPage
+
+logger = logging.getLogger(__name__)
+
+_TERM_RE = re.compile(r'[a-z0-9]{2,64}')
+MAX_QUERY_TERMS = 10
+SNIPPET_LENGTH = 200
+# Paramètres BM25 usuels
+BM25_K1 = 1.2
+BM25_B = 0.75
+INSERT_BATCH_SIZE = 2000
+
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BOOK_INDEX_THREADS, thread_name_prefix='book-index')
+    return _executor
+
+
+def terms(text):
+    """Termes normalisés d'un texte (dans l'ordre, répétitions comprises)."""
+    return [t for t in _TERM_RE.findall(fold(text)) if t not in FRENCH_STOP_WORDS]
+
+
+def extract_pages(book_file):
+    """[(numéro de page, texte)] d'un PDF."""
+    import fitz  # PyMuPDF
+    with _LocalCopy(book_file) as path:
+        with fitz.open(path) as document:
+            return [(number, page.get_text('text')) for number, page in enumerate(document, start=1)]
+
+
+def index_book_content(book_id):
+    """(Ré)indexe le texte d'un livre PDF. Retourne le nombre de pages indexées (None si non PDF)."""
+    book = Book.objects.filter(pk=book_id).first()
+    if book is None or not book.book_file or not book.book_file.name.lower().endswith('.pdf'):
+        return None
+    extracted = extract_pages(book.book_file)
+    with transaction.atomic():
+        BookIndexTerm.objects.filter(book_id=book_id).delete()
+        BookPage.objects.filter(book_id=book_id).delete()
+        counted = [(number, text, Counter(terms(text))) for number, text in extracted]
+        pages = BookPage.objects.bulk_create(
+            [BookPage(book_id=book_id, page_number=number, content=text, term_count=sum(counts.values()))
+             for number, text, counts in counted],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        BookIndexTerm.objects.bulk_create(
+            (BookIndexTerm(term=term, page_id=page.pk, book_id=book_id, frequency=n)
+             for page, (_, _, counts) in zip(pages, counted) for term, n in counts.items()),
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        Book.objects.filter(pk=book_id).update(content_indexed_at=timezone.now())
+    return len(pages)
+
+
+def _index_in_thread(book_id):
+    try:
+        index_book_content(book_id)
+    except Exception:
+        logger.exception("Échec de l'indexation du contenu du livre %s", book_id)
+    finally:
+        connection.close()
+
+
+def queue_content_indexing(book_id):
+    """Met en file l'indexation du contenu, après le commit de la requête."""
+    mode = settings.BOOK_INDEX_MODE
+    if mode == 'celery':
+        from .tasks import index_book_content as task
+        transaction.on_commit(lambda: task.delay(book_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _thread_pool().submit(_index_in_thread, book_id))
+    else:
+        transaction.on_commit(lambda: index_book_content(book_id))
+
+
+def _folded_with_offsets(text):
+    """Texte replié et, pour chaque caractère replié, sa position dans le texte d'origine."""
+    folded, offsets = [], []
+    for position, char in enumerate(text):
+        for folded_char in fold(char):
+            folded.append(folded_char)
+            offsets.append(position)
+    return ''.join(folded), offsets
+
+
+def snippet(content, query_terms, length=SNIPPET_LENGTH):
+    """(extrait autour de la première occurrence, [[début, fin]] des termes dans l'extrait)."""
+    folded, offsets = _folded_with_offsets(content)
+    pattern = re.compile(r'\b(?:' + '|'.join(map(re.escape, query_terms)) + r')\b')
+    matches = [(offsets[m.start()], offsets[m.end() - 1] + 1) for m in pattern.finditer(folded)]
+    first = matches[0][0] if matches else 0
+    start = max(0, first - length // 3)
+    end = min(len(content), start + length)
+    raw = content[start:end]
+    # Espaces et retours à la ligne du PDF compactés, positions recalculées en conséquence
+    text, positions = [], []
+    for index, char in enumerate(raw):
+        if char.isspace():
+            if text and text[-1] == ' ':
+                continue
+            char = ' '
+        text.append(char)
+        positions.append(start + index)
+    lookup = {pos: i for i, pos in enumerate(positions)}
+    highlights = [
+        [lookup[s], lookup[e - 1] + 1] for s, e in matches
+        if s >= start and e <= end and s in lookup and e - 1 in lookup
+    ]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(content) else ''
+    shift = len(prefix)
+    return prefix + ''.join(text) + suffix, [[s + shift, e + shift] for s, e in highlights]
+
+
+def search_contents(books, query, limit=20, pages_per_book=3):
+    """
+    Livres de `books` (queryset déjà filtré par visibilité) dont le contenu correspond à `query` :
+    [{'book_id', 'score', 'pages': [{'page_number', 'score', 'snippet', 'highlights'}]}] par score décroissant.
+    """
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return []
+    stats = BookPage.objects.aggregate(total=Count('pk'), average=Avg('term_count'))
+    total_pages, average_length = stats['total'] or 0, stats['average'] or 1.0
+    document_frequency = dict(
+        BookIndexTerm.objects.filter(term__in=query_terms).values_list('term').annotate(n=Count('pk')).order_by()
+    )
+    visible_ids = books.values('pk')
+    max_postings = settings.BOOK_SEARCH_MAX_POSTINGS
+
+    scores = defaultdict(float)
+    page_info = {}
+    for term in sorted(query_terms, key=lambda t: document_frequency.get(t, 0)):
+        df = document_frequency.get(term, 0)
+        if not df:
+            continue
+        postings = BookIndexTerm.objects.filter(term=term, book_id__in=visible_ids)
+        if df > max_postings and scores:
+            postings = postings.filter(page_id__in=list(scores))
+        idf = math.log(1 + (total_pages - df + 0.5) / (df + 0.5))
+        rows = postings.order_by('-frequency').values_list(
+            'page_id', 'book_id', 'frequency', 'page__term_count', 'page__page_number'
+        )[:max_postings]
+        for page_id, book_id, frequency, length, page_number in rows:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            scores[page_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            page_info[page_id] = (book_id, page_number)
+
+    by_book = defaultdict(list)
+    for page_id, score in scores.items():
+        by_book[page_info[page_id][0]].append((score, page_id))
+    ranked = sorted(
+        ((max(pages)[0], book_id, sorted(pages, reverse=True)[:pages_per_book]) for book_id, pages in by_book.items()),
+        key=lambda item: (-item[0], item[1]),
+    )[:limit]
+
+    contents = dict(
+        BookPage.objects.filter(pk__in=[pid for _, _, pages in ranked for _, pid in pages]).values_list('pk', 'content')
+    )
+    results = []
+    for book_score, book_id, pages in ranked:
+        hits = []
+        for score, page_id in pages:
+            text, highlights = snippet(contents.get(page_id, ''), query_terms)
+            hits.append({
+                'page_number': page_info[page_id][1], 'score': round(score, 4),
+                'snippet': text, 'highlights': highlights,
+            })
+        results.append({'book_id': book_id, 'score': round(book_score, 4), 'pages': hits})
+    return results
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .covers import COVER_SIZES, cover_url
 from .models import BookCategory, Book, BookPurchase, ReadingProgress, BookAnnotation, BookNote
 
 
@@ -12,11 +13,12 @@ class BookSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     school_name = serializers.CharField(source='school.name', read_only=True)
     classes_names = serializers.SerializerMethodField()
+    cover_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Book
-        fields = '__all__'
-        read_only_fields = ['download_count', 'view_count', 'created_at', 'updated_at', 'school']  # school est assigné automatiquement dans perform_create
+        exclude = ['cover_thumbnails']
+        read_only_fields = ['download_count', 'view_count', 'created_at', 'updated_at', 'school', 'covers_generated_at', 'content_indexed_at']  # school est assigné automatiquement dans perform_create
         extra_kwargs = {
             'school': {'required': False, 'allow_null': True, 'read_only': True}  # Le champ school est assigné automatiquement dans perform_create
         }
@@ -25,6 +27,18 @@ class BookSerializer(serializers.ModelSerializer):
         """Retourne la liste des noms des classes"""
         return [cls.name for cls in obj.classes.all()]
 
+    def get_cover_url(self, obj):
+        """
+        Vignette adaptée : ?cover_size=grid|detail|mobile et ?cover_format=webp|jpeg,
+        par défaut grid en liste et detail sinon (WebP).
+        """
+        request = self.context.get('request')
+        view = self.context.get('view')
+        params = request.query_params if request is not None else {}
+        default_size = 'grid' if getattr(view, 'action', None) == 'list' else 'detail'
+        size = params.get('cover_size') if params.get('cover_size') in COVER_SIZES else default_size
+        return cover_url(obj, size, params.get('cover_format', 'webp'), request)
+
 
 class BookPurchaseSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
@@ -43,7 +57,7 @@ class ReadingProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReadingProgress
         fields = '__all__'
-        read_only_fields = ['last_read_at']
+        read_only_fields = ['last_read_at', 'field_timestamps']
 
 
 class BookAnnotationSerializer(serializers.ModelSerializer):
@@ -53,7 +67,7 @@ class BookAnnotationSerializer(serializers.ModelSerializer):
     class Meta:
         model = BookAnnotation
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'client_id', 'field_timestamps']
 
 
 class BookNoteSerializer(serializers.ModelSerializer):
@@ -63,4 +77,4 @@ class BookNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = BookNote
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'client_id', 'field_timestamps']
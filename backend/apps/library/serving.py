@@ -0,0 +1,172 @@
+"""
+Service des fichiers protégés (livres) après le contrôle d'accès.
+
+Selon FILE_SERVING_BACKEND :
+  - 'django'   : le worker envoie le fichier lui-même, avec prise en charge de Range
+                 (réponses 206 / 416, If-Range) par blocs de FILE_SERVING_CHUNK_SIZE ;
+  - 'nginx'    : réponse vide avec X-Accel-Redirect vers FILE_SERVING_ACCEL_PREFIX + chemin
+                 relatif à MEDIA_ROOT ; nginx envoie le fichier et gère Range lui-même ;
+  - 'sendfile' : idem avec X-Sendfile (chemin absolu), pour Apache / lighttpd.
+
+Dans tous les cas ETag et Last-Modified sont posés et If-None-Match / If-Modified-Since
+répondent 304 sans toucher au fichier. Exemple de location nginx :
+
+    location /protected-media/ {
+        internal;
+        alias /app/backend/media/;
+    }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/msword',
+    '.epub': 'application/epub+zip',
+}
+
+
+def content_type_for(name):
+    extension = os.path.splitext(name)[1].lower()
+    return CONTENT_TYPES.get(extension) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (début, fin inclusive) d'un en-tête Range à plage unique, None si absent ou non géré
+    (plages multiples : fichier complet), ValueError si la plage n'est pas satisfaisable.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    """If-Range absent, ou validateur toujours valable : la plage peut être servie."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _read_range(path, start, length, chunk_size):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            block = source.read(min(chunk_size, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _offloaded_response(path, backend):
+    response = HttpResponse()
+    if backend == 'nginx':
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.FILE_SERVING_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_file(request, field_file, filename=None, content_type=None):
+    """
+    Réponse de téléchargement d'un FieldFile (contrôle d'accès déjà fait par l'appelant).
+    Stockage sans chemin local (cloud) : redirection vers l'URL du stockage.
+    """
+    try:
+        path = field_file.path
+    except (NotImplementedError, ValueError):
+        if field_file.url:
+            return HttpResponseRedirect(field_file.url)
+        raise Http404("Fichier non disponible")
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("Fichier introuvable")
+
+    size = stat.st_size
+    etag = file_etag(stat)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = content_type or content_type_for(filename)
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        backend = settings.FILE_SERVING_BACKEND
+        if backend in ('nginx', 'sendfile'):
+            response = _offloaded_response(path, backend)
+        else:
+            response = _django_response(request, path, size, etag, stat.st_mtime)
+        response['Content-Type'] = content_type
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    patch_cache_control(response, private=True)
+    return response
+
+
+def counts_as_download(request, response):
+    """
+    Téléchargement à compter : fichier complet ou première plage, pas chaque saut de la liseuse.
+    Envoi délégué au proxy : la réponse Django est toujours 200, la décision se fait sur Range.
+    """
+    if response.status_code not in (200, 206):
+        return False
+    if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+        header = request.META.get('HTTP_RANGE')
+        match = RANGE_RE.match((header or '').strip())
+        return not header or bool(match and match.group(1) and int(match.group(1)) == 0)
+    return response.status_code == 200 or response.get('Content-Range', '').startswith('bytes 0-')
+
+
+def _django_response(request, path, size, etag, mtime):
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(
+        _read_range(path, start, length, settings.FILE_SERVING_CHUNK_SIZE),
+        status=206 if byte_range else 200,
+    )
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,51 @@
+"""
+Signals pour maintenir la visibilité précalculée des livres (BookVisibility)
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from apps.schools.models import SchoolClass
+from .models import Book
+from .visibility import bump_catalog_version, refresh_book_visibility
+
+
+@receiver(post_save, sender=Book)
+def refresh_visibility_on_book_save(sender, instance, **kwargs):
+    """Livre créé, publié / dépublié ou modifié (le catalogue en cache est invalidé)."""
+    if kwargs.get('raw'):
+        return
+    refresh_book_visibility([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def invalidate_catalog_on_book_delete(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Book.classes.through)
+def refresh_visibility_on_classes_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Classes d'un livre (book.classes) ou livres d'une classe (school_class.books) modifiés."""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_book_ids = list(instance.books.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_book_visibility([instance.pk])
+    elif action == 'post_clear':
+        refresh_book_visibility(getattr(instance, '_cleared_book_ids', []))
+    else:
+        refresh_book_visibility(pk_set)
+
+
+@receiver(pre_delete, sender=SchoolClass)
+def remember_class_books(sender, instance, **kwargs):
+    """Livres de la classe supprimée : sans autre classe, ils deviennent visibles par toutes."""
+    instance._library_book_ids = list(Book.classes.through.objects.filter(
+        schoolclass_id=instance.pk
+    ).values_list('book_id', flat=True))
+
+
+@receiver(post_delete, sender=SchoolClass)
+def refresh_visibility_on_class_delete(sender, instance, **kwargs):
+    book_ids = getattr(instance, '_library_book_ids', None)
+    if book_ids:
+        refresh_book_visibility(book_ids)
@@ -0,0 +1,284 @@
+"""
+Synchronisation par lots des liseuses hors ligne (progression, annotations, notes).
+
+POST /api/library/books/sync/ reçoit en une requête les changements accumulés hors ligne,
+chacun avec l'horodatage de l'appareil (`updated_at`) :
+
+    {"since": "<watermark précédent ou null>",
+     "progress": [{"book", "current_page", "total_pages", "updated_at"}],
+     "annotations": [{"id" | "client_id", "book", "page_number", "content", ..., "updated_at", "deleted"}],
+     "notes": [{"id" | "client_id", "book", "title", "content", "page_reference", "updated_at", "deleted"}]}
+
+Conflits : dernier écrivain gagnant par champ. Chaque ligne garde {champ: horodatage}
+(field_timestamps, aussi renseigné par les écritures en ligne) ; un champ reçu n'est appliqué
+que s'il est plus récent. Les horodatages dans le futur sont ramenés à l'heure du serveur.
+Une suppression l'emporte si elle est plus récente que toutes les modifications de la ligne.
+
+Écritures groupées : progression par upsert (bulk_create update_conflicts), annotations et
+notes par bulk_create / bulk_update, suppressions en une requête avec SyncTombstone.
+La réponse contient le delta serveur depuis `since` (lignes modifiées et suppressions) et le
+nouveau watermark ; l'appareil peut y retrouver ses propres changements (ids serveur).
+
+Le watermark est l'heure de lecture du delta moins BOOK_SYNC_WATERMARK_MARGIN_SECONDS : une
+écriture concurrente horodatée avant la lecture mais validée après reste dans le delta suivant.
+Les lignes de cette marge sont renvoyées deux fois ; l'appareil les dédoublonne par id.
+Les SyncTombstone sont purgées après BOOK_SYNC_TOMBSTONE_RETENTION_DAYS (purge_sync_tombstones) ;
+un `since` plus ancien reçoit l'état complet (`full`), à substituer à la copie locale.
+"""
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Book, BookAnnotation, BookNote, ReadingProgress, SyncTombstone
+
+MAX_SYNC_ITEMS = 1000
+PROGRESS_FIELDS = ('current_page', 'total_pages')
+# kind -> (modèle, type de SyncTombstone, champs synchronisés, champs requis à la création)
+SYNC_KINDS = {
+    'annotations': (BookAnnotation, 'ANNOTATION',
+                    ('page_number', 'content', 'position_x', 'position_y', 'color'), ('page_number', 'content')),
+    'notes': (BookNote, 'NOTE', ('title', 'content', 'page_reference'), ('content',)),
+}
+_INT_FIELDS = {'current_page', 'total_pages', 'page_number', 'page_reference'}
+_FLOAT_FIELDS = {'position_x', 'position_y'}
+_NULLABLE_FIELDS = {'total_pages', 'position_x', 'position_y', 'title', 'page_reference'}
+
+
+class SyncError(ValueError):
+    """Changement refusé (renvoyé dans `rejected` sans bloquer le reste du lot)."""
+
+
+def parse_timestamp(value, now):
+    try:
+        # Format reconnu mais date impossible (mois 13...) : ValueError
+        timestamp = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        timestamp = None
+    if timestamp is None:
+        raise SyncError("Horodatage updated_at invalide.")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone.utc)
+    return min(timestamp, now)
+
+
+def _clean_value(field, value):
+    if value is None:
+        if field not in _NULLABLE_FIELDS:
+            raise SyncError(f"Champ {field} obligatoire.")
+        return None
+    try:
+        if field in _INT_FIELDS:
+            value = int(value)
+            if value < 0:
+                raise ValueError
+            return value
+        if field in _FLOAT_FIELDS:
+            return float(value)
+    except (TypeError, ValueError):
+        raise SyncError(f"Valeur invalide pour {field}.")
+    value = str(value)
+    if field == 'color' and len(value) > 7 or field == 'title' and len(value) > 200:
+        raise SyncError(f"Valeur trop longue pour {field}.")
+    return value
+
+
+def _field_timestamp(obj, field):
+    value = (obj.field_timestamps or {}).get(field)
+    return parse_datetime(value) if value else None
+
+
+def stamp_fields(obj, fields, timestamp=None):
+    """Horodate des champs écrits en ligne (API classique) pour la résolution des conflits."""
+    timestamp = (timestamp or timezone.now()).isoformat()
+    stamps = dict(obj.field_timestamps or {})
+    stamps.update(dict.fromkeys(fields, timestamp))
+    return stamps
+
+
+def _merge(obj, changes, timestamp):
+    """Applique les champs plus récents que ceux de la ligne. Retourne True si un champ a changé."""
+    changed = False
+    stamps = dict(obj.field_timestamps or {})
+    for field, value in changes.items():
+        current = _field_timestamp(obj, field)
+        if current is None or timestamp > current:
+            setattr(obj, field, value)
+            stamps[field] = timestamp.isoformat()
+            changed = True
+    obj.field_timestamps = stamps
+    return changed
+
+
+def _prepare(items, fields, now, visible_book_ids, rejected, kind):
+    """Éléments valides triés par horodatage (le plus récent appliqué en dernier)."""
+    prepared = []
+    for index, item in enumerate(items[:MAX_SYNC_ITEMS]):
+        try:
+            if not isinstance(item, dict):
+                raise SyncError("Élément invalide.")
+            timestamp = parse_timestamp(item.get('updated_at'), now)
+            changes = {f: _clean_value(f, item[f]) for f in fields if f in item}
+            book_id = _identifier(item.get('book'), 'book')
+            if book_id is not None and book_id not in visible_book_ids:
+                raise SyncError("Livre introuvable.")
+            prepared.append((timestamp, index, item, changes, book_id))
+        except SyncError as error:
+            rejected.append({'kind': kind, 'index': index, 'error': str(error)})
+    if len(items) > MAX_SYNC_ITEMS:
+        rejected.append({'kind': kind, 'index': MAX_SYNC_ITEMS, 'error': f"Au plus {MAX_SYNC_ITEMS} éléments par lot."})
+    prepared.sort(key=lambda entry: (entry[0], entry[1]))
+    return prepared
+
+
+def _identifier(value, field):
+    """Identifiant entier envoyé par l'appareil (None si absent)."""
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise SyncError(f"Identifiant {field} invalide.")
+
+
+def _client_id(item):
+    try:
+        return uuid.UUID(str(item['client_id'])) if item.get('client_id') else None
+    except ValueError:
+        raise SyncError("client_id invalide.")
+
+
+def apply_progress(user, items, now, visible_book_ids, rejected):
+    prepared = _prepare(items, PROGRESS_FIELDS, now, visible_book_ids, rejected, 'progress')
+    book_ids = {book_id for *_, book_id in prepared}
+    existing = {p.book_id: p for p in ReadingProgress.objects.filter(user=user, book_id__in=book_ids)}
+    # Comme update_progress : total_pages du livre par défaut
+    book_pages = dict(Book.objects.filter(pk__in=book_ids).values_list('pk', 'pages'))
+    touched = {}
+    for timestamp, index, item, changes, book_id in prepared:
+        if book_id is None:
+            rejected.append({'kind': 'progress', 'index': index, 'error': "Livre obligatoire."})
+            continue
+        progress = touched.get(book_id) or existing.get(book_id) or ReadingProgress(
+            user=user, book_id=book_id, current_page=0, total_pages=book_pages.get(book_id),
+        )
+        if _merge(progress, changes, timestamp):
+            touched[book_id] = progress
+    for progress in touched.values():
+        progress.progress_percentage = (
+            round(progress.current_page / progress.total_pages * 100, 2) if progress.total_pages else 0
+        )
+    ReadingProgress.objects.bulk_create(
+        list(touched.values()), update_conflicts=True, unique_fields=['book', 'user'],
+        update_fields=['current_page', 'total_pages', 'progress_percentage', 'field_timestamps', 'last_read_at'],
+    )
+
+
+def apply_changes(user, kind, items, now, visible_book_ids, rejected):
+    """Annotations ou notes : création, mise à jour champ par champ, suppression."""
+    model, tombstone_kind, fields, required = SYNC_KINDS[kind]
+    prepared = []
+    for entry in _prepare(items, fields, now, visible_book_ids, rejected, kind):
+        try:
+            prepared.append((*entry, _identifier(entry[2].get('id'), 'id'), _client_id(entry[2])))
+        except SyncError as error:
+            rejected.append({'kind': kind, 'index': entry[1], 'error': str(error)})
+
+    ids = {pk for *_, pk, _ in prepared if pk}
+    client_ids = {client_id for *_, client_id in prepared if client_id}
+    existing = list(model.objects.filter(user=user).filter(Q(pk__in=ids) | Q(client_id__in=client_ids)))
+    by_id = {obj.pk: obj for obj in existing}
+    by_client = {obj.client_id: obj for obj in existing if obj.client_id}
+
+    to_create, to_update, to_delete = {}, {}, {}
+    for timestamp, index, item, changes, book_id, pk, client_id in prepared:
+        obj = by_id.get(pk) or by_client.get(client_id)
+        if item.get('deleted'):
+            latest = max(filter(None, (_field_timestamp(obj, f) for f in fields)), default=None) if obj else None
+            if obj is not None and (latest is None or timestamp >= latest):
+                to_create.pop(id(obj), None)
+                to_update.pop(id(obj), None)
+                if obj.pk:
+                    to_delete[obj.pk] = obj
+            continue
+        if obj is None:
+            if pk:
+                rejected.append({'kind': kind, 'index': index, 'error': "Élément introuvable ou supprimé."})
+                continue
+            missing = [f for f in required if changes.get(f) in (None, '')] + ([] if book_id else ['book'])
+            if missing:
+                rejected.append({'kind': kind, 'index': index, 'error': f"Champs obligatoires : {', '.join(missing)}."})
+                continue
+            obj = model(user=user, book_id=book_id, client_id=client_id)
+            if client_id:
+                by_client[client_id] = obj
+            _merge(obj, changes, timestamp)
+            to_create[id(obj)] = obj
+        elif obj.pk in to_delete:
+            continue
+        elif _merge(obj, changes, timestamp) and obj.pk:
+            obj.updated_at = now
+            to_update[id(obj)] = obj
+
+    model.objects.bulk_create(list(to_create.values()))
+    model.objects.bulk_update(list(to_update.values()), list(fields) + ['field_timestamps', 'updated_at'])
+    if to_delete:
+        record_deletions(user, tombstone_kind, to_delete.values())
+        model.objects.filter(pk__in=list(to_delete)).delete()
+
+
+def record_deletions(user, kind, objects):
+    SyncTombstone.objects.bulk_create([
+        SyncTombstone(user=user, kind=kind, object_id=obj.pk, client_id=obj.client_id) for obj in objects
+    ])
+
+
+def apply_sync(user, payload, visible_book_ids):
+    """Applique un lot de changements. Retourne les éléments refusés."""
+    now = timezone.now()
+    rejected = []
+    with transaction.atomic():
+        apply_progress(user, payload.get('progress') or [], now, visible_book_ids, rejected)
+        for kind in SYNC_KINDS:
+            apply_changes(user, kind, payload.get(kind) or [], now, visible_book_ids, rejected)
+    return rejected
+
+
+def _tombstone_cutoff(days=None):
+    days = settings.BOOK_SYNC_TOMBSTONE_RETENTION_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def server_delta(user, since):
+    """
+    Lignes de l'utilisateur modifiées depuis `since` et suppressions, avec le watermark
+    suivant. Tout l'état (`full`) si `since` est None ou antérieur aux suppressions conservées.
+    """
+    watermark = timezone.now() - timedelta(seconds=settings.BOOK_SYNC_WATERMARK_MARGIN_SECONDS)
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since, timezone.utc)
+    if since is not None and since < _tombstone_cutoff():
+        since = None
+    progress = ReadingProgress.objects.filter(user=user).select_related('book', 'user')
+    annotations = BookAnnotation.objects.filter(user=user).select_related('book', 'user')
+    notes = BookNote.objects.filter(user=user).select_related('book', 'user')
+    deleted = {'annotations': [], 'notes': []}
+    if since is not None:
+        progress = progress.filter(last_read_at__gt=since)
+        annotations = annotations.filter(updated_at__gt=since)
+        notes = notes.filter(updated_at__gt=since)
+        kinds = {tombstone_kind: kind for kind, (_, tombstone_kind, _, _) in SYNC_KINDS.items()}
+        for kind, object_id in SyncTombstone.objects.filter(user=user, deleted_at__gt=since).values_list('kind', 'object_id'):
+            deleted[kinds[kind]].append(object_id)
+    return {
+        'progress': progress, 'annotations': annotations, 'notes': notes, 'deleted': deleted,
+        'watermark': watermark, 'full': since is None,
+    }
+
+
+def purge_tombstones(older_than_days=None):
+    """Supprime les SyncTombstone plus anciennes que BOOK_SYNC_TOMBSTONE_RETENTION_DAYS. Retourne leur nombre."""
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=_tombstone_cutoff(older_than_days)).delete()
+    return deleted
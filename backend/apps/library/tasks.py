@@ -0,0 +1,18 @@
+"""
+Celery tasks for the digital library
+"""
+from celery import shared_task
+
+
+@shared_task
+def generate_book_covers(book_id):
+    """Extract the cover from the PDF and build the thumbnail sizes"""
+    from .covers import generate_book_covers as run_generation
+    return run_generation(book_id)
+
+
+@shared_task
+def index_book_content(book_id):
+    """Extract the text of each PDF page and rebuild the book's full-text index"""
+    from .search import index_book_content as run_indexing
+    return run_indexing(book_id)
@@ -3,13 +3,20 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db import models
-from django.core.files.base import ContentFile
+from django.core.cache import cache
 from django.core.files.storage import default_storage
-from django.http import FileResponse, Http404
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
-from PIL import Image
-import io
-import os
+from apps.uploads.chunked import chunked_upload_fields, uploaded_file
+from . import pages as book_pages
+from .counters import STAT_FIELDS, VIEWS, pending_count, popular_book_ids, record_download, record_view
+from .covers import COVER_FORMATS, queue_cover_generation
+from .search import queue_content_indexing, search_contents
+from .serving import counts_as_download, serve_file
+from .sync import SYNC_KINDS, apply_sync, record_deletions, server_delta, stamp_fields
+from .visibility import catalog_cache_key, student_visibility_exists
 from .models import BookCategory, Book, BookPurchase, ReadingProgress, BookAnnotation, BookNote
 from .serializers import (
     BookCategorySerializer, BookSerializer, BookPurchaseSerializer, 
@@ -44,119 +51,45 @@ class BookViewSet(viewsets.ModelViewSet):
                 models.Q(school=self.request.user.school) | models.Q(school__isnull=True)
             )
         
-        # Pour les élèves, filtrer par classe
+        # Pour les élèves, filtrer par classe : visibilité précalculée (visibility.py),
+        # livres de la classe de l'élève ou sans classe spécifiée
         if self.request.user.is_student:
-            try:
-                student_profile = self.request.user.student_profile
-                if student_profile and student_profile.school_class:
-                    # Les élèves voient seulement les livres de leur classe ou les livres sans classe spécifiée
-                    from django.db.models import Count
-                    # Livres qui ont la classe de l'élève OU qui n'ont aucune classe assignée
-                    queryset = queryset.annotate(
-                        classes_count=Count('classes')
-                    ).filter(
-                        models.Q(classes=student_profile.school_class) | models.Q(classes_count=0)
-                    ).distinct()
-                else:
-                    # Si l'élève n'a pas de classe assignée, ne voir que les livres sans classe spécifiée
-                    from django.db.models import Count
-                    queryset = queryset.annotate(
-                        classes_count=Count('classes')
-                    ).filter(classes_count=0)
-            except Exception as e:
-                # Si l'élève n'a pas de profil, ne voir que les livres sans classe spécifiée
-                from django.db.models import Count
-                queryset = queryset.annotate(
-                    classes_count=Count('classes')
-                ).filter(classes_count=0)
+            queryset = queryset.filter(student_visibility_exists(self._student_class_id()))
         
         return queryset
     
-    def extract_pdf_first_page(self, pdf_file):
-        """Extrait la première page d'un PDF et la convertit en image. Retourne (buffer_image, nombre_pages)"""
-        try:
-            import fitz  # PyMuPDF
-            # Lire le contenu du fichier
-            pdf_content = pdf_file.read()
-            # Réinitialiser la position du fichier
-            pdf_file.seek(0)
-            
-            # Ouvrir le PDF depuis le contenu
-            pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
-            num_pages = len(pdf_document)
-            
-            if num_pages == 0:
-                pdf_document.close()
-                return None, 0
-            
-            # Obtenir la première page
-            first_page = pdf_document[0]
-            
-            # Convertir la page en image (matrice de pixels)
-            # zoom pour une meilleure qualité
-            zoom = 2.0
-            mat = fitz.Matrix(zoom, zoom)
-            pix = first_page.get_pixmap(matrix=mat)
-            
-            # Convertir en PIL Image
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Convertir en RGB si nécessaire
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Redimensionner si trop grand (max 800px de largeur)
-            max_width = 800
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Sauvegarder dans un buffer
-            buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=85)
-            buffer.seek(0)
-            
-            pdf_document.close()
-            return buffer, num_pages
-            
-        except ImportError:
-            # PyMuPDF n'est pas installé
-            return None, 0
-        except Exception as e:
-            print(f"Erreur lors de l'extraction de la première page du PDF: {str(e)}")
-            return None, 0
-    
+    def _student_class_id(self):
+        """Classe de l'élève connecté (None si pas de profil ou de classe)."""
+        student_profile = getattr(self.request.user, 'student_profile', None)
+        return student_profile.school_class_id if student_profile else None
+
+    def list(self, request, *args, **kwargs):
+        """Catalogue élève mis en cache par classe (clé versionnée, voir visibility.py)"""
+        if not request.user.is_student or not settings.BOOK_CATALOG_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+        key = catalog_cache_key(request, self._student_class_id())
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, settings.BOOK_CATALOG_CACHE_SECONDS)
+        return Response(data)
+
     def perform_create(self, serializer):
-        """Automatically assign the book to the user's school and extract cover from PDF"""
-        book_file = self.request.FILES.get('book_file')
+        """
+        Automatically assign the book to the user's school. La couverture, le nombre de pages
+        et les vignettes sont générés hors requête (covers.py).
+        """
+        # Fichier multipart classique ou envoi fractionné terminé (book_file_upload)
+        book_file = uploaded_file(self.request, 'book_file')
         cover_image = self.request.FILES.get('cover_image')
-        num_pages = None
-        
-        # Si un fichier PDF est fourni et qu'aucune image de couverture n'est fournie
-        if book_file and not cover_image:
-            # Vérifier si c'est un PDF
-            if book_file.name.lower().endswith('.pdf'):
-                # Extraire la première page et obtenir le nombre de pages
-                cover_buffer, num_pages = self.extract_pdf_first_page(book_file)
-                if cover_buffer:
-                    # Créer un nom de fichier pour l'image de couverture
-                    cover_filename = f"{os.path.splitext(book_file.name)[0]}_cover.jpg"
-                    cover_image = ContentFile(cover_buffer.read(), name=cover_filename)
-        
+
         # Préparer les données pour la sauvegarde
         save_data = {}
         if book_file:
             save_data['book_file'] = book_file
         if cover_image:
             save_data['cover_image'] = cover_image
-        
-        # Ajouter le nombre de pages si extrait du PDF et non fourni dans le formulaire
-        if num_pages and 'pages' not in self.request.data:
-            # Modifier directement les données validées
-            serializer.validated_data['pages'] = num_pages
-        
+
         # Sauvegarder le livre
         if self.request.user.school:
             book = serializer.save(
@@ -200,9 +133,19 @@ class BookViewSet(viewsets.ModelViewSet):
                 classes = SchoolClass.objects.filter(id__in=classes_ids)
             book.classes.set(classes)
 
+        if cover_image or book_file:
+            queue_cover_generation(book.id)
+        if book_file:
+            queue_content_indexing(book.id)
+
     def perform_update(self, serializer):
         """Handle classes ManyToMany on update when provided"""
-        book = serializer.save()
+        files = chunked_upload_fields(self.request, 'book_file')
+        book = serializer.save(**files)
+        if files or 'book_file' in self.request.FILES or 'cover_image' in self.request.FILES:
+            queue_cover_generation(book.id)
+        if files or 'book_file' in self.request.FILES:
+            queue_content_indexing(book.id)
         has_classes = 'classes' in self.request.data or (hasattr(self.request.data, 'getlist') and self.request.data.getlist('classes'))
         if not has_classes:
             return
@@ -283,7 +226,9 @@ class BookViewSet(viewsets.ModelViewSet):
             if total_pages:
                 progress.total_pages = total_pages
                 progress.progress_percentage = (current_page / total_pages * 100)
-            progress.save()
+        # Horodatage par champ pour les conflits avec la synchronisation hors ligne
+        progress.field_timestamps = stamp_fields(progress, ['current_page', 'total_pages'] if total_pages else ['current_page'])
+        progress.save()
         
         return Response(ReadingProgressSerializer(progress).data)
     
@@ -291,44 +236,130 @@ class BookViewSet(viewsets.ModelViewSet):
     def increment_view(self, request, pk=None):
         """Increment view count"""
         book = self.get_object()
-        book.view_count += 1
-        book.save()
-        return Response({'view_count': book.view_count})
+        # Incrément différé (counters.py) : pas de save() complet par vue
+        record_view(book.id)
+        return Response({'view_count': book.view_count + pending_count(book.id, VIEWS)})
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Synchronisation hors ligne par lots (sync.py) : applique progression, annotations et
+        notes horodatées par l'appareil puis renvoie le delta serveur depuis `since`.
+        """
+        payload = request.data
+        since = payload.get('since')
+        try:
+            since_at = parse_datetime(since) if isinstance(since, str) else None
+        except ValueError:
+            since_at = None
+        if (since and since_at is None) or any(
+            not isinstance(payload.get(kind) or [], list) for kind in ('progress', *SYNC_KINDS)
+        ):
+            return Response({'error': 'Lot de synchronisation invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        book_ids = {
+            item.get('book') for kind in ('progress', *SYNC_KINDS)
+            for item in payload.get(kind) or [] if isinstance(item, dict)
+        }
+        requested = {int(pk) for pk in book_ids if str(pk).isdigit()}
+        visible = set(self.get_queryset().filter(pk__in=requested).values_list('pk', flat=True)) if requested else set()
+        rejected = apply_sync(request.user, payload, visible)
+        delta = server_delta(request.user, since_at)
+        context = self.get_serializer_context()
+        return Response({
+            'watermark': delta['watermark'].isoformat(),
+            'full': delta['full'],
+            'rejected': rejected,
+            'progress': ReadingProgressSerializer(delta['progress'], many=True, context=context).data,
+            'annotations': BookAnnotationSerializer(delta['annotations'], many=True, context=context).data,
+            'notes': BookNoteSerializer(delta['notes'], many=True, context=context).data,
+            'deleted': delta['deleted'],
+        })
+
+    @action(detail=False, methods=['get'], url_path='search-content')
+    def search_content(self, request):
+        """Recherche plein texte dans le contenu des livres visibles (?q=, ?limit=) avec pages et extraits"""
+        query = (request.query_params.get('q') or '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if not query or len(query) > 200 or not 1 <= limit <= 50:
+            return Response({'error': 'Paramètres de recherche invalides'}, status=status.HTTP_400_BAD_REQUEST)
+        hits = search_contents(self.get_queryset(), query, limit=limit)
+        books = Book.objects.select_related('category').prefetch_related('classes').in_bulk([h['book_id'] for h in hits])
+        return Response([
+            {'book': self.get_serializer(books[h['book_id']]).data, 'score': h['score'], 'pages': h['pages']}
+            for h in hits if h['book_id'] in books
+        ])
+
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """Livres les plus vus (?metric=downloads) sur ?days=30 jours, parmi les livres visibles"""
+        metric = request.query_params.get('metric', 'views')
+        try:
+            days = int(request.query_params.get('days', 30))
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            days = limit = 0
+        if metric not in STAT_FIELDS or not 1 <= days <= 366 or not 1 <= limit <= 100:
+            return Response({'error': 'Paramètres invalides'}, status=status.HTTP_400_BAD_REQUEST)
+        ranking = popular_book_ids(self.get_queryset(), days=days, metric=metric, limit=limit)
+        books = Book.objects.select_related('category').prefetch_related('classes').in_bulk([pk for pk, _ in ranking])
+        return Response([
+            {**self.get_serializer(books[pk]).data, metric: total}
+            for pk, total in ranking if pk in books
+        ])
     
     @action(detail=True, methods=['get'])
     def download_file(self, request, pk=None):
-        """Serve book file with authentication"""
+        """
+        Serve book file with authentication. Range (reprise, lecture partielle), ETag et
+        Last-Modified sont gérés ; l'envoi peut être délégué au proxy (serving.py).
+        """
         book = self.get_object()
         if not book.book_file:
             raise Http404("Fichier non disponible")
-        
-        # Vérifier que l'utilisateur a accès au livre
-        # (déjà vérifié par les permissions IsAuthenticated)
-        
+        response = serve_file(request, book.book_file)
+        if counts_as_download(request, response):
+            record_download(book.id)
+        return response
+
+    @action(detail=True, methods=['get'], url_path=r'pages/(?P<page_number>\d+)')
+    def page(self, request, pk=None, page_number=None):
+        """
+        Render one page of the PDF for the reader (pages.py) : ?zoom=1.0, ?layer=image|text,
+        ?image_format=webp|jpeg. Les pages suivantes sont pré-rendues en arrière-plan.
+        """
+        book = self.get_object()
+        if not book.book_file or not book.book_file.name.lower().endswith('.pdf'):
+            return Response({'error': 'Rendu des pages disponible uniquement pour les livres PDF'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        layer = request.query_params.get('layer', 'image')
+        image_format = request.query_params.get('image_format', 'webp')
         try:
-            file_path = book.book_file.path
-            if not os.path.exists(file_path):
-                raise Http404("Fichier introuvable")
-            
-            # Déterminer le content type
-            content_type = 'application/pdf'
-            if file_path.endswith('.doc') or file_path.endswith('.docx'):
-                content_type = 'application/msword'
-            elif file_path.endswith('.epub'):
-                content_type = 'application/epub+zip'
-            
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type=content_type
-            )
-            response['Content-Disposition'] = f'inline; filename="{os.path.basename(book.book_file.name)}"'
-            return response
-        except ValueError:
-            # Si le fichier n'a pas de path (stockage cloud), utiliser l'URL
-            if book.book_file.url:
-                from django.http import HttpResponseRedirect
-                return HttpResponseRedirect(book.book_file.url)
-            raise Http404("Fichier non disponible")
+            zoom = book_pages.normalize_zoom(request.query_params.get('zoom', 1.0))
+        except (TypeError, ValueError):
+            zoom = None
+        if zoom is None or layer not in book_pages.LAYERS or image_format not in COVER_FORMATS:
+            return Response({'error': 'Paramètres de rendu invalides'}, status=status.HTTP_400_BAD_REQUEST)
+
+        page_number = int(page_number)
+        page_count = book_pages.page_count(book)
+        if not 1 <= page_number <= page_count:
+            raise Http404("Page introuvable")
+        try:
+            data = book_pages.render_page(book, page_number, zoom, layer, image_format)
+        except IndexError:
+            # Champ pages supérieur au nombre réel de pages du PDF
+            raise Http404("Page introuvable")
+        if settings.BOOK_PAGE_PREFETCH:
+            book_pages.prefetch_pages(book, page_number, page_count, zoom, layer, image_format)
+
+        content_type = 'application/json' if layer == 'text' else f'image/{image_format}'
+        response = HttpResponse(data, content_type=content_type)
+        response['X-Page-Count'] = str(page_count)
+        patch_cache_control(response, private=True, max_age=settings.BOOK_PAGE_BROWSER_CACHE_SECONDS)
+        return response
 
 
 class BookPurchaseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -356,9 +387,31 @@ class ReadingProgressViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(user=self.request.user)
         return queryset
 
+    def perform_create(self, serializer):
+        serializer.save(field_timestamps=stamp_fields(ReadingProgress(), serializer.validated_data))
+
+    def perform_update(self, serializer):
+        serializer.save(field_timestamps=stamp_fields(serializer.instance, serializer.validated_data))
+
 
-class BookAnnotationViewSet(viewsets.ModelViewSet):
+class SyncedViewSetMixin:
+    """Écritures en ligne des annotations / notes visibles par la synchronisation hors ligne (sync.py)."""
+    tombstone_kind = None
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, field_timestamps=stamp_fields(serializer.Meta.model(), serializer.validated_data))
+
+    def perform_update(self, serializer):
+        serializer.save(field_timestamps=stamp_fields(serializer.instance, serializer.validated_data))
+
+    def perform_destroy(self, instance):
+        record_deletions(instance.user, self.tombstone_kind, [instance])
+        instance.delete()
+
+
+class BookAnnotationViewSet(SyncedViewSetMixin, viewsets.ModelViewSet):
     serializer_class = BookAnnotationSerializer
+    tombstone_kind = 'ANNOTATION'
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['book', 'user', 'page_number']
     
@@ -368,13 +421,11 @@ class BookAnnotationViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_admin:
             queryset = queryset.filter(user=self.request.user)
         return queryset
-    
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
 
 
-class BookNoteViewSet(viewsets.ModelViewSet):
+class BookNoteViewSet(SyncedViewSetMixin, viewsets.ModelViewSet):
     serializer_class = BookNoteSerializer
+    tombstone_kind = 'NOTE'
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['book', 'user']
     
@@ -384,6 +435,3 @@ class BookNoteViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_admin:
             queryset = queryset.filter(user=self.request.user)
         return queryset
-    
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
@@ -0,0 +1,93 @@
+"""
+Visibilité précalculée des livres pour le catalogue élève (BookVisibility).
+
+Un élève voit un livre publié s'il est assigné à sa classe ou s'il n'a aucune classe
+(ligne school_class=NULL). La table est reconstruite livre par livre à chaque changement
+de classes (m2m), de publication ou de suppression d'une classe, ce qui remplace le
+Count('classes') + GROUP BY + distinct par une semi-jointure EXISTS indexée.
+
+Le catalogue élève (liste) est en plus mis en cache par classe : la clé porte une version
+incrémentée à chaque changement de livre ou de visibilité (BOOK_CATALOG_CACHE_SECONDS
+borne la fraîcheur des compteurs et vignettes, écrits par update()). La version vit dans le
+cache : le catalogue n'est mis en cache (BOOK_CATALOG_CACHE_ENABLED) qu'avec un cache partagé
+par tous les workers, sinon un changement n'invaliderait que le processus qui l'a fait.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import Warning, register
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from .models import Book, BookVisibility
+
+CATALOG_VERSION_KEY = 'library:catalog-version'
+CATALOG_KEY = 'library:catalog:{version}:{school}:{school_class}:{query}'
+
+
+def refresh_book_visibility(book_ids=None):
+    """
+    Reconstruit la visibilité des livres donnés (tous si None).
+    Retourne le nombre de lignes créées.
+    """
+    books = Book.objects.filter(is_published=True)
+    assignments = Book.classes.through.objects.all()
+    existing = BookVisibility.objects.all()
+    if book_ids is not None:
+        book_ids = list(book_ids)
+        books = books.filter(pk__in=book_ids)
+        assignments = assignments.filter(book_id__in=book_ids)
+        existing = existing.filter(book_id__in=book_ids)
+    classes = {}
+    for book_id, school_class_id in assignments.values_list('book_id', 'schoolclass_id'):
+        classes.setdefault(book_id, []).append(school_class_id)
+    rows = [
+        BookVisibility(book_id=book_id, school_class_id=school_class_id)
+        for book_id in books.values_list('pk', flat=True)
+        for school_class_id in classes.get(book_id) or [None]
+    ]
+    with transaction.atomic():
+        existing.delete()
+        BookVisibility.objects.bulk_create(rows, batch_size=1000)
+    bump_catalog_version()
+    return len(rows)
+
+
+def student_visibility_exists(school_class_id, book_ref='pk'):
+    """Expression EXISTS : le livre OuterRef(book_ref) est visible par la classe (None : livres sans classe)."""
+    rows = BookVisibility.objects.filter(book=OuterRef(book_ref))
+    if school_class_id is None:
+        return Exists(rows.filter(school_class__isnull=True))
+    return Exists(rows.filter(Q(school_class__isnull=True) | Q(school_class_id=school_class_id)))
+
+
+def bump_catalog_version():
+    """Invalide tous les catalogues en cache (nouvelle version de clé)."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, None)
+
+
+def catalog_cache_key(request, school_class_id):
+    """Clé du catalogue d'une classe pour cette requête (filtres, recherche, page, hôte)."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 0, None)
+        version = cache.get(CATALOG_VERSION_KEY, 0)
+    query = hashlib.sha1(f"{request.get_host()}{request.get_full_path()}".encode()).hexdigest()
+    return CATALOG_KEY.format(
+        version=version, school=request.user.school_id, school_class=school_class_id, query=query
+    )
+
+
+@register()
+def check_catalog_cache(app_configs, **kwargs):
+    """Avertissement si le catalogue est mis en cache dans la mémoire locale de chaque processus."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if settings.BOOK_CATALOG_CACHE_ENABLED and backend.endswith('LocMemCache'):
+        return [Warning(
+            "BOOK_CATALOG_CACHE_ENABLED avec LocMemCache : bump_catalog_version n'invalide que le processus courant.",
+            hint="Définir REDIS_CACHE_URL (cache partagé) ou BOOK_CATALOG_CACHE_ENABLED=False avec plusieurs workers.",
+            id='library.W001',
+        )]
+    return []
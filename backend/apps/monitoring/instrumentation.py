@@ -0,0 +1,207 @@
+"""
+Mesure du travail base de données par requête HTTP et agrégation par endpoint.
+
+QueryRecorder s'installe via connection.execute_wrapper et relève, pour chaque requête SQL,
+son empreinte (SQL normalisé, listes IN repliées) et sa durée. Les empreintes répétées
+dans une même requête HTTP signalent un motif N+1.
+
+Les statistiques par endpoint sont accumulées en mémoire puis fusionnées périodiquement
+dans le cache Django (partagé entre workers si le cache est Redis, voir REDIS_CACHE_URL).
+Chaque processus écrit sa propre entrée, clé hôte:pid : aucun worker n'écrase les mesures
+d'un autre, et le rapport additionne les entrées de tous. Les entrées et le registre des
+processus expirent après CACHE_TIMEOUT sans écriture : les workers recyclés ou les anciens
+déploiements disparaissent du rapport au lieu de s'accumuler.
+"""
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_REGISTRY_KEY = 'monitoring:processes'
+CACHE_KEY_PREFIX = 'monitoring:process:'
+CACHE_TIMEOUT = 7 * 24 * 3600
+
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """Empreinte d'une requête : espaces normalisés et IN (%s, %s, ...) → IN (...)."""
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    return _IN_LIST_RE.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper qui compte les requêtes, leur durée cumulée et les empreintes répétées."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint_sql(sql)] += 1
+
+    def duplicates(self):
+        """[(empreinte, occurrences)] des requêtes exécutées plus d'une fois, les plus fréquentes d'abord."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+
+def _empty_stats(endpoint):
+    return {
+        'endpoint': endpoint,
+        'requests': 0,
+        'total_queries': 0,
+        'max_queries': 0,
+        'total_db_ms': 0.0,
+        'total_wall_ms': 0.0,
+        'max_wall_ms': 0.0,
+        'total_duplicate_queries': 0,
+        'worst_duplicate_sql': '',
+        'worst_duplicate_count': 0,
+    }
+
+
+def _merge(into, other):
+    into['requests'] += other['requests']
+    into['total_queries'] += other['total_queries']
+    into['max_queries'] = max(into['max_queries'], other['max_queries'])
+    into['total_db_ms'] += other['total_db_ms']
+    into['total_wall_ms'] += other['total_wall_ms']
+    into['max_wall_ms'] = max(into['max_wall_ms'], other['max_wall_ms'])
+    into['total_duplicate_queries'] += other['total_duplicate_queries']
+    if other['worst_duplicate_count'] > into['worst_duplicate_count']:
+        into['worst_duplicate_sql'] = other['worst_duplicate_sql']
+        into['worst_duplicate_count'] = other['worst_duplicate_count']
+    return into
+
+
+def _process_key(process_id):
+    return f"{CACHE_KEY_PREFIX}{process_id}"
+
+
+class EndpointStats:
+    """Agrégat par endpoint : tampon local au processus, fusionné dans le cache à intervalle régulier."""
+
+    def __init__(self, flush_interval=None):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._process_id = None
+        self._process_pid = None
+        self.flush_interval = flush_interval
+
+    def _interval(self):
+        if self.flush_interval is not None:
+            return self.flush_interval
+        return getattr(settings, 'QUERY_INSTRUMENTATION_FLUSH_SECONDS', 30)
+
+    def _process(self):
+        """Identifiant de l'entrée du processus (hôte:pid, nouveau après un fork)."""
+        if self._process_id is None or self._process_pid != os.getpid():
+            self._process_pid = os.getpid()
+            self._process_id = f"{socket.gethostname()}:{self._process_pid}:{id(self):x}"
+        return self._process_id
+
+    def _register(self, process_id):
+        """Inscrit le processus au registre et en retire ceux sans écriture depuis CACHE_TIMEOUT."""
+        now = time.time()
+        registry = {
+            pid: seen for pid, seen in (cache.get(CACHE_REGISTRY_KEY) or {}).items()
+            if now - seen < CACHE_TIMEOUT
+        }
+        registry[process_id] = now
+        cache.set(CACHE_REGISTRY_KEY, registry, CACHE_TIMEOUT)
+
+    def record(self, endpoint, recorder, wall_ms):
+        duplicates = recorder.duplicates()
+        with self._lock:
+            stats = self._pending.setdefault(endpoint, _empty_stats(endpoint))
+            stats['requests'] += 1
+            stats['total_queries'] += recorder.count
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            stats['total_db_ms'] += recorder.duration * 1000
+            stats['total_wall_ms'] += wall_ms
+            stats['max_wall_ms'] = max(stats['max_wall_ms'], wall_ms)
+            stats['total_duplicate_queries'] += sum(n - 1 for _, n in duplicates)
+            if duplicates and duplicates[0][1] > stats['worst_duplicate_count']:
+                stats['worst_duplicate_sql'], stats['worst_duplicate_count'] = duplicates[0]
+            due = time.monotonic() - self._last_flush >= self._interval()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Fusionne le tampon local dans l'entrée du processus (seul ce processus l'écrit)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        with self._flush_lock:
+            process_id = self._process()
+            key = _process_key(process_id)
+            totals = cache.get(key) or {}
+            for endpoint, stats in pending.items():
+                totals[endpoint] = _merge(totals.get(endpoint) or _empty_stats(endpoint), stats)
+            cache.set(key, totals, CACHE_TIMEOUT)
+            self._register(process_id)
+
+    def _process_keys(self):
+        return [_process_key(process_id) for process_id in cache.get(CACHE_REGISTRY_KEY) or {}]
+
+    def reset(self):
+        """Efface les mesures de tous les processus et le registre."""
+        with self._lock:
+            self._pending = {}
+        with self._flush_lock:
+            cache.delete_many(self._process_keys() + [CACHE_REGISTRY_KEY])
+
+    def collect(self):
+        """{endpoint: statistiques} additionnées sur tous les processus."""
+        self.flush()
+        merged = {}
+        for totals in cache.get_many(self._process_keys()).values():
+            for endpoint, stats in totals.items():
+                _merge(merged.setdefault(endpoint, _empty_stats(endpoint)), stats)
+        return merged
+
+    def report(self, sort='avg_queries', limit=20):
+        """Endpoints triés du pire au meilleur selon sort (avg_queries, avg_db_ms, avg_wall_ms, ...)."""
+        rows = []
+        for stats in self.collect().values():
+            n = stats['requests'] or 1
+            rows.append({
+                'endpoint': stats['endpoint'],
+                'requests': stats['requests'],
+                'avg_queries': round(stats['total_queries'] / n, 1),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['total_db_ms'] / n, 1),
+                'avg_wall_ms': round(stats['total_wall_ms'] / n, 1),
+                'max_wall_ms': round(stats['max_wall_ms'], 1),
+                'avg_duplicate_queries': round(stats['total_duplicate_queries'] / n, 1),
+                'worst_duplicate_sql': stats['worst_duplicate_sql'],
+                'worst_duplicate_count': stats['worst_duplicate_count'],
+            })
+        if rows and sort not in rows[0]:
+            sort = 'avg_queries'
+        rows.sort(key=lambda r: r[sort], reverse=True)
+        return rows[:limit] if limit else rows
+
+
+endpoint_stats = EndpointStats()
+
+REPORT_SORT_FIELDS = [
+    'avg_queries', 'max_queries', 'avg_db_ms', 'avg_wall_ms', 'max_wall_ms',
+    'avg_duplicate_queries', 'requests',
+]
@@ -0,0 +1,36 @@
+"""
+Affiche les endpoints les plus coûteux relevés par QueryInstrumentationMiddleware.
+Usage: python manage.py query_report [--sort avg_db_ms] [--limit 20] [--reset]
+
+Les statistiques sont lues dans le cache Django : avec plusieurs workers, configurer
+REDIS_CACHE_URL pour que la commande voie les mesures de tous les processus.
+"""
+from django.core.management.base import BaseCommand
+from apps.monitoring.instrumentation import endpoint_stats, REPORT_SORT_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Liste les endpoints les plus coûteux (requêtes SQL, temps DB, N+1)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=REPORT_SORT_FIELDS, default='avg_queries', help='Critère de tri')
+        parser.add_argument('--limit', type=int, default=20, help="Nombre d'endpoints affichés")
+        parser.add_argument('--reset', action='store_true', help='Remet les compteurs à zéro après affichage')
+
+    def handle(self, *args, **options):
+        rows = endpoint_stats.report(sort=options['sort'], limit=options['limit'])
+        if not rows:
+            self.stdout.write(self.style.WARNING(
+                "Aucune mesure. Activez QUERY_INSTRUMENTATION_ENABLED=True et un cache partagé (REDIS_CACHE_URL)."
+            ))
+        for row in rows:
+            self.stdout.write(
+                f"{row['endpoint']:<55} req={row['requests']:<6} "
+                f"sql moy={row['avg_queries']:<7} max={row['max_queries']:<5} "
+                f"db={row['avg_db_ms']}ms total={row['avg_wall_ms']}ms dupl={row['avg_duplicate_queries']}"
+            )
+            if row['worst_duplicate_count'] > 1:
+                self.stdout.write(f"    ×{row['worst_duplicate_count']} {row['worst_duplicate_sql'][:160]}")
+        if options['reset']:
+            endpoint_stats.reset()
+            self.stdout.write(self.style.SUCCESS("Compteurs remis à zéro."))
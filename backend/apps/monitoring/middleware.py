@@ -0,0 +1,59 @@
+"""
+Middleware d'instrumentation : nombre de requêtes SQL, temps base de données et
+détection N+1 par endpoint. Activé uniquement si QUERY_INSTRUMENTATION_ENABLED=True.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from .instrumentation import QueryRecorder, endpoint_stats
+
+logger = logging.getLogger('apps.monitoring')
+
+
+def resolve_endpoint(request):
+    """Nom stable de l'endpoint : méthode + nom de route DRF (ex. GET student-parent-dashboard)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f"{request.method} <non résolu>"
+    func = match.func
+    name = match.view_name or match.route or f"{func.__module__}.{func.__qualname__}"
+    return f"{request.method} {name}"
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mesure chaque requête HTTP (requêtes SQL, temps DB, temps total, empreintes dupliquées)
+    et journalise les requêtes qui dépassent les seuils configurés.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'QUERY_COUNT_WARNING_THRESHOLD', 50)
+        self.max_duplicates = getattr(settings, 'QUERY_DUPLICATE_WARNING_THRESHOLD', 10)
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_WARNING_MS', 1000)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        endpoint = resolve_endpoint(request)
+        endpoint_stats.record(endpoint, recorder, wall_ms)
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f"{recorder.duration * 1000:.1f}"
+
+        duplicates = recorder.duplicates()
+        worst = duplicates[0] if duplicates else ('', 0)
+        if recorder.count > self.max_queries or worst[1] > self.max_duplicates or wall_ms > self.slow_ms:
+            logger.warning(
+                "Requête coûteuse %s (%s) : %d requêtes SQL, %.1f ms DB, %.1f ms total, "
+                "requête la plus répétée ×%d : %s",
+                endpoint, request.path, recorder.count, recorder.duration * 1000, wall_ms,
+                worst[1], worst[0][:300],
+            )
+        return response
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import endpoint_report
+
+urlpatterns = [
+    path('endpoints/', endpoint_report, name='monitoring-endpoint-report'),
+]
@@ -0,0 +1,30 @@
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from .instrumentation import endpoint_stats, REPORT_SORT_FIELDS
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def endpoint_report(request):
+    """
+    Rapport agrégé de l'instrumentation : endpoints les plus coûteux en premier.
+    GET ?sort=avg_queries|max_queries|avg_db_ms|avg_wall_ms|max_wall_ms|avg_duplicate_queries|requests&limit=20
+    DELETE remet les compteurs à zéro. Réservé aux administrateurs.
+    """
+    if not getattr(request.user, 'is_admin', False):
+        return Response({'detail': 'Réservé aux administrateurs.'}, status=status.HTTP_403_FORBIDDEN)
+    if request.method == 'DELETE':
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    sort = request.query_params.get('sort', 'avg_queries')
+    if sort not in REPORT_SORT_FIELDS:
+        return Response(
+            {'error': f"sort doit être l'un de : {', '.join(REPORT_SORT_FIELDS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        limit = 20
+    return Response({'results': endpoint_stats.report(sort=sort, limit=limit)})
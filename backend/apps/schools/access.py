@@ -0,0 +1,73 @@
+"""
+Carte d'accès enseignant → (classe, matière) (TeacherClassAccess).
+
+Un enseignant peut gérer une matière d'une classe s'il en est le titulaire (ligne avec
+subject=NULL) ou s'il est assigné à la matière (ClassSubject.teacher). La table est
+reconstruite classe par classe à chaque changement de titulaire ou d'assignation,
+ce qui remplace les OR + jointures sur class_subjects (et le .distinct()) par une
+semi-jointure EXISTS indexée.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from .models import SchoolClass, ClassSubject, TeacherClassAccess
+
+
+def refresh_teacher_access(school_class_ids=None):
+    """
+    Reconstruit les accès des classes données (toutes si None).
+    Retourne le nombre de lignes d'accès créées.
+    """
+    classes = SchoolClass.objects.all()
+    assignments = ClassSubject.objects.filter(teacher__isnull=False)
+    existing = TeacherClassAccess.objects.all()
+    if school_class_ids is not None:
+        school_class_ids = list(school_class_ids)
+        classes = classes.filter(id__in=school_class_ids)
+        assignments = assignments.filter(school_class_id__in=school_class_ids)
+        existing = existing.filter(school_class_id__in=school_class_ids)
+    rows = {
+        (sc_id, titulaire_id, None)
+        for sc_id, titulaire_id in classes.filter(titulaire__isnull=False).values_list('id', 'titulaire_id')
+    }
+    rows.update(
+        (sc_id, teacher_id, subject_id)
+        for sc_id, teacher_id, subject_id in assignments.values_list('school_class_id', 'teacher_id', 'subject_id')
+    )
+    with transaction.atomic():
+        existing.delete()
+        TeacherClassAccess.objects.bulk_create(
+            [TeacherClassAccess(school_class_id=sc, teacher_id=t, subject_id=s) for sc, t, s in rows],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def teacher_access_exists(teacher, class_ref='school_class', subject_ref=None):
+    """
+    Expression EXISTS : l'enseignant a accès à la classe OuterRef(class_ref)
+    (et, si subject_ref est donné, à la matière OuterRef(subject_ref) ou à toute la classe).
+    """
+    access = TeacherClassAccess.objects.filter(teacher=teacher, school_class=OuterRef(class_ref))
+    if subject_ref is not None:
+        access = access.filter(Q(subject__isnull=True) | Q(subject=OuterRef(subject_ref)))
+    return Exists(access)
+
+
+def titulaire_access_exists(teacher, class_ref='school_class'):
+    """Expression EXISTS : l'enseignant est titulaire de la classe OuterRef(class_ref)."""
+    return Exists(TeacherClassAccess.objects.filter(
+        teacher=teacher, school_class=OuterRef(class_ref), subject__isnull=True
+    ))
+
+
+def teacher_can_manage(teacher, school_class, subject=None):
+    """Une seule requête indexée : titulaire de la classe ou assigné à la matière."""
+    access = TeacherClassAccess.objects.filter(teacher=teacher, school_class=school_class)
+    if subject is not None:
+        access = access.filter(Q(subject__isnull=True) | Q(subject=subject))
+    return access.exists()
+
+
+def accessible_class_ids(teacher):
+    """Sous-requête des classes où l'enseignant a au moins un accès (titulaire ou matière assignée)."""
+    return TeacherClassAccess.objects.filter(teacher=teacher).values('school_class_id')
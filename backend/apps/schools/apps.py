@@ -0,0 +1,13 @@
+"""
+Configuration de l'application schools
+"""
+from django.apps import AppConfig
+
+
+class SchoolsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.schools'
+
+    def ready(self):
+        """Import des signaux (carte d'accès enseignants) lors du chargement de l'application"""
+        import apps.schools.signals  # noqa
@@ -0,0 +1,20 @@
+"""
+Reconstruit la carte d'accès enseignants (TeacherClassAccess) à partir des titulaires
+et des assignations ClassSubject.teacher.
+
+Les signaux maintiennent la table à chaque save/delete ; cette commande sert après
+des modifications en masse (QuerySet.update, import SQL) qui ne déclenchent pas les signaux.
+
+Usage:
+  python manage.py refresh_teacher_access
+"""
+from django.core.management.base import BaseCommand
+from apps.schools.access import refresh_teacher_access
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la carte d'accès enseignant → (classe, matière)."
+
+    def handle(self, *args, **options):
+        count = refresh_teacher_access()
+        self.stdout.write(self.style.SUCCESS(f"Accès enseignants reconstruits : {count}"))
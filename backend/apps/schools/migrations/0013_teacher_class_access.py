@@ -0,0 +1,48 @@
+# Carte d'accès enseignant → (classe, matière) dérivée de SchoolClass.titulaire et
+# ClassSubject.teacher, puis remplissage initial à partir des données existantes.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_teacher_access(apps, schema_editor):
+    SchoolClass = apps.get_model('schools', 'SchoolClass')
+    ClassSubject = apps.get_model('schools', 'ClassSubject')
+    TeacherClassAccess = apps.get_model('schools', 'TeacherClassAccess')
+    rows = {
+        (sc_id, titulaire_id, None)
+        for sc_id, titulaire_id in SchoolClass.objects.filter(titulaire__isnull=False).values_list('id', 'titulaire_id')
+    }
+    rows.update(
+        ClassSubject.objects.filter(teacher__isnull=False).values_list('school_class_id', 'teacher_id', 'subject_id')
+    )
+    TeacherClassAccess.objects.bulk_create(
+        [TeacherClassAccess(school_class_id=sc, teacher_id=t, subject_id=s) for sc, t, s in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_middle_name'),
+        ('schools', '0012_add_meeting_groups_and_publication'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherClassAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_access', to='schools.schoolclass', verbose_name='Classe')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='schools.subject', verbose_name='Matière')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_access', to='accounts.teacher', verbose_name='Enseignant')),
+            ],
+            options={
+                'verbose_name': 'Accès enseignant',
+                'verbose_name_plural': 'Accès enseignants',
+                'indexes': [models.Index(fields=['teacher', 'school_class', 'subject'], name='schools_tca_teacher_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_teacher_access, migrations.RunPython.noop),
+    ]
@@ -212,3 +212,32 @@ class ClassSubject(models.Model):
 
     def __str__(self):
         return f"{self.school_class.name} — {self.subject.name} (base: {self.period_max})"
+
+
+class TeacherClassAccess(models.Model):
+    """
+    Carte d'accès enseignant → (classe, matière), dérivée de SchoolClass.titulaire et
+    ClassSubject.teacher et maintenue par signaux (voir apps/schools/access.py).
+    subject=NULL : titulaire de la classe (toutes les matières).
+    Permet de restreindre notes et présences par une simple semi-jointure indexée.
+    """
+    teacher = models.ForeignKey(
+        'accounts.Teacher', on_delete=models.CASCADE, related_name='class_access', verbose_name="Enseignant"
+    )
+    school_class = models.ForeignKey(
+        SchoolClass, on_delete=models.CASCADE, related_name='teacher_access', verbose_name="Classe"
+    )
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name="Matière"
+    )
+
+    class Meta:
+        verbose_name = "Accès enseignant"
+        verbose_name_plural = "Accès enseignants"
+        indexes = [
+            models.Index(fields=['teacher', 'school_class', 'subject'], name='schools_tca_teacher_idx'),
+        ]
+
+    def __str__(self):
+        subject = self.subject.name if self.subject_id else "toutes matières (titulaire)"
+        return f"{self.teacher} — {self.school_class.name} — {subject}"
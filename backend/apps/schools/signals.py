@@ -0,0 +1,47 @@
+"""
+Signals pour maintenir la carte d'accès enseignants (TeacherClassAccess)
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import SchoolClass, ClassSubject
+from .access import refresh_teacher_access
+
+
+@receiver(pre_save, sender=ClassSubject)
+def remember_previous_class(sender, instance, **kwargs):
+    """Mémorise la classe d'origine si une assignation change de classe."""
+    instance._previous_school_class_id = None
+    if instance.pk:
+        instance._previous_school_class_id = (
+            ClassSubject.objects.filter(pk=instance.pk).values_list('school_class_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ClassSubject)
+@receiver(post_delete, sender=ClassSubject)
+def refresh_access_on_class_subject_change(sender, instance, **kwargs):
+    """Assignation d'une matière (ClassSubject.teacher) créée, modifiée ou supprimée."""
+    if kwargs.get('raw'):
+        return
+    class_ids = {instance.school_class_id, getattr(instance, '_previous_school_class_id', None)} - {None}
+    refresh_teacher_access(class_ids)
+
+
+@receiver(pre_save, sender=SchoolClass)
+def remember_previous_titulaire(sender, instance, **kwargs):
+    """Mémorise le titulaire enregistré pour ne reconstruire les accès que s'il change."""
+    instance._previous_titulaire_id = None
+    if instance.pk:
+        instance._previous_titulaire_id = (
+            SchoolClass.objects.filter(pk=instance.pk).values_list('titulaire_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=SchoolClass)
+def refresh_access_on_titulaire_change(sender, instance, created, **kwargs):
+    """Titulaire de la classe défini ou changé."""
+    if kwargs.get('raw'):
+        return
+    if instance.titulaire_id == getattr(instance, '_previous_titulaire_id', None):
+        return
+    refresh_teacher_access([instance.id])
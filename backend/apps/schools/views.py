@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.db.models import Q
 from .models import School, Section, SchoolClass, Subject, ClassSubject, StudentClassEnrollment
+from .access import teacher_access_exists
 from .serializers import (
     SchoolSerializer, SectionSerializer, SchoolClassSerializer, SubjectSerializer, ClassSubjectSerializer,
     StudentClassEnrollmentSerializer,
@@ -93,15 +94,13 @@ class SchoolClassViewSet(viewsets.ModelViewSet):
             teacher = request.user.teacher_profile
         except Exception:
             return Response({'results': []})
-        # Titulaire OU au moins une ClassSubject avec teacher=me
-        teaching_class_ids = ClassSubject.objects.filter(teacher=teacher).values_list('school_class_id', flat=True).distinct()
+        # Titulaire OU au moins une ClassSubject avec teacher=me (carte TeacherClassAccess)
         qs = SchoolClass.objects.filter(
-            Q(titulaire=teacher) | Q(id__in=teaching_class_ids),
+            teacher_access_exists(teacher, 'pk'),
             is_active=True,
         ).select_related('school', 'section', 'titulaire__user')
         if request.user.school:
             qs = qs.filter(school=request.user.school)
-        qs = qs.distinct()
         serializer = self.get_serializer(qs, many=True)
         return Response({'results': serializer.data})
 
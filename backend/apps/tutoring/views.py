@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
+from apps.communication.counters import get_counters
 from .models import TutoringMessage, PedagogicalAdvice, TutoringReport
 from .serializers import (
     TutoringMessageSerializer, PedagogicalAdviceSerializer, TutoringReportSerializer
@@ -66,10 +67,7 @@ class TutoringMessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread messages"""
-        count = TutoringMessage.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).count()
+        count = get_counters(request.user)['tutoring_messages']
         return Response({'unread_count': count})
 
 
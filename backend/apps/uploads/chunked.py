@@ -0,0 +1,238 @@
+"""
+Envois fractionnés et reprenables (init / append / complete).
+
+Le client déclare le fichier (nom, taille, SHA-256), envoie des morceaux d'au plus
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE à l'offset courant, chacun avec son SHA-256, puis termine
+l'envoi : l'empreinte du fichier complet est vérifiée en le relisant par blocs. Les morceaux
+sont écrits directement dans un fichier temporaire (CHUNKED_UPLOAD_DIR) sans jamais charger
+le fichier entier en mémoire. Après une coupure, GET /api/uploads/<id>/ donne l'offset
+à partir duquel reprendre.
+
+Un utilisateur a au plus CHUNKED_UPLOAD_MAX_OPEN_PER_USER envois en cours, totalisant au plus
+CHUNKED_UPLOAD_MAX_OPEN_BYTES_PER_USER octets déclarés (429 au-delà).
+
+Un envoi terminé est utilisé par un champ fichier via `<champ>_upload=<id>` (voir
+uploaded_file) : le fichier assemblé est déplacé dans le stockage, pas recopié en mémoire ;
+il n'est ouvert que si le stockage doit le lire, et refermé après lecture par chunks().
+Les envois abandonnés ou consommés sont supprimés par purge_uploads (tâche périodique).
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from rest_framework.exceptions import ValidationError
+from .models import ChunkedUpload
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """Morceau refusé ; `status` est le code HTTP à renvoyer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def part_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{upload.pk}.part")
+
+
+def start_upload(user, filename, size, checksum):
+    """Déclare un envoi (dans le quota d'envois en cours de l'utilisateur) ; crée le fichier temporaire vide."""
+    if size <= 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f"Taille invalide (maximum {settings.CHUNKED_UPLOAD_MAX_SIZE} octets).")
+    checksum = (checksum or '').lower()
+    if len(checksum) != 64 or any(c not in '0123456789abcdef' for c in checksum):
+        raise UploadError("Empreinte SHA-256 invalide.")
+    with transaction.atomic():
+        # Verrou sur l'utilisateur : deux déclarations simultanées ne dépassent pas le quota
+        get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True).first()
+        current = ChunkedUpload.objects.filter(user=user, status='UPLOADING').aggregate(
+            count=Count('pk'), size=Sum('size'),
+        )
+        if current['count'] >= settings.CHUNKED_UPLOAD_MAX_OPEN_PER_USER:
+            raise UploadError("Trop d'envois en cours : terminez-en ou supprimez-en un.", status=429)
+        if (current['size'] or 0) + size > settings.CHUNKED_UPLOAD_MAX_OPEN_BYTES_PER_USER:
+            raise UploadError("Volume d'envois en cours trop important.", status=429)
+        upload = ChunkedUpload.objects.create(
+            user=user, filename=get_valid_filename(os.path.basename(filename or 'fichier')) or 'fichier',
+            size=size, checksum=checksum,
+        )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload_id, user, offset, chunk, checksum):
+    """
+    Écrit un morceau (fichier envoyé) à `offset`, qui doit être l'offset courant.
+    Le morceau est vérifié pendant l'écriture ; s'il est corrompu le fichier est tronqué.
+    """
+    if not _is_uuid(upload_id):
+        raise UploadError("Envoi introuvable.", status=404)
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(pk=upload_id, user=user).first()
+        if upload is None:
+            raise UploadError("Envoi introuvable.", status=404)
+        if upload.status != 'UPLOADING':
+            raise UploadError("Envoi déjà terminé.", status=409)
+        if offset != upload.offset:
+            raise UploadError("Offset inattendu.", status=409)
+        if chunk.size > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE or upload.offset + chunk.size > upload.size:
+            raise UploadError("Morceau trop grand.")
+
+        digest = hashlib.sha256()
+        with open(part_path(upload), 'r+b') as part:
+            part.seek(upload.offset)
+            for block in chunk.chunks(READ_BLOCK_SIZE):
+                digest.update(block)
+                part.write(block)
+            if digest.hexdigest() != (checksum or '').lower():
+                part.truncate(upload.offset)
+                raise UploadError("Empreinte du morceau invalide.")
+            part.truncate(upload.offset + chunk.size)
+        upload.offset += chunk.size
+        upload.save(update_fields=['offset', 'updated_at'])
+    return upload
+
+
+def complete_upload(upload_id, user):
+    """Vérifie la taille et l'empreinte du fichier assemblé (lu par blocs)."""
+    if not _is_uuid(upload_id):
+        raise UploadError("Envoi introuvable.", status=404)
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(pk=upload_id, user=user).first()
+        if upload is None:
+            raise UploadError("Envoi introuvable.", status=404)
+        if upload.status == 'COMPLETE':
+            return upload
+        if upload.offset != upload.size:
+            raise UploadError("Envoi incomplet.", status=409)
+        digest = hashlib.sha256()
+        with open(part_path(upload), 'rb') as part:
+            for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+                digest.update(block)
+        if digest.hexdigest() != upload.checksum:
+            raise UploadError("Empreinte du fichier invalide.")
+        upload.status = 'COMPLETE'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload
+
+
+def discard_upload(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+class AssembledFile(File):
+    """
+    Fichier assemblé d'un envoi terminé. temporary_file_path permet au stockage local
+    de déplacer le fichier (comme TemporaryUploadedFile) au lieu de le recopier : il n'est
+    alors jamais ouvert. Un autre stockage l'ouvre au premier accès ; chunks() le referme.
+    """
+
+    def __init__(self, upload):
+        self.upload = upload
+        self._path = part_path(upload)
+        self._file = None
+        super().__init__(None, name=upload.filename)
+        self.size = upload.size
+
+    @property
+    def file(self):
+        if self._file is None:
+            self._file = open(self._path, 'rb')
+        return self._file
+
+    @file.setter
+    def file(self, value):
+        self._file = value
+
+    @property
+    def closed(self):
+        return self._file is None or self._file.closed
+
+    def open(self, mode=None):
+        if self.closed:
+            self._file = open(self._path, mode or 'rb')
+        else:
+            self.seek(0)
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def chunks(self, chunk_size=None):
+        try:
+            yield from super().chunks(chunk_size)
+        finally:
+            self.close()
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def claim_upload(user, upload_id, field='file'):
+    """
+    Fichier d'un envoi terminé de l'utilisateur, à affecter à un champ fichier
+    (ValidationError sinon). Le stockage local déplace le fichier assemblé : l'envoi
+    ne peut plus être réutilisé et sa ligne est supprimée par purge_uploads.
+    """
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user=user, status='COMPLETE').first() \
+        if _is_uuid(upload_id) else None
+    if upload is None or not os.path.exists(part_path(upload)):
+        raise ValidationError({f'{field}_upload': "Envoi introuvable ou non terminé."})
+    return AssembledFile(upload)
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def uploaded_file(request, field):
+    """
+    Fichier du champ `field` de la requête : envoi multipart classique, ou envoi
+    fractionné terminé désigné par `<field>_upload`. None si aucun.
+    """
+    if field in request.FILES:
+        return request.FILES[field]
+    upload_id = request.data.get(f'{field}_upload')
+    if not upload_id:
+        return None
+    return claim_upload(request.user, upload_id, field)
+
+
+def chunked_upload_fields(request, *fields):
+    """{champ: fichier} des envois fractionnés désignés dans la requête (pour serializer.save)."""
+    return {
+        field: claim_upload(request.user, request.data[f'{field}_upload'], field)
+        for field in fields
+        if field not in request.FILES and request.data.get(f'{field}_upload')
+    }
+
+
+def purge_uploads(older_than_hours=None):
+    """Supprime les envois abandonnés ou consommés (non modifiés depuis CHUNKED_UPLOAD_EXPIRE_HOURS)."""
+    hours = settings.CHUNKED_UPLOAD_EXPIRE_HOURS if older_than_hours is None else older_than_hours
+    expired = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for upload in expired.iterator():
+        discard_upload(upload)
+        count += 1
+    return count
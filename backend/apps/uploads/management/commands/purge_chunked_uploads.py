@@ -0,0 +1,20 @@
+"""
+Supprime les envois fractionnés abandonnés ou déjà utilisés (fichiers temporaires compris).
+
+Usage:
+  python manage.py purge_chunked_uploads               # plus vieux que CHUNKED_UPLOAD_EXPIRE_HOURS
+  python manage.py purge_chunked_uploads --hours 6
+"""
+from django.core.management.base import BaseCommand
+from apps.uploads.chunked import purge_uploads
+
+
+class Command(BaseCommand):
+    help = "Supprime les envois fractionnés inactifs et leurs fichiers temporaires."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help="Inactivité minimale en heures (défaut : CHUNKED_UPLOAD_EXPIRE_HOURS)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"{purge_uploads(options['hours'])} envoi(s) supprimé(s)"))
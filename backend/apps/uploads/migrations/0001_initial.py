@@ -0,0 +1,37 @@
+# Envois fractionnés (init / append / complete)
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('size', models.BigIntegerField(verbose_name='Taille (octets)')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Empreinte SHA-256')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('status', models.CharField(choices=[('UPLOADING', 'En cours'), ('COMPLETE', 'Terminé')], default='UPLOADING', max_length=20, verbose_name='Statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Envoi fractionné',
+                'verbose_name_plural': 'Envois fractionnés',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['updated_at'], name='uploads_chunked_updated_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+"""
+Chunked upload models (envois fractionnés et reprenables)
+"""
+import uuid
+from django.db import models
+
+
+class ChunkedUpload(models.Model):
+    """Envoi fractionné en cours ou terminé (fichier assemblé dans CHUNKED_UPLOAD_DIR)"""
+    STATUS_CHOICES = [
+        ('UPLOADING', 'En cours'),
+        ('COMPLETE', 'Terminé'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='chunked_uploads',
+                             verbose_name="Utilisateur")
+    filename = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    size = models.BigIntegerField(verbose_name="Taille (octets)")
+    checksum = models.CharField(max_length=64, verbose_name="Empreinte SHA-256")
+    offset = models.BigIntegerField(default=0, verbose_name="Octets reçus")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='UPLOADING', verbose_name="Statut")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Envoi fractionné"
+        verbose_name_plural = "Envois fractionnés"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='uploads_chunked_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from .models import ChunkedUpload
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'filename', 'size', 'checksum', 'offset', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'status', 'created_at', 'updated_at']
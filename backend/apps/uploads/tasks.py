@@ -0,0 +1,11 @@
+"""
+Celery tasks for chunked uploads
+"""
+from celery import shared_task
+
+
+@shared_task
+def purge_chunked_uploads():
+    """Delete abandoned or consumed chunked uploads and their temporary files (periodic task)"""
+    from .chunked import purge_uploads
+    return purge_uploads()
@@ -0,0 +1,72 @@
+from django.conf import settings
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.response import Response
+from .chunked import UploadError, append_chunk, complete_upload, discard_upload, start_upload
+from .models import ChunkedUpload
+from .serializers import ChunkedUploadSerializer
+
+
+class ChunkedUploadViewSet(mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Envoi fractionné et reprenable :
+      POST   /api/uploads/                 {filename, size, checksum}  -> envoi (offset 0)
+      POST   /api/uploads/<id>/append/     multipart chunk, offset, checksum du morceau
+      POST   /api/uploads/<id>/complete/   vérifie l'empreinte du fichier complet
+      GET    /api/uploads/<id>/            offset à partir duquel reprendre
+      DELETE /api/uploads/<id>/            abandon
+    L'id d'un envoi terminé s'utilise ensuite comme `<champ>_upload` (book_file_upload, ...).
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def _error(self, error, upload_id=None):
+        data = {'error': str(error)}
+        if error.status == 409 and upload_id:
+            upload = ChunkedUpload.objects.filter(pk=upload_id, user=self.request.user).first()
+            if upload:
+                data['offset'] = upload.offset
+        return Response(data, status=error.status)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = start_upload(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return self._error(e)
+        data = self.get_serializer(upload).data
+        data['chunk_size'] = settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def append(self, request, pk=None):
+        """Ajoute un morceau à l'offset courant (409 + offset attendu sinon)."""
+        chunk = request.FILES.get('chunk')
+        if chunk is None:
+            return Response({'error': 'Morceau manquant (champ chunk).'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            offset = int(request.data.get('offset', -1))
+            upload = append_chunk(pk, request.user, offset, chunk, request.data.get('checksum'))
+        except ValueError:
+            return Response({'error': 'Offset invalide.'}, status=status.HTTP_400_BAD_REQUEST)
+        except UploadError as e:
+            return self._error(e, pk)
+        return Response(self.get_serializer(upload).data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Termine l'envoi après vérification de la taille et de l'empreinte SHA-256."""
+        try:
+            upload = complete_upload(pk, request.user)
+        except UploadError as e:
+            return self._error(e, pk)
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
@@ -1,5 +1,19 @@
 """
 ASGI config for e-school-management project.
+
+L'API classique reste servie par gunicorn WSGI (process `web` du Procfile). Le process
+`push` sert la même application en ASGI (uvicorn) pour le flux temps réel
+/api/communication/stream/. Les écritures des workers WSGI atteignent les flux par Redis
+(PUSH_BACKEND='redis', défaut ; PUSH_ENABLED suit la présence d'un Redis).
+
+Routage, selon la plateforme :
+- proxy devant les deux process (nginx...) : router /api/communication/stream/ vers `push`,
+  le reste vers `web` ;
+- Heroku, Railway... (seul le process `web` reçoit le HTTP, $PORT compris) : déployer `push`
+  comme service séparé avec son propre domaine et y pointer les clients du flux, ou servir
+  tout depuis `web` en ASGI :
+  gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
+  (les vues synchrones de l'API tournent alors dans le pool de threads d'asgiref).
 """
 import os
 from pathlib import Path
@@ -47,5 +47,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # Requêtes coûteuses relevées par QueryInstrumentationMiddleware
+        'apps.monitoring': {
+            'handlers': ['console', 'file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
@@ -42,18 +42,22 @@ INSTALLED_APPS = [
     
     # Local apps
     'apps.accounts.apps.AccountsConfig',
-    'apps.schools',
+    'apps.schools.apps.SchoolsConfig',
     'apps.enrollment',
     'apps.academics',
     'apps.elearning',
     'apps.library',
     'apps.payments',
-    'apps.communication',
+    'apps.communication.apps.CommunicationConfig',
     'apps.meetings',
     'apps.tutoring',
+    'apps.monitoring',
+    'apps.uploads',
 ]
 
 MIDDLEWARE = [
+    # Instrumentation requêtes SQL / latence par endpoint (opt-in : QUERY_INSTRUMENTATION_ENABLED)
+    'apps.monitoring.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -320,9 +324,84 @@ CSRF_USE_SESSIONS = False  # Utiliser les cookies CSRF (pas les sessions)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Envois fractionnés (api/uploads/) : morceaux écrits dans CHUNKED_UPLOAD_DIR puis déplacés dans le stockage
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=str(BASE_DIR / 'tmp' / 'chunked_uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=500 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = config('CHUNKED_UPLOAD_MAX_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_EXPIRE_HOURS = config('CHUNKED_UPLOAD_EXPIRE_HOURS', default=24, cast=int)
+# Quota d'envois en cours par utilisateur (nombre et octets déclarés)
+CHUNKED_UPLOAD_MAX_OPEN_PER_USER = config('CHUNKED_UPLOAD_MAX_OPEN_PER_USER', default=5, cast=int)
+CHUNKED_UPLOAD_MAX_OPEN_BYTES_PER_USER = config(
+    'CHUNKED_UPLOAD_MAX_OPEN_BYTES_PER_USER', default=1024 * 1024 * 1024, cast=int
+)
+# Passage périodique de purge_chunked_uploads (CELERY_BEAT_SCHEDULE)
+CHUNKED_UPLOAD_PURGE_SECONDS = config('CHUNKED_UPLOAD_PURGE_SECONDS', default=3600, cast=int)
+
+# Cache : Redis si REDIS_CACHE_URL est défini (partagé entre workers), sinon mémoire locale
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Instrumentation des requêtes (apps.monitoring) : nombre de requêtes SQL, temps DB,
+# requêtes dupliquées (N+1) et temps total par endpoint. Rapport : /api/monitoring/endpoints/
+# ou python manage.py query_report
+QUERY_INSTRUMENTATION_ENABLED = config('QUERY_INSTRUMENTATION_ENABLED', default=False, cast=bool)
+QUERY_COUNT_WARNING_THRESHOLD = config('QUERY_COUNT_WARNING_THRESHOLD', default=50, cast=int)
+QUERY_DUPLICATE_WARNING_THRESHOLD = config('QUERY_DUPLICATE_WARNING_THRESHOLD', default=10, cast=int)
+SLOW_REQUEST_WARNING_MS = config('SLOW_REQUEST_WARNING_MS', default=1000, cast=int)
+QUERY_INSTRUMENTATION_FLUSH_SECONDS = config('QUERY_INSTRUMENTATION_FLUSH_SECONDS', default=30, cast=int)
+
+# Flux temps réel (SSE / long-poll, apps.communication.push) servi par ASGI (routage : config/asgi.py).
+# Activé par défaut seulement si un Redis est configuré (REDIS_CACHE_URL ou PUSH_REDIS_URL) : sans
+# lui chaque écriture tenterait une publication vers un Redis absent.
+# PUSH_BACKEND : 'redis' (défaut, obligatoire avec les process web WSGI + push ASGI du Procfile)
+# ou 'memory' (un seul processus ASGI qui reçoit les écritures et sert les flux : PUSH_SINGLE_PROCESS=True)
+PUSH_REDIS_URL = config('PUSH_REDIS_URL', default=REDIS_CACHE_URL or 'redis://localhost:6379/1')
+PUSH_ENABLED = config(
+    'PUSH_ENABLED', default=bool(REDIS_CACHE_URL or config('PUSH_REDIS_URL', default='')), cast=bool
+)
+PUSH_BACKEND = config('PUSH_BACKEND', default='redis')
+PUSH_SINGLE_PROCESS = config('PUSH_SINGLE_PROCESS', default=False, cast=bool)
+# Délai de connexion / lecture Redis (secondes) : une publication (au commit d'une écriture) n'attend
+# jamais plus ; les lectures bloquantes du flux y ajoutent leur propre attente
+PUSH_REDIS_TIMEOUT = config('PUSH_REDIS_TIMEOUT', default=1.0, cast=float)
+PUSH_HEARTBEAT_SECONDS = config('PUSH_HEARTBEAT_SECONDS', default=15, cast=int)
+PUSH_STREAM_MAX_SECONDS = config('PUSH_STREAM_MAX_SECONDS', default=300, cast=int)
+PUSH_LONG_POLL_TIMEOUT = config('PUSH_LONG_POLL_TIMEOUT', default=25, cast=int)
+PUSH_RETRY_MS = config('PUSH_RETRY_MS', default=3000, cast=int)
+PUSH_QUEUE_SIZE = config('PUSH_QUEUE_SIZE', default=100, cast=int)
+# Tampon de reprise par utilisateur (?since= / Last-Event-ID) : derniers événements et durée de conservation
+PUSH_BUFFER_SIZE = config('PUSH_BUFFER_SIZE', default=200, cast=int)
+PUSH_BUFFER_SECONDS = config('PUSH_BUFFER_SECONDS', default=3600, cast=int)
+
 # Celery Configuration (for async tasks)
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
+# Tâches de communication (diffusion des annonces, envois SMS/WhatsApp) via Celery. False (dev sans
+# broker) : rien n'est envoyé dans la requête, les logs restent PENDING jusqu'au passage du processus
+# delivery du Procfile (python manage.py run_delivery_worker)
+COMMUNICATION_TASKS_ASYNC = config('COMMUNICATION_TASKS_ASYNC', default=False, cast=bool)
+# Diffusion des annonces publiées, toujours hors requête : 'celery', 'thread' (pool du processus
+# web) ou 'sync' (au commit de la requête). Défaut : 'celery' si COMMUNICATION_TASKS_ASYNC, sinon 'thread'
+ANNOUNCEMENT_FANOUT_MODE = config(
+    'ANNOUNCEMENT_FANOUT_MODE', default='celery' if COMMUNICATION_TASKS_ASYNC else 'thread'
+)
+# Taille des tranches de destinataires (bulk_create) lors de la diffusion d'une annonce
+ANNOUNCEMENT_FANOUT_CHUNK_SIZE = config('ANNOUNCEMENT_FANOUT_CHUNK_SIZE', default=1000, cast=int)
+# Diffusion publiée, inachevée et sans progrès depuis ce délai : relancée par resume_announcement_fanouts
+ANNOUNCEMENT_FANOUT_STALLED_SECONDS = config('ANNOUNCEMENT_FANOUT_STALLED_SECONDS', default=300, cast=int)
+ANNOUNCEMENT_FANOUT_RESUME_INTERVAL = config('ANNOUNCEMENT_FANOUT_RESUME_INTERVAL', default=300, cast=int)
 
 # Payment Gateway (Stripe)
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
@@ -333,6 +412,104 @@ TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 
+# Worker de livraison SMS/WhatsApp (apps.communication.delivery)
+# SMS_PROVIDER : 'twilio' ou 'fake' (fournisseur local pour tests et mesures de débit)
+SMS_PROVIDER = config('SMS_PROVIDER', default='twilio')
+DELIVERY_BATCH_SIZE = config('DELIVERY_BATCH_SIZE', default=100, cast=int)
+DELIVERY_WORKER_THREADS = config('DELIVERY_WORKER_THREADS', default=4, cast=int)
+# Messages / seconde par fournisseur (0 = débit par défaut du fournisseur)
+DELIVERY_RATE_LIMIT = config('DELIVERY_RATE_LIMIT', default=0, cast=float)
+DELIVERY_MAX_ATTEMPTS = config('DELIVERY_MAX_ATTEMPTS', default=5, cast=int)
+DELIVERY_RETRY_BASE_SECONDS = config('DELIVERY_RETRY_BASE_SECONDS', default=30, cast=int)
+DELIVERY_RETRY_MAX_SECONDS = config('DELIVERY_RETRY_MAX_SECONDS', default=3600, cast=int)
+DELIVERY_LEASE_SECONDS = config('DELIVERY_LEASE_SECONDS', default=300, cast=int)
+DELIVERY_HTTP_TIMEOUT = config('DELIVERY_HTTP_TIMEOUT', default=10, cast=int)
+# Passage périodique de process_delivery_queue (beat) : retries échus et logs laissés PENDING
+DELIVERY_QUEUE_INTERVAL = config('DELIVERY_QUEUE_INTERVAL', default=60, cast=int)
+FAKE_PROVIDER_LATENCY_MS = config('FAKE_PROVIDER_LATENCY_MS', default=50, cast=int)
+FAKE_PROVIDER_FAILURE_RATE = config('FAKE_PROVIDER_FAILURE_RATE', default=0.0, cast=float)
+# Derniers messages gardés en mémoire par FakeProvider (sent), pour les tests et le benchmark
+FAKE_PROVIDER_SENT_MAX = config('FAKE_PROVIDER_SENT_MAX', default=1000, cast=int)
+
+# Résumé parent (notes, présences, paiements) : une notification / un SMS par parent et par
+# fenêtre de DIGEST_WINDOW_HOURS au lieu d'un message par événement (commande send_parent_digests)
+DIGEST_ENABLED = config('DIGEST_ENABLED', default=True, cast=bool)
+DIGEST_WINDOW_HOURS = config('DIGEST_WINDOW_HOURS', default=24, cast=int)
+DIGEST_SEND_SMS = config('DIGEST_SEND_SMS', default=True, cast=bool)
+
+# Correction automatique des réponses texte : nombre maximal de mots comparés par réponse
+SIMILARITY_MAX_TOKENS = config('SIMILARITY_MAX_TOKENS', default=2000, cast=int)
+
+# Analyse d'items des quiz / devoirs : durée maximale du cache (invalidé à chaque soumission).
+# L'invalidation passe par le cache : activé par défaut seulement avec un cache partagé (REDIS_CACHE_URL),
+# la mémoire locale garderait l'analyse périmée dans les autres workers
+ITEM_ANALYSIS_CACHE_ENABLED = config('ITEM_ANALYSIS_CACHE_ENABLED', default=bool(REDIS_CACHE_URL), cast=bool)
+ITEM_ANALYSIS_CACHE_SECONDS = config('ITEM_ANALYSIS_CACHE_SECONDS', default=86400, cast=int)
+
+# Correction automatique des devoirs hors requête : 'celery', 'thread' (pool du processus web)
+# ou 'sync' (au commit de la requête) ; regrade_assignment corrige par lots de ASSIGNMENT_REGRADE_CHUNK_SIZE
+ASSIGNMENT_GRADING_MODE = config('ASSIGNMENT_GRADING_MODE', default='thread')
+ASSIGNMENT_GRADING_THREADS = config('ASSIGNMENT_GRADING_THREADS', default=2, cast=int)
+ASSIGNMENT_REGRADE_CHUNK_SIZE = config('ASSIGNMENT_REGRADE_CHUNK_SIZE', default=200, cast=int)
+# Corrections en file depuis plus longtemps reprises par grade_pending_submissions (redémarrage, tâche perdue),
+# tâche périodique lancée à ce même intervalle (CELERY_BEAT_SCHEDULE)
+ASSIGNMENT_GRADING_SWEEP_SECONDS = config('ASSIGNMENT_GRADING_SWEEP_SECONDS', default=600, cast=int)
+
+# Brouillons des tentatives de quiz (autosauvegarde) : conservés en cache QUIZ_DRAFT_TTL_SECONDS,
+# copiés en base au plus une fois par QUIZ_DRAFT_WRITE_BEHIND_SECONDS (rattrapage : flush_quiz_drafts).
+# Cache partagé obligatoire avec plusieurs workers (REDIS_CACHE_URL) : brouillons et verrou de fusion y sont tenus.
+# Sans lui (QUIZ_DRAFT_CACHE_ENABLED=False, défaut sans REDIS_CACHE_URL) chaque autosauvegarde écrit en base
+QUIZ_DRAFT_CACHE_ENABLED = config('QUIZ_DRAFT_CACHE_ENABLED', default=bool(REDIS_CACHE_URL), cast=bool)
+QUIZ_DRAFT_TTL_SECONDS = config('QUIZ_DRAFT_TTL_SECONDS', default=86400, cast=int)
+QUIZ_DRAFT_WRITE_BEHIND_SECONDS = config('QUIZ_DRAFT_WRITE_BEHIND_SECONDS', default=30, cast=int)
+# Passage périodique de flush_quiz_drafts (CELERY_BEAT_SCHEDULE)
+QUIZ_DRAFT_FLUSH_SECONDS = config('QUIZ_DRAFT_FLUSH_SECONDS', default=60, cast=int)
+
+# Couvertures / vignettes des livres générées hors requête : 'celery', 'thread' ou 'sync'
+BOOK_COVER_MODE = config('BOOK_COVER_MODE', default='thread')
+BOOK_COVER_THREADS = config('BOOK_COVER_THREADS', default=1, cast=int)
+
+# Téléchargement des livres : 'django' (Range servi par le worker), 'nginx' (X-Accel-Redirect)
+# ou 'sendfile' (X-Sendfile). FILE_SERVING_ACCEL_PREFIX : location nginx interne sur MEDIA_ROOT
+FILE_SERVING_BACKEND = config('FILE_SERVING_BACKEND', default='django')
+FILE_SERVING_ACCEL_PREFIX = config('FILE_SERVING_ACCEL_PREFIX', default='/protected-media/')
+FILE_SERVING_CHUNK_SIZE = config('FILE_SERVING_CHUNK_SIZE', default=64 * 1024, cast=int)
+
+# Liseuse : rendu des pages PDF à la demande, cache disque LRU borné et pré-rendu des pages suivantes
+BOOK_PAGE_CACHE_DIR = config('BOOK_PAGE_CACHE_DIR', default=str(BASE_DIR / 'tmp' / 'book_pages'))
+BOOK_PAGE_CACHE_MAX_BYTES = config('BOOK_PAGE_CACHE_MAX_BYTES', default=1024 * 1024 * 1024, cast=int)
+BOOK_PAGE_CACHE_RESCAN_SECONDS = config('BOOK_PAGE_CACHE_RESCAN_SECONDS', default=300, cast=int)
+BOOK_PAGE_PREFETCH = config('BOOK_PAGE_PREFETCH', default=2, cast=int)
+BOOK_PAGE_RENDER_THREADS = config('BOOK_PAGE_RENDER_THREADS', default=2, cast=int)
+BOOK_PAGE_MAX_ZOOM = config('BOOK_PAGE_MAX_ZOOM', default=3.0, cast=float)
+BOOK_PAGE_BROWSER_CACHE_SECONDS = config('BOOK_PAGE_BROWSER_CACHE_SECONDS', default=86400, cast=int)
+
+# Compteurs de vues / téléchargements des livres : tampon en mémoire vidé en base périodiquement,
+# hors requête par un thread de chaque processus ('thread') ou par la requête qui le remplit ('sync')
+BOOK_COUNTER_FLUSH_MODE = config('BOOK_COUNTER_FLUSH_MODE', default='thread')
+BOOK_COUNTER_FLUSH_SECONDS = config('BOOK_COUNTER_FLUSH_SECONDS', default=30, cast=int)
+BOOK_COUNTER_MAX_PENDING = config('BOOK_COUNTER_MAX_PENDING', default=500, cast=int)
+
+# Recherche plein texte dans les livres : indexation hors requête ('celery', 'thread' ou 'sync')
+BOOK_INDEX_MODE = config('BOOK_INDEX_MODE', default='thread')
+BOOK_INDEX_THREADS = config('BOOK_INDEX_THREADS', default=1, cast=int)
+BOOK_SEARCH_MAX_POSTINGS = config('BOOK_SEARCH_MAX_POSTINGS', default=20000, cast=int)
+
+# Synchronisation hors ligne des liseuses : marge du watermark (écritures concurrentes) et
+# conservation des suppressions ; un appareil plus ancien reçoit l'état complet (purge_sync_tombstones)
+BOOK_SYNC_WATERMARK_MARGIN_SECONDS = config('BOOK_SYNC_WATERMARK_MARGIN_SECONDS', default=60, cast=int)
+BOOK_SYNC_TOMBSTONE_RETENTION_DAYS = config('BOOK_SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+
+# Catalogue élève de la bibliothèque mis en cache par classe (invalidé à chaque changement de livre).
+# L'invalidation passe par le cache : activé par défaut seulement avec un cache partagé (REDIS_CACHE_URL),
+# la mémoire locale n'invaliderait que le processus qui a modifié le livre
+BOOK_CATALOG_CACHE_ENABLED = config('BOOK_CATALOG_CACHE_ENABLED', default=bool(REDIS_CACHE_URL), cast=bool)
+BOOK_CATALOG_CACHE_SECONDS = config('BOOK_CATALOG_CACHE_SECONDS', default=300, cast=int)
+
+# Archivage des notifications / logs SMS-WhatsApp (commande archive_communication)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+ARCHIVE_CHUNK_SIZE = config('ARCHIVE_CHUNK_SIZE', default=1000, cast=int)
+
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
@@ -346,6 +523,39 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@eschool.rdc')
 DEFAULT_PARENT_PASSWORD = config('DEFAULT_PARENT_PASSWORD', default='Parent@@')
 DEFAULT_STUDENT_PASSWORD = config('DEFAULT_STUDENT_PASSWORD', default='Eleve@@')
 
+# Hachage des mots de passe en masse (import d'élèves, set_default_passwords) :
+# nombre de processus du pool (0 = un par cœur CPU)
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0, cast=int)
+
+# Import d'élèves lancé depuis l'API (hors dry_run) : exécuté hors requête, 'celery', 'thread'
+# (un thread du processus web) ou 'sync' (au commit de la requête) ; statut dans StudentImportJob
+STUDENT_IMPORT_MODE = config('STUDENT_IMPORT_MODE', default='thread')
+
+# Tâches périodiques (processus clock du Procfile : celery -A config beat, avec le processus worker),
+# intervalles en secondes
+CELERY_BEAT_SCHEDULE = {
+    'resume-announcement-fanouts': {
+        'task': 'apps.communication.tasks.resume_announcement_fanouts',
+        'schedule': ANNOUNCEMENT_FANOUT_RESUME_INTERVAL,
+    },
+    'process-delivery-queue': {
+        'task': 'apps.communication.tasks.process_delivery_queue',
+        'schedule': DELIVERY_QUEUE_INTERVAL,
+    },
+    'grade-pending-submissions': {
+        'task': 'apps.elearning.tasks.grade_pending_submissions',
+        'schedule': ASSIGNMENT_GRADING_SWEEP_SECONDS,
+    },
+    'flush-quiz-drafts': {
+        'task': 'apps.elearning.tasks.flush_quiz_drafts',
+        'schedule': QUIZ_DRAFT_FLUSH_SECONDS,
+    },
+    'purge-chunked-uploads': {
+        'task': 'apps.uploads.tasks.purge_chunked_uploads',
+        'schedule': CHUNKED_UPLOAD_PURGE_SECONDS,
+    },
+}
+
 # Logging
 LOGGING_CONFIG = None
 import logging.config
@@ -55,6 +55,8 @@ urlpatterns = [
     path('api/communication/', include('apps.communication.urls')),
     path('api/meetings/', include('apps.meetings.urls')),
     path('api/tutoring/', include('apps.tutoring.urls')),
+    path('api/monitoring/', include('apps.monitoring.urls')),
+    path('api/uploads/', include('apps.uploads.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,41 @@
+"""
+Shared pytest hooks
+"""
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def in_memory_push_backend(django_db_setup):
+    """Tests dans un seul processus : flux temps réel en mémoire plutôt que Redis."""
+    from django.test.utils import override_settings
+    from apps.communication import pubsub
+    with override_settings(PUSH_ENABLED=True, PUSH_BACKEND='memory', PUSH_SINGLE_PROCESS=True):
+        pubsub._backend = None
+        yield
+    pubsub._backend = None
+
+
+@pytest.fixture(autouse=True)
+def discard_book_counters():
+    """
+    Le tampon des compteurs de livres est global au processus : vidé après chaque test, et
+    écrit par les requêtes des tests plutôt que par le thread (autre connexion à la base).
+    """
+    from django.test.utils import override_settings
+    with override_settings(BOOK_COUNTER_FLUSH_MODE='sync'):
+        yield
+    from apps.library.counters import discard_pending
+    discard_pending()
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Affiche le tableau des benchmarks d'endpoints (tests/test_benchmarks.py) s'ils ont tourné."""
+    from .test_benchmarks import BENCHMARK_RESULTS
+    if not BENCHMARK_RESULTS:
+        return
+    terminalreporter.write_sep('-', 'endpoint benchmarks')
+    for r in BENCHMARK_RESULTS:
+        terminalreporter.write_line(
+            f"{r['name']:<22} {r['median_ms']:>9.1f} ms  {r['queries']:>4} requêtes (budget {r['budget']})"
+            f"  [{r['students']} élèves]"
+        )
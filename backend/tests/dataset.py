@@ -0,0 +1,186 @@
+"""
+Générateur d'un jeu de données d'école synthétique (classes, matières, élèves, parents,
+une année de présences, bulletins, paiements, mouvements de caisse) à échelle configurable.
+
+Les objets sont construits avec les factories (build) puis insérés avec bulk_create :
+plusieurs milliers d'élèves se génèrent en quelques secondes.
+
+Échelle configurable par variables d'environnement (voir DatasetScale.from_env), ex. :
+    BENCHMARK_CLASSES=20 BENCHMARK_STUDENTS_PER_CLASS=50 BENCHMARK_ATTENDANCE_DAYS=180 pytest tests/test_benchmarks.py
+"""
+import os
+import random
+from dataclasses import dataclass, field, fields
+from datetime import date, timedelta
+from decimal import Decimal
+from django.utils import timezone
+from apps.accounts.models import User, Parent, Student
+from apps.schools.models import ClassSubject, StudentClassEnrollment
+from apps.academics.models import Attendance, GradeBulletin, ReportCard
+from apps.payments.models import Payment, CashMovement
+from .factories import (
+    ACADEMIC_YEAR, SchoolFactory, UserFactory, TeacherFactory, SchoolClassFactory, SubjectFactory,
+    ClassSubjectFactory, StudentFactory, AttendanceFactory, GradeBulletinFactory, PaymentFactory,
+    CashMovementFactory,
+)
+
+ATTENDANCE_STATUSES = ['PRESENT'] * 17 + ['ABSENT', 'LATE', 'EXCUSED']
+BATCH_SIZE = 2000
+
+
+@dataclass
+class DatasetScale:
+    classes: int = 3
+    students_per_class: int = 20
+    subjects_per_class: int = 8
+    attendance_days: int = 40
+    children_per_parent: int = 2
+    payments_per_student: int = 2
+    cash_movements: int = 200
+
+    @classmethod
+    def from_env(cls, prefix='BENCHMARK_'):
+        values = {}
+        for f in fields(cls):
+            raw = os.environ.get(f"{prefix}{f.name.upper()}")
+            if raw:
+                values[f.name] = int(raw)
+        return cls(**values)
+
+    @property
+    def students(self):
+        return self.classes * self.students_per_class
+
+
+@dataclass
+class SchoolDataset:
+    school: object
+    admin: object
+    accountant: object
+    classes: list = field(default_factory=list)
+    subjects: list = field(default_factory=list)
+    titulaires: list = field(default_factory=list)
+    students: list = field(default_factory=list)
+    parents: list = field(default_factory=list)
+
+
+def school_days(start, count):
+    """Les `count` premiers jours ouvrables (lundi-vendredi) à partir de start."""
+    days, current = [], start
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def build_school_dataset(scale=None, seed=42):
+    """Construit une école complète et retourne un SchoolDataset."""
+    scale = scale or DatasetScale()
+    rng = random.Random(seed)
+    school = SchoolFactory()
+    admin = UserFactory(school=school, role='ADMIN', username=f"admin.{school.code.lower()}")
+    accountant = UserFactory(school=school, role='ACCOUNTANT', username=f"compta.{school.code.lower()}")
+    data = SchoolDataset(school=school, admin=admin, accountant=accountant)
+
+    data.subjects = [SubjectFactory(school=school) for _ in range(scale.subjects_per_class)]
+    for i in range(scale.classes):
+        titulaire = TeacherFactory(user__school=school)
+        school_class = SchoolClassFactory(school=school, titulaire=titulaire)
+        data.titulaires.append(titulaire)
+        data.classes.append(school_class)
+        for subject in data.subjects:
+            ClassSubjectFactory(school_class=school_class, subject=subject, teacher=titulaire)
+
+    # Parents puis élèves : Users en bulk, profils en bulk
+    n_parents = max(1, scale.students // max(1, scale.children_per_parent))
+    parent_users = User.objects.bulk_create(
+        [UserFactory.build(school=school, role='PARENT', phone=f"+24381{i:07d}") for i in range(n_parents)],
+        batch_size=BATCH_SIZE,
+    )
+    Parent.objects.bulk_create([Parent(user=u) for u in parent_users], batch_size=BATCH_SIZE)
+    data.parents = parent_users
+
+    student_users = User.objects.bulk_create(
+        [UserFactory.build(school=school, role='STUDENT') for _ in range(scale.students)],
+        batch_size=BATCH_SIZE,
+    )
+    students = []
+    for i, user in enumerate(student_users):
+        students.append(StudentFactory.build(
+            user=user,
+            school_class=data.classes[i // scale.students_per_class],
+            parent=parent_users[i % n_parents],
+        ))
+    data.students = Student.objects.bulk_create(students, batch_size=BATCH_SIZE)
+    StudentClassEnrollment.objects.bulk_create(
+        [StudentClassEnrollment(student=s, school_class=s.school_class, status='active') for s in data.students],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Une année (scale.attendance_days jours ouvrables) de présences quotidiennes
+    days = school_days(date(2024, 9, 2), scale.attendance_days)
+    Attendance.objects.bulk_create(
+        (
+            AttendanceFactory.build(
+                student=s, school_class=s.school_class, date=d,
+                status=rng.choice(ATTENDANCE_STATUSES), teacher=s.school_class.titulaire,
+            )
+            for s in data.students for d in days
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    # Bulletins RDC : bulk_create ne passe pas par save(), les totaux sont calculés ici
+    bulletins = []
+    for s in data.students:
+        for subject in data.subjects:
+            b = GradeBulletinFactory.build(
+                student=s, subject=subject, school_class=s.school_class, teacher=s.school_class.titulaire,
+                s1_p1=Decimal(rng.randint(6, 20)), s1_p2=Decimal(rng.randint(6, 20)),
+                s1_exam=Decimal(rng.randint(12, 40)), s2_p3=Decimal(rng.randint(6, 20)),
+                s2_p4=Decimal(rng.randint(6, 20)), s2_exam=Decimal(rng.randint(12, 40)),
+            )
+            b.total_s1 = b.s1_p1 + b.s1_p2 + b.s1_exam
+            b.total_s2 = b.s2_p3 + b.s2_p4 + b.s2_exam
+            b.total_general = b.total_s1 + b.total_s2
+            bulletins.append(b)
+    GradeBulletin.objects.bulk_create(bulletins, batch_size=BATCH_SIZE)
+    ReportCard.objects.bulk_create(
+        [
+            ReportCard(
+                student=s, academic_year=ACADEMIC_YEAR, term='AN', total_subjects=len(data.subjects),
+                average_score=Decimal(rng.randint(40, 90)), is_published=True, published_at=timezone.now(),
+            )
+            for s in data.students
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Paiements : la moitié a un mouvement de caisse, l'autre moitié reste « orpheline »
+    payments = Payment.objects.bulk_create(
+        [
+            PaymentFactory.build(
+                user=s.parent, student=s, school=school, payment_date=timezone.now(),
+                amount=Decimal(rng.choice([25000, 50000, 75000])), currency=rng.choice(['CDF', 'USD']),
+            )
+            for s in data.students for _ in range(scale.payments_per_student)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    movements = [
+        CashMovementFactory.build(
+            school=school, amount=p.amount, currency=p.currency, reference_type='payment',
+            reference_id=p.id, created_by=accountant,
+        )
+        for p in payments[::2]
+    ]
+    movements += [
+        CashMovementFactory.build(
+            school=school, movement_type=rng.choice(['IN', 'OUT']), source='ADJUSTMENT',
+            amount=Decimal(rng.randint(1, 100) * 1000), created_by=accountant,
+        )
+        for _ in range(scale.cash_movements)
+    ]
+    CashMovement.objects.bulk_create(movements, batch_size=BATCH_SIZE)
+    return data
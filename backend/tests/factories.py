@@ -0,0 +1,196 @@
+"""
+factory-boy factories for the core school models
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import factory
+from apps.accounts.models import User, Teacher, Parent, Student
+from apps.schools.models import School, SchoolClass, Subject, ClassSubject, StudentClassEnrollment
+from apps.academics.models import Attendance, GradeBulletin
+from apps.payments.models import Payment, CashMovement
+from apps.elearning.models import Quiz, QuizQuestion, QuizAttempt
+
+# Mot de passe inutilisable : évite le coût PBKDF2 pour des milliers d'utilisateurs générés
+UNUSABLE_PASSWORD = '!benchmark'
+ACADEMIC_YEAR = '2024-2025'
+
+
+class SchoolFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = School
+
+    name = factory.Sequence(lambda n: f"École {n}")
+    code = factory.Sequence(lambda n: f"SCH{n}")
+    address = "Avenue de la Paix"
+    city = "Kinshasa"
+    phone = "+243900000000"
+    email = factory.LazyAttribute(lambda o: f"contact@{o.code.lower()}.rdc")
+    academic_year = ACADEMIC_YEAR
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f"user{n}")
+    email = factory.LazyAttribute(lambda o: f"{o.username}@eschool.rdc")
+    first_name = factory.Faker('first_name', locale='fr_FR')
+    last_name = factory.Faker('last_name', locale='fr_FR')
+    password = UNUSABLE_PASSWORD
+    school = factory.SubFactory(SchoolFactory)
+    role = 'STUDENT'
+
+
+class TeacherFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Teacher
+
+    user = factory.SubFactory(UserFactory, role='TEACHER')
+    employee_id = factory.Sequence(lambda n: f"EMP-{n:05d}")
+    hire_date = date(2020, 9, 1)
+
+
+class ParentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Parent
+
+    user = factory.SubFactory(UserFactory, role='PARENT', phone=factory.Sequence(lambda n: f"+24381{n:07d}"))
+
+
+class SchoolClassFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = SchoolClass
+
+    school = factory.SubFactory(SchoolFactory)
+    name = factory.Sequence(lambda n: f"Classe {n}")
+    level = "Secondaire"
+    grade = factory.Sequence(lambda n: f"{n % 6 + 1}ème")
+    academic_year = ACADEMIC_YEAR
+
+
+class SubjectFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Subject
+
+    school = factory.SubFactory(SchoolFactory)
+    name = factory.Sequence(lambda n: f"Matière {n}")
+    code = factory.Sequence(lambda n: f"MAT{n}")
+    period_max = 20
+
+
+class ClassSubjectFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = ClassSubject
+
+    school_class = factory.SubFactory(SchoolClassFactory)
+    subject = factory.SubFactory(SubjectFactory)
+    period_max = 20
+
+
+class StudentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Student
+
+    user = factory.SubFactory(UserFactory, role='STUDENT')
+    student_id = factory.Sequence(lambda n: f"STU-{n:06d}")
+    school_class = factory.SubFactory(SchoolClassFactory)
+    enrollment_date = date(2024, 9, 2)
+    academic_year = ACADEMIC_YEAR
+
+
+class StudentClassEnrollmentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = StudentClassEnrollment
+
+    student = factory.SubFactory(StudentFactory)
+    school_class = factory.SelfAttribute('student.school_class')
+    status = 'active'
+
+
+class AttendanceFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Attendance
+
+    student = factory.SubFactory(StudentFactory)
+    school_class = factory.SelfAttribute('student.school_class')
+    date = date(2024, 10, 1)
+    status = 'PRESENT'
+
+
+class GradeBulletinFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = GradeBulletin
+
+    student = factory.SubFactory(StudentFactory)
+    subject = factory.SubFactory(SubjectFactory)
+    school_class = factory.SelfAttribute('student.school_class')
+    academic_year = ACADEMIC_YEAR
+    s1_p1 = Decimal('12')
+    s1_p2 = Decimal('14')
+    s1_exam = Decimal('25')
+    s2_p3 = Decimal('13')
+    s2_p4 = Decimal('15')
+    s2_exam = Decimal('28')
+
+
+class PaymentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Payment
+
+    payment_id = factory.Sequence(lambda n: f"PAY-{n:08d}")
+    user = factory.SubFactory(UserFactory, role='PARENT')
+    school = factory.SelfAttribute('user.school')
+    amount = Decimal('50000')
+    currency = 'CDF'
+    payment_method = 'CASH'
+    status = 'COMPLETED'
+
+
+class CashMovementFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = CashMovement
+
+    school = factory.SubFactory(SchoolFactory)
+    movement_type = 'IN'
+    amount = Decimal('50000')
+    currency = 'CDF'
+    source = 'PAYMENT'
+
+
+class QuizFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Quiz
+
+    title = factory.Sequence(lambda n: f"Quiz {n}")
+    school_class = factory.SubFactory(SchoolClassFactory)
+    subject = factory.SubFactory(SubjectFactory, school=factory.SelfAttribute('..school_class.school'))
+    teacher = factory.SubFactory(TeacherFactory, user__school=factory.SelfAttribute('...school_class.school'))
+    academic_year = ACADEMIC_YEAR
+    passing_score = Decimal('50')
+    start_date = datetime(2024, 10, 1, tzinfo=timezone.utc)
+    end_date = datetime(2024, 10, 31, tzinfo=timezone.utc)
+    is_published = True
+
+
+class QuizQuestionFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = QuizQuestion
+
+    quiz = factory.SubFactory(QuizFactory)
+    question_text = factory.Sequence(lambda n: f"Question {n}")
+    question_type = 'SINGLE_CHOICE'
+    points = Decimal('1')
+    order = factory.Sequence(lambda n: n)
+    correct_answer = 'A'
+
+
+class QuizAttemptFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = QuizAttempt
+
+    quiz = factory.SubFactory(QuizFactory)
+    student = factory.SubFactory(
+        StudentFactory,
+        school_class=factory.SelfAttribute('..quiz.school_class'),
+        user__school=factory.SelfAttribute('...quiz.school_class.school'),
+    )
@@ -0,0 +1,111 @@
+"""
+Unit tests for the announcement fan-out (notifications, SMS, WhatsApp)
+"""
+from unittest import mock
+import pytest
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.communication.fanout import fan_out_announcement, resume_announcement_fanouts
+from apps.communication.models import Announcement, Notification, SMSLog
+from .factories import SchoolFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestAnnouncementFanOut(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.admin = UserFactory(school=self.school, role='ADMIN')
+        self.parents = [
+            UserFactory(school=self.school, role='PARENT', phone=f"+24381000000{i}") for i in range(5)
+        ]
+        UserFactory(school=self.school, role='PARENT', phone=None)
+        UserFactory(school=self.school, role='PARENT', is_active=False)
+        UserFactory(school=self.school, role='TEACHER')
+        UserFactory(role='PARENT')  # autre école
+        self.announcement = Announcement.objects.create(
+            school=self.school, title="Réunion", message="Réunion des parents samedi",
+            target_audience='PARENTS', send_sms=True, created_by=self.admin,
+        )
+
+    def test_publish_fans_out_to_audience_in_chunks(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.settings(ANNOUNCEMENT_FANOUT_CHUNK_SIZE=2, ANNOUNCEMENT_FANOUT_MODE='sync'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = client.post(f'/api/communication/announcements/{self.announcement.id}/publish/')
+            # La requête ne fait que publier : la diffusion part après le commit
+            assert response.status_code == 200
+            assert response.json()['recipients_count'] == 0
+            assert not Notification.objects.exists()
+            with self.captureOnCommitCallbacks(execute=True):
+                for callback in callbacks:
+                    callback()
+        self.announcement.refresh_from_db()
+        assert self.announcement.recipients_count == 6
+        assert self.announcement.notifications_sent == 6
+        assert self.announcement.sms_queued == 5
+        assert self.announcement.fanout_completed_at is not None
+        assert Notification.objects.filter(related_object_id=self.announcement.id).count() == 6
+        assert SMSLog.objects.filter(status='PENDING').count() == 5
+
+    def test_fan_out_is_not_repeated(self):
+        self.announcement.is_published = True
+        self.announcement.save()
+        assert fan_out_announcement(self.announcement.id)['notifications'] == 6
+        assert fan_out_announcement(self.announcement.id)['notifications'] == 0
+        assert Notification.objects.count() == 6
+
+    def test_interrupted_sms_only_fan_out_resumes_after_cursor(self):
+        self.announcement.send_notification = False
+        self.announcement.is_published = True
+        self.announcement.save()
+        real_bulk_create = SMSLog.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError("worker interrompu")
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(SMSLog.objects, 'bulk_create', side_effect=failing_bulk_create):
+            with pytest.raises(RuntimeError):
+                fan_out_announcement(self.announcement.id, chunk_size=2)
+        assert SMSLog.objects.count() == 2
+
+        report = fan_out_announcement(self.announcement.id, chunk_size=2)
+        # Les 2 premiers destinataires ne reçoivent pas un second SMS
+        assert report['recipients'] == 4
+        assert SMSLog.objects.count() == 5
+        assert SMSLog.objects.values('recipient_phone').distinct().count() == 5
+        assert not Notification.objects.exists()
+        self.announcement.refresh_from_db()
+        assert self.announcement.recipients_count == 6
+        assert self.announcement.sms_queued == 5
+
+    def test_stalled_fan_out_is_resumed_without_texting_a_phone_twice(self):
+        # Un second parent partage le numéro du premier, dans une tranche ultérieure
+        UserFactory(school=self.school, role='PARENT', phone=self.parents[0].phone)
+        self.announcement.is_published = True
+        self.announcement.save()
+        real_bulk_create = SMSLog.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError("worker interrompu")
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(SMSLog.objects, 'bulk_create', side_effect=failing_bulk_create):
+            with pytest.raises(RuntimeError):
+                fan_out_announcement(self.announcement.id, chunk_size=2)
+
+        assert resume_announcement_fanouts(stalled_seconds=3600) == []
+        with self.settings(ANNOUNCEMENT_FANOUT_MODE='thread'):
+            assert resume_announcement_fanouts(stalled_seconds=0) == [self.announcement.id]
+        self.announcement.refresh_from_db()
+        assert self.announcement.fanout_completed_at is not None
+        assert SMSLog.objects.count() == 5
+        assert SMSLog.objects.values('recipient_phone').distinct().count() == 5
+        assert resume_announcement_fanouts(stalled_seconds=0) == []
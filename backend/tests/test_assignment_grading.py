@@ -0,0 +1,137 @@
+"""
+Unit tests for off-request assignment grading and regrade_assignment
+"""
+import json
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.communication.models import Notification
+from apps.elearning import autograde
+from apps.elearning.models import Assignment, AssignmentQuestion, AssignmentSubmission
+from .factories import SchoolClassFactory, SubjectFactory, TeacherFactory, StudentFactory
+
+
+@pytest.mark.django_db
+@override_settings(ASSIGNMENT_GRADING_MODE='sync')
+class TestAssignmentGrading(TestCase):
+    def setUp(self):
+        school_class = SchoolClassFactory()
+        school = school_class.school
+        self.assignment = Assignment.objects.create(
+            title='Géographie', description='Capitales', subject=SubjectFactory(school=school),
+            school_class=school_class, teacher=TeacherFactory(user__school=school),
+            academic_year='2024-2025', due_date=datetime(2100, 1, 1, tzinfo=timezone.utc), is_published=True,
+        )
+        self.capital = AssignmentQuestion.objects.create(
+            assignment=self.assignment, question_text='Capitale de la RDC ?', question_type='TEXT',
+            points=2, correct_answer='Kinshasa', order=1,
+        )
+        self.choice = AssignmentQuestion.objects.create(
+            assignment=self.assignment, question_text='Fleuve ?', question_type='SINGLE_CHOICE',
+            points=1, correct_answer='B', order=2,
+        )
+        self.student = StudentFactory(school_class=school_class, user__school=school)
+
+    def _submit(self, answers):
+        client = APIClient()
+        client.force_authenticate(self.student.user)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = client.post(
+                f'/api/elearning/assignments/{self.assignment.id}/submit/',
+                {'submission_text': json.dumps(answers)}, format='json',
+            )
+        return response, callbacks
+
+    def test_submit_stores_answers_then_grades_after_commit(self):
+        response, callbacks = self._submit({str(self.capital.id): 'kinshasa', str(self.choice.id): 'A'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['score'])
+        self.assertTrue(callbacks)
+
+        submission = AssignmentSubmission.objects.get()
+        self.assertEqual(submission.score, 2)
+        self.assertEqual(submission.answer_grades[str(self.choice.id)]['points_earned'], 0)
+        notification = Notification.objects.get(user=self.student.user)
+        self.assertEqual(notification.notification_type, 'ASSIGNMENT')
+        self.assertEqual(notification.related_object_id, submission.id)
+
+    def test_regrade_after_correct_answer_change(self):
+        self._submit({str(self.capital.id): 'Kinshasa', str(self.choice.id): 'A'})
+        graded_by_teacher = AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=StudentFactory(school_class=self.assignment.school_class),
+            submission_text=json.dumps({str(self.choice.id): 'A'}), status='GRADED', score=1,
+        )
+        self.choice.correct_answer = 'A'
+        self.choice.save()
+
+        out = StringIO()
+        call_command('regrade_assignment', self.assignment.id, '--local', '--chunk-size', '1', stdout=out)
+        self.assertIn('1 soumission(s) recorrigée(s) sur 1', out.getvalue())
+        self.assertEqual(AssignmentSubmission.objects.get(student=self.student).score, 3)
+        graded_by_teacher.refresh_from_db()
+        self.assertEqual(graded_by_teacher.score, 1)
+
+        call_command('regrade_assignment', self.assignment.id, '--local', '--include-graded', stdout=out)
+        graded_by_teacher.refresh_from_db()
+        self.assertEqual(graded_by_teacher.score, 1)
+        self.assertEqual(graded_by_teacher.status, 'SUBMITTED')
+        self.assertEqual(graded_by_teacher.answer_grades[str(self.capital.id)]['points_earned'], 0)
+
+    @override_settings(ASSIGNMENT_GRADING_MODE='thread')
+    def test_lost_thread_grading_is_picked_up_by_sweep(self):
+        client = APIClient()
+        client.force_authenticate(self.student.user)
+        # Callbacks de commit jamais exécutés : processus arrêté avant la correction
+        with self.captureOnCommitCallbacks(execute=False):
+            client.post(
+                f'/api/elearning/assignments/{self.assignment.id}/submit/',
+                {'submission_text': json.dumps({str(self.capital.id): 'Kinshasa'})}, format='json',
+            )
+        submission = AssignmentSubmission.objects.get()
+        self.assertIsNotNone(submission.grading_queued_at)
+
+        out = StringIO()
+        call_command('grade_pending_submissions', stdout=out)
+        self.assertIn('0 soumission(s) corrigée(s) sur 0', out.getvalue())
+
+        AssignmentSubmission.objects.update(grading_queued_at=submission.grading_queued_at - timedelta(hours=1))
+        call_command('grade_pending_submissions', stdout=out)
+        self.assertIn('1 soumission(s) corrigée(s) sur 1', out.getvalue())
+        submission.refresh_from_db()
+        self.assertEqual(submission.score, 2)
+        self.assertIsNone(submission.grading_queued_at)
+
+    def test_sweep_is_a_periodic_task_not_a_web_startup_step(self):
+        from django.conf import settings
+        from config.celery import app
+        entry = settings.CELERY_BEAT_SCHEDULE['grade-pending-submissions']
+        self.assertEqual(entry['schedule'], settings.ASSIGNMENT_GRADING_SWEEP_SECONDS)
+        app.loader.import_default_modules()
+        self.assertIn(entry['task'], app.tasks)
+
+    def test_local_regrade_spreads_chunks_over_the_pool(self):
+        for _ in range(3):
+            AssignmentSubmission.objects.create(
+                assignment=self.assignment, student=StudentFactory(school_class=self.assignment.school_class),
+                submission_text=json.dumps({str(self.choice.id): 'B'}),
+            )
+
+        class InlinePool:
+            submitted = 0
+
+            def submit(self, fn, *args):
+                InlinePool.submitted += 1
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        with mock.patch.object(autograde, '_thread_pool', InlinePool), \
+                mock.patch.object(autograde.connection, 'close'):
+            report = autograde.regrade_assignment(self.assignment.id, chunk_size=2, use_celery=False)
+        self.assertEqual(report, {'submissions': 3, 'chunks': 2, 'graded': 3})
+        self.assertEqual(InlinePool.submitted, 2)
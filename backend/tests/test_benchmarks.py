@@ -0,0 +1,86 @@
+"""
+Benchmarks of the hot endpoints on a synthetic school (see tests/dataset.py).
+
+Each benchmark times the endpoint (median of several runs, reported in the pytest
+terminal summary) and asserts a query-count budget so that N+1 regressions fail the suite.
+"""
+import statistics
+import time
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .dataset import DatasetScale, build_school_dataset
+from .factories import ACADEMIC_YEAR
+
+BENCHMARK_RUNS = 3
+BENCHMARK_RESULTS = []
+
+
+@pytest.mark.django_db
+class TestEndpointBenchmarks(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.scale = DatasetScale.from_env()
+        cls.data = build_school_dataset(cls.scale)
+        cls.school_class = cls.data.classes[0]
+        cls.titulaire = cls.data.titulaires[0]
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def benchmark(self, name, user, url, max_queries, **params):
+        client = self._client(user)
+        timings = []
+        for _ in range(BENCHMARK_RUNS):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, (name, response.status_code)
+            queries = len(ctx.captured_queries)
+            assert queries <= max_queries, f"{name}: {queries} requêtes SQL (budget {max_queries})"
+        BENCHMARK_RESULTS.append({
+            'name': name,
+            'median_ms': statistics.median(timings),
+            'queries': queries,
+            'budget': max_queries,
+            'students': self.scale.students,
+        })
+        return response
+
+    def test_class_ranking(self):
+        response = self.benchmark(
+            'class_ranking', self.titulaire.user, '/api/academics/grade-bulletins/class_ranking/', 10,
+            school_class=self.school_class.id, academic_year=ACADEMIC_YEAR,
+        )
+        assert len(response.json()['results']) == self.scale.students_per_class
+
+    def test_attendance_summary(self):
+        self.benchmark(
+            'attendance_summary', self.titulaire.user, '/api/academics/attendance/attendance_summary/', 10,
+            school_class=self.school_class.id, period='month', date='2024-09-15',
+        )
+
+    def test_parent_dashboard(self):
+        parent = self.data.parents[0]
+        children = sum(1 for s in self.data.students if s.parent_id == parent.id)
+        self.benchmark(
+            'parent_dashboard', parent, '/api/accounts/students/parent_dashboard/', 5 + 6 * children,
+        )
+
+    def test_caisse_balance(self):
+        self.benchmark('caisse_balance', self.data.accountant, '/api/payments/caisse/balance/', 10)
+
+    def test_caisse_operations(self):
+        self.benchmark('caisse_operations', self.data.accountant, '/api/payments/caisse/operations/', 15)
+
+    def test_bulletin_pdf(self):
+        student = self.data.students[0]
+        self.benchmark(
+            'bulletin_pdf', self.data.admin, f'/api/accounts/students/{student.id}/bulletin_pdf/', 15,
+            school_class=self.school_class.id, academic_year=ACADEMIC_YEAR,
+        )
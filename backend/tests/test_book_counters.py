@@ -0,0 +1,108 @@
+"""
+Unit tests for the write-buffered book view/download counters
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+import pytest
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.library import counters
+from apps.library.models import Book, BookDailyStat
+from .factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestBookCounters(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.tmp, BOOK_COUNTER_FLUSH_SECONDS=3600, BOOK_COUNTER_MAX_PENDING=1000,
+        )
+        self.settings_override.enable()
+        self.book = Book.objects.create(title='Géographie', author='A', description='D', is_published=True)
+        self.other = Book.objects.create(title='Chimie', author='B', description='D', is_published=True)
+        self.client = APIClient()
+        self.client.force_authenticate(UserFactory(role='STUDENT', school=None))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_views_are_buffered_then_flushed_in_bulk(self):
+        updated_at = self.book.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                response = self.client.post(f'/api/library/books/{self.book.id}/increment_view/')
+        self.assertFalse([q for q in queries.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(response.data['view_count'], 3)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).view_count, 0)
+        counters.record_view(self.other.id)
+
+        self.assertEqual(counters.flush_counters(), 2)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual((book.view_count, book.updated_at), (3, updated_at))
+        stat = BookDailyStat.objects.get(book=self.book, date=timezone.localdate())
+        self.assertEqual((stat.views, stat.downloads), (3, 0))
+
+        counters.record_view(self.book.id)
+        counters.flush_counters()
+        self.assertEqual(BookDailyStat.objects.get(book=self.book).views, 4)
+
+    def test_buffer_flushes_when_full(self):
+        with override_settings(BOOK_COUNTER_MAX_PENDING=2):
+            counters.record_view(self.book.id)
+            self.assertEqual(Book.objects.get(pk=self.book.pk).view_count, 0)
+            counters.record_view(self.other.id)
+        self.assertEqual(Book.objects.get(pk=self.other.pk).view_count, 1)
+
+    def test_full_buffer_wakes_the_flush_thread(self):
+        with override_settings(BOOK_COUNTER_FLUSH_MODE='thread', BOOK_COUNTER_MAX_PENDING=2):
+            with mock.patch.object(counters.threading, 'Thread') as thread:
+                counters.record_view(self.book.id)
+                self.assertFalse(counters._wake.is_set())
+                counters.record_view(self.other.id)
+        counters._flusher = None
+        thread.assert_called_once()
+        # Écriture laissée au thread : rien dans la requête
+        self.assertTrue(counters._wake.is_set())
+        counters._wake.clear()
+        self.assertEqual(Book.objects.get(pk=self.other.pk).view_count, 0)
+
+    def test_failed_flush_keeps_the_increments(self):
+        counters.record_view(self.book.id)
+        counters.record_download(self.book.id)
+        with mock.patch.object(BookDailyStat.objects, 'bulk_create', side_effect=DatabaseError):
+            self.assertEqual(counters.flush_counters(), 0)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).view_count, 0)
+        self.assertEqual(counters.pending_count(self.book.id, counters.VIEWS), 1)
+        counters.record_view(self.book.id)
+        self.assertEqual(counters.flush_counters(), 1)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual((book.view_count, book.download_count), (2, 1))
+
+    def test_downloads_count_once_per_read(self):
+        self.book.book_file.save('geo.pdf', ContentFile(b'x' * 1000))
+        url = f'/api/library/books/{self.book.id}/download_file/'
+        self.client.get(url)
+        self.client.get(url, HTTP_RANGE='bytes=0-99')
+        self.client.get(url, HTTP_RANGE='bytes=100-199')
+        counters.flush_counters()
+        self.assertEqual(Book.objects.get(pk=self.book.pk).download_count, 2)
+
+    def test_popular_ranking(self):
+        today = timezone.localdate()
+        BookDailyStat.objects.bulk_create([
+            BookDailyStat(book=self.book, date=today, views=5),
+            BookDailyStat(book=self.other, date=today - timedelta(days=1), views=8),
+            BookDailyStat(book=self.book, date=today - timedelta(days=40), views=100),
+        ])
+        response = self.client.get('/api/library/books/popular/', {'days': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(b['id'], b['views']) for b in response.data], [(self.other.id, 8), (self.book.id, 5)])
+        self.assertEqual(self.client.get('/api/library/books/popular/', {'metric': 'x'}).status_code, 400)
@@ -0,0 +1,84 @@
+"""
+Unit tests for off-request book cover and thumbnail generation
+"""
+import os
+import shutil
+import tempfile
+import fitz
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from apps.library.covers import COVER_SIZES
+from apps.library.models import Book
+from .factories import UserFactory
+
+
+def make_pdf(pages=3):
+    document = fitz.open()
+    for number in range(pages):
+        page = document.new_page(width=595, height=842)
+        page.insert_text((72, 72), f"Page {number + 1}")
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+@pytest.mark.django_db
+class TestBookCovers(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp, BOOK_COVER_MODE='sync')
+        self.settings_override.enable()
+        self.admin = UserFactory(role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def create_book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/library/books/', {
+                'title': 'Algèbre', 'author': 'Auteur', 'description': 'Manuel',
+                'book_file': SimpleUploadedFile('algebre.pdf', make_pdf(), content_type='application/pdf'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Book.objects.get(pk=response.data['id'])
+
+    def test_upload_generates_cover_pages_and_thumbnails(self):
+        book = self.create_book()
+
+        self.assertEqual(book.pages, 3)
+        self.assertTrue(book.cover_image.name.endswith('_cover.jpg'))
+        self.assertIsNotNone(book.covers_generated_at)
+        self.assertEqual(set(book.cover_thumbnails), set(COVER_SIZES))
+        for size, max_width in COVER_SIZES.items():
+            entry = book.cover_thumbnails[size]
+            self.assertEqual(entry['width'], max_width)
+            for fmt, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+                with Image.open(os.path.join(self.tmp, entry[fmt])) as image:
+                    self.assertEqual(image.format, pil_format)
+                    self.assertEqual(image.size, (entry['width'], entry['height']))
+
+    def test_cover_url_size_depends_on_view(self):
+        book = self.create_book()
+        thumbs = book.cover_thumbnails
+
+        listing = self.client.get('/api/library/books/')
+        results = listing.data['results'] if isinstance(listing.data, dict) else listing.data
+        self.assertTrue(results[0]['cover_url'].endswith(thumbs['grid']['webp']))
+        self.assertNotIn('cover_thumbnails', results[0])
+
+        detail = self.client.get(f'/api/library/books/{book.id}/')
+        self.assertTrue(detail.data['cover_url'].endswith(thumbs['detail']['webp']))
+
+        mobile = self.client.get(f'/api/library/books/{book.id}/', {'cover_size': 'mobile', 'cover_format': 'jpeg'})
+        self.assertTrue(mobile.data['cover_url'].endswith(thumbs['mobile']['jpeg']))
+
+    def test_cover_url_falls_back_to_original_cover(self):
+        book = Book.objects.create(title='Sans vignette', author='A', description='D', is_published=True)
+        response = self.client.get(f'/api/library/books/{book.id}/')
+        self.assertIsNone(response.data['cover_url'])
@@ -0,0 +1,92 @@
+"""
+Unit tests for book downloads (Range requests, validators, proxy offload)
+"""
+import os
+import shutil
+import tempfile
+import pytest
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.library import counters
+from apps.library.models import Book
+from apps.library.serving import parse_range
+from .factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestBookDownload(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp, FILE_SERVING_BACKEND='django')
+        self.settings_override.enable()
+        self.data = os.urandom(10000)
+        self.book = Book(title='Physique', author='A', description='D', is_published=True)
+        self.book.book_file.save('physique.pdf', ContentFile(self.data), save=False)
+        self.book.save()
+        self.client = APIClient()
+        self.client.force_authenticate(UserFactory(role='STUDENT', school=None))
+        self.url = f'/api/library/books/{self.book.id}/download_file/'
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_full_download_has_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Content-Length'], '10000')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/10000')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-500')
+        self.assertEqual(b''.join(tail.streaming_content), self.data[-500:])
+
+        resume = self.client.get(self.url, HTTP_RANGE='bytes=9000-')
+        self.assertEqual(resume['Content-Length'], '1000')
+
+        invalid = self.client.get(self.url, HTTP_RANGE='bytes=20000-')
+        self.assertEqual(invalid.status_code, 416)
+        self.assertEqual(invalid['Content-Range'], 'bytes */10000')
+
+    def test_stale_if_range_returns_full_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"autre"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '10000')
+
+    def test_nginx_offload(self):
+        with override_settings(FILE_SERVING_BACKEND='nginx', FILE_SERVING_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.book.book_file.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_offloaded_downloads_are_counted_once(self):
+        counters.discard_pending()
+        with override_settings(FILE_SERVING_BACKEND='nginx', FILE_SERVING_ACCEL_PREFIX='/protected-media/'):
+            self.client.get(self.url)
+            self.client.get(self.url, HTTP_RANGE='bytes=0-65535')
+            # Sauts de la liseuse dans le fichier : nginx sert la plage, pas un nouveau téléchargement
+            self.client.get(self.url, HTTP_RANGE='bytes=65536-131071')
+            self.client.get(self.url, HTTP_RANGE='bytes=-500')
+        self.assertEqual(counters.pending_count(self.book.id, counters.DOWNLOADS), 2)
+        counters.discard_pending()
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=-0', 10)
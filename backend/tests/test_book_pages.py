@@ -0,0 +1,127 @@
+"""
+Unit tests for on-demand book page rendering and its LRU disk cache
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+import fitz
+import pytest
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.library import pages
+from apps.library.models import Book
+from .factories import UserFactory
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def make_pdf(count=5):
+    document = fitz.open()
+    for number in range(count):
+        document.new_page(width=400, height=600).insert_text((50, 50), f"Chapitre {number + 1}")
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+@pytest.mark.django_db
+class TestBookPages(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp, 'media'), BOOK_PAGE_CACHE_DIR=os.path.join(self.tmp, 'pages'),
+            BOOK_PAGE_PREFETCH=0, BOOK_PAGE_CACHE_MAX_BYTES=50 * 1024 * 1024,
+        )
+        self.settings_override.enable()
+        pages._cache_bytes, pages._scanned_at, pages._maintaining = None, None, False
+        self.book = Book(title='Histoire', author='A', description='D', is_published=True)
+        self.book.book_file.save('histoire.pdf', ContentFile(make_pdf()), save=False)
+        self.book.save()
+        self.client = APIClient()
+        self.client.force_authenticate(UserFactory(role='STUDENT', school=None))
+        self.url = f'/api/library/books/{self.book.id}/pages/'
+
+    def tearDown(self):
+        self.settings_override.disable()
+        pages._cache_bytes, pages._scanned_at, pages._maintaining = None, None, False
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_page_image_is_rendered_at_zoom_and_cached(self):
+        response = self.client.get(f'{self.url}1/', {'zoom': '1.4'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['X-Page-Count'], '5')
+        path = pages.cache_path(self.book.id, pages.file_version(self.book), 1, 1.5, 'image')
+        self.assertTrue(os.path.exists(path))
+
+        with mock.patch.object(pages, '_render') as render:
+            cached = self.client.get(f'{self.url}1/', {'zoom': '1.5'})
+        render.assert_not_called()
+        self.assertEqual(cached.content, response.content)
+
+    def test_text_layer(self):
+        response = self.client.get(f'{self.url}2/', {'layer': 'text', 'zoom': '2'})
+        self.assertEqual(response.status_code, 200)
+        layer = json.loads(response.content)
+        self.assertEqual((layer['width'], layer['height']), (800, 1200))
+        self.assertIn('Chapitre', [word[4] for word in layer['words']])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(f'{self.url}6/').status_code, 404)
+        self.assertEqual(self.client.get(f'{self.url}1/', {'zoom': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}1/', {'layer': 'svg'}).status_code, 400)
+
+    def test_next_pages_are_prefetched(self):
+        with override_settings(BOOK_PAGE_PREFETCH=2), \
+                mock.patch.object(pages, '_thread_pool', return_value=InlineExecutor()):
+            self.client.get(f'{self.url}4/')
+        version = pages.file_version(self.book)
+        self.assertTrue(os.path.exists(pages.cache_path(self.book.id, version, 5, 1.0, 'image')))
+        self.assertFalse(os.path.exists(pages.cache_path(self.book.id, version, 6, 1.0, 'image')))
+
+    def test_least_recently_used_pages_are_evicted(self):
+        paths = []
+        for number in (1, 2, 3):
+            pages.render_page(self.book, number)
+            paths.append(pages.cache_path(self.book.id, pages.file_version(self.book), number, 1.0, 'image'))
+        # Page 1 relue en dernier : les pages 2 puis 3 sont les moins récentes
+        for age, path in zip((10, 30, 20), paths):
+            os.utime(path, (os.path.getmtime(path) - age,) * 2)
+        pages.render_page(self.book, 1)
+        size = os.path.getsize(paths[0])
+        pages.evict(size + 1)
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, False])
+
+    def test_eviction_runs_in_maintenance_thread_outside_the_lock(self):
+        scan = pages._scan
+        held = []
+
+        def checked_scan():
+            held.append(pages._lock.locked())
+            return scan()
+
+        with mock.patch.object(pages, '_maintenance_pool', return_value=InlineExecutor()), \
+                mock.patch.object(pages, '_scan', side_effect=checked_scan):
+            pages.render_page(self.book, 1)
+            first = pages._cache_bytes
+            self.assertEqual(len(held), 1)
+            # Sous le maximum et scan récent : simple compteur, pas de parcours du disque
+            pages.render_page(self.book, 2)
+            self.assertEqual(len(held), 1)
+            with override_settings(BOOK_PAGE_CACHE_MAX_BYTES=first + 1):
+                pages.render_page(self.book, 3)
+            with override_settings(BOOK_PAGE_CACHE_RESCAN_SECONDS=0):
+                pages.render_page(self.book, 4)
+        self.assertGreaterEqual(len(held), 3)
+        self.assertFalse(any(held))
+        remaining = sum(
+            os.path.exists(pages.cache_path(self.book.id, pages.file_version(self.book), n, 1.0, 'image'))
+            for n in (1, 2, 3)
+        )
+        self.assertLess(remaining, 3)
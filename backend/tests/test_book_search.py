@@ -0,0 +1,92 @@
+"""
+Unit tests for full-text search inside library book contents
+"""
+import shutil
+import tempfile
+import fitz
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.library.models import Book, BookIndexTerm, BookPage
+from apps.library.search import index_book_content, snippet, terms
+from .factories import SchoolClassFactory, StudentFactory, UserFactory
+
+
+def make_pdf(pages):
+    document = fitz.open()
+    for text in pages:
+        document.new_page(width=595, height=842).insert_textbox(fitz.Rect(50, 50, 545, 792), text)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+@pytest.mark.django_db
+class TestBookSearch(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp, BOOK_INDEX_MODE='sync')
+        self.settings_override.enable()
+        self.school_class = SchoolClassFactory()
+        other_class = SchoolClassFactory(school=self.school_class.school)
+        self.student = StudentFactory(school_class=self.school_class, user__school=self.school_class.school)
+
+        self.biology = self.make_book('Biologie', [
+            "Introduction aux sciences de la vie.",
+            "La photosynthèse transforme l'énergie lumineuse. La photosynthèse a lieu dans les chloroplastes.",
+            "Les chloroplastes contiennent la chlorophylle.",
+        ])
+        self.biology.classes.add(self.school_class)
+        self.general = self.make_book('Sciences', ["Une page sur la photosynthèse et la respiration."])
+        self.hidden = self.make_book('Réservé', ["Photosynthèse pour une autre classe."])
+        self.hidden.classes.add(other_class)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make_book(self, title, pages):
+        book = Book(title=title, author='A', description='D', is_published=True, school=self.school_class.school)
+        book.book_file.save(f'{title}.pdf', ContentFile(make_pdf(pages)))
+        index_book_content(book.id)
+        return book
+
+    def test_ingestion_builds_page_index(self):
+        self.assertEqual(BookPage.objects.filter(book=self.biology).count(), 3)
+        posting = BookIndexTerm.objects.get(book=self.biology, term='photosynthese')
+        self.assertEqual((posting.page.page_number, posting.frequency), (2, 2))
+        self.assertFalse(BookIndexTerm.objects.filter(term='la').exists())
+        self.assertIsNotNone(Book.objects.get(pk=self.biology.pk).content_indexed_at)
+
+    def test_search_ranks_visible_books_with_snippets(self):
+        response = self.client.get('/api/library/books/search-content/', {'q': 'Photosynthese chloroplastes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hit['book']['id'] for hit in response.data], [self.biology.id, self.general.id])
+        pages = response.data[0]['pages']
+        self.assertEqual([p['page_number'] for p in pages], [2, 3])
+        start, end = pages[0]['highlights'][0]
+        self.assertEqual(pages[0]['snippet'][start:end], 'photosynthèse')
+
+    def test_search_requires_a_query(self):
+        self.assertEqual(self.client.get('/api/library/books/search-content/').status_code, 400)
+        self.assertEqual(self.client.get('/api/library/books/search-content/', {'q': 'le la'}).data, [])
+
+    def test_upload_queues_indexing(self):
+        admin_client = APIClient()
+        admin_client.force_authenticate(UserFactory(role='ADMIN', school=self.school_class.school))
+        with override_settings(BOOK_COVER_MODE='sync'), self.captureOnCommitCallbacks(execute=True):
+            response = admin_client.post('/api/library/books/', {
+                'title': 'Géologie', 'author': 'A', 'description': 'D',
+                'book_file': SimpleUploadedFile('geo.pdf', make_pdf(["Les volcans et les séismes."])),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(BookIndexTerm.objects.filter(book_id=response.data['id'], term='volcans').exists())
+
+    def test_snippet_offsets_follow_original_text(self):
+        text, highlights = snippet("Début.\n\nL'Œuvre   étudiée ici.", terms('oeuvre etudiee'))
+        self.assertEqual([text[s:e] for s, e in highlights], ['Œuvre', 'étudiée'])
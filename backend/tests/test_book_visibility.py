@@ -0,0 +1,97 @@
+"""
+Unit tests for the precomputed per-class book visibility and the cached student catalog
+"""
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.library.models import Book, BookVisibility
+from apps.library.visibility import refresh_book_visibility
+from .factories import SchoolClassFactory, StudentFactory
+
+
+def visibility(book):
+    return set(BookVisibility.objects.filter(book=book).values_list('school_class_id', flat=True))
+
+
+@pytest.mark.django_db
+class TestBookVisibility(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_a = SchoolClassFactory()
+        self.class_b = SchoolClassFactory(school=self.class_a.school)
+        self.student = StudentFactory(school_class=self.class_a, user__school=self.class_a.school)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def make_book(self, title, *classes, published=True):
+        book = Book.objects.create(title=title, author='A', description='D', is_published=published,
+                                   school=self.class_a.school)
+        book.classes.add(*classes)
+        return book
+
+    def catalog(self):
+        response = self.client.get('/api/library/books/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return {b['title'] for b in results}
+
+    def test_visibility_follows_classes_and_publication(self):
+        book = self.make_book('Maths')
+        self.assertEqual(visibility(book), {None})
+        book.classes.add(self.class_a, self.class_b)
+        self.assertEqual(visibility(book), {self.class_a.id, self.class_b.id})
+        self.class_b.books.remove(book)
+        self.assertEqual(visibility(book), {self.class_a.id})
+        self.class_a.books.clear()
+        self.assertEqual(visibility(book), {None})
+
+        book.is_published = False
+        book.save()
+        self.assertEqual(visibility(book), set())
+
+        other = self.make_book('Physique', self.class_b)
+        self.class_b.delete()
+        self.assertEqual(visibility(other), {None})
+
+    def test_student_catalog_uses_visibility_without_group_by(self):
+        self.make_book('Pour A', self.class_a)
+        self.make_book('Pour B', self.class_b)
+        self.make_book('Pour tous')
+        self.make_book('Non publié', published=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.catalog(), {'Pour A', 'Pour tous'})
+        book_queries = [q['sql'] for q in queries.captured_queries if 'library_book' in q['sql']]
+        self.assertTrue(book_queries)
+        self.assertFalse([sql for sql in book_queries if 'GROUP BY' in sql or 'DISTINCT' in sql])
+
+        self.student.school_class = None
+        self.student.save()
+        self.student.user.refresh_from_db()
+        self.client.force_authenticate(self.student.user)
+        self.assertEqual(self.catalog(), {'Pour tous'})
+
+    @override_settings(BOOK_CATALOG_CACHE_ENABLED=True)
+    def test_catalog_is_cached_per_class_and_invalidated(self):
+        book = self.make_book('Histoire', self.class_a)
+        self.assertEqual(self.catalog(), {'Histoire'})
+        with self.assertNumQueries(0):  # profil élève déjà chargé, liste servie par le cache
+            self.assertEqual(self.catalog(), {'Histoire'})
+
+        book.title = 'Histoire-Géo'
+        book.save()
+        self.assertEqual(self.catalog(), {'Histoire-Géo'})
+        Book.objects.filter(pk=book.pk).update(is_published=False)
+        refresh_book_visibility()
+        self.assertEqual(self.catalog(), set())
+
+    @override_settings(BOOK_CATALOG_CACHE_ENABLED=False)
+    def test_catalog_is_not_cached_without_shared_cache(self):
+        book = self.make_book('Histoire', self.class_a)
+        self.assertEqual(self.catalog(), {'Histoire'})
+        # Modification sans signal (autre processus) : visible immédiatement
+        Book.objects.filter(pk=book.pk).update(title='Géographie')
+        self.assertEqual(self.catalog(), {'Géographie'})
@@ -0,0 +1,140 @@
+"""
+Unit tests for chunked, resumable uploads
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.elearning.models import Assignment, AssignmentSubmission
+from apps.uploads.chunked import claim_upload, part_path, purge_uploads
+from apps.uploads.models import ChunkedUpload
+from .factories import SchoolClassFactory, SubjectFactory, TeacherFactory, StudentFactory
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.django_db
+class TestChunkedUploads(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CHUNKED_UPLOAD_DIR=os.path.join(self.tmp, 'parts'), MEDIA_ROOT=os.path.join(self.tmp, 'media'),
+            CHUNKED_UPLOAD_MAX_CHUNK_SIZE=1024, ASSIGNMENT_GRADING_MODE='sync',
+        )
+        self.settings_override.enable()
+        school_class = SchoolClassFactory()
+        self.student = StudentFactory(school_class=school_class, user__school=school_class.school)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        self.data = os.urandom(2500)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _init(self):
+        response = self.client.post('/api/uploads/', {
+            'filename': '../rapport final.pdf', 'size': len(self.data), 'checksum': sha256(self.data),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def _append(self, upload_id, offset, chunk, checksum=None):
+        return self.client.post(f'/api/uploads/{upload_id}/append/', {
+            'offset': offset, 'checksum': checksum or sha256(chunk),
+            'chunk': SimpleUploadedFile('chunk', chunk),
+        }, format='multipart')
+
+    def _upload(self):
+        upload_id = self._init()
+        for offset in range(0, len(self.data), 1024):
+            self.assertEqual(self._append(upload_id, offset, self.data[offset:offset + 1024]).status_code, 200)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/').data['status'], 'COMPLETE')
+        return upload_id
+
+    def test_resume_after_corrupted_or_repeated_chunk(self):
+        upload_id = self._init()
+        self.assertEqual(self._append(upload_id, 0, self.data[:1024]).status_code, 200)
+
+        corrupted = self._append(upload_id, 1024, self.data[1024:2048], checksum=sha256(b'autre'))
+        self.assertEqual(corrupted.status_code, 400)
+        repeated = self._append(upload_id, 0, self.data[:1024])
+        self.assertEqual(repeated.status_code, 409)
+        self.assertEqual(repeated.data['offset'], 1024)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['offset'], 1024)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/').status_code, 409)
+
+        self.assertEqual(self._append(upload_id, 1024, self.data[1024:2048]).status_code, 200)
+        self.assertEqual(self._append(upload_id, 2048, self.data[2048:]).status_code, 200)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/').status_code, 200)
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        self.assertEqual(upload.filename, 'rapport_final.pdf')
+        with open(part_path(upload), 'rb') as part:
+            self.assertEqual(part.read(), self.data)
+
+    def test_completed_upload_becomes_submission_file(self):
+        upload_id = self._upload()
+        assignment = Assignment.objects.create(
+            title='Exposé', description='PDF', subject=SubjectFactory(school=self.student.user.school),
+            school_class=self.student.school_class, teacher=TeacherFactory(user__school=self.student.user.school),
+            academic_year='2024-2025', due_date=datetime(2100, 1, 1, tzinfo=timezone.utc), is_published=True,
+        )
+        response = self.client.post(
+            f'/api/elearning/assignments/{assignment.id}/submit/', {'submission_file_upload': upload_id}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        submission = AssignmentSubmission.objects.get()
+        with submission.submission_file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertFalse(os.path.exists(part_path(ChunkedUpload.objects.get(pk=upload_id))))
+
+        again = self.client.post(
+            f'/api/elearning/assignments/{assignment.id}/submit/', {'submission_file_upload': upload_id}, format='json'
+        )
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(purge_uploads(older_than_hours=0), 1)
+
+    def test_assembled_file_is_opened_only_when_read(self):
+        upload_id = self._upload()
+        assembled = claim_upload(self.student.user, upload_id)
+        # Stockage local : déplacé par temporary_file_path, jamais ouvert
+        self.assertTrue(assembled.closed)
+        self.assertEqual(b''.join(assembled.chunks()), self.data)
+        self.assertTrue(assembled.closed)
+
+    def test_open_uploads_are_capped_per_user(self):
+        with self.settings(CHUNKED_UPLOAD_MAX_OPEN_PER_USER=2):
+            self._init()
+            self._init()
+            response = self.client.post('/api/uploads/', {
+                'filename': 'trois.pdf', 'size': len(self.data), 'checksum': sha256(self.data),
+            }, format='json')
+            self.assertEqual(response.status_code, 429)
+        with self.settings(CHUNKED_UPLOAD_MAX_OPEN_BYTES_PER_USER=3 * len(self.data)):
+            response = self.client.post('/api/uploads/', {
+                'filename': 'gros.pdf', 'size': len(self.data) + 1, 'checksum': sha256(self.data),
+            }, format='json')
+            self.assertEqual(response.status_code, 429)
+        # Un envoi d'un autre utilisateur n'entame pas ce quota
+        self.client.force_authenticate(StudentFactory().user)
+        with self.settings(CHUNKED_UPLOAD_MAX_OPEN_PER_USER=2):
+            self._init()
+
+    def test_uploads_are_private(self):
+        upload_id = self._init()
+        other = StudentFactory()
+        self.client.force_authenticate(other.user)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').status_code, 404)
+        self.assertEqual(self._append(upload_id, 0, self.data[:1024]).status_code, 404)
+
+    def test_malformed_upload_id_is_not_found(self):
+        self.assertEqual(self._append('not-a-uuid', 0, self.data[:1024]).status_code, 404)
+        self.assertEqual(self.client.post('/api/uploads/not-a-uuid/complete/').status_code, 404)
+        self.assertEqual(self.client.get('/api/uploads/not-a-uuid/').status_code, 404)
@@ -0,0 +1,80 @@
+"""
+Unit tests for the archival of old notifications and SMS/WhatsApp logs
+"""
+from datetime import timedelta
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.communication.archive import archive_communication
+from apps.communication.counters import get_counters
+from apps.communication.models import Notification, SMSLog, ArchivedRecord
+from .factories import SchoolFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestCommunicationArchive(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.admin = UserFactory(school=self.school, role='ADMIN')
+        # Nom fixe : la recherche 'Ancienne 3' porte aussi sur user__username
+        self.parent = UserFactory(school=self.school, role='PARENT', username='parent_archive')
+        old = timezone.now() - timedelta(days=200)
+        for i in range(5):
+            Notification.objects.create(
+                user=self.parent, school=self.school, notification_type='GENERAL',
+                title=f"Ancienne {i}", message="...", is_read=i % 2 == 0,
+            )
+        Notification.objects.create(
+            user=self.parent, school=self.school, notification_type='GENERAL', title="Récente", message="..."
+        )
+        Notification.objects.exclude(title="Récente").update(created_at=old)
+        SMSLog.objects.bulk_create([
+            SMSLog(school=self.school, recipient_phone="+243810000001", message="Envoyé", status='SENT'),
+            SMSLog(school=self.school, recipient_phone="+243810000002", message="En file", status='PENDING'),
+        ])
+        SMSLog.objects.update(created_at=old)
+
+    def test_old_rows_move_to_archive_in_chunks(self):
+        assert get_counters(self.parent)['notifications'] == 3
+        result = archive_communication(older_than_days=180, chunk_size=2)
+        assert result == {'NOTIFICATION': 5, 'SMS': 1, 'WHATSAPP': 0}
+        assert list(Notification.objects.values_list('title', flat=True)) == ["Récente"]
+        assert SMSLog.objects.get().status == 'PENDING'
+        assert ArchivedRecord.objects.filter(kind='NOTIFICATION', user=self.parent).count() == 5
+        # Les notifications non lues archivées ne comptent plus dans le badge
+        assert get_counters(self.parent)['notifications'] == 1
+
+    def test_unread_counters_are_adjusted_per_chunk(self):
+        others = [UserFactory(school=self.school, role='PARENT') for _ in range(3)]
+        for user in others:
+            Notification.objects.create(user=user, school=self.school, notification_type='GENERAL', title="x", message="...")
+        Notification.objects.filter(user__in=others).update(created_at=timezone.now() - timedelta(days=200))
+        with CaptureQueriesContext(connection) as queries:
+            archive_communication(older_than_days=180, chunk_size=100, kinds=['NOTIFICATION'])
+        counter_updates = [q for q in queries.captured_queries
+                           if q['sql'].startswith('UPDATE') and 'unreadcounter' in q['sql']]
+        # Décréments 2 (parent) et 1 (les trois autres) : deux requêtes pour la tranche
+        assert len(counter_updates) == 2
+        assert get_counters(self.parent)['notifications'] == 1
+        assert all(get_counters(user)['notifications'] == 0 for user in others)
+
+    def test_archive_endpoint_is_admin_only(self):
+        archive_communication(older_than_days=180)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/communication/archives/', {'kind': 'NOTIFICATION', 'search': 'Ancienne 3'})
+        assert response.status_code == 200
+        assert [r['summary'] for r in response.json()['results']] == ["Ancienne 3"]
+
+        client.force_authenticate(self.parent)
+        assert client.get('/api/communication/archives/').status_code == 403
+
+    def test_invalid_date_filter_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        assert client.get('/api/communication/archives/', {'created_after': 'hier'}).status_code == 400
+        assert client.get('/api/communication/archives/', {'created_before': '2024-02-30'}).status_code == 400
+        assert client.get('/api/communication/archives/', {'created_before': '2024-02-28'}).status_code == 200
@@ -0,0 +1,79 @@
+"""
+Unit tests for set_default_passwords (checkpoint and resume)
+"""
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from apps.accounts.models import User
+from apps.accounts.utils import hash_passwords as real_hash_passwords
+
+COMMAND_MODULE = 'apps.accounts.management.commands.set_default_passwords'
+
+
+@pytest.mark.django_db
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TestSetDefaultPasswords(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.checkpoint = Path(self.tmp) / 'set_default_passwords_all_student.json'
+        self.students = [
+            User.objects.create_user(username=f'pwd_student_{i}', password='ancien', role='STUDENT')
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _call(self, *args):
+        out = io.StringIO()
+        call_command(
+            'set_default_passwords', '--role', 'STUDENT', '--chunk-size', '2', '--workers', '1',
+            '--checkpoint-dir', self.tmp, *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def _with_default_password(self):
+        return [u.username for u in User.objects.filter(role='STUDENT').order_by('id') if u.check_password('Eleve@@')]
+
+    def _interrupt_after_first_batch(self):
+        calls = []
+
+        def failing_hash(passwords, **kwargs):
+            calls.append(len(passwords))
+            if len(calls) > 1:
+                raise KeyboardInterrupt
+            return real_hash_passwords(passwords, **kwargs)
+
+        with mock.patch(f'{COMMAND_MODULE}.hash_passwords', side_effect=failing_hash):
+            with pytest.raises(KeyboardInterrupt):
+                self._call()
+
+    def test_interrupted_run_leaves_checkpoint(self):
+        self._interrupt_after_first_batch()
+        state = json.loads(self.checkpoint.read_text())
+        assert state == {'last_id': self.students[1].id, 'updated': {'STUDENT': 2}}
+        assert self._with_default_password() == ['pwd_student_0', 'pwd_student_1']
+
+    def test_rerun_resumes_after_checkpoint(self):
+        self._interrupt_after_first_batch()
+        with mock.patch(f'{COMMAND_MODULE}.hash_passwords', side_effect=real_hash_passwords) as hashed:
+            output = self._call()
+        assert 'Reprise' in output
+        # Seuls les 3 utilisateurs restants sont hachés à la reprise
+        assert sum(len(call.args[0]) for call in hashed.call_args_list) == 3
+        assert len(self._with_default_password()) == 5
+        assert '5 utilisateurs mis à jour' in output
+        assert not self.checkpoint.exists()
+
+    def test_restart_ignores_checkpoint(self):
+        self._interrupt_after_first_batch()
+        with mock.patch(f'{COMMAND_MODULE}.hash_passwords', side_effect=real_hash_passwords) as hashed:
+            self._call('--restart')
+        assert sum(len(call.args[0]) for call in hashed.call_args_list) == 5
+        assert not self.checkpoint.exists()
@@ -0,0 +1,56 @@
+"""
+Unit tests for the batched SMS/WhatsApp delivery worker
+"""
+import pytest
+from django.test import TestCase, override_settings
+from apps.communication.delivery import DeliveryWorker, TokenBucket
+from apps.communication.models import SMSLog
+from apps.communication.providers import FakeProvider
+from .factories import SchoolFactory
+
+
+@pytest.mark.django_db
+@override_settings(DELIVERY_RETRY_BASE_SECONDS=60, DELIVERY_MAX_ATTEMPTS=2)
+class TestDeliveryWorker(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        SMSLog.objects.bulk_create([
+            SMSLog(school=self.school, recipient_phone=f"+2438100000{i:02d}", message="Test") for i in range(25)
+        ])
+
+    def test_worker_sends_pending_logs_in_batches(self):
+        provider = FakeProvider(latency=0, failure_rate=0)
+        stats = DeliveryWorker('sms', provider=provider, batch_size=10, threads=4, rate_limit=10000).run()
+        assert stats['sent'] == 25
+        assert stats['batches'] == 3
+        assert len(provider.sent) == 25
+        assert SMSLog.objects.filter(status='SENT', provider='Fake', attempts=1).count() == 25
+
+    def test_fake_provider_keeps_only_the_last_messages(self):
+        with self.settings(FAKE_PROVIDER_SENT_MAX=10):
+            provider = FakeProvider(latency=0, failure_rate=0)
+        DeliveryWorker('sms', provider=provider, batch_size=10, rate_limit=10000).run()
+        assert len(provider.sent) == 10
+        assert provider.sent_count == 25
+        provider.reset()
+        assert not provider.sent and provider.sent_count == 0
+
+    def test_failures_are_retried_with_backoff_then_failed(self):
+        provider = FakeProvider(latency=0, failure_rate=1)
+        worker = DeliveryWorker('sms', provider=provider, batch_size=50, rate_limit=10000)
+        stats = worker.run()
+        assert stats['retried'] == 25
+        # Backoff : rien n'est dû immédiatement
+        assert worker.run()['batches'] == 0
+        SMSLog.objects.update(next_attempt_at=None)
+        assert worker.run()['failed'] == 25
+        assert SMSLog.objects.filter(status='FAILED', attempts=2).count() == 25
+
+
+def test_token_bucket_limits_rate():
+    import time
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
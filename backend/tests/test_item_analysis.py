@@ -0,0 +1,109 @@
+"""
+Unit tests for quiz / assignment item analysis
+"""
+import random
+import time
+from decimal import Decimal
+import pytest
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.elearning.analysis import analyse_items, check_item_analysis_cache
+from apps.elearning.models import QuizAnswer
+from .factories import QuizFactory, QuizQuestionFactory, QuizAttemptFactory
+
+
+@pytest.mark.django_db
+class TestItemAnalysis(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.quiz = QuizFactory()
+        # q1, q4 : réussies par les bons élèves ; q2 : réussie par tous ; q3 : par un élève faible
+        questions = QuizQuestionFactory.create_batch(4, quiz=self.quiz, correct_answer='A')
+        self.q1 = questions[0]
+        strong = [('A', 'A', 'B', 'A'), ('A', 'A', 'C', 'A'), ('A', 'A', 'B', 'A')]
+        weak = [('B', 'A', 'A', 'C'), ('C', 'A', 'B', 'C'), ('B', 'A', 'B', 'D')]
+        for answers in strong + weak:
+            attempt = QuizAttemptFactory(quiz=self.quiz, submitted_at=timezone.now())
+            QuizAnswer.objects.bulk_create([
+                QuizAnswer(attempt=attempt, question=q, answer_text=a, is_correct=a == 'A',
+                           points_earned=Decimal('1') if a == 'A' else 0)
+                for q, a in zip(questions, answers)
+            ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.quiz.teacher.user)
+        self.url = f'/api/elearning/quizzes/{self.quiz.id}/item-analysis/'
+
+    def test_difficulty_discrimination_and_distractors(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['respondents'], 6)
+        q1, q2, q3, _ = data['questions']
+        self.assertEqual(q1['difficulty'], 0.5)
+        self.assertEqual(q2['difficulty'], 1.0)
+        self.assertGreater(q1['discrimination'], 0.5)
+        self.assertIsNone(q2['discrimination'])
+        self.assertLess(q3['discrimination'], 0)
+        distractors = {d['answer']: d for d in q1['distractors']}
+        self.assertEqual(distractors['A']['count'], 3)
+        self.assertTrue(distractors['A']['is_correct'])
+        self.assertEqual(distractors['B']['count'], 2)
+        self.assertEqual(distractors['D']['count'], 0)
+        self.assertEqual(data['score_distribution']['mean'], 2.17)
+        self.assertEqual(sum(b['count'] for b in data['score_distribution']['histogram']), 6)
+
+    @override_settings(ITEM_ANALYSIS_CACHE_ENABLED=True)
+    def test_cached_until_next_submission(self):
+        first = self.client.get(self.url).data
+        self.assertEqual(self.client.get(self.url).data['computed_at'], first['computed_at'])
+
+        attempt = QuizAttemptFactory(quiz=self.quiz)
+        student_client = APIClient()
+        student_client.force_authenticate(attempt.student.user)
+        student_client.post(
+            f'/api/elearning/quiz-attempts/{attempt.id}/submit/',
+            {'answers': [{'question_id': self.q1.id, 'answer_text': 'A'}]}, format='json'
+        )
+        self.assertEqual(self.client.get(self.url).data['respondents'], 7)
+
+    @override_settings(ITEM_ANALYSIS_CACHE_ENABLED=False)
+    def test_not_cached_without_shared_cache(self):
+        self.assertEqual(self.client.get(self.url).data['respondents'], 6)
+        # Soumission reçue par un autre processus (aucune invalidation ici) : visible immédiatement
+        QuizAnswer.objects.create(
+            attempt=QuizAttemptFactory(quiz=self.quiz, submitted_at=timezone.now()),
+            question=self.q1, answer_text='A', is_correct=True, points_earned=Decimal('1'),
+        )
+        self.assertEqual(self.client.get(self.url).data['respondents'], 7)
+        self.assertEqual(check_item_analysis_cache(None), [])
+        with override_settings(ITEM_ANALYSIS_CACHE_ENABLED=True):
+            self.assertEqual([w.id for w in check_item_analysis_cache(None)], ['elearning.W001'])
+
+    def test_students_cannot_see_analysis(self):
+        attempt = QuizAttemptFactory(quiz=self.quiz)
+        self.client.force_authenticate(attempt.student.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class TestItemAnalysisScale(TestCase):
+    def test_thousands_of_attempts_in_well_under_a_second(self):
+        rng = random.Random(7)
+        questions = [
+            {'id': i, 'order': i, 'question_text': f'Q{i}', 'question_type': 'SINGLE_CHOICE',
+             'points': Decimal('1'), 'correct_answer': 'A'}
+            for i in range(40)
+        ]
+        responses = {}
+        for attempt in range(5000):
+            row = {}
+            for q in questions:
+                answer = rng.choice('AABCD')
+                row[q['id']] = (answer, 1.0 if answer == 'A' else 0.0)
+            responses[attempt] = row
+        start = time.monotonic()
+        result = analyse_items(questions, responses)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(result['respondents'], 5000)
+        self.assertAlmostEqual(result['questions'][0]['difficulty'], 0.4, delta=0.05)
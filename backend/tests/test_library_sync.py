@@ -0,0 +1,135 @@
+"""
+Unit tests for the batched offline sync of reading progress, annotations and notes
+"""
+import uuid
+from datetime import timedelta
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.library.models import Book, BookAnnotation, BookNote, ReadingProgress, SyncTombstone
+from .factories import SchoolClassFactory, StudentFactory
+
+
+def ts(minutes_ago):
+    return (timezone.now() - timedelta(minutes=minutes_ago)).isoformat()
+
+
+@pytest.mark.django_db
+class TestLibrarySync(TestCase):
+    url = '/api/library/books/sync/'
+
+    def setUp(self):
+        school_class = SchoolClassFactory()
+        self.student = StudentFactory(school_class=school_class, user__school=school_class.school)
+        self.book = Book.objects.create(title='Français', author='A', description='D', is_published=True, pages=100)
+        self.hidden = Book.objects.create(title='Brouillon', author='A', description='D', is_published=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def sync(self, **payload):
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_offline_batch_is_applied_once(self):
+        annotation_id = str(uuid.uuid4())
+        batch = {
+            'since': None,
+            'progress': [
+                {'book': self.book.id, 'current_page': 10, 'updated_at': ts(30)},
+                {'book': self.book.id, 'current_page': 25, 'updated_at': ts(20)},
+            ],
+            'annotations': [{'client_id': annotation_id, 'book': self.book.id, 'page_number': 12,
+                             'content': 'Important', 'updated_at': ts(25)}],
+            'notes': [{'client_id': str(uuid.uuid4()), 'book': self.book.id, 'content': 'Résumé', 'updated_at': ts(15)}],
+        }
+        data = self.sync(**batch)
+        self.assertEqual(data['rejected'], [])
+        self.assertEqual(data['progress'][0]['current_page'], 25)
+        self.assertEqual(float(data['progress'][0]['progress_percentage']), 25.0)
+        self.assertEqual(data['annotations'][0]['client_id'], annotation_id)
+
+        # Renvoi du même lot (connexion coupée avant la réponse) : pas de doublon
+        self.sync(**batch)
+        self.assertEqual(BookAnnotation.objects.count(), 1)
+        self.assertEqual(BookNote.objects.count(), 1)
+        self.assertEqual(ReadingProgress.objects.get().current_page, 25)
+
+    def test_last_writer_wins_per_field(self):
+        note = BookNote.objects.create(book=self.book, user=self.student.user, title='Titre', content='Ancien')
+        response = self.client.patch(f'/api/library/notes/{note.id}/', {'content': 'Modifié en ligne'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        data = self.sync(notes=[{'id': note.id, 'title': 'Titre hors ligne', 'content': 'Hors ligne', 'updated_at': ts(5)}])
+        note.refresh_from_db()
+        # Le contenu modifié en ligne après l'édition hors ligne est conservé, le titre est appliqué
+        self.assertEqual((note.title, note.content), ('Titre hors ligne', 'Modifié en ligne'))
+        self.assertEqual(data['rejected'], [])
+
+        # Horloge de l'appareil en avance : ramenée à l'heure du serveur
+        self.sync(notes=[{'id': note.id, 'content': 'Futur', 'updated_at': (timezone.now() + timedelta(days=1)).isoformat()}])
+        self.client.patch(f'/api/library/notes/{note.id}/', {'content': 'Plus récent'}, format='json')
+        note.refresh_from_db()
+        self.assertEqual(note.content, 'Plus récent')
+
+    def test_deletions_reach_other_devices(self):
+        first = self.sync(annotations=[{'client_id': str(uuid.uuid4()), 'book': self.book.id, 'page_number': 1,
+                                        'content': 'A', 'updated_at': ts(10)}])
+        annotation_id = first['annotations'][0]['id']
+        kept = BookNote.objects.create(book=self.book, user=self.student.user, content='Gardée')
+        watermark = self.sync()['watermark']
+
+        self.sync(annotations=[{'id': annotation_id, 'deleted': True, 'updated_at': ts(1)}])
+        self.assertFalse(BookAnnotation.objects.exists())
+        self.client.delete(f'/api/library/notes/{kept.id}/')
+
+        delta = self.sync(since=watermark)
+        self.assertEqual(delta['deleted'], {'annotations': [annotation_id], 'notes': [kept.id]})
+        self.assertEqual(delta['annotations'], [])
+
+    def test_invalid_items_are_rejected_individually(self):
+        data = self.sync(
+            progress=[{'book': self.hidden.id, 'current_page': 3, 'updated_at': ts(1)}],
+            annotations=[
+                {'client_id': str(uuid.uuid4()), 'book': self.book.id, 'content': 'Sans page', 'updated_at': ts(1)},
+                {'client_id': str(uuid.uuid4()), 'book': self.book.id, 'page_number': 2, 'content': 'Ok'},
+                {'client_id': str(uuid.uuid4()), 'book': self.book.id, 'page_number': 3, 'content': 'Ok', 'updated_at': ts(1)},
+            ],
+        )
+        self.assertEqual([(r['kind'], r['index']) for r in data['rejected']],
+                         [('progress', 0), ('annotations', 1), ('annotations', 0)])
+        self.assertEqual(BookAnnotation.objects.count(), 1)
+        self.assertEqual(self.client.post(self.url, {'notes': 'x'}, format='json').status_code, 400)
+
+    def test_impossible_dates_are_rejected_not_errors(self):
+        data = self.sync(annotations=[
+            {'client_id': str(uuid.uuid4()), 'book': self.book.id, 'page_number': 2, 'content': 'Ok',
+             'updated_at': '2024-13-01T00:00:00'},
+        ])
+        self.assertEqual([(r['kind'], r['index']) for r in data['rejected']], [('annotations', 0)])
+        self.assertFalse(BookAnnotation.objects.exists())
+        response = self.client.post(self.url, {'since': '2024-02-30T00:00:00'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_watermark_keeps_a_margin_for_concurrent_writes(self):
+        watermark = self.sync()['watermark']
+        # Écriture horodatée avant le watermark mais validée après (transaction concurrente)
+        late = BookNote.objects.create(book=self.book, user=self.student.user, content='Concurrente')
+        BookNote.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=30))
+        self.assertEqual([n['id'] for n in self.sync(since=watermark)['notes']], [late.id])
+
+    def test_old_tombstones_are_purged_and_stale_devices_resync(self):
+        note = BookNote.objects.create(book=self.book, user=self.student.user, content='Gardée')
+        watermark = self.sync()['watermark']
+        self.client.delete(f'/api/library/notes/{note.id}/')
+        SyncTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        call_command('purge_sync_tombstones', stdout=StringIO())
+        self.assertFalse(SyncTombstone.objects.exists())
+
+        self.assertFalse(self.sync(since=watermark)['full'])
+        stale = self.sync(since=(timezone.now() - timedelta(days=365)).isoformat())
+        self.assertTrue(stale['full'])
+        self.assertEqual(stale['notes'], [])
@@ -0,0 +1,77 @@
+"""
+Unit tests for the cursor-paginated conversation inbox
+"""
+import pytest
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.communication.inbox import rebuild_conversations
+from apps.communication.models import Conversation, Message
+from .factories import SchoolFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestMessageInbox(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.user = UserFactory(school=self.school, role='PARENT')
+        self.partners = [UserFactory(school=self.school, role='TEACHER') for _ in range(3)]
+        for i, partner in enumerate(self.partners):
+            for j in range(i + 1):
+                self._send(partner, self.user, f"Message {i}.{j}")
+            self._send(self.user, partner, f"Réponse {i}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _send(self, sender, recipient, subject):
+        return Message.objects.create(
+            sender=sender, recipient=recipient, school=self.school, subject=subject, message="..."
+        )
+
+    def test_inbox_groups_by_partner_with_cursor(self):
+        self._send(self.partners[0], self.user, "Relance")
+        response = self.client.get('/api/communication/messages/inbox/', {'page_size': 2})
+        data = response.json()
+        assert [c['partner']['id'] for c in data['results']] == [self.partners[0].id, self.partners[2].id]
+        assert data['results'][0]['last_message']['subject'] == "Relance"
+        assert data['results'][0]['unread_count'] == 2
+        assert data['next']
+
+        data = self.client.get(data['next']).json()
+        assert [c['partner']['id'] for c in data['results']] == [self.partners[1].id]
+        assert data['results'][0]['unread_count'] == 2
+        assert data['next'] is None
+
+    def test_conversation_is_keyset_paginated(self):
+        partner = self.partners[2]
+        data = self.client.get(
+            '/api/communication/messages/conversation/', {'with': partner.id, 'page_size': 3}
+        ).json()
+        assert [m['subject'] for m in data['results']] == ["Réponse 2", "Message 2.2", "Message 2.1"]
+        data = self.client.get(data['next']).json()
+        assert [m['subject'] for m in data['results']] == ["Message 2.0"]
+        assert data['next'] is None
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/communication/messages/inbox/', {'cursor': '!!'})
+        assert response.status_code == 400
+
+    def test_conversation_rows_follow_reads_and_deletes(self):
+        partner = self.partners[2]
+        latest = Message.objects.filter(sender=partner).latest('id')
+        self.client.post(f'/api/communication/messages/{latest.id}/mark_read/')
+        row = Conversation.objects.get(user=self.user, partner=partner)
+        assert row.unread_count == 2
+        assert Conversation.objects.get(user=partner, partner=self.user).unread_count == 1
+
+        reply = Message.objects.filter(sender=self.user, recipient=partner).get()
+        reply.delete()
+        assert Conversation.objects.get(user=self.user, partner=partner).last_message_id == latest.id
+
+        Message.objects.filter(sender=partner, recipient=self.user).delete()
+        assert not Conversation.objects.filter(user=self.user, partner=partner).exists()
+
+    def test_rebuild_conversations_matches_signals(self):
+        expected = set(Conversation.objects.values_list('user_id', 'partner_id', 'last_message_id', 'unread_count'))
+        Conversation.objects.all().delete()
+        assert rebuild_conversations() == len(expected)
+        assert set(Conversation.objects.values_list('user_id', 'partner_id', 'last_message_id', 'unread_count')) == expected
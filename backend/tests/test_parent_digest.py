@@ -0,0 +1,52 @@
+"""
+Unit tests for the per-parent digest of grade, attendance and payment events
+"""
+from datetime import date, timedelta
+import pytest
+from django.test import TestCase
+from django.utils import timezone
+from apps.communication.digest import send_parent_digests
+from apps.communication.models import DigestEvent, Notification, SMSLog
+from .factories import (
+    SchoolFactory, UserFactory, SchoolClassFactory, StudentFactory, AttendanceFactory, GradeBulletinFactory,
+    PaymentFactory,
+)
+
+
+@pytest.mark.django_db
+class TestParentDigest(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.parent = UserFactory(school=self.school, role='PARENT', phone='+243810000001')
+        school_class = SchoolClassFactory(school=self.school)
+        self.children = [
+            StudentFactory(user__school=self.school, user__first_name=name, parent=self.parent, school_class=school_class)
+            for name in ("Jean", "Marie")
+        ]
+
+    def test_events_are_coalesced_into_one_message_per_parent(self):
+        jean, marie = self.children
+        for day, status in ((1, 'PRESENT'), (2, 'ABSENT'), (3, 'LATE')):
+            AttendanceFactory(student=jean, date=date(2024, 10, day), status=status)
+        bulletin = GradeBulletinFactory(student=jean)
+        bulletin.s1_p1 = 15
+        bulletin.save()  # même bulletin : un seul événement
+        payment = PaymentFactory(user=self.parent, student=marie, status='PENDING')
+        payment.status = 'COMPLETED'
+        payment.save()
+        assert DigestEvent.objects.count() == 5
+
+        report = send_parent_digests(window_end=timezone.now() + timedelta(seconds=1))
+        assert report == {'parents': 1, 'events': 5, 'notifications': 1, 'sms_queued': 1}
+        notification = Notification.objects.get(user=self.parent)
+        assert "Jean : 1 note mise à jour, 3 présences relevées (dont 1 absence, 1 retard)" in notification.message
+        assert "Marie : 1 paiement confirmé" in notification.message
+        assert SMSLog.objects.get().recipient_phone == '+243810000001'
+
+        # Rien de plus à envoyer pour cette fenêtre
+        assert send_parent_digests(window_end=timezone.now())['notifications'] == 0
+
+    def test_open_window_events_wait(self):
+        AttendanceFactory(student=self.children[0], status='ABSENT')
+        assert send_parent_digests()['events'] == 0
+        assert DigestEvent.objects.filter(digest_sent_at__isnull=True).count() == 1
@@ -0,0 +1,113 @@
+"""
+Unit tests for the real-time push channel (pub/sub + SSE/long-poll endpoint)
+"""
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.communication.models import Notification
+from apps.communication.pubsub import MemoryPushBackend, RedisPushBackend, check_push_backend, get_backend
+from .factories import SchoolFactory, UserFactory
+
+
+def subscription_cursor(user_id):
+    """Dernier identifiant d'événement de l'utilisateur (backend en mémoire des tests)."""
+    return str(get_backend()._sequences.get(user_id, 0))
+
+
+@pytest.mark.django_db
+class TestPushStream(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.user = UserFactory(school=self.school, role='PARENT')
+
+    def _notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(
+                user=self.user, school=self.school, notification_type='GENERAL', title="Réunion", message="..."
+            )
+
+    def test_new_notification_is_pushed_to_subscriber(self):
+        async def scenario():
+            subscription = await get_backend().subscribe(self.user.id)
+            try:
+                notification = await sync_to_async(self._notify)()
+                event_id, event = await subscription.get(timeout=1)
+            finally:
+                await subscription.close()
+            return notification, event_id, event
+
+        notification, event_id, event = async_to_sync(scenario)()
+        assert event_id == subscription_cursor(self.user.id)
+        assert event['type'] == 'notification'
+        assert event['id'] == notification.id
+        assert event['title'] == "Réunion"
+
+    def test_long_poll_requires_token_and_times_out_empty(self):
+        client = AsyncClient()
+
+        async def get(params):
+            return await client.get('/api/communication/stream/', params)
+
+        response = async_to_sync(get)({'mode': 'poll'})
+        assert response.status_code == 401
+
+        token = str(AccessToken.for_user(self.user))
+        response = async_to_sync(get)({'mode': 'poll', 'timeout': '0.1', 'token': token})
+        assert response.status_code == 200
+        assert response.json() == {'events': [], 'cursor': subscription_cursor(self.user.id), 'resync': False}
+
+    def _poll(self, since=None, headers=None):
+        client = AsyncClient()
+        params = {'mode': 'poll', 'timeout': '0.1', 'token': str(AccessToken.for_user(self.user))}
+        if since is not None:
+            params['since'] = since
+        return async_to_sync(client.get)('/api/communication/stream/', params, headers=headers)
+
+    def test_events_between_polls_are_replayed_from_cursor(self):
+        cursor = self._poll().json()['cursor']
+        # Émis pendant que le client n'est pas connecté
+        first, second = self._notify(), self._notify()
+        data = self._poll(since=cursor).json()
+        assert [e['id'] for e in data['events']] == [first.id, second.id]
+        assert data['resync'] is False
+        assert self._poll(since=data['cursor']).json()['events'] == []
+
+    def test_last_event_id_header_resumes_stream(self):
+        cursor = self._poll().json()['cursor']
+        notification = self._notify()
+        data = self._poll(headers={'Last-Event-ID': cursor}).json()
+        assert [e['id'] for e in data['events']] == [notification.id]
+
+    def test_cursor_older_than_buffer_asks_for_resync(self):
+        cursor = self._poll().json()['cursor']
+        with override_settings(PUSH_BUFFER_SIZE=2):
+            get_backend()._buffers.pop(self.user.id, None)
+            notifications = [self._notify() for _ in range(3)]
+            data = self._poll(since=cursor).json()
+        assert data['resync'] is True
+        assert [e['id'] for e in data['events']] == [n.id for n in notifications[1:]]
+
+    def test_invalid_cursor_is_rejected(self):
+        assert self._poll(since='abc').status_code == 400
+
+    def test_memory_backend_requires_single_process(self):
+        with override_settings(PUSH_BACKEND='memory', PUSH_SINGLE_PROCESS=False):
+            with pytest.raises(ImproperlyConfigured):
+                MemoryPushBackend()
+            assert [e.id for e in check_push_backend(None)] == ['communication.E001']
+        with override_settings(PUSH_BACKEND='redis', PUSH_SINGLE_PROCESS=False):
+            assert check_push_backend(None) == []
+
+    def test_redis_client_has_short_timeouts(self):
+        with override_settings(PUSH_REDIS_URL='redis://redis.invalid:6379/1', PUSH_REDIS_TIMEOUT=0.5):
+            backend = RedisPushBackend()
+        kwargs = backend._client.connection_pool.connection_kwargs
+        assert kwargs['socket_timeout'] == 0.5
+        assert kwargs['socket_connect_timeout'] == 0.5
+
+    def test_stream_is_not_served_by_wsgi(self):
+        token = str(AccessToken.for_user(self.user))
+        response = self.client.get('/api/communication/stream/', {'token': token})
+        assert response.status_code == 503
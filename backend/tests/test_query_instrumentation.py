@@ -0,0 +1,111 @@
+"""
+Unit tests for the per-endpoint query instrumentation (apps.monitoring)
+"""
+import time
+from unittest import mock
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.monitoring.instrumentation import CACHE_REGISTRY_KEY, CACHE_TIMEOUT, EndpointStats, QueryRecorder, endpoint_stats, fingerprint_sql
+from .factories import SchoolFactory, UserFactory
+
+
+def _recorder(count=0, duplicates=0):
+    recorder = QueryRecorder()
+    recorder.count = count
+    if duplicates:
+        recorder.fingerprints['SELECT 1'] = duplicates
+    return recorder
+
+
+class TestQueryRecorder(TestCase):
+    def test_fingerprint_folds_in_lists(self):
+        sql = 'SELECT  *\n FROM t WHERE id IN (%s, %s, %s)'
+        assert fingerprint_sql(sql) == 'SELECT * FROM t WHERE id IN (...)'
+
+    def test_repeated_queries_are_reported_as_duplicates(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in (1, 2, 3):
+                User.objects.filter(pk=pk).first()
+        assert recorder.count == 3
+        assert recorder.duplicates()[0][1] == 3
+
+
+@pytest.mark.django_db
+class TestEndpointStats(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_processes_do_not_overwrite_each_other(self):
+        # Deux instances : deux workers qui écrivent chacun leur entrée du cache
+        worker_a, worker_b = EndpointStats(flush_interval=3600), EndpointStats(flush_interval=3600)
+        worker_a.record('GET books', _recorder(count=4), 10.0)
+        worker_b.record('GET books', _recorder(count=2, duplicates=2), 30.0)
+        worker_a.flush()
+        worker_b.flush()
+        worker_a.record('GET books', _recorder(count=6), 20.0)
+        worker_a.flush()
+
+        stats = worker_b.collect()['GET books']
+        assert stats['requests'] == 3
+        assert stats['total_queries'] == 12
+        assert stats['max_queries'] == 6
+        assert stats['max_wall_ms'] == 30.0
+        assert stats['worst_duplicate_count'] == 2
+
+        row = worker_a.report()[0]
+        assert row['avg_queries'] == 4.0
+
+    def test_reset_clears_every_process(self):
+        worker_a, worker_b = EndpointStats(flush_interval=3600), EndpointStats(flush_interval=3600)
+        worker_a.record('GET books', _recorder(count=1), 1.0)
+        worker_b.record('GET notes', _recorder(count=1), 1.0)
+        worker_a.flush()
+        worker_b.flush()
+        worker_a.reset()
+        assert worker_b.report() == []
+        worker_b.record('GET notes', _recorder(count=5), 1.0)
+        worker_b.flush()
+        assert worker_a.report()[0]['max_queries'] == 5
+
+    def test_stale_processes_leave_the_registry(self):
+        old_worker, new_worker = EndpointStats(flush_interval=3600), EndpointStats(flush_interval=3600)
+        old_worker.record('GET books', _recorder(count=1), 1.0)
+        old_worker.flush()
+        later = time.time() + CACHE_TIMEOUT + 1
+        with mock.patch('apps.monitoring.instrumentation.time.time', return_value=later):
+            new_worker.record('GET notes', _recorder(count=1), 1.0)
+            new_worker.flush()
+        assert list(cache.get(CACHE_REGISTRY_KEY)) == [new_worker._process()]
+        assert [row['endpoint'] for row in new_worker.report()] == ['GET notes']
+
+
+@pytest.mark.django_db
+@override_settings(QUERY_INSTRUMENTATION_ENABLED=True, QUERY_INSTRUMENTATION_FLUSH_SECONDS=0)
+class TestEndpointReport(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.school = SchoolFactory()
+        self.admin = UserFactory(role='ADMIN', school=self.school)
+        self.client = APIClient()
+
+    def tearDown(self):
+        endpoint_stats.reset()
+
+    def test_admin_sees_instrumented_endpoints(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/accounts/users/me/')
+        assert 'X-DB-Query-Count' in response
+        report = self.client.get('/api/monitoring/endpoints/')
+        assert report.status_code == 200
+        assert any(row['endpoint'].startswith('GET ') for row in report.data['results'])
+
+    def test_report_requires_school_admin_role(self):
+        staff = UserFactory(role='TEACHER', school=self.school, is_staff=True)
+        self.client.force_authenticate(staff)
+        assert self.client.get('/api/monitoring/endpoints/').status_code == 403
+        assert self.client.delete('/api/monitoring/endpoints/').status_code == 403
@@ -0,0 +1,99 @@
+"""
+Unit tests for quiz attempt autosave drafts (cache + write-behind)
+"""
+from decimal import Decimal
+from unittest import mock
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.elearning import drafts
+from apps.elearning.drafts import check_draft_cache, flush_quiz_drafts, load_draft, save_draft
+from apps.elearning.models import QuizAnswer, QuizAttemptDraft
+from .factories import QuizFactory, QuizQuestionFactory, QuizAttemptFactory
+
+
+@pytest.mark.django_db
+@override_settings(QUIZ_DRAFT_CACHE_ENABLED=True)
+class TestQuizDrafts(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.quiz = QuizFactory()
+        self.q1, self.q2, self.q3 = QuizQuestionFactory.create_batch(3, quiz=self.quiz, correct_answer='A')
+        self.attempt = QuizAttemptFactory(quiz=self.quiz)
+        self.client = APIClient()
+        self.client.force_authenticate(self.attempt.student.user)
+        self.url = f'/api/elearning/quiz-attempts/{self.attempt.id}/draft/'
+
+    def _patch(self, answers):
+        return self.client.patch(self.url, {'answers': answers}, format='json')
+
+    def test_autosave_hits_cache_only_after_first_write(self):
+        self.assertEqual(self._patch({self.q1.id: 'B'}).status_code, 200)
+        self.assertEqual(QuizAttemptDraft.objects.get().answers, {str(self.q1.id): 'B'})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._patch({self.q2.id: 'A'})
+        self.assertEqual(response.data['answers'], {str(self.q1.id): 'B', str(self.q2.id): 'A'})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(QuizAttemptDraft.objects.get().answers, {str(self.q1.id): 'B'})
+
+        self.assertEqual(flush_quiz_drafts(), 1)
+        self.assertEqual(QuizAttemptDraft.objects.get().answers, response.data['answers'])
+        self.assertEqual(flush_quiz_drafts(), 0)
+
+    def test_draft_survives_cache_loss(self):
+        self._patch({self.q1.id: 'A'})
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).data['answers'], {str(self.q1.id): 'A'})
+
+    def test_submit_merges_draft_and_discards_it(self):
+        self._patch({self.q1.id: 'A', self.q2.id: 'B'})
+        response = self.client.post(
+            f'/api/elearning/quiz-attempts/{self.attempt.id}/submit/',
+            {'answers': [{'question_id': self.q2.id, 'answer_text': 'A'}]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['score']), Decimal('2'))
+        self.assertEqual(QuizAnswer.objects.filter(attempt=self.attempt).count(), 2)
+        self.assertFalse(QuizAttemptDraft.objects.exists())
+        self.assertEqual(self._patch({self.q3.id: 'A'}).status_code, 400)
+
+    def test_other_users_and_bad_payloads_are_rejected(self):
+        self.assertEqual(self._patch(['not', 'answers']).status_code, 200)
+        self.assertEqual(self._patch({'abc': 'A'}).status_code, 400)
+        other = QuizAttemptFactory(quiz=self.quiz)
+        self.client.force_authenticate(other.student.user)
+        self.assertEqual(self._patch({self.q1.id: 'A'}).status_code, 404)
+
+    def test_concurrent_autosaves_are_merged(self):
+        user_id = self.attempt.student.user_id
+        # Deux requêtes ont lu le même brouillon avant d'écrire
+        first, second = load_draft(self.attempt.id, user_id), load_draft(self.attempt.id, user_id)
+        save_draft(self.attempt.id, first, {str(self.q1.id): 'A'})
+        save_draft(self.attempt.id, second, {str(self.q2.id): 'B'})
+        self.assertEqual(self.client.get(self.url).data['answers'], {str(self.q1.id): 'A', str(self.q2.id): 'B'})
+
+    def test_autosave_waits_for_the_draft_lock(self):
+        self._patch({self.q1.id: 'A'})
+        cache.add(drafts.LOCK_KEY.format(pk=self.attempt.id), True, 60)
+        with mock.patch.object(drafts, 'LOCK_WAIT', 0):
+            self.assertEqual(self._patch({self.q2.id: 'B'}).status_code, 409)
+        cache.delete(drafts.LOCK_KEY.format(pk=self.attempt.id))
+        self.assertEqual(self._patch({self.q2.id: 'B'}).status_code, 200)
+
+    @override_settings(QUIZ_DRAFT_CACHE_ENABLED=False)
+    def test_without_shared_cache_every_autosave_is_written_through(self):
+        self._patch({self.q1.id: 'A'})
+        # Autre worker : son cache local ne sait rien du brouillon
+        cache.clear()
+        response = self._patch({self.q2.id: 'B'})
+        self.assertEqual(response.data['answers'], {str(self.q1.id): 'A', str(self.q2.id): 'B'})
+        self.assertEqual(QuizAttemptDraft.objects.get().answers, response.data['answers'])
+        self.assertIsNone(cache.get(drafts.DRAFT_KEY.format(pk=self.attempt.id)))
+        self.assertEqual(flush_quiz_drafts(), 0)
+        self.assertEqual(check_draft_cache(None), [])
+        with override_settings(QUIZ_DRAFT_CACHE_ENABLED=True):
+            self.assertEqual([w.id for w in check_draft_cache(None)], ['elearning.W002'])
@@ -0,0 +1,63 @@
+"""
+Unit tests for batched quiz submission scoring
+"""
+from decimal import Decimal
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.elearning.grading import evaluate_answer
+from apps.elearning.models import QuizAnswer
+from .factories import QuizFactory, QuizQuestionFactory, QuizAttemptFactory
+
+
+@pytest.mark.django_db
+class TestQuizSubmit(TestCase):
+    def setUp(self):
+        self.quiz = QuizFactory(passing_score=Decimal('50'))
+        self.questions = QuizQuestionFactory.create_batch(40, quiz=self.quiz, correct_answer='B')
+        self.attempt = QuizAttemptFactory(quiz=self.quiz)
+        self.client = APIClient()
+        self.client.force_authenticate(self.attempt.student.user)
+        self.url = f'/api/elearning/quiz-attempts/{self.attempt.id}/submit/'
+
+    def _answers(self, correct_count):
+        return [
+            {'question_id': q.id, 'answer_text': 'B' if i < correct_count else 'C'}
+            for i, q in enumerate(self.questions)
+        ]
+
+    def test_submit_scores_with_constant_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'answers': self._answers(30)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['score']), Decimal('30'))
+        self.assertTrue(response.data['is_passed'])
+        self.assertEqual(QuizAnswer.objects.filter(attempt=self.attempt).count(), 40)
+        self.assertEqual(QuizAnswer.objects.filter(attempt=self.attempt, is_correct=True).count(), 30)
+        # Indépendant du nombre de questions (ancienne version : ~2 requêtes par réponse)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_second_submit_is_rejected(self):
+        self.client.post(self.url, {'answers': self._answers(10)}, format='json')
+        response = self.client.post(self.url, {'answers': self._answers(40)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, Decimal('10'))
+        self.assertFalse(self.attempt.is_passed)
+        self.assertEqual(QuizAnswer.objects.filter(attempt=self.attempt).count(), 40)
+
+    def test_question_from_another_quiz_is_rejected(self):
+        other = QuizQuestionFactory()
+        response = self.client.post(
+            self.url, {'answers': [{'question_id': other.id, 'answer_text': 'A'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.attempt.refresh_from_db()
+        self.assertIsNone(self.attempt.submitted_at)
+        self.assertFalse(QuizAnswer.objects.exists())
+
+    def test_evaluate_answer_partial_text_credit(self):
+        self.assertEqual(evaluate_answer('TEXT', 'la photosynthèse', 'La photosynthèse', 2), (True, 2.0))
+        self.assertEqual(evaluate_answer('NUMBER', 'abc', '4', 2), (False, 0))
@@ -0,0 +1,121 @@
+"""
+Unit tests for the bulk student/parent import pipeline
+"""
+import io
+import shutil
+import tempfile
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.accounts.importers import StudentImporter
+from apps.accounts.models import User, Student, StudentImportJob
+from apps.schools.models import School, SchoolClass, StudentClassEnrollment
+
+CSV_CONTENT = (
+    "prenom;nom;classe;telephone_du_parent;nom_du_parent;date_de_naissance\n"
+    "Jean;KABILA;1ère A;+243 900 000 001;KABILA Joseph;12/03/2015\n"
+    "Marie;KABILA;1ère A;+243900000001;KABILA Joseph;2016-01-20\n"
+    "Paul;MBUYI;2ème Z;+243900000002;MBUYI Pierre;\n"
+    ";SANS;1ère A;;;\n"
+)
+
+
+@pytest.mark.django_db
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], PASSWORD_HASH_WORKERS=1)
+class TestStudentImporter(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(
+            name="Test School", code="TEST", address="Test Address", city="Kinshasa",
+            phone="+243900000000", email="test@school.com", academic_year="2024-2025",
+        )
+        self.school_class = SchoolClass.objects.create(
+            school=self.school, name="1ère A", level="Primaire", grade="1ère", academic_year="2024-2025"
+        )
+
+    def _run(self, **kwargs):
+        upload = io.BytesIO(CSV_CONTENT.encode('utf-8'))
+        return StudentImporter(self.school, **kwargs).run(upload, 'eleves.csv')
+
+    def test_import_dedupes_parents_and_reports_row_errors(self):
+        report = self._run()
+        assert report['total_rows'] == 4
+        assert report['created_students'] == 2
+        assert report['created_parents'] == 1
+        assert sorted(e['row'] for e in report['errors']) == [4, 5]
+
+        students = Student.objects.filter(user__school=self.school).select_related('parent')
+        assert students.count() == 2
+        assert len({s.parent_id for s in students}) == 1
+        assert all(s.student_id.startswith('TEST-') for s in students)
+        assert StudentClassEnrollment.objects.filter(school_class=self.school_class).count() == 2
+        assert User.objects.get(username='jean.kabila').check_password('Eleve@@')
+
+    def test_existing_parent_is_reused_by_phone(self):
+        User.objects.create_user(
+            username='joseph.kabila', password='x', role='PARENT', school=self.school, phone='+243900000001'
+        )
+        report = self._run()
+        assert report['created_parents'] == 0
+        assert report['reused_parents'] == 2
+
+    def test_dry_run_writes_nothing(self):
+        report = self._run(dry_run=True)
+        assert report['created_students'] == 2
+        assert not Student.objects.exists()
+
+
+@pytest.mark.django_db
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], PASSWORD_HASH_WORKERS=1)
+class TestStudentImportEndpoint(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp, STUDENT_IMPORT_MODE='sync')
+        self.settings_override.enable()
+        self.school = School.objects.create(
+            name="Test School", code="TEST", address="Test Address", city="Kinshasa",
+            phone="+243900000000", email="test@school.com", academic_year="2024-2025",
+        )
+        SchoolClass.objects.create(
+            school=self.school, name="1ère A", level="Primaire", grade="1ère", academic_year="2024-2025"
+        )
+        self.admin = User.objects.create_user(username='import_admin', password='x', role='ADMIN', school=self.school)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _post(self, **data):
+        upload = SimpleUploadedFile('eleves.csv', CSV_CONTENT.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/accounts/students/import/', {'file': upload, **data}, format='multipart')
+
+    def test_dry_run_is_validated_inline(self):
+        response = self._post(dry_run='true')
+        assert response.status_code == 200
+        assert response.data['created_students'] == 2
+        assert not StudentImportJob.objects.exists()
+        assert not Student.objects.exists()
+
+    def test_import_is_queued_and_status_can_be_polled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post()
+        assert response.status_code == 202
+        job_id = response.data['job_id']
+        assert response.data['status'] == 'PENDING'
+        assert Student.objects.filter(user__school=self.school).count() == 2
+
+        status_response = self.client.get(f'/api/accounts/students/import/{job_id}/')
+        assert status_response.status_code == 200
+        assert status_response.data['status'] == 'DONE'
+        assert status_response.data['report']['created_students'] == 2
+        assert not StudentImportJob.objects.get(pk=job_id).file
+
+    def test_invalid_file_marks_job_failed(self):
+        upload = SimpleUploadedFile('eleves.csv', b"colonne;autre\n1;2\n", content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/accounts/students/import/', {'file': upload}, format='multipart')
+        job = StudentImportJob.objects.get(pk=response.data['job_id'])
+        assert job.status == 'FAILED'
+        assert 'En-tête invalide' in job.error
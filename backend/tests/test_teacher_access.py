@@ -0,0 +1,65 @@
+"""
+Unit tests for the precomputed teacher access map (TeacherClassAccess)
+"""
+from unittest import mock
+import pytest
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.schools.access import teacher_can_manage, refresh_teacher_access
+from apps.schools.models import TeacherClassAccess
+from .factories import (
+    SchoolFactory, TeacherFactory, SchoolClassFactory, SubjectFactory, ClassSubjectFactory, AttendanceFactory,
+)
+
+
+@pytest.mark.django_db
+class TestTeacherClassAccess(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.titulaire = TeacherFactory(user__school=self.school)
+        self.teacher = TeacherFactory(user__school=self.school)
+        self.school_class = SchoolClassFactory(school=self.school, titulaire=self.titulaire)
+        self.math = SubjectFactory(school=self.school)
+        self.french = SubjectFactory(school=self.school)
+
+    def test_titulaire_manages_every_subject(self):
+        assert teacher_can_manage(self.titulaire, self.school_class, self.math)
+        assert teacher_can_manage(self.titulaire, self.school_class, self.french)
+
+    def test_assignment_is_tracked_by_signals(self):
+        assignment = ClassSubjectFactory(school_class=self.school_class, subject=self.math, teacher=self.teacher)
+        assert teacher_can_manage(self.teacher, self.school_class, self.math)
+        assert not teacher_can_manage(self.teacher, self.school_class, self.french)
+
+        assignment.delete()
+        assert not teacher_can_manage(self.teacher, self.school_class, self.math)
+
+    def test_titulaire_change_and_full_refresh(self):
+        self.school_class.titulaire = self.teacher
+        self.school_class.save()
+        assert not teacher_can_manage(self.titulaire, self.school_class)
+        assert teacher_can_manage(self.teacher, self.school_class, self.math)
+
+        TeacherClassAccess.objects.all().delete()
+        assert refresh_teacher_access() == 1
+        assert teacher_can_manage(self.teacher, self.school_class)
+
+    def test_saving_class_without_titulaire_change_skips_refresh(self):
+        with mock.patch('apps.schools.signals.refresh_teacher_access') as refresh:
+            self.school_class.name = 'Renommée'
+            self.school_class.save()
+            refresh.assert_not_called()
+            self.school_class.titulaire = None
+            self.school_class.save()
+            refresh.assert_called_once_with([self.school_class.id])
+
+    def test_attendance_is_not_scoped_to_teacher_classes(self):
+        # Comme avant la carte d'accès : un enseignant voit les présences de toute son école
+        other_class = SchoolClassFactory(school=self.school)
+        AttendanceFactory(student__school_class=other_class, student__user__school=self.school)
+        client = APIClient()
+        client.force_authenticate(self.teacher.user)
+        response = client.get('/api/academics/attendance/')
+        assert response.status_code == 200
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        assert len(results) == 1
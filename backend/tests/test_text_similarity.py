@@ -0,0 +1,41 @@
+"""
+Unit tests for the text-answer similarity engine
+"""
+import time
+from django.test import SimpleTestCase, override_settings
+from apps.elearning.grading import evaluate_answer, evaluate_answers
+from apps.elearning.similarity import fold, tokenize, similarity, reference_profile
+
+
+class TestTextSimilarity(SimpleTestCase):
+    def test_normalization_folds_accents_punctuation_and_stop_words(self):
+        self.assertEqual(fold('Élève ÇA Œuvre'), 'eleve ca oeuvre')
+        self.assertEqual(tokenize("La photosynthèse, c'est la vie !"), ['photosynthese', 'vie'])
+        self.assertEqual(tokenize('Le'), ['le'])
+
+    def test_similarity_is_order_and_accent_insensitive(self):
+        self.assertEqual(similarity('Vie; PHOTOSYNTHESE', 'la photosynthèse et la vie'), 1.0)
+        self.assertGreater(similarity('photosyntese', 'photosynthèse'), 0.65)
+        self.assertLess(similarity('respiration cellulaire', 'photosynthèse'), 0.4)
+        self.assertEqual(similarity('', ''), 1.0)
+
+    def test_grading_thresholds(self):
+        self.assertEqual(evaluate_answer('TEXT', 'la Photosynthèse', 'photosynthese', 2), (True, 2.0))
+        self.assertEqual(evaluate_answer('SHORT_ANSWER', 'mitochondrie', 'photosynthese', 2), (False, 0))
+        self.assertEqual(evaluate_answer('ESSAY', '', '', 2), (True, 2.0))
+        is_correct, pts = evaluate_answer('TEXT', 'Kinshasa', 'Kinshasa est la capitale de la RDC', 4)
+        self.assertFalse(is_correct)
+        self.assertTrue(0 < pts < 4)
+
+    def test_batch_grades_all_answers_with_one_reference_profile(self):
+        reference_profile.cache_clear()
+        results = evaluate_answers('TEXT', ['Kinshasa', 'Lubumbashi', None], 'Kinshasa', 1)
+        self.assertEqual(results, [(True, 1.0), (False, 0), (False, 0)])
+        self.assertEqual(reference_profile.cache_info().misses, 1)
+
+    @override_settings(SIMILARITY_MAX_TOKENS=50)
+    def test_long_essays_are_capped(self):
+        essay = ' '.join(f'mot{i}' for i in range(200000))
+        start = time.monotonic()
+        self.assertEqual(similarity(essay, essay + ' fin'), 1.0)
+        self.assertLess(time.monotonic() - start, 1.0)
@@ -0,0 +1,51 @@
+"""
+Unit tests for the maintained unread counters (UnreadCounter)
+"""
+import pytest
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.communication.counters import rebuild_counters, get_counters
+from apps.communication.models import Notification, Message, UnreadCounter
+from .factories import SchoolFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestUnreadCounters(TestCase):
+    def setUp(self):
+        self.school = SchoolFactory()
+        self.user = UserFactory(school=self.school, role='PARENT')
+        self.sender = UserFactory(school=self.school, role='TEACHER')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _notify(self, n):
+        return [
+            Notification.objects.create(
+                user=self.user, school=self.school, notification_type='GENERAL', title=f"N{i}", message="..."
+            )
+            for i in range(n)
+        ]
+
+    def test_counters_follow_create_read_and_mark_all_read(self):
+        notifications = self._notify(3)
+        message = Message.objects.create(
+            sender=self.sender, recipient=self.user, school=self.school, subject="Devoir", message="..."
+        )
+        assert self.client.get('/api/communication/counters/').json() == {
+            'notifications': 3, 'messages': 1, 'tutoring_messages': 0,
+        }
+
+        self.client.post(f'/api/communication/notifications/{notifications[0].id}/mark_read/')
+        self.client.post(f'/api/communication/messages/{message.id}/mark_read/')
+        assert get_counters(self.user) == {'notifications': 2, 'messages': 0, 'tutoring_messages': 0}
+
+        response = self.client.post('/api/communication/notifications/mark_all_read/')
+        assert response.json()['marked_read'] == 2
+        assert get_counters(self.user)['notifications'] == 0
+
+    def test_rebuild_counters(self):
+        self._notify(2)
+        UnreadCounter.objects.all().delete()
+        assert get_counters(self.user)['notifications'] == 0
+        assert rebuild_counters() == 1
+        assert get_counters(self.user)['notifications'] == 2